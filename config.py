@@ -13,6 +13,15 @@ MAP_HEIGHT = 576        # 36 tiles * 16
 # 瓦片设置
 TILE_SIZE = 16          # 每个瓦片的像素大小
 
+# 瓦片图集设置（Pyxel 共有 3 个 256x256 图像库和 8 个瓦片地图）
+TILE_ATLAS_BANK = 0     # 烘焙地面瓦片所用的图像库
+TILEMAP_EAST_CAMPUS = 0 # 东校区地面瓦片地图
+TILEMAP_TUNNEL = 1      # 地下通道
+TILEMAP_WEST_CAMPUS = 2 # 西校区
+TILEMAP_LIBRARY = 3     # 图书馆内部
+LANDMARK_BANK = 1       # 烘焙地标建筑静态部分所用的图像库
+WORLD_LAYER_BANK = 2    # 相机的持久化世界图层（与屏幕同大，环形使用）
+
 # 动画设置
 WIND_SPEED = 0.05       # 风速（用于草地和树木摆动）
 
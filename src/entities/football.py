@@ -7,11 +7,16 @@
 import pyxel
 import math
 from config import TILE_SIZE
+from src.systems.collision import sweep_aabb, bounds_checker
 
 
 class Football:
     """足球类"""
     
+    __slots__ = ('x', 'y', 'vx', 'vy', 'radius', 'friction', 'kick_power', 'min_speed',
+                 'field_min_x', 'field_min_y', 'field_max_x', 'field_max_y',
+                 'field_checker', 'rotation')
+    
     def __init__(self, x, y, field_bounds):
         """
         初始化足球
@@ -35,29 +40,24 @@ class Football:
         self.field_min_y = field_bounds[1]
         self.field_max_x = field_bounds[2]
         self.field_max_y = field_bounds[3]
+        self.field_checker = bounds_checker(*field_bounds)
         
         # 动画
         self.rotation = 0  # 旋转角度
         
     def update(self):
         """更新足球状态"""
-        # 应用速度
-        self.x += self.vx
-        self.y += self.vy
+        # 应用速度（扫掠足球的包围盒，碰到场地边界时停在边界上）
+        size = self.radius * 2
+        result = sweep_aabb(self.field_checker, self.x - self.radius, self.y - self.radius,
+                            size, size, self.vx, self.vy)
+        self.x = result.x + self.radius
+        self.y = result.y + self.radius
         
-        # 边界检测和反弹
-        if self.x - self.radius < self.field_min_x:
-            self.x = self.field_min_x + self.radius
-            self.vx = -self.vx * 0.6  # 反弹并损失能量
-        elif self.x + self.radius > self.field_max_x:
-            self.x = self.field_max_x - self.radius
+        # 按接触法线反弹并损失能量
+        if result.normal_x:
             self.vx = -self.vx * 0.6
-            
-        if self.y - self.radius < self.field_min_y:
-            self.y = self.field_min_y + self.radius
-            self.vy = -self.vy * 0.6
-        elif self.y + self.radius > self.field_max_y:
-            self.y = self.field_max_y - self.radius
+        if result.normal_y:
             self.vy = -self.vy * 0.6
         
         # 应用摩擦力
@@ -11,6 +11,10 @@ from config import TILE_SIZE
 class Goal:
     """足球球门类"""
     
+    __slots__ = ('x', 'y', 'side', 'width', 'height',
+                 'goal_area_x1', 'goal_area_x2', 'goal_area_y1', 'goal_area_y2',
+                 'goal_scored', 'goal_timer', 'score')
+    
     def __init__(self, x, y, side):
         """
         初始化球门
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+锦鲤池塘
+小碧池里的锦鲤按鱼群（boids）规则游动：对齐邻居的方向、向邻居靠拢、与太近的鱼分开，
+靠近椭圆池边时转回池中央。玩家在岸边走动时附近的鱼会四散游开，
+在岸边站定一会儿后鱼群会游过来（等着喂食）。
+有 NumPy 时整池的鱼每帧用数组运算一次更新，没有 NumPy（如 Web/Pyodide 未加载）时
+退回逐条计算的纯 Python 实现，两者规则相同
+"""
+
+import math
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    # Web(Pyodide) 环境不一定加载 NumPy，退回纯 Python 实现
+    np = None
+
+TWO_PI = 2 * math.pi
+
+
+class KoiPond:
+    """
+    椭圆池塘中的锦鲤群
+
+    每个字段是一列（NumPy 数组或列表），鱼就是下标：
+    x, y（鱼身中心）、heading（朝向，弧度）、speed、tail_phase（尾巴摆动相位）、color。
+    """
+
+    # 鱼群规则
+    NEIGHBOR_RADIUS = 20     # 对齐和靠拢只看这个距离内的鱼
+    SEPARATION_RADIUS = 7    # 比这更近就互相推开
+    ALIGNMENT_WEIGHT = 0.05
+    COHESION_WEIGHT = 0.004
+    SEPARATION_WEIGHT = 0.8
+    MAX_TURN = 0.12          # 每帧最大转向（弧度）
+    WANDER = 0.08            # 每帧随机转向幅度
+
+    # 池边：归一化椭圆半径超过 WALL_START 开始转向中央，鱼身中心不超过 WALL_LIMIT
+    WALL_START = 0.7
+    WALL_LIMIT = 0.95
+    WALL_WEIGHT = 1.2
+
+    # 玩家：走动时附近的鱼四散，站定 FEED_WAIT 帧后岸边附近的鱼游过来
+    FLEE_RADIUS = 36
+    FLEE_WEIGHT = 1.5
+    FLEE_SPEED = 3.0         # 受惊时的速度倍数
+    FEED_WAIT = 60
+    FEED_RADIUS = 96
+    FEED_WEIGHT = 0.01
+    SHORE_DISTANCE = 1.6     # 玩家在归一化椭圆半径这个范围内算站在岸边
+
+    def __init__(self, center_x, center_y, radius_x, radius_y, colors, seed=None, use_numpy=None):
+        """
+        初始化锦鲤池塘
+
+        参数:
+            center_x, center_y: 游动椭圆的中心（像素）
+            radius_x, radius_y: 游动椭圆的半径（像素，应比池塘略小，留出边距）
+            colors: 每条鱼的颜色列表（长度即鱼的数量）
+            seed: 随机种子（可选）
+            use_numpy: 是否使用 NumPy，None 表示可用时就用
+        """
+        self.center_x = center_x
+        self.center_y = center_y
+        self.radius_x = radius_x
+        self.radius_y = radius_y
+        self.count = len(colors)
+        self.use_numpy = np is not None if use_numpy is None else (use_numpy and np is not None)
+        self.backend = "numpy" if self.use_numpy else "python"
+
+        # 玩家状态（用来区分走动和站定）
+        self._player_pos = None
+        self._player_still = 0
+
+        # 统计（调试用）
+        self.step_ms = 0.0
+        self.fleeing = 0
+
+        # 初始位置：椭圆内随机
+        rng = random.Random(seed)
+        xs, ys, headings, speeds, phases = [], [], [], [], []
+        for _ in range(self.count):
+            angle = rng.uniform(0, TWO_PI)
+            r = rng.uniform(0.3, 0.8)  # 距离中心的比例
+            xs.append(center_x + math.cos(angle) * radius_x * r)
+            ys.append(center_y + math.sin(angle) * radius_y * r)
+            headings.append(rng.uniform(0, TWO_PI))
+            speeds.append(rng.uniform(0.3, 0.5))
+            phases.append(rng.uniform(0, TWO_PI))
+
+        if self.use_numpy:
+            self._rng = np.random.default_rng(seed)
+            self.x = np.array(xs)
+            self.y = np.array(ys)
+            self.heading = np.array(headings)
+            self.speed = np.array(speeds)
+            self.base_speed = self.speed.copy()
+            self.tail_phase = np.array(phases)
+            self.color = np.array(colors, dtype=np.int8)
+        else:
+            self._rng = rng
+            self.x = xs
+            self.y = ys
+            self.heading = headings
+            self.speed = speeds
+            self.base_speed = list(speeds)
+            self.tail_phase = phases
+            self.color = list(colors)
+
+    def __len__(self):
+        return self.count
+
+    def bounds(self):
+        """鱼可能出现的包围盒 (x, y, w, h)，绘制时整池裁剪用"""
+        return (self.center_x - self.radius_x, self.center_y - self.radius_y,
+                self.radius_x * 2, self.radius_y * 2)
+
+    def bytes_per_entity(self):
+        """每条鱼占用的字节数（各列元素大小之和）"""
+        if self.use_numpy:
+            columns = (self.x, self.y, self.heading, self.speed, self.base_speed,
+                       self.tail_phase, self.color)
+            return sum(column.itemsize for column in columns)
+        # 列表每个元素是一个指针加一个浮点对象（颜色是缓存的小整数，只计指针）
+        return 6 * (8 + sys.getsizeof(0.0)) + 8
+
+    def update(self, player_x=None, player_y=None):
+        """
+        推进一帧
+
+        参数:
+            player_x, player_y: 玩家中心（像素），玩家不在这张地图时传 None
+        """
+        start = time.perf_counter()
+        if player_x is None:
+            self._player_pos = None
+            self._player_still = 0
+        else:
+            if self._player_pos == (player_x, player_y):
+                self._player_still += 1
+            else:
+                self._player_still = 0
+            self._player_pos = (player_x, player_y)
+
+        if self.count:
+            if self.use_numpy:
+                self._step_numpy()
+            else:
+                self._step_python()
+        self.step_ms = (time.perf_counter() - start) * 1000
+
+    def _player_mode(self):
+        """玩家对鱼群的影响：返回 ('flee' 或 'feed', 玩家x, 玩家y)，没有影响时返回 None"""
+        if self._player_pos is None:
+            return None
+        px, py = self._player_pos
+        if self._player_still < self.FEED_WAIT:
+            return ('flee', px, py)
+        nx = (px - self.center_x) / self.radius_x
+        ny = (py - self.center_y) / self.radius_y
+        if nx * nx + ny * ny <= self.SHORE_DISTANCE * self.SHORE_DISTANCE:
+            # 游向岸边离玩家最近的水面
+            norm = math.sqrt(nx * nx + ny * ny)
+            scale = min(1.0, self.WALL_START / norm) if norm > 0 else 1.0
+            return ('feed', self.center_x + (px - self.center_x) * scale,
+                    self.center_y + (py - self.center_y) * scale)
+        return None
+
+    def _step_numpy(self):
+        """整池一次数组运算"""
+        x, y, heading, speed = self.x, self.y, self.heading, self.speed
+        vx = np.cos(heading) * speed
+        vy = np.sin(heading) * speed
+
+        # 两两相对位置 (i - j)
+        dx = x[:, None] - x[None, :]
+        dy = y[:, None] - y[None, :]
+        dist2 = dx * dx + dy * dy
+        np.fill_diagonal(dist2, np.inf)
+
+        # 对齐与靠拢
+        near = (dist2 < self.NEIGHBOR_RADIUS ** 2).astype(float)
+        neighbors = near.sum(axis=1)
+        has_neighbors = neighbors > 0
+        divisor = np.maximum(neighbors, 1)
+        steer_x = np.where(has_neighbors,
+                           self.ALIGNMENT_WEIGHT * (near @ vx / divisor - vx)
+                           + self.COHESION_WEIGHT * (near @ x / divisor - x), 0.0)
+        steer_y = np.where(has_neighbors,
+                           self.ALIGNMENT_WEIGHT * (near @ vy / divisor - vy)
+                           + self.COHESION_WEIGHT * (near @ y / divisor - y), 0.0)
+
+        # 分开
+        push = np.where(dist2 < self.SEPARATION_RADIUS ** 2, 1.0 / np.maximum(dist2, 1e-6), 0.0)
+        steer_x += self.SEPARATION_WEIGHT * (dx * push).sum(axis=1)
+        steer_y += self.SEPARATION_WEIGHT * (dy * push).sum(axis=1)
+
+        # 池边
+        off_x = x - self.center_x
+        off_y = y - self.center_y
+        norm = np.sqrt((off_x / self.radius_x) ** 2 + (off_y / self.radius_y) ** 2)
+        wall = np.maximum(norm - self.WALL_START, 0.0) * self.WALL_WEIGHT / np.maximum(norm, 1e-6)
+        steer_x -= off_x / self.radius_x * wall
+        steer_y -= off_y / self.radius_y * wall
+
+        # 玩家
+        target_speed = self.base_speed
+        self.fleeing = 0
+        mode = self._player_mode()
+        if mode is not None:
+            kind, px, py = mode
+            to_x = x - px
+            to_y = y - py
+            dist = np.sqrt(to_x * to_x + to_y * to_y)
+            safe = np.maximum(dist, 1e-6)
+            if kind == 'flee':
+                scared = dist < self.FLEE_RADIUS
+                strength = np.where(scared, self.FLEE_WEIGHT * (1 - dist / self.FLEE_RADIUS) / safe, 0.0)
+                steer_x += to_x * strength
+                steer_y += to_y * strength
+                target_speed = np.where(scared, self.base_speed * self.FLEE_SPEED, self.base_speed)
+                self.fleeing = int(scared.sum())
+            else:
+                pull = np.where(dist < self.FEED_RADIUS, self.FEED_WEIGHT, 0.0)
+                steer_x -= to_x * pull
+                steer_y -= to_y * pull
+
+        # 转向（限制每帧转角）并加一点随机摆动
+        desired = np.arctan2(vy + steer_y, vx + steer_x)
+        turn = np.remainder(desired - heading + math.pi, TWO_PI) - math.pi
+        heading += np.clip(turn, -self.MAX_TURN, self.MAX_TURN)
+        heading += self._rng.uniform(-self.WANDER, self.WANDER, self.count)
+        np.remainder(heading, TWO_PI, out=heading)
+        speed += (target_speed - speed) * 0.1
+
+        # 移动，越过池边的拉回边界内
+        x += np.cos(heading) * speed
+        y += np.sin(heading) * speed
+        off_x = x - self.center_x
+        off_y = y - self.center_y
+        norm = np.sqrt((off_x / self.radius_x) ** 2 + (off_y / self.radius_y) ** 2)
+        outside = norm > self.WALL_LIMIT
+        if outside.any():
+            scale = np.where(outside, self.WALL_LIMIT / np.maximum(norm, 1e-6), 1.0)
+            x[:] = self.center_x + off_x * scale
+            y[:] = self.center_y + off_y * scale
+
+        # 尾巴摆动，游得越快摆得越快
+        self.tail_phase += 0.3 + speed * 0.5
+        np.remainder(self.tail_phase, TWO_PI, out=self.tail_phase)
+
+    def _step_python(self):
+        """逐条计算（没有 NumPy 时），邻居按格子分桶查找"""
+        x, y, heading, speed = self.x, self.y, self.heading, self.speed
+        count = self.count
+        vx = [math.cos(heading[i]) * speed[i] for i in range(count)]
+        vy = [math.sin(heading[i]) * speed[i] for i in range(count)]
+
+        cell = self.NEIGHBOR_RADIUS
+        buckets = {}
+        for i in range(count):
+            buckets.setdefault((int(x[i] // cell), int(y[i] // cell)), []).append(i)
+
+        mode = self._player_mode()
+        neighbor_r2 = self.NEIGHBOR_RADIUS ** 2
+        separation_r2 = self.SEPARATION_RADIUS ** 2
+        cx, cy, rx, ry = self.center_x, self.center_y, self.radius_x, self.radius_y
+        rng = self._rng
+        self.fleeing = 0
+        new_heading = [0.0] * count
+        new_speed = [0.0] * count
+
+        for i in range(count):
+            xi, yi = x[i], y[i]
+            steer_x = steer_y = 0.0
+            sum_x = sum_y = sum_vx = sum_vy = 0.0
+            neighbors = 0
+            cell_x, cell_y = int(xi // cell), int(yi // cell)
+            for bx in range(cell_x - 1, cell_x + 2):
+                for by in range(cell_y - 1, cell_y + 2):
+                    for j in buckets.get((bx, by), ()):
+                        if j == i:
+                            continue
+                        dx = xi - x[j]
+                        dy = yi - y[j]
+                        dist2 = dx * dx + dy * dy
+                        if dist2 < neighbor_r2:
+                            neighbors += 1
+                            sum_x += x[j]
+                            sum_y += y[j]
+                            sum_vx += vx[j]
+                            sum_vy += vy[j]
+                            if dist2 < separation_r2:
+                                push = self.SEPARATION_WEIGHT / max(dist2, 1e-6)
+                                steer_x += dx * push
+                                steer_y += dy * push
+            if neighbors:
+                steer_x += (self.ALIGNMENT_WEIGHT * (sum_vx / neighbors - vx[i])
+                            + self.COHESION_WEIGHT * (sum_x / neighbors - xi))
+                steer_y += (self.ALIGNMENT_WEIGHT * (sum_vy / neighbors - vy[i])
+                            + self.COHESION_WEIGHT * (sum_y / neighbors - yi))
+
+            # 池边
+            off_x, off_y = xi - cx, yi - cy
+            norm = math.sqrt((off_x / rx) ** 2 + (off_y / ry) ** 2)
+            if norm > self.WALL_START:
+                wall = (norm - self.WALL_START) * self.WALL_WEIGHT / norm
+                steer_x -= off_x / rx * wall
+                steer_y -= off_y / ry * wall
+
+            # 玩家
+            target_speed = self.base_speed[i]
+            if mode is not None:
+                kind, px, py = mode
+                to_x, to_y = xi - px, yi - py
+                dist = math.sqrt(to_x * to_x + to_y * to_y)
+                if kind == 'flee':
+                    if dist < self.FLEE_RADIUS:
+                        strength = self.FLEE_WEIGHT * (1 - dist / self.FLEE_RADIUS) / max(dist, 1e-6)
+                        steer_x += to_x * strength
+                        steer_y += to_y * strength
+                        target_speed *= self.FLEE_SPEED
+                        self.fleeing += 1
+                elif dist < self.FEED_RADIUS:
+                    steer_x -= to_x * self.FEED_WEIGHT
+                    steer_y -= to_y * self.FEED_WEIGHT
+
+            # 转向（限制每帧转角）并加一点随机摆动
+            desired = math.atan2(vy[i] + steer_y, vx[i] + steer_x)
+            turn = (desired - heading[i] + math.pi) % TWO_PI - math.pi
+            turn = max(-self.MAX_TURN, min(self.MAX_TURN, turn))
+            new_heading[i] = (heading[i] + turn + rng.uniform(-self.WANDER, self.WANDER)) % TWO_PI
+            new_speed[i] = speed[i] + (target_speed - speed[i]) * 0.1
+
+        # 移动，越过池边的拉回边界内
+        for i in range(count):
+            heading[i] = new_heading[i]
+            speed[i] = new_speed[i]
+            nx = x[i] + math.cos(heading[i]) * speed[i]
+            ny = y[i] + math.sin(heading[i]) * speed[i]
+            off_x, off_y = nx - cx, ny - cy
+            norm = math.sqrt((off_x / rx) ** 2 + (off_y / ry) ** 2)
+            if norm > self.WALL_LIMIT:
+                scale = self.WALL_LIMIT / norm
+                nx = cx + off_x * scale
+                ny = cy + off_y * scale
+            x[i] = nx
+            y[i] = ny
+            # 尾巴摆动，游得越快摆得越快
+            self.tail_phase[i] = (self.tail_phase[i] + 0.3 + speed[i] * 0.5) % TWO_PI
+
+    def get_draw_data(self):
+        """绘制用的数据：(x 列表, y 列表, 朝向列表, 尾巴相位列表, 颜色列表)"""
+        if self.use_numpy:
+            return (self.x.tolist(), self.y.tolist(), self.heading.tolist(),
+                    self.tail_phase.tolist(), self.color.tolist())
+        return self.x, self.y, self.heading, self.tail_phase, self.color
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        return [
+            f"koi: {self.count} backend: {self.backend}",
+            f"step: {self.step_ms:.3f}ms fleeing: {self.fleeing}",
+        ]
@@ -6,12 +6,41 @@ NPC 类 - 精细版
 
 import pyxel
 import math
-from config import TILE_SIZE
+from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT
+from src.utils.animation_clock import get_clock
+from src.utils.sprite_atlas import get_sprite_atlas, PLACEHOLDER_CLOTH
+from src.systems.collision import sweep_aabb
+from src.systems.spatial_hash import SpatialHash
 
 
 class NPC:
     """NPC 基类"""
     
+    # 固定字段（不建实例字典，每个 NPC 的内存更小、属性访问更快）
+    __slots__ = (
+        'id', 'name', 'type', 'x', 'y', 'direction', 'dialogues', 'personality',
+        'can_play_football', 'sprite_shape', 'shirt_color', 'sprite_palette',
+        'width', 'height', 'dialogue_index', 'is_talking',
+        'collision_checker', 'pathfinder', 'home_destination',
+        'anim_timer', 'anim_frame', 'idle_timer',
+        'action_state', 'action_type', 'action_timer', 'action_duration',
+        'home_x', 'home_y', 'target_x', 'target_y', 'action_destination', 'move_speed',
+        'football_ref', 'target_goal',
+    )
+    
+    # 精灵相对绘制原点的包围盒 (ox, oy, w, h)
+    SPRITE_BOUNDS = (0, 0, 14, 16)
+    
+    # 各类型学生的默认衬衫颜色（其他人类 NPC 用学生造型，默认绿色）
+    SHIRT_COLORS = {
+        'student': 12,         # 蓝色
+        'student_female': 14,  # 紫色
+    }
+    DEFAULT_SHIRT_COLOR = 11
+    
+    # 玩家与 NPC 中心的横纵距离都小于该值时可以交互
+    INTERACTION_DISTANCE = 24
+    
     def __init__(self, npc_data):
         """初始化 NPC"""
         self.id = npc_data.get('id', 'npc')
@@ -24,6 +53,15 @@ class NPC:
         self.personality = npc_data.get('personality', '')  # AI 人物设定
         self.can_play_football = npc_data.get('can_play_football', False)  # 是否可以踢足球
         
+        # 外观：学生造型的衬衫颜色在绘制时换色，同造型的 NPC 共用一份精灵
+        self.sprite_shape = self._sprite_shape()
+        self.shirt_color = npc_data.get(
+            'shirt_color', self.SHIRT_COLORS.get(self.type, self.DEFAULT_SHIRT_COLOR))
+        if self.sprite_shape in ('student', 'student_female'):
+            self.sprite_palette = ((PLACEHOLDER_CLOTH, self.shirt_color),)
+        else:
+            self.sprite_palette = ()
+        
         self.width = 14
         self.height = 16
         self.dialogue_index = 0
@@ -32,6 +70,10 @@ class NPC:
         # 碰撞检测
         self.collision_checker = None  # 碰撞检测函数，由外部设置
         
+        # 寻路（由外部用 set_pathfinder 设置，没有寻路器时直线走向目标）
+        self.pathfinder = None
+        self.home_destination = None  # 原位在寻路器中登记的目的地名称
+        
         # 动画
         self.anim_timer = 0
         self.anim_frame = 0
@@ -46,9 +88,20 @@ class NPC:
         self.home_y = self.y  # 原始位置Y
         self.target_x = 0  # 目标位置X
         self.target_y = 0  # 目标位置Y
+        self.action_destination = None  # 目标所在的常用目的地（按流场寻路）
         self.move_speed = 1.5  # 移动速度
+        self.football_ref = None  # 足球引用，用于踢球时追踪
+        self.target_goal = None  # 目标球门
+        
+    def set_pathfinder(self, pathfinder):
+        """设置寻路器，并把原位登记为常用目的地（回原位时按流场走）"""
+        self.pathfinder = pathfinder
+        self.home_destination = ('home', self.id)
+        tile_x = int((self.home_x + self.width / 2) // TILE_SIZE)
+        tile_y = int((self.home_y + self.height / 2) // TILE_SIZE)
+        pathfinder.add_destination(self.home_destination, (tile_x, tile_y, 1, 1))
         
-    def start_action(self, action_type, target_x, target_y, duration=180):
+    def start_action(self, action_type, target_x, target_y, duration=180, destination=None):
         """
         开始执行动作
         
@@ -56,6 +109,7 @@ class NPC:
             action_type: 动作类型 ('play_football', etc.)
             target_x, target_y: 目标位置
             duration: 动作持续时间（帧数，60帧=1秒）
+            destination: 目标所在的常用目的地名称（如 'football_field'，可选）
         """
         if self.action_state != 'idle':
             return False
@@ -63,6 +117,7 @@ class NPC:
         self.action_type = action_type
         self.target_x = target_x
         self.target_y = target_y
+        self.action_destination = destination
         self.action_duration = duration
         self.action_timer = 0
         self.action_state = 'moving_to_target'
@@ -81,23 +136,27 @@ class NPC:
         self.football_ref = football
         self.target_goal = target_goal
         
-    def update(self):
-        """更新 NPC 状态"""
-        self.anim_timer += 1
-        if self.anim_timer >= 30:
-            self.anim_timer = 0
-            self.anim_frame = (self.anim_frame + 1) % 2
+    def update(self, steps=1, animate=True):
+        """
+        更新 NPC 状态
+        
+        参数:
+            steps: 本次推进的帧数（屏幕外的 NPC 隔几帧更新一次，一次走更大的一步）
+            animate: 是否推进动画计时（屏幕外不需要）
+        """
+        if animate:
+            self._advance_animation(steps)
         
         # 处理动作状态
         if self.action_state == 'moving_to_target':
-            self._move_towards(self.target_x, self.target_y)
+            self._navigate_to(self.target_x, self.target_y, self.action_destination, steps)
             # 检查是否到达目标
             if self._distance_to(self.target_x, self.target_y) < 10:
                 self.action_state = 'doing_action'
                 self.action_timer = 0
                 
         elif self.action_state == 'doing_action':
-            self.action_timer += 1
+            self.action_timer += steps
             # 执行动作期间的特殊行为
             if self.action_type == 'play_football' and self.football_ref:
                 football = self.football_ref
@@ -124,61 +183,126 @@ class NPC:
                         # 先移动到球后面的位置
                         approach_dist = self._distance_to(approach_x, approach_y)
                         if approach_dist > 18:  # 还在远处，继续接近球后位置
-                            self._move_towards(approach_x, approach_y)
+                            self._move_towards(approach_x, approach_y, steps)
                         else:  # 已经接近球后位置，直接冲向足球踢它
-                            self._move_towards(football.x, football.y)
+                            self._move_towards(football.x, football.y, steps)
                     else:
                         # 如果距离为0，直接追球
-                        self._move_towards(football.x, football.y)
+                        self._move_towards(football.x, football.y, steps)
                 else:
                     # 没有目标球门，就简单地追着足球跑
-                    self._move_towards(football.x, football.y)
+                    self._move_towards(football.x, football.y, steps)
             
             # 动作完成，开始返回
             if self.action_timer >= self.action_duration:
-                self.action_state = 'returning'
-                self.football_ref = None
-                self.target_goal = None
+                self._finish_action()
                 
         elif self.action_state == 'returning':
-            self._move_towards(self.home_x, self.home_y)
+            self._navigate_to(self.home_x, self.home_y, self.home_destination, steps)
             # 检查是否到达原位
             if self._distance_to(self.home_x, self.home_y) < 5:
-                self.x = self.home_x
-                self.y = self.home_y
-                self.action_state = 'idle'
-                self.action_type = None
+                self._arrive_home()
                 
         else:  # idle 状态
-            # 随机看向不同方向
-            self.idle_timer += 1
-            if self.idle_timer >= 180:  # 每3秒随机换方向
-                self.idle_timer = 0
-                directions = ['up', 'down', 'left', 'right']
-                self.direction = directions[pyxel.rndi(0, 3)]
+            self._advance_idle(steps)
+            
+    def _advance_animation(self, frames):
+        """推进走路动画计时（每30帧切换一次动画帧）"""
+        total = self.anim_timer + frames
+        self.anim_frame = (self.anim_frame + total // 30) % 2
+        self.anim_timer = total % 30
+        
+    def _advance_idle(self, frames):
+        """空闲时随机看向不同方向（每3秒换一次）"""
+        self.idle_timer += frames
+        if self.idle_timer >= 180:
+            self.idle_timer %= 180
+            directions = ['up', 'down', 'left', 'right']
+            self.direction = directions[pyxel.rndi(0, 3)]
+            
+    def _finish_action(self):
+        """动作时间到，开始返回原位"""
+        self.action_state = 'returning'
+        self.football_ref = None
+        self.target_goal = None
+        
+    def _arrive_home(self):
+        """回到原位，恢复空闲"""
+        self.x = self.home_x
+        self.y = self.home_y
+        self.action_state = 'idle'
+        self.action_type = None
+        
+    def catch_up(self, frames):
+        """
+        玩家不在本地图期间，按解析方式把状态推进 frames 帧（不逐帧模拟）
+        
+        移动阶段按直线距离估算所需帧数，时间足够时直接到达该阶段终点；
+        不够走完的移动阶段停在原处，回到地图后继续正常更新
+        """
+        self._advance_animation(frames)
+        remaining = frames
+        
+        if self.action_state == 'moving_to_target':
+            travel = self._distance_to(self.target_x, self.target_y) / self.move_speed
+            if remaining < travel:
+                return
+            remaining -= travel
+            self.x = self.target_x
+            self.y = self.target_y
+            self.action_state = 'doing_action'
+            self.action_timer = 0
+            
+        if self.action_state == 'doing_action':
+            left = self.action_duration - self.action_timer
+            if remaining < left:
+                self.action_timer += remaining
+                return
+            remaining -= left
+            self._finish_action()
+            
+        if self.action_state == 'returning':
+            travel = self._distance_to(self.home_x, self.home_y) / self.move_speed
+            if remaining < travel:
+                return
+            remaining -= travel
+            self._arrive_home()
+            
+        self._advance_idle(int(remaining))
                 
-    def _move_towards(self, target_x, target_y):
-        """向目标位置移动（带碰撞检测）"""
+    def _navigate_to(self, target_x, target_y, destination=None, steps=1):
+        """绕开障碍走向目标：有寻路器时先走向路径上的下一个瓦片，否则直线移动"""
+        if self.pathfinder:
+            half_w = self.width / 2
+            half_h = self.height / 2
+            waypoint = self.pathfinder.next_waypoint(self.x + half_w, self.y + half_h,
+                                                     target_x + half_w, target_y + half_h,
+                                                     destination)
+            if waypoint is not None:
+                self._move_towards(waypoint[0] - half_w, waypoint[1] - half_h, steps)
+                return
+        self._move_towards(target_x, target_y, steps)
+                
+    def _move_towards(self, target_x, target_y, steps=1):
+        """向目标位置移动（带碰撞检测），steps 帧的移动合成一步"""
         dx = target_x - self.x
         dy = target_y - self.y
         distance = math.sqrt(dx * dx + dy * dy)
         
         if distance > 0:
-            # 归一化方向并应用速度
-            move_x = (dx / distance) * self.move_speed
-            move_y = (dy / distance) * self.move_speed
+            # 归一化方向并应用速度（合成的大步不越过目标）
+            step = self.move_speed * steps
+            if steps > 1:
+                step = min(step, distance)
+            move_x = (dx / distance) * step
+            move_y = (dy / distance) * step
             
-            # 如果有碰撞检测器，进行碰撞检测
+            # 如果有碰撞检测器，扫掠碰撞框（比精灵四周各小 2 像素）
             if self.collision_checker:
-                # 尝试X方向移动
-                new_x = self.x + move_x
-                if not self.collision_checker(new_x + 2, self.y + 2, self.width - 4, self.height - 4):
-                    self.x = new_x
-                
-                # 尝试Y方向移动
-                new_y = self.y + move_y
-                if not self.collision_checker(self.x + 2, new_y + 2, self.width - 4, self.height - 4):
-                    self.y = new_y
+                result = sweep_aabb(self.collision_checker, self.x + 2, self.y + 2,
+                                    self.width - 4, self.height - 4, move_x, move_y)
+                self.x = result.x - 2
+                self.y = result.y - 2
             else:
                 # 没有碰撞检测器，直接移动
                 self.x += move_x
@@ -205,138 +329,153 @@ class NPC:
         screen_x = int(self.x - camera_x)
         screen_y = int(self.y - camera_y)
         
-        # 根据类型绘制不同的精灵
-        if self.type == 'student':
-            self._draw_student(screen_x, screen_y, 12)  # 蓝色衣服
-        elif self.type == 'student_female':
-            self._draw_student_female(screen_x, screen_y)
-        elif self.type == 'professor':
-            self._draw_professor(screen_x, screen_y)
-        elif self.type.startswith('cat_'):
-            self._draw_cat(screen_x, screen_y)
+        # 精灵按（造型, 方向）在第一次使用时烘焙，之后每帧一次 blt
+        get_sprite_atlas().draw(('npc', self.sprite_shape, self.direction), screen_x, screen_y,
+                                self.SPRITE_BOUNDS, self._draw_body,
+                                palette=self.sprite_palette)
+        
+        # 猫尾巴会摆动，实时绘制
+        if self.type.startswith('cat_'):
+            self._draw_cat_tail(screen_x, screen_y)
+            
+    def _sprite_shape(self):
+        """精灵造型：猫咪和教授按类型区分，其余人类 NPC 按学生造型绘制"""
+        if self.type in ('student_female', 'professor') or self.type.startswith('cat_'):
+            return self.type
+        return 'student'
+            
+    def _draw_body(self, canvas, x, y):
+        """根据造型绘制不同的精灵"""
+        if self.sprite_shape == 'student':
+            self._draw_student(canvas, x, y)
+        elif self.sprite_shape == 'student_female':
+            self._draw_student_female(canvas, x, y)
+        elif self.sprite_shape == 'professor':
+            self._draw_professor(canvas, x, y)
         else:
-            self._draw_student(screen_x, screen_y, 11)  # 默认绿色
+            self._draw_cat(canvas, x, y)
             
-    def _draw_student(self, x, y, shirt_color):
-        """绘制男学生"""
+    def _draw_student(self, canvas, x, y):
+        """绘制男学生（衬衫用换色占位色）"""
         # 身体（衬衫）
-        pyxel.rect(x + 2, y + 5, 10, 8, shirt_color)
+        canvas.rect(x + 2, y + 5, 10, 8, PLACEHOLDER_CLOTH)
         
         # 头部（肤色）
-        pyxel.rect(x + 3, y, 8, 7, 15)
+        canvas.rect(x + 3, y, 8, 7, 15)
         
         # 头发（黑色）
-        pyxel.rect(x + 3, y, 8, 3, 0)
+        canvas.rect(x + 3, y, 8, 3, 0)
         
         # 眼睛
         if self.direction != 'up':
             eye_y = y + 4
             if self.direction == 'left':
-                pyxel.pset(x + 4, eye_y, 0)
+                canvas.pset(x + 4, eye_y, 0)
             elif self.direction == 'right':
-                pyxel.pset(x + 9, eye_y, 0)
+                canvas.pset(x + 9, eye_y, 0)
             else:
-                pyxel.pset(x + 5, eye_y, 0)
-                pyxel.pset(x + 8, eye_y, 0)
+                canvas.pset(x + 5, eye_y, 0)
+                canvas.pset(x + 8, eye_y, 0)
         
         # 腿（深蓝色裤子）
-        pyxel.rect(x + 3, y + 13, 4, 3, 1)
-        pyxel.rect(x + 7, y + 13, 4, 3, 1)
+        canvas.rect(x + 3, y + 13, 4, 3, 1)
+        canvas.rect(x + 7, y + 13, 4, 3, 1)
         
-    def _draw_student_female(self, x, y):
-        """绘制女学生"""
-        # 身体（紫色上衣）
-        pyxel.rect(x + 2, y + 5, 10, 8, 14)
+    def _draw_student_female(self, canvas, x, y):
+        """绘制女学生（上衣用换色占位色）"""
+        # 身体（上衣）
+        canvas.rect(x + 2, y + 5, 10, 8, PLACEHOLDER_CLOTH)
         
         # 头部
-        pyxel.rect(x + 3, y, 8, 7, 15)
+        canvas.rect(x + 3, y, 8, 7, 15)
         
         # 长发（棕色）
-        pyxel.rect(x + 2, y, 10, 4, 4)
-        pyxel.rect(x + 2, y + 4, 3, 5, 4)  # 左侧长发
-        pyxel.rect(x + 9, y + 4, 3, 5, 4)  # 右侧长发
+        canvas.rect(x + 2, y, 10, 4, 4)
+        canvas.rect(x + 2, y + 4, 3, 5, 4)  # 左侧长发
+        canvas.rect(x + 9, y + 4, 3, 5, 4)  # 右侧长发
         
         # 眼睛
         if self.direction != 'up':
             eye_y = y + 4
             if self.direction == 'left':
-                pyxel.pset(x + 4, eye_y, 0)
+                canvas.pset(x + 4, eye_y, 0)
             elif self.direction == 'right':
-                pyxel.pset(x + 9, eye_y, 0)
+                canvas.pset(x + 9, eye_y, 0)
             else:
-                pyxel.pset(x + 5, eye_y, 0)
-                pyxel.pset(x + 8, eye_y, 0)
+                canvas.pset(x + 5, eye_y, 0)
+                canvas.pset(x + 8, eye_y, 0)
         
         # 裙子
-        pyxel.rect(x + 3, y + 13, 8, 3, 2)
+        canvas.rect(x + 3, y + 13, 8, 3, 2)
         
-    def _draw_professor(self, x, y):
+    def _draw_professor(self, canvas, x, y):
         """绘制教授"""
         # 身体（西装）
-        pyxel.rect(x + 2, y + 5, 10, 8, 5)  # 灰色西装
+        canvas.rect(x + 2, y + 5, 10, 8, 5)  # 灰色西装
         # 领带
-        pyxel.rect(x + 6, y + 5, 2, 6, 8)
+        canvas.rect(x + 6, y + 5, 2, 6, 8)
         
         # 头部
-        pyxel.rect(x + 3, y, 8, 7, 15)
+        canvas.rect(x + 3, y, 8, 7, 15)
         
         # 秃头/稀疏头发
-        pyxel.rect(x + 4, y, 6, 2, 6)  # 灰色头发
+        canvas.rect(x + 4, y, 6, 2, 6)  # 灰色头发
         
         # 眼镜
         if self.direction != 'up':
             eye_y = y + 4
-            pyxel.rect(x + 4, eye_y - 1, 3, 3, 0)  # 左眼镜框
-            pyxel.rect(x + 7, eye_y - 1, 3, 3, 0)  # 右眼镜框
-            pyxel.pset(x + 5, eye_y, 12)  # 左镜片
-            pyxel.pset(x + 8, eye_y, 12)  # 右镜片
+            canvas.rect(x + 4, eye_y - 1, 3, 3, 0)  # 左眼镜框
+            canvas.rect(x + 7, eye_y - 1, 3, 3, 0)  # 右眼镜框
+            canvas.pset(x + 5, eye_y, 12)  # 左镜片
+            canvas.pset(x + 8, eye_y, 12)  # 右镜片
         
         # 腿
-        pyxel.rect(x + 3, y + 13, 4, 3, 5)
-        pyxel.rect(x + 7, y + 13, 4, 3, 5)
+        canvas.rect(x + 3, y + 13, 4, 3, 5)
+        canvas.rect(x + 7, y + 13, 4, 3, 5)
         
-    def _draw_cat(self, x, y):
-        """绘制猫咪"""
-        # 确定颜色
+    def _cat_colors(self):
+        """猫咪的 (身体颜色, 花纹颜色)"""
         if self.type == 'cat_orange':
-            body_color = 9  # 橙色
-            pattern_color = 10  # 黄色
+            return 9, 10  # 橙色，黄色
         elif self.type == 'cat_black':
-            body_color = 0  # 黑色
-            pattern_color = 5  # 灰色
-        else:  # cat_calico
-            body_color = 7  # 白色
-            pattern_color = 9  # 橙色斑点
+            return 0, 5   # 黑色，灰色
+        return 7, 9       # cat_calico：白色，橙色斑点
+        
+    def _draw_cat(self, canvas, x, y):
+        """绘制猫咪（尾巴除外）"""
+        body_color, pattern_color = self._cat_colors()
             
         # 身体
-        pyxel.rect(x + 3, y + 6, 8, 6, body_color)
+        canvas.rect(x + 3, y + 6, 8, 6, body_color)
         
         # 头
-        pyxel.rect(x + 4, y + 2, 6, 5, body_color)
+        canvas.rect(x + 4, y + 2, 6, 5, body_color)
         
         # 耳朵
-        pyxel.tri(x + 4, y + 2, x + 6, y + 2, x + 4, y, body_color)
-        pyxel.tri(x + 8, y + 2, x + 10, y + 2, x + 10, y, body_color)
+        canvas.tri(x + 4, y + 2, x + 6, y + 2, x + 4, y, body_color)
+        canvas.tri(x + 8, y + 2, x + 10, y + 2, x + 10, y, body_color)
         
         # 花纹（三花猫和橘猫）
         if self.type == 'cat_calico':
-            pyxel.pset(x + 5, y + 7, pattern_color)
-            pyxel.pset(x + 8, y + 9, 0)  # 黑色斑
+            canvas.pset(x + 5, y + 7, pattern_color)
+            canvas.pset(x + 8, y + 9, 0)  # 黑色斑
         elif self.type == 'cat_orange':
-            pyxel.pset(x + 5, y + 4, pattern_color)
+            canvas.pset(x + 5, y + 4, pattern_color)
             
         # 眼睛
         eye_y = y + 4
-        pyxel.pset(x + 5, eye_y, 11)  # 绿眼睛
-        pyxel.pset(x + 8, eye_y, 11)
-        
-        # 尾巴（带摆动）
-        tail_sway = math.sin(pyxel.frame_count * 0.1) * 2
-        pyxel.line(x + 10, y + 8, int(x + 13 + tail_sway), y + 5, body_color)
+        canvas.pset(x + 5, eye_y, 11)  # 绿眼睛
+        canvas.pset(x + 8, eye_y, 11)
         
         # 腿
-        pyxel.rect(x + 4, y + 12, 2, 2, body_color)
-        pyxel.rect(x + 8, y + 12, 2, 2, body_color)
+        canvas.rect(x + 4, y + 12, 2, 2, body_color)
+        canvas.rect(x + 8, y + 12, 2, 2, body_color)
+        
+    def _draw_cat_tail(self, x, y):
+        """绘制猫尾巴（带摆动）"""
+        body_color = self._cat_colors()[0]
+        tail_sway = get_clock().wave(0.1) * 2
+        pyxel.line(x + 10, y + 8, int(x + 13 + tail_sway), y + 5, body_color)
         
     def get_rect(self):
         """获取碰撞矩形"""
@@ -347,7 +486,7 @@ class NPC:
         # 检查距离
         dx = abs((self.x + self.width / 2) - (player_x + player_w / 2))
         dy = abs((self.y + self.height / 2) - (player_y + player_h / 2))
-        return dx < 24 and dy < 24
+        return dx < self.INTERACTION_DISTANCE and dy < self.INTERACTION_DISTANCE
         
     def interact(self):
         """与 NPC 交互，返回对话内容"""
@@ -368,35 +507,146 @@ class NPC:
 
 
 class NPCManager:
-    """NPC管理器"""
+    """
+    NPC管理器
+    
+    NPC 按细节层级模拟：屏幕附近的完整更新；屏幕外的每 COARSE_INTERVAL 帧更新一次，
+    一次推进多帧、不播放动画；玩家不在本地图时不更新，回来时按解析方式一次补上。
+    """
+    
+    # 屏幕外 NPC 的更新间隔（帧）
+    COARSE_INTERVAL = 4
+    # 视口外扩多少像素内仍算屏幕附近
+    VIEW_MARGIN = TILE_SIZE * 2
     
-    def __init__(self):
-        """初始化NPC管理器"""
+    def __init__(self, spatial_hash=None):
+        """
+        初始化NPC管理器
+        
+        参数:
+            spatial_hash: NPC 登记到的空间哈希（可与同一地图的其他实体共用），
+                默认新建一个
+        """
         self.npcs = []
         self.current_dialogue = None
         self.current_npc = None
+        self.spatial_hash = spatial_hash if spatial_hash is not None else SpatialHash()
+        
+        # 细节层级
+        self.frame = 0
+        self.backlog = {}  # NPC -> 尚未模拟的帧数（屏幕外的 NPC 攒够间隔再更新）
+        self.suspended_frame = None  # 玩家离开本地图时场景的模拟帧数
+        self.tier_counts = {'full': 0, 'coarse': 0, 'away': 0}
+        self.coarse_updates = 0  # 本帧实际执行的屏幕外更新次数
         
     def load_npcs(self, npc_data_list, cat_data_list):
         """加载NPC数据"""
-        for npc_data in npc_data_list:
-            self.npcs.append(NPC(npc_data))
+        for npc_data in list(npc_data_list) + list(cat_data_list):
+            npc = NPC(npc_data)
+            self.npcs.append(npc)
+            self.backlog[npc] = 0
+            self.spatial_hash.insert(npc, npc, npc.x, npc.y, npc.width, npc.height, kind='npc')
             
-        for cat_data in cat_data_list:
-            self.npcs.append(NPC(cat_data))
+    def update(self, camera_x=None, camera_y=None):
+        """
+        更新所有NPC（移动后同步空间哈希）
+        
+        参数:
+            camera_x, camera_y: 相机位置，屏幕附近的 NPC 完整更新，其余粗略更新；
+                不传时全部完整更新
+        """
+        if self.suspended_frame is not None:
+            self.resume(self.suspended_frame)  # 没有经过 resume 就回到了本地图，不补帧
+        self.frame += 1
+        
+        visible = None
+        if camera_x is not None:
+            margin = self.VIEW_MARGIN
+            visible = set(self.get_npcs_near(camera_x - margin, camera_y - margin,
+                                             WINDOW_WIDTH + margin * 2, WINDOW_HEIGHT + margin * 2))
+        
+        spatial_hash = self.spatial_hash
+        interval = self.COARSE_INTERVAL
+        full = coarse = updates = 0
+        for index, npc in enumerate(self.npcs):
+            steps = self.backlog[npc] + 1
+            if visible is None or npc in visible:
+                full += 1
+                npc.update(steps)
+            else:
+                coarse += 1
+                # 错开各 NPC 的更新帧，避免同一帧集中更新
+                if (self.frame + index) % interval:
+                    self.backlog[npc] = steps
+                    continue
+                updates += 1
+                npc.update(steps, animate=False)
+            self.backlog[npc] = 0
+            spatial_hash.move(npc, npc.x, npc.y, npc.width, npc.height)
+        
+        self.tier_counts['full'] = full
+        self.tier_counts['coarse'] = coarse
+        self.tier_counts['away'] = 0
+        self.coarse_updates = updates
+        
+    def suspend(self, frame):
+        """
+        玩家离开本地图（进入其他地图或室内）时调用，之后不再逐帧更新
+        
+        参数:
+            frame: 场景当前的模拟帧数（暂停的帧不计，见 GameScene.sim_frame）
+        """
+        if self.suspended_frame is None:
+            self.suspended_frame = frame
+            self.tier_counts['full'] = 0
+            self.tier_counts['coarse'] = 0
+            self.tier_counts['away'] = len(self.npcs)
+            self.coarse_updates = 0
             
-    def update(self):
-        """更新所有NPC"""
+    def resume(self, frame):
+        """
+        玩家回到本地图时调用：把离开期间的状态一次补上
+        
+        参数:
+            frame: 场景当前的模拟帧数
+        """
+        if self.suspended_frame is None:
+            return
+        elapsed = frame - self.suspended_frame
+        self.suspended_frame = None
+        if elapsed <= 0:
+            return
         for npc in self.npcs:
-            npc.update()
+            npc.catch_up(elapsed + self.backlog[npc])
+            self.backlog[npc] = 0
+            self.spatial_hash.move(npc, npc.x, npc.y, npc.width, npc.height)
+        print(f"[NPC] 补上离开期间的 {elapsed} 帧")
+        
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        counts = self.tier_counts
+        return [
+            f"full: {counts['full']} coarse: {counts['coarse']} away: {counts['away']}",
+            f"coarse updates: {self.coarse_updates}",
+        ]
+            
+    def get_npcs_near(self, x, y, width, height):
+        """获取矩形附近的NPC候选（按加载顺序），调用方再做精确判断"""
+        return self.spatial_hash.query(x, y, width, height, kind='npc')
             
     def draw(self, camera_x, camera_y):
-        """绘制所有NPC"""
-        for npc in self.npcs:
+        """绘制屏幕附近的NPC"""
+        margin = TILE_SIZE
+        for npc in self.get_npcs_near(camera_x - margin, camera_y - margin,
+                                      WINDOW_WIDTH + margin * 2, WINDOW_HEIGHT + margin * 2):
             npc.draw(camera_x, camera_y)
             
     def check_interaction(self, player_x, player_y, player_w, player_h):
         """检查玩家是否可以与某个NPC交互"""
-        for npc in self.npcs:
+        # 只检查玩家附近格子里的NPC（NPC 中心在交互距离内，包围盒再外扩半个身位）
+        reach = NPC.INTERACTION_DISTANCE + TILE_SIZE // 2
+        for npc in self.spatial_hash.query_around(player_x + player_w / 2, player_y + player_h / 2,
+                                                  reach, kind='npc'):
             if npc.check_interaction(player_x, player_y, player_w, player_h):
                 return npc
         return None
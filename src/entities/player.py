@@ -3,12 +3,15 @@
 玩家角色类
 """
 
-import pyxel
 from config import (
     PLAYER_SPEED, PLAYER_MAX_HP, TILE_SIZE
 )
 from src.map.campus_map import PLAYER_START_TILE_X, PLAYER_START_TILE_Y, MAP_TILES_WIDTH, MAP_TILES_HEIGHT
 from src.systems.input_handler import InputHandler
+from src.systems.collision import sweep_aabb
+from src.utils.sprite_atlas import (
+    get_sprite_atlas, PLACEHOLDER_SKIN, PLACEHOLDER_CLOTH, PLACEHOLDER_HAIR
+)
 
 
 class Player:
@@ -22,6 +25,10 @@ class Player:
         'black': 1     # 深色
     }
     
+    # 精灵相对绘制原点的包围盒 (ox, oy, w, h)
+    SPRITE_BOUNDS = (0, 0, 12, 16)
+    SKATEBOARD_SPRITE_BOUNDS = (0, -2, 12, 19)  # 含摇晃的头发和滑板轮子
+    
     def __init__(self, collision_checker=None, player_data=None):
         """初始化玩家"""
         # 从瓦片坐标计算像素坐标
@@ -37,17 +44,11 @@ class Player:
         # 玩家自定义数据
         if player_data:
             self.name = player_data.get('name', 'SharkFin')
-            self.gender = player_data.get('gender', 'male')
-            self.skin_color_name = player_data.get('skin_color', 'yellow')
+            self.set_appearance(player_data.get('gender', 'male'),
+                                player_data.get('skin_color', 'yellow'))
         else:
             self.name = 'SharkFin'
-            self.gender = 'male'
-            self.skin_color_name = 'yellow'
-            
-        self.skin_color = self.SKIN_COLORS.get(self.skin_color_name, 15)
-        self.cloth_color = 12 if self.gender == 'male' else 14  # 男蓝，女粉
-        self.hair_color = 0 if self.gender == 'male' else 4     # 男黑发，女棕发
-        self.is_male = self.gender == 'male'
+            self.set_appearance('male', 'yellow')
         
         # 状态
         self.hp = PLAYER_MAX_HP
@@ -65,6 +66,19 @@ class Player:
         self.anim_timer = 0
         self.is_moving = False
         
+    def set_appearance(self, gender, skin_color_name):
+        """设置性别和肤色（衣服和头发颜色随性别确定）"""
+        self.gender = gender
+        self.skin_color_name = skin_color_name
+        self.skin_color = self.SKIN_COLORS.get(skin_color_name, 15)
+        self.cloth_color = 12 if gender == 'male' else 14  # 男蓝，女粉
+        self.hair_color = 0 if gender == 'male' else 4     # 男黑发，女棕发
+        self.is_male = gender == 'male'
+        # 精灵用占位色烘焙，绘制时换成实际的肤色、衣服和头发颜色
+        self.sprite_palette = ((PLACEHOLDER_SKIN, self.skin_color),
+                               (PLACEHOLDER_CLOTH, self.cloth_color),
+                               (PLACEHOLDER_HAIR, self.hair_color))
+        
     def update(self):
         """更新玩家状态"""
         # B键切换滑板模式
@@ -88,16 +102,8 @@ class Player:
 
         self.is_moving = abs(dx) > 0.001 or abs(dy) > 0.001
         
-        # 尝试移动（带碰撞检测）
-        if dx != 0:
-            new_x = self.x + dx
-            if not self._check_collision(new_x, self.y):
-                self.x = new_x
-                
-        if dy != 0:
-            new_y = self.y + dy
-            if not self._check_collision(self.x, new_y):
-                self.y = new_y
+        # 移动（扫掠碰撞框，贴着障碍停下并沿障碍滑动）
+        self._move(dx, dy)
         
         # 地图边界限制
         max_x = MAP_TILES_WIDTH * TILE_SIZE - self.width
@@ -115,29 +121,62 @@ class Player:
             self.frame = 0
             self.anim_timer = 0
             
-    def _check_collision(self, x, y):
-        """检查碰撞"""
-        if self.collision_checker:
-            return self.collision_checker(x + 2, y + 2, self.width - 4, self.height - 4)
-        return False
+    def _move(self, dx, dy):
+        """
+        按位移移动玩家（带碰撞检测）
+        
+        返回:
+            MoveResult: 解算结果（含接触法线），没有碰撞检测器时为 None
+        """
+        if not self.collision_checker:
+            self.x += dx
+            self.y += dy
+            return None
+        # 碰撞框比精灵四周各小 2 像素
+        result = sweep_aabb(self.collision_checker, self.x + 2, self.y + 2,
+                            self.width - 4, self.height - 4, dx, dy)
+        self.x = result.x - 2
+        self.y = result.y - 2
+        return result
             
     def draw(self, camera_x=0, camera_y=0):
         """绘制玩家"""
-        screen_x = self.x - camera_x
-        screen_y = self.y - camera_y
+        self.draw_at(self.x - camera_x, self.y - camera_y)
+        
+    def draw_at(self, x, y, scale=1):
+        """
+        在屏幕位置 (x, y) 绘制玩家
+        
+        精灵按姿势在第一次使用时烘焙进精灵图集，之后每帧一次 blt，
+        肤色、衣服和头发颜色在 blt 时换色
         
-        # 滑板模式下绘制滑板动画
+        参数:
+            x, y: 屏幕坐标
+            scale: 放大倍数（角色创建界面的预览使用 2 倍）
+        """
         if self.skateboard_mode:
-            self._draw_skateboard_character(screen_x, screen_y)
+            # 滑板模式下绘制滑板动画
+            painter = self._draw_skateboard_character
+            bounds = self.SKATEBOARD_SPRITE_BOUNDS
         else:
-            # 绘制玩家身体
-            self._draw_character(screen_x, screen_y)
-        
-    def _draw_skateboard_character(self, x, y):
+            # 行走时的身体上下弹跳（四帧动画中 1、3 帧身体稍微抬起）
+            if self.is_moving and self.frame in [1, 3]:
+                y -= scale
+            painter = self._draw_character
+            bounds = self.SPRITE_BOUNDS
+        get_sprite_atlas().draw(self._sprite_key(), x, y, bounds, painter, scale,
+                                self.sprite_palette)
+        
+    def _sprite_key(self):
+        """当前姿势对应的精灵键（包含影响形状的全部状态，颜色由换色表决定）"""
+        pose = self.frame if self.is_moving else -1
+        return ('player', self.skateboard_mode, self.direction, pose, self.is_male)
+        
+    def _draw_skateboard_character(self, canvas, x, y):
         """绘制滑滑板的角色"""
-        skin = self.skin_color
-        cloth = self.cloth_color
-        hair = self.hair_color
+        skin = PLACEHOLDER_SKIN
+        cloth = PLACEHOLDER_CLOTH
+        hair = PLACEHOLDER_HAIR
         
         # 滑板左右摇晃动画
         sway = 0
@@ -152,293 +191,283 @@ class Player:
         if self.direction in ["left", "right"]:
             # 侧面滑行姿势
             # 滑板
-            pyxel.rect(x, y + 12, 12, 3, 4)  # 棕色板身
-            pyxel.rect(x + 1, y + 13, 10, 1, 15)  # 浅色条纹
-            pyxel.pset(x + 2, y + 15, 0)  # 左轮
-            pyxel.pset(x + 9, y + 15, 0)  # 右轮
+            canvas.rect(x, y + 12, 12, 3, 4)  # 棕色板身
+            canvas.rect(x + 1, y + 13, 10, 1, 15)  # 浅色条纹
+            canvas.pset(x + 2, y + 15, 0)  # 左轮
+            canvas.pset(x + 9, y + 15, 0)  # 右轮
             
             # 身体（略微弯曲）
             body_y = y + sway
             # 头发
-            pyxel.rect(x + 4, body_y - 1, 5, 3, hair)
+            canvas.rect(x + 4, body_y - 1, 5, 3, hair)
             # 头部
-            pyxel.rect(x + 4, body_y + 1, 5, 4, skin)
+            canvas.rect(x + 4, body_y + 1, 5, 4, skin)
             # 眼睛
             if self.direction == "right":
-                pyxel.pset(x + 7, body_y + 3, 0)
+                canvas.pset(x + 7, body_y + 3, 0)
             else:
-                pyxel.pset(x + 5, body_y + 3, 0)
+                canvas.pset(x + 5, body_y + 3, 0)
             # 身体
-            pyxel.rect(x + 3, body_y + 5, 6, 5, cloth)
+            canvas.rect(x + 3, body_y + 5, 6, 5, cloth)
             # 手臂（向前伸展保持平衡）
             if self.direction == "right":
-                pyxel.rect(x + 8, body_y + 5, 3, 2, skin)
-                pyxel.rect(x + 1, body_y + 6, 3, 2, skin)
+                canvas.rect(x + 8, body_y + 5, 3, 2, skin)
+                canvas.rect(x + 1, body_y + 6, 3, 2, skin)
             else:
-                pyxel.rect(x + 1, body_y + 5, 3, 2, skin)
-                pyxel.rect(x + 8, body_y + 6, 3, 2, skin)
+                canvas.rect(x + 1, body_y + 5, 3, 2, skin)
+                canvas.rect(x + 8, body_y + 6, 3, 2, skin)
             # 腿（弯曲站在滑板上）
-            pyxel.rect(x + 3, body_y + 10, 3, 2, skin)
-            pyxel.rect(x + 6, body_y + 10, 3, 2, skin)
+            canvas.rect(x + 3, body_y + 10, 3, 2, skin)
+            canvas.rect(x + 6, body_y + 10, 3, 2, skin)
         else:
             # 正面/背面滑行姿势
             # 滑板
-            pyxel.rect(x + 1, y + 13, 10, 3, 4)  # 棕色板身
-            pyxel.rect(x + 2, y + 14, 8, 1, 15)  # 浅色条纹
-            pyxel.pset(x + 3, y + 16, 0)  # 左轮
-            pyxel.pset(x + 8, y + 16, 0)  # 右轮
+            canvas.rect(x + 1, y + 13, 10, 3, 4)  # 棕色板身
+            canvas.rect(x + 2, y + 14, 8, 1, 15)  # 浅色条纹
+            canvas.pset(x + 3, y + 16, 0)  # 左轮
+            canvas.pset(x + 8, y + 16, 0)  # 右轮
             
             body_y = y + sway
             # 头发
-            pyxel.rect(x + 3, body_y, 6, 3, hair)
+            canvas.rect(x + 3, body_y, 6, 3, hair)
             if not self.is_male:
-                pyxel.rect(x + 2, body_y + 2, 2, 3, hair)
-                pyxel.rect(x + 8, body_y + 2, 2, 3, hair)
+                canvas.rect(x + 2, body_y + 2, 2, 3, hair)
+                canvas.rect(x + 8, body_y + 2, 2, 3, hair)
             # 头部
-            pyxel.rect(x + 3, body_y + 2, 6, 4, skin)
+            canvas.rect(x + 3, body_y + 2, 6, 4, skin)
             # 眼睛
             if self.direction == "down":
-                pyxel.pset(x + 4, body_y + 4, 0)
-                pyxel.pset(x + 7, body_y + 4, 0)
+                canvas.pset(x + 4, body_y + 4, 0)
+                canvas.pset(x + 7, body_y + 4, 0)
             # 身体
-            pyxel.rect(x + 2, body_y + 6, 8, 5, cloth)
+            canvas.rect(x + 2, body_y + 6, 8, 5, cloth)
             # 手臂（向两侧伸展保持平衡）
-            pyxel.rect(x, body_y + 6, 3, 2, skin)
-            pyxel.rect(x + 9, body_y + 6, 3, 2, skin)
+            canvas.rect(x, body_y + 6, 3, 2, skin)
+            canvas.rect(x + 9, body_y + 6, 3, 2, skin)
             # 腿（弯曲站在滑板上）
-            pyxel.rect(x + 3, body_y + 11, 2, 2, skin)
-            pyxel.rect(x + 7, body_y + 11, 2, 2, skin)
+            canvas.rect(x + 3, body_y + 11, 2, 2, skin)
+            canvas.rect(x + 7, body_y + 11, 2, 2, skin)
     
-    def _draw_character(self, x, y):
-        """绘制角色精灵 - 带行走动画"""
-        # 行走时的身体上下弹跳
-        body_bounce = 0
-        if self.is_moving:
-            # 四帧动画: 0,1,2,3 对应不同的腿部姿势
-            if self.frame in [1, 3]:
-                body_bounce = -1  # 身体稍微抬起
-        
-        # 计算实际绘制位置
-        draw_y = y + body_bounce
-        
+    def _draw_character(self, canvas, x, y):
+        """绘制角色精灵 - 四帧行走动画（0,1,2,3 对应不同的腿部姿势）"""
         # 根据方向和帧数绘制不同姿势
         if self.direction == "down":
-            self._draw_facing_down(x, draw_y)
+            self._draw_facing_down(canvas, x, y)
         elif self.direction == "up":
-            self._draw_facing_up(x, draw_y)
+            self._draw_facing_up(canvas, x, y)
         elif self.direction == "left":
-            self._draw_facing_left(x, draw_y)
+            self._draw_facing_left(canvas, x, y)
         elif self.direction == "right":
-            self._draw_facing_right(x, draw_y)
+            self._draw_facing_right(canvas, x, y)
     
-    def _draw_facing_down(self, x, y):
+    def _draw_facing_down(self, canvas, x, y):
         """绘制朝下的角色"""
         frame = self.frame if self.is_moving else 0
-        skin = self.skin_color
-        cloth = self.cloth_color
-        hair = self.hair_color
+        skin = PLACEHOLDER_SKIN
+        cloth = PLACEHOLDER_CLOTH
+        hair = PLACEHOLDER_HAIR
         
         # 头发
-        pyxel.rect(x + 3, y, 6, 3, hair)
+        canvas.rect(x + 3, y, 6, 3, hair)
         if not self.is_male:  # 女性长发
-            pyxel.rect(x + 2, y + 2, 2, 4, hair)
-            pyxel.rect(x + 8, y + 2, 2, 4, hair)
+            canvas.rect(x + 2, y + 2, 2, 4, hair)
+            canvas.rect(x + 8, y + 2, 2, 4, hair)
         # 头部（肤色）
-        pyxel.rect(x + 3, y + 2, 6, 5, skin)
+        canvas.rect(x + 3, y + 2, 6, 5, skin)
         # 眼睛
-        pyxel.pset(x + 4, y + 4, 0)
-        pyxel.pset(x + 7, y + 4, 0)
+        canvas.pset(x + 4, y + 4, 0)
+        canvas.pset(x + 7, y + 4, 0)
         
         # 身体
-        pyxel.rect(x + 2, y + 7, 8, 6, cloth)
+        canvas.rect(x + 2, y + 7, 8, 6, cloth)
         
         # 手臂动画
         if self.is_moving:
             if frame in [0, 2]:
                 # 手臂自然下垂
-                pyxel.rect(x + 1, y + 7, 2, 4, skin)  # 左手
-                pyxel.rect(x + 9, y + 7, 2, 4, skin)  # 右手
+                canvas.rect(x + 1, y + 7, 2, 4, skin)  # 左手
+                canvas.rect(x + 9, y + 7, 2, 4, skin)  # 右手
             elif frame == 1:
                 # 左手向前，右手向后
-                pyxel.rect(x + 1, y + 8, 2, 3, skin)  # 左手
-                pyxel.rect(x + 9, y + 6, 2, 3, skin)  # 右手
+                canvas.rect(x + 1, y + 8, 2, 3, skin)  # 左手
+                canvas.rect(x + 9, y + 6, 2, 3, skin)  # 右手
             else:  # frame == 3
                 # 右手向前，左手向后
-                pyxel.rect(x + 1, y + 6, 2, 3, skin)  # 左手
-                pyxel.rect(x + 9, y + 8, 2, 3, skin)  # 右手
+                canvas.rect(x + 1, y + 6, 2, 3, skin)  # 左手
+                canvas.rect(x + 9, y + 8, 2, 3, skin)  # 右手
         else:
             # 站立时手臂下垂
-            pyxel.rect(x + 1, y + 7, 2, 4, skin)
-            pyxel.rect(x + 9, y + 7, 2, 4, skin)
+            canvas.rect(x + 1, y + 7, 2, 4, skin)
+            canvas.rect(x + 9, y + 7, 2, 4, skin)
         
         # 腿部动画
         if self.is_moving:
             if frame == 0:
                 # 左腿前，右腿后
-                pyxel.rect(x + 3, y + 13, 3, 3, 1)   # 左腿
-                pyxel.rect(x + 6, y + 13, 3, 2, 1)   # 右腿
+                canvas.rect(x + 3, y + 13, 3, 3, 1)   # 左腿
+                canvas.rect(x + 6, y + 13, 3, 2, 1)   # 右腿
             elif frame == 1:
                 # 双腿交叉中间
-                pyxel.rect(x + 4, y + 13, 4, 3, 1)
+                canvas.rect(x + 4, y + 13, 4, 3, 1)
             elif frame == 2:
                 # 右腿前，左腿后
-                pyxel.rect(x + 3, y + 13, 3, 2, 1)   # 左腿
-                pyxel.rect(x + 6, y + 13, 3, 3, 1)   # 右腿
+                canvas.rect(x + 3, y + 13, 3, 2, 1)   # 左腿
+                canvas.rect(x + 6, y + 13, 3, 3, 1)   # 右腿
             else:  # frame == 3
                 # 双腿交叉中间
-                pyxel.rect(x + 4, y + 13, 4, 3, 1)
+                canvas.rect(x + 4, y + 13, 4, 3, 1)
         else:
             # 站立
-            pyxel.rect(x + 3, y + 13, 3, 3, 1)
-            pyxel.rect(x + 6, y + 13, 3, 3, 1)
+            canvas.rect(x + 3, y + 13, 3, 3, 1)
+            canvas.rect(x + 6, y + 13, 3, 3, 1)
     
-    def _draw_facing_up(self, x, y):
+    def _draw_facing_up(self, canvas, x, y):
         """绘制朝上的角色（背面）"""
         frame = self.frame if self.is_moving else 0
-        skin = self.skin_color
-        cloth = self.cloth_color
-        hair = self.hair_color
+        skin = PLACEHOLDER_SKIN
+        cloth = PLACEHOLDER_CLOTH
+        hair = PLACEHOLDER_HAIR
         
         # 头发（背面更多）
-        pyxel.rect(x + 3, y, 6, 5, hair)
+        canvas.rect(x + 3, y, 6, 5, hair)
         if not self.is_male:  # 女性长发
-            pyxel.rect(x + 2, y + 2, 2, 6, hair)
-            pyxel.rect(x + 8, y + 2, 2, 6, hair)
+            canvas.rect(x + 2, y + 2, 2, 6, hair)
+            canvas.rect(x + 8, y + 2, 2, 6, hair)
         # 头部侧面（肤色）
-        pyxel.rect(x + 3, y + 4, 1, 2, skin)
-        pyxel.rect(x + 8, y + 4, 1, 2, skin)
+        canvas.rect(x + 3, y + 4, 1, 2, skin)
+        canvas.rect(x + 8, y + 4, 1, 2, skin)
         
         # 身体
-        pyxel.rect(x + 2, y + 7, 8, 6, cloth)
+        canvas.rect(x + 2, y + 7, 8, 6, cloth)
         
         # 手臂动画
         if self.is_moving:
             if frame in [0, 2]:
-                pyxel.rect(x + 1, y + 7, 2, 4, 15)
-                pyxel.rect(x + 9, y + 7, 2, 4, 15)
+                canvas.rect(x + 1, y + 7, 2, 4, 15)
+                canvas.rect(x + 9, y + 7, 2, 4, 15)
             elif frame == 1:
-                pyxel.rect(x + 1, y + 6, 2, 3, skin)
-                pyxel.rect(x + 9, y + 8, 2, 3, skin)
+                canvas.rect(x + 1, y + 6, 2, 3, skin)
+                canvas.rect(x + 9, y + 8, 2, 3, skin)
             else:
-                pyxel.rect(x + 1, y + 8, 2, 3, skin)
-                pyxel.rect(x + 9, y + 6, 2, 3, skin)
+                canvas.rect(x + 1, y + 8, 2, 3, skin)
+                canvas.rect(x + 9, y + 6, 2, 3, skin)
         else:
-            pyxel.rect(x + 1, y + 7, 2, 4, skin)
-            pyxel.rect(x + 9, y + 7, 2, 4, skin)
+            canvas.rect(x + 1, y + 7, 2, 4, skin)
+            canvas.rect(x + 9, y + 7, 2, 4, skin)
         
         # 腿部动画
         if self.is_moving:
             if frame == 0:
-                pyxel.rect(x + 3, y + 13, 3, 2, 1)
-                pyxel.rect(x + 6, y + 13, 3, 3, 1)
+                canvas.rect(x + 3, y + 13, 3, 2, 1)
+                canvas.rect(x + 6, y + 13, 3, 3, 1)
             elif frame == 1:
-                pyxel.rect(x + 4, y + 13, 4, 3, 1)
+                canvas.rect(x + 4, y + 13, 4, 3, 1)
             elif frame == 2:
-                pyxel.rect(x + 3, y + 13, 3, 3, 1)
-                pyxel.rect(x + 6, y + 13, 3, 2, 1)
+                canvas.rect(x + 3, y + 13, 3, 3, 1)
+                canvas.rect(x + 6, y + 13, 3, 2, 1)
             else:
-                pyxel.rect(x + 4, y + 13, 4, 3, 1)
+                canvas.rect(x + 4, y + 13, 4, 3, 1)
         else:
-            pyxel.rect(x + 3, y + 13, 3, 3, 1)
-            pyxel.rect(x + 6, y + 13, 3, 3, 1)
+            canvas.rect(x + 3, y + 13, 3, 3, 1)
+            canvas.rect(x + 6, y + 13, 3, 3, 1)
     
-    def _draw_facing_left(self, x, y):
+    def _draw_facing_left(self, canvas, x, y):
         """绘制朝左的角色"""
         frame = self.frame if self.is_moving else 0
-        skin = self.skin_color
-        cloth = self.cloth_color
-        hair = self.hair_color
+        skin = PLACEHOLDER_SKIN
+        cloth = PLACEHOLDER_CLOTH
+        hair = PLACEHOLDER_HAIR
         
         # 头发
-        pyxel.rect(x + 4, y, 5, 3, hair)
+        canvas.rect(x + 4, y, 5, 3, hair)
         if not self.is_male:
-            pyxel.rect(x + 6, y + 2, 3, 5, hair)
+            canvas.rect(x + 6, y + 2, 3, 5, hair)
         # 头部
-        pyxel.rect(x + 3, y + 2, 5, 5, skin)
+        canvas.rect(x + 3, y + 2, 5, 5, skin)
         # 眼睛
-        pyxel.pset(x + 4, y + 4, 0)
+        canvas.pset(x + 4, y + 4, 0)
         
         # 身体
-        pyxel.rect(x + 3, y + 7, 6, 6, cloth)
+        canvas.rect(x + 3, y + 7, 6, 6, cloth)
         
         # 手臂（侧面只显示一只）
         if self.is_moving:
             if frame in [0, 2]:
-                pyxel.rect(x + 2, y + 7, 2, 4, skin)
+                canvas.rect(x + 2, y + 7, 2, 4, skin)
             elif frame == 1:
-                pyxel.rect(x + 1, y + 8, 2, 4, skin)  # 手臂向后
+                canvas.rect(x + 1, y + 8, 2, 4, skin)  # 手臂向后
             else:
-                pyxel.rect(x + 3, y + 6, 2, 4, skin)  # 手臂向前
+                canvas.rect(x + 3, y + 6, 2, 4, skin)  # 手臂向前
         else:
-            pyxel.rect(x + 2, y + 7, 2, 4, skin)
+            canvas.rect(x + 2, y + 7, 2, 4, skin)
         
         # 腿部动画 - 侧面行走
         if self.is_moving:
             if frame == 0:
                 # 左腿向前伸
-                pyxel.line(x + 4, y + 13, x + 2, y + 15, 1)
-                pyxel.line(x + 6, y + 13, x + 7, y + 15, 1)
+                canvas.line(x + 4, y + 13, x + 2, y + 15, 1)
+                canvas.line(x + 6, y + 13, x + 7, y + 15, 1)
             elif frame == 1:
                 # 双腿并拢
-                pyxel.rect(x + 4, y + 13, 3, 3, 1)
+                canvas.rect(x + 4, y + 13, 3, 3, 1)
             elif frame == 2:
                 # 右腿向前伸
-                pyxel.line(x + 4, y + 13, x + 3, y + 15, 1)
-                pyxel.line(x + 6, y + 13, x + 8, y + 15, 1)
+                canvas.line(x + 4, y + 13, x + 3, y + 15, 1)
+                canvas.line(x + 6, y + 13, x + 8, y + 15, 1)
             else:
                 # 双腿并拢
-                pyxel.rect(x + 4, y + 13, 3, 3, 1)
+                canvas.rect(x + 4, y + 13, 3, 3, 1)
         else:
-            pyxel.rect(x + 4, y + 13, 3, 3, 1)
+            canvas.rect(x + 4, y + 13, 3, 3, 1)
     
-    def _draw_facing_right(self, x, y):
+    def _draw_facing_right(self, canvas, x, y):
         """绘制朝右的角色"""
         frame = self.frame if self.is_moving else 0
-        skin = self.skin_color
-        cloth = self.cloth_color
-        hair = self.hair_color
+        skin = PLACEHOLDER_SKIN
+        cloth = PLACEHOLDER_CLOTH
+        hair = PLACEHOLDER_HAIR
         
         # 头发
-        pyxel.rect(x + 3, y, 5, 3, hair)
+        canvas.rect(x + 3, y, 5, 3, hair)
         if not self.is_male:
-            pyxel.rect(x + 3, y + 2, 3, 5, hair)
+            canvas.rect(x + 3, y + 2, 3, 5, hair)
         # 头部
-        pyxel.rect(x + 4, y + 2, 5, 5, skin)
+        canvas.rect(x + 4, y + 2, 5, 5, skin)
         # 眼睛
-        pyxel.pset(x + 7, y + 4, 0)
+        canvas.pset(x + 7, y + 4, 0)
         
         # 身体
-        pyxel.rect(x + 3, y + 7, 6, 6, cloth)
+        canvas.rect(x + 3, y + 7, 6, 6, cloth)
         
         # 手臂（侧面只显示一只）
         if self.is_moving:
             if frame in [0, 2]:
-                pyxel.rect(x + 8, y + 7, 2, 4, skin)
+                canvas.rect(x + 8, y + 7, 2, 4, skin)
             elif frame == 1:
-                pyxel.rect(x + 7, y + 6, 2, 4, skin)  # 手臂向前
+                canvas.rect(x + 7, y + 6, 2, 4, skin)  # 手臂向前
             else:
-                pyxel.rect(x + 9, y + 8, 2, 4, skin)  # 手臂向后
+                canvas.rect(x + 9, y + 8, 2, 4, skin)  # 手臂向后
         else:
-            pyxel.rect(x + 8, y + 7, 2, 4, skin)
+            canvas.rect(x + 8, y + 7, 2, 4, skin)
         
         # 腿部动画 - 侧面行走
         if self.is_moving:
             if frame == 0:
                 # 右腿向前伸
-                pyxel.line(x + 5, y + 13, x + 4, y + 15, 1)
-                pyxel.line(x + 7, y + 13, x + 9, y + 15, 1)
+                canvas.line(x + 5, y + 13, x + 4, y + 15, 1)
+                canvas.line(x + 7, y + 13, x + 9, y + 15, 1)
             elif frame == 1:
                 # 双腿并拢
-                pyxel.rect(x + 5, y + 13, 3, 3, 1)
+                canvas.rect(x + 5, y + 13, 3, 3, 1)
             elif frame == 2:
                 # 左腿向前伸
-                pyxel.line(x + 5, y + 13, x + 3, y + 15, 1)
-                pyxel.line(x + 7, y + 13, x + 8, y + 15, 1)
+                canvas.line(x + 5, y + 13, x + 3, y + 15, 1)
+                canvas.line(x + 7, y + 13, x + 8, y + 15, 1)
             else:
                 # 双腿并拢
-                pyxel.rect(x + 5, y + 13, 3, 3, 1)
+                canvas.rect(x + 5, y + 13, 3, 3, 1)
         else:
-            pyxel.rect(x + 5, y + 13, 3, 3, 1)
+            canvas.rect(x + 5, y + 13, 3, 3, 1)
             
     def take_damage(self, amount):
         """受到伤害"""
@@ -1,24 +1,192 @@
 # -*- coding: utf-8 -*-
 """
 相机/视口模块
+支持整数对齐的视口和持久化的世界图层：
+相机移动 (dx, dy) 像素时只重绘新露出的行/列，其余部分直接复用
 """
 
-from config import WINDOW_WIDTH, WINDOW_HEIGHT
+import pyxel
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, TILE_SIZE, WORLD_LAYER_BANK
+from src.utils.image_bank_allocator import get_image_allocator
+
+
+class WorldLayer:
+    """
+    持久化的世界图层
+
+    图层区域与屏幕一样大，按环形缓冲使用：世界像素 (x, y) 固定存放在
+    区域内的 (x % 宽, y % 高)。相机移动时旧内容无需搬动（相当于已经
+    平移过），只需补画新露出的条带，再用最多 4 次 blt 拼到屏幕上。
+
+    区域向图像库分配器申请；被室内缓存等淘汰后，下次使用时重新申请并整屏重绘。
+    """
+
+    def __init__(self, image_bank=WORLD_LAYER_BANK):
+        """
+        初始化世界图层
+
+        参数:
+            image_bank: 存放图层的图像库编号
+        """
+        self.image_bank = image_bank
+        self.width = WINDOW_WIDTH
+        self.height = WINDOW_HEIGHT
+        self.handle = None
+        self.valid = False
+        self.painter = None
+        self.view_x = 0
+        self.view_y = 0
+
+    def invalidate(self):
+        """使图层失效，下一帧整屏重绘"""
+        self.valid = False
+
+    def acquire(self):
+        """
+        确保图层持有图像库区域
+
+        返回:
+            bool: 是否可用（分配失败时返回 False，由调用方直接绘制）
+        """
+        allocator = get_image_allocator()
+        if self.handle and allocator.touch(self.handle):
+            return True
+        self.handle = allocator.allocate('world_layer', self.width, self.height,
+                                         bank=self.image_bank, on_evict=self._on_evict)
+        self.valid = False
+        return self.handle is not None
+
+    def _on_evict(self, handle):
+        """图层区域被淘汰"""
+        self.handle = None
+        self.valid = False
+
+    def _repaint(self, world_x, world_y, w, h):
+        """
+        重绘一块世界区域，返回涉及的瓦片数
+
+        区域跨越图像库边界时拆成多块，保证绘制函数拿到的都是连续区域
+        """
+        if w <= 0 or h <= 0:
+            return 0
+
+        img = pyxel.images[self.handle.bank]
+        y = world_y
+        while y < world_y + h:
+            v = y % self.height
+            part_h = min(world_y + h - y, self.height - v)
+            x = world_x
+            while x < world_x + w:
+                u = x % self.width
+                part_w = min(world_x + w - x, self.width - u)
+                u += self.handle.u
+                v_bank = v + self.handle.v
+                img.clip(u, v_bank, part_w, part_h)
+                self.painter(img, u, v_bank, part_w, part_h, x, y)
+                img.clip()
+                x += part_w
+            y += part_h
+
+        tiles_x = (world_x + w - 1) // TILE_SIZE - world_x // TILE_SIZE + 1
+        tiles_y = (world_y + h - 1) // TILE_SIZE - world_y // TILE_SIZE + 1
+        return tiles_x * tiles_y
+
+    def update(self, view_x, view_y, painter):
+        """
+        让图层与新的视口位置保持一致
+
+        参数:
+            view_x, view_y: 整数视口位置
+            painter: 静态世界绘制函数 painter(canvas, x, y, w, h, world_x, world_y)，
+                负责把世界区域 (world_x, world_y, w, h) 完整画到画布的 (x, y)
+
+        返回:
+            int: 本帧重绘的瓦片数
+        """
+        dx = view_x - self.view_x
+        dy = view_y - self.view_y
+        full = (not self.valid or painter != self.painter or
+                abs(dx) >= self.width or abs(dy) >= self.height)
+
+        self.painter = painter
+        self.view_x = view_x
+        self.view_y = view_y
+        self.valid = True
+
+        if full:
+            return self._repaint(view_x, view_y, self.width, self.height)
+
+        repainted = 0
+        # 新露出的列
+        if dx > 0:
+            repainted += self._repaint(view_x + self.width - dx, view_y, dx, self.height)
+        elif dx < 0:
+            repainted += self._repaint(view_x, view_y, -dx, self.height)
+
+        # 新露出的行（去掉已随列一起画过的部分）
+        col_x = view_x if dx >= 0 else view_x - dx
+        col_w = self.width - abs(dx)
+        if dy > 0:
+            repainted += self._repaint(col_x, view_y + self.height - dy, col_w, dy)
+        elif dy < 0:
+            repainted += self._repaint(col_x, view_y, col_w, -dy)
+        return repainted
+
+    def draw(self):
+        """把图层拼到屏幕上（环形缓冲最多分成 4 块）"""
+        bank, base_u, base_v = self.handle.bank, self.handle.u, self.handle.v
+        u = self.view_x % self.width
+        v = self.view_y % self.height
+        left_w = self.width - u
+        top_h = self.height - v
+
+        pyxel.blt(0, 0, bank, base_u + u, base_v + v, left_w, top_h)
+        if u:
+            pyxel.blt(left_w, 0, bank, base_u, base_v + v, u, top_h)
+        if v:
+            pyxel.blt(0, top_h, bank, base_u + u, base_v, left_w, v)
+        if u and v:
+            pyxel.blt(left_w, top_h, bank, base_u, base_v, u, v)
 
 
 class Camera:
     """相机类"""
-    
-    def __init__(self, map_width, map_height):
+
+    def __init__(self, map_width, map_height, snap=True, use_world_layer=True):
         """
         初始化相机
         map_width, map_height: 地图的像素尺寸
+        snap: 是否把视口对齐到整数像素
+        use_world_layer: 是否使用持久化的世界图层
         """
         self.x = 0
         self.y = 0
         self.map_width = map_width
         self.map_height = map_height
-        
+        self.snap = snap
+
+        # 世界图层及重绘统计
+        self.world_layer = WorldLayer() if use_world_layer else None
+        self.tiles_repainted = 0        # 上一帧重绘的瓦片数
+        self.total_tiles_repainted = 0  # 累计重绘的瓦片数
+
+    @property
+    def view_x(self):
+        """绘制用的视口 X（整数对齐模式下取整）"""
+        return round(self.x) if self.snap else self.x
+
+    @property
+    def view_y(self):
+        """绘制用的视口 Y（整数对齐模式下取整）"""
+        return round(self.y) if self.snap else self.y
+
+    def set_bounds(self, map_width, map_height):
+        """切换地图时更新边界，并让世界图层失效"""
+        self.map_width = map_width
+        self.map_height = map_height
+        if self.world_layer:
+            self.world_layer.invalidate()
+
     def follow(self, target_x, target_y, smooth=0.1):
         """
         跟随目标
@@ -27,28 +195,46 @@ class Camera:
         # 目标位置（将目标置于屏幕中心）
         target_cam_x = target_x - WINDOW_WIDTH // 2
         target_cam_y = target_y - WINDOW_HEIGHT // 2
-        
+
         # 平滑移动
         self.x += (target_cam_x - self.x) * smooth
         self.y += (target_cam_y - self.y) * smooth
-        
+
         # 边界限制
         self.x = max(0, min(self.x, self.map_width - WINDOW_WIDTH))
         self.y = max(0, min(self.y, self.map_height - WINDOW_HEIGHT))
-        
+
     def set_position(self, x, y):
         """直接设置相机位置"""
         self.x = max(0, min(x, self.map_width - WINDOW_WIDTH))
         self.y = max(0, min(y, self.map_height - WINDOW_HEIGHT))
-        
+
+    def draw_world(self, painter):
+        """
+        用世界图层绘制静态世界（只重绘新露出的部分）
+
+        参数:
+            painter: 静态世界绘制函数 painter(canvas, x, y, w, h, world_x, world_y)
+
+        返回:
+            bool: 是否已绘制（未启用世界图层或视口未对齐时返回 False，由调用方直接绘制）
+        """
+        if not self.world_layer or not self.snap or not self.world_layer.acquire():
+            return False
+
+        self.tiles_repainted = self.world_layer.update(self.view_x, self.view_y, painter)
+        self.total_tiles_repainted += self.tiles_repainted
+        self.world_layer.draw()
+        return True
+
     def world_to_screen(self, world_x, world_y):
         """将世界坐标转换为屏幕坐标"""
-        return world_x - self.x, world_y - self.y
-        
+        return world_x - self.view_x, world_y - self.view_y
+
     def screen_to_world(self, screen_x, screen_y):
         """将屏幕坐标转换为世界坐标"""
-        return screen_x + self.x, screen_y + self.y
-        
+        return screen_x + self.view_x, screen_y + self.view_y
+
     def is_visible(self, x, y, width, height):
         """检查对象是否在视口内"""
         return (x + width > self.x and
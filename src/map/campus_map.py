@@ -121,6 +121,28 @@ for row in CAMPUS_MAP:
 # 校门位置
 GATE_POSITION = {"left_pillar_x": 12, "right_pillar_x": 19, "top_y": 35, "bottom_y": 37}
 
+# 椭圆形池塘（水池瓦片 列24-31、行9-12 上的椭圆，像素坐标）
+POND_CENTER_X = 27.5 * 16
+POND_CENTER_Y = 10.5 * 16
+POND_RADIUS_X = 3.5 * 16
+POND_RADIUS_Y = 2.0 * 16
+
+# 建筑区域名称（HUD 显示玩家附近的建筑，见 src/map/region_map.py）
+BUILDING_REGION_NAMES = {
+    TILE_DOME: "阿拉伯语学院",
+    TILE_DOME_ARCH: "阿拉伯语学院",
+    TILE_LIBRARY: "图书馆",
+    TILE_LIBRARY_WINDOW: "图书馆",
+    TILE_CANTEEN: "食堂",
+    TILE_ADMIN: "行政楼",
+    TILE_HALL: "礼堂",
+    TILE_GYM: "体育馆",
+    TILE_JAPAN: "日研中心",
+    TILE_MAIN: "主楼",
+    TILE_WATER: "小碧池",
+}
+CAMPUS_DEFAULT_REGION = "东校区"
+
 # 树木位置
 TREE_POSITIONS = [(x, y) for y, row in enumerate(CAMPUS_MAP) for x, tile in enumerate(row) if tile == 6]
 
@@ -128,6 +150,10 @@ TREE_POSITIONS = [(x, y) for y, row in enumerate(CAMPUS_MAP) for x, tile in enum
 PLAYER_START_TILE_X = 16
 PLAYER_START_TILE_Y = 34  # 校门内侧（第35行是围栏/校门）
 
+# 滑板道具所在瓦片（操场右侧草地）
+SKATEBOARD_TILE_X = 24
+SKATEBOARD_TILE_Y = 20
+
 # NPC数据
 NPC_DATA = [
     {"id": "student_1", "name": "小明", "type": "student", "x": 18*16, "y": 18*16, "direction": "down",
@@ -348,4 +374,53 @@ LIBRARY_BOOKSHELF_CONTENT = {
     (12, 8): {"title": "新闻传播", "books": ["《新闻学概论》", "《国际传播》", "《媒体英语》"]},
     (13, 8): {"title": "法学", "books": ["《国际法》", "《外交法》", "《比较法学》"]},
     (14, 8): {"title": "经济学", "books": ["《国际经济学》", "《发展经济学》", "《宏观经济学》"]},
-}
\ No newline at end of file
+}
+
+
+# ========== 触发区域 ==========
+# 按地图登记，玩家中心点所在瓦片变化时才检测（见 src/systems/trigger_system.py）
+# rect: 瓦片矩形 (x, y, 宽, 高)，或 tiles: 瓦片列表
+# facing: 要求玩家朝向（可选）；once: 只触发一次
+# on_enter / on_exit / on_interact: 事件名，由游戏场景绑定处理函数
+
+def _build_bookshelf_zones():
+    """书架阅读区域：站在书架上下左右相邻的瓦片上可以查看（同时挨着多个书架时按上、下、左、右的顺序取第一个）"""
+    tiles_by_shelf = {}
+    for tile_y in range(LIBRARY_HEIGHT):
+        for tile_x in range(LIBRARY_WIDTH):
+            for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
+                shelf = (tile_x + dx, tile_y + dy)
+                if shelf in LIBRARY_BOOKSHELF_CONTENT:
+                    tiles_by_shelf.setdefault(shelf, []).append((tile_x, tile_y))
+                    break
+    return [
+        {'name': f'bookshelf_{shelf[0]}_{shelf[1]}', 'tiles': tiles, 'bookshelf': shelf,
+         'on_enter': 'near_bookshelf', 'on_exit': 'leave_bookshelf', 'on_interact': 'read_bookshelf'}
+        for shelf, tiles in tiles_by_shelf.items()
+    ]
+
+
+TRIGGER_ZONE_DATA = {
+    'east': [
+        # 清真寺拱门（第4行，列11-13）前的一行，朝上走到拱门前就进入室内
+        {'name': 'mosque_entrance', 'rect': (11, 5, 3, 1), 'facing': 'up', 'on_enter': 'enter_mosque'},
+        # 图书馆门（列14，行11）及门前，走到门口自动进入
+        {'name': 'library_entrance', 'rect': (13, 11, 3, 2), 'on_enter': 'enter_library'},
+        # 东校区校门（地图最底行，列13-18），朝下走进入地下通道
+        {'name': 'east_gate_entrance', 'rect': (13, 39, 6, 1), 'facing': 'down', 'on_enter': 'enter_tunnel'},
+        # 滑板道具
+        {'name': 'skateboard', 'rect': (SKATEBOARD_TILE_X, SKATEBOARD_TILE_Y, 1, 1), 'once': True,
+         'on_enter': 'collect_skateboard'},
+    ],
+    'tunnel': [
+        # 通道顶部入口（列7-12），朝上走返回东校区
+        {'name': 'tunnel_entry_to_east', 'rect': (7, 0, 6, 1), 'facing': 'up', 'on_enter': 'return_to_east'},
+        # 通道底部施工牌子附近
+        {'name': 'construction_sign', 'rect': (5, 25, 11, 4), 'text': '未完待续，正在建设中',
+         'on_enter': 'show_sign', 'on_exit': 'hide_sign', 'on_interact': 'read_sign'},
+    ],
+    'library': [
+        # 图书馆底部出口（列7，行11），朝下走离开
+        {'name': 'library_exit', 'rect': (7, 11, 1, 1), 'facing': 'down', 'on_enter': 'leave_library'},
+    ] + _build_bookshelf_zones(),
+}
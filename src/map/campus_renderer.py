@@ -8,10 +8,13 @@
 
 import pyxel
 import math
-from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT
-from src.utils.font_manager import draw_text
+from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT, TILEMAP_EAST_CAMPUS
+from src.map.tile_atlas import TileAtlas
+from src.map.landmark_cache import LandmarkCache, rect_on_screen, union_rect
+from src.map.decoration_index import DecorationIndex
+from src.utils.animation_clock import get_clock
 from src.map.campus_map import (
-    CAMPUS_MAP, COLLISION_MAP, TREE_POSITIONS, GATE_POSITION,
+    CAMPUS_MAP, TREE_POSITIONS, GATE_POSITION,
     TILE_GRASS, TILE_PATH, TILE_BUILDING, TILE_BUILDING_DOOR,
     TILE_PLAYGROUND, TILE_PLAYGROUND_GREEN, TILE_TREE, TILE_FLOWER,
     TILE_GATE_PILLAR, TILE_GATE_TOP, TILE_GATE_PASS, TILE_FENCE,
@@ -19,400 +22,517 @@ from src.map.campus_map import (
     TILE_DOME, TILE_DOME_ARCH,
     TILE_CANTEEN, TILE_ADMIN, TILE_HALL, TILE_GYM, TILE_JAPAN, TILE_MAIN, TILE_PLAZA,
     TILE_MAIN_WING, TILE_MAIN_COURT,
-    MAP_TILES_WIDTH, MAP_TILES_HEIGHT
+    MAP_TILES_WIDTH, MAP_TILES_HEIGHT,
+    POND_CENTER_X, POND_CENTER_Y, POND_RADIUS_X, POND_RADIUS_Y
 )
 from src.utils.font_manager import draw_text, text_width
+from src.systems.collision import get_collision_service
+from src.systems.particles import ParticleEmitter, get_particle_system
+
+
+# 日研中心樱花树下飘落花瓣的范围（世界坐标）
+SAKURA_PETAL_RECT = (29 * TILE_SIZE - 40, 21 * TILE_SIZE - 40, 120, 100)
+
+
+def _pieces(anchor_tile_x, anchor_tile_y, rects):
+    """把相对于锚点瓦片的矩形列表转换为世界坐标"""
+    ax = anchor_tile_x * TILE_SIZE
+    ay = anchor_tile_y * TILE_SIZE
+    return [(ax + x, ay + y, w, h) for x, y, w, h in rects]
+
+
+# 地标静态部分的组成矩形（世界坐标），空白较多的地标拆成几块以节省图像库空间
+LANDMARK_PIECES = {
+    'dome': _pieces(10, 1, [(18, -41, 45, 59)]),
+    'library_tower': _pieces(12, 8, [
+        (-22, -31, 24, 100),   # 文字塔
+        (0, -16, 128, 18),     # 主楼屋顶
+        (28, 44, 94, 25),      # 台阶和右下角标识
+    ]),
+    'japan_center': _pieces(29, 21, [
+        (-4, -20, 89, 18),     # 檐篷和招牌
+        (-34, -14, 29, 37),    # 左侧樱花树
+        (86, -9, 29, 37),      # 右侧樱花树
+    ]),
+    'main_roof': _pieces(4, 30, [
+        (-7, -19, 191, 21),    # 中央大屋顶和两翼屋顶
+        (72, 18, 31, 26),      # 正门牌匾和台阶
+    ]),
+    'gate': _pieces(GATE_POSITION['left_pillar_x'], GATE_POSITION['top_y'], [
+        (-8, -32, 145, 48),    # 拱门
+        (-8, -16, 21, 64),     # 左柱子
+        (116, -16, 21, 64),    # 右柱子
+    ]),
+}
+LANDMARK_RECTS = {name: union_rect(pieces) for name, pieces in LANDMARK_PIECES.items()}
 
 
 class CampusRenderer:
     """校园场景渲染器"""
     
-    def __init__(self):
-        """初始化渲染器"""
-        self.time = 0  # 用于动画计时
+    def __init__(self, use_tile_atlas=True, use_landmark_cache=True):
+        """
+        初始化渲染器
+        
+        参数:
+            use_tile_atlas: 是否把地面瓦片烘焙进图集（否则每帧逐瓦片绘制）
+            use_landmark_cache: 是否把地标建筑的静态部分烘焙成精灵
+        """
+        self.clock = get_clock()  # 全局动画时钟
         self.current_weather = 'sunny'  # 当前天气
         
-        # 草地动画点（随机分布的草叶）
-        self.grass_blades = []
+        # 草地动画点（随机分布的草叶）和树木
         self._generate_grass_blades()
         
+        # 飘落的樱花花瓣（从树冠高度生成，飘出范围或寿命到了就消失）
+        petal_x, petal_y, petal_w, _ = SAKURA_PETAL_RECT
+        self.petals = get_particle_system().add(ParticleEmitter(
+            'sakura', 12, 'pixel', (14, 7), ((-0.15, 0.25), (0.3, 0.5)),
+            lifetime=(200, 260), rate=0.035, sway=0.3, size=(1, 2),
+            area=(petal_x, petal_y, petal_w, 10), prefill_area=SAKURA_PETAL_RECT,
+            bounds=SAKURA_PETAL_RECT, wrap_x=True))
+        
+        # 地面瓦片图集（圆顶拱门会向上越出自身格子）
+        self.tile_atlas = None
+        if use_tile_atlas:
+            self.tile_atlas = TileAtlas(
+                TILEMAP_EAST_CAMPUS, self._paint_tile, self._tile_variant,
+                overhang_tiles=(TILE_DOME_ARCH,)
+            ).bake(CAMPUS_MAP)
+        
+        # 地标建筑（按绘制顺序）：名称、静态部分绘制函数、动画叠加函数
+        self.landmarks = [
+            ('dome', self._paint_dome_top, self._draw_dome_sparkle),
+            ('library_tower', self._paint_library_tower, self._draw_library_tower_text),
+            ('japan_center', self._paint_japan_center, self._draw_japan_center_petals),
+            ('main_roof', self._paint_main_building_roof, None),
+            ('gate', self._paint_gate, self._draw_gate_overlay),
+        ]
+        self.landmark_cache = None
+        if use_landmark_cache:
+            self.landmark_cache = LandmarkCache()
+            for name, paint, _ in self.landmarks:
+                self.landmark_cache.bake(name, LANDMARK_PIECES[name], paint)
+        
     def _generate_grass_blades(self):
-        """生成草叶位置"""
+        """生成草叶和树木的装饰物索引（按瓦片分桶）"""
+        blades = []
         for y in range(MAP_TILES_HEIGHT):
             for x in range(MAP_TILES_WIDTH):
                 tile = CAMPUS_MAP[y][x]
                 if tile == TILE_GRASS:
-                    # 每个草地瓦片上放置4个草叶
+                    # 每个草地瓦片上放置4个草叶，参数为相位的十倍
                     for i in range(4):
                         px = x * TILE_SIZE + (i * 4) % TILE_SIZE
                         py = y * TILE_SIZE + ((i * 5 + 2) % TILE_SIZE)
-                        phase = (x * 3 + y * 7 + i) % 100 / 10.0
-                        self.grass_blades.append((px, py, phase))
+                        phase = (x * 3 + y * 7 + i) % 100
+                        blades.append((x, y, px, py, phase))
+        self.grass_blades = DecorationIndex(MAP_TILES_WIDTH, MAP_TILES_HEIGHT, blades)
+        
+        # 树木（参数为绘制用的种子）
+        self.trees = DecorationIndex(MAP_TILES_WIDTH, MAP_TILES_HEIGHT, [
+            (tx, ty, tx * TILE_SIZE, ty * TILE_SIZE, tx + ty) for tx, ty in TREE_POSITIONS
+        ])
                         
     def update(self, weather='sunny'):
-        """更新动画"""
-        self.time += 1
+        """更新天气和飘落的花瓣（其他动画计时由全局动画时钟负责）"""
         self.current_weather = weather
+        self.petals.update()
+        
+    def draw(self, camera_x, camera_y, camera=None):
+        """
+        绘制整个校园场景
+        
+        参数:
+            camera_x, camera_y: 相机位置
+            camera: 可选的 Camera，提供持久化世界图层时只重绘新露出的部分
+        """
+        # 绘制静态地面（基础瓦片和椭圆形池塘水面）
+        if not (camera and self.tile_atlas and camera.draw_world(self.paint_world)):
+            if self.tile_atlas:
+                self.tile_atlas.draw(camera_x, camera_y)
+            else:
+                self._draw_tiles(camera_x, camera_y)
+            self._paint_pond(pyxel, camera_x, camera_y)
+        
+        # 绘制池塘波纹
+        self._draw_pond_ripples(camera_x, camera_y)
+                
+        # 绘制动态草叶
+        self._draw_grass_animation(camera_x, camera_y)
+        
+        # 绘制树木（带动画）
+        self._draw_trees(camera_x, camera_y)
         
-    def draw(self, camera_x, camera_y):
-        """绘制整个校园场景"""
-        # 计算可见范围
+        # 绘制地标建筑：金色圆顶、图书馆文字塔、日研中心与樱花树、
+        # 主楼中国传统屋顶、校门（在最上层）
+        self._draw_landmarks(camera_x, camera_y)
+                
+    def paint_world(self, canvas, x, y, w, h, world_x, world_y):
+        """把世界区域内的静态地面画到画布上（供相机的世界图层使用）"""
+        canvas.rect(x, y, w, h, 0)
+        self.tile_atlas.paint(canvas, x, y, w, h, world_x, world_y)
+        self._paint_pond(canvas, world_x - x, world_y - y)
+        
+    def _draw_tiles(self, camera_x, camera_y):
+        """逐瓦片绘制可见范围内的地面"""
         start_tile_x = max(0, int(camera_x // TILE_SIZE) - 1)
         start_tile_y = max(0, int(camera_y // TILE_SIZE) - 1)
         end_tile_x = min(MAP_TILES_WIDTH, int((camera_x + WINDOW_WIDTH) // TILE_SIZE) + 2)
         end_tile_y = min(MAP_TILES_HEIGHT, int((camera_y + WINDOW_HEIGHT) // TILE_SIZE) + 2)
         
-        # 绘制基础瓦片
         for y in range(start_tile_y, end_tile_y):
             for x in range(start_tile_x, end_tile_x):
                 self._draw_tile(x, y, camera_x, camera_y)
-        
-        # 绘制椭圆形池塘
-        self._draw_ellipse_pond(camera_x, camera_y)
-                
-        # 绘制动态草叶
-        self._draw_grass_animation(camera_x, camera_y)
-        
-        # 绘制树木（带动画）
-        for tx, ty in TREE_POSITIONS:
-            screen_x = tx * TILE_SIZE - camera_x
-            screen_y = ty * TILE_SIZE - camera_y
-            if -TILE_SIZE < screen_x < WINDOW_WIDTH and -TILE_SIZE * 2 < screen_y < WINDOW_HEIGHT:
-                self._draw_tree(screen_x, screen_y, tx + ty)
-        
-        # 绘制金色圆顶（上层装饰）
-        self._draw_dome_top(camera_x, camera_y)
-        
-        # 绘制图书馆多语言文字塔装饰
-        self._draw_library_tower(camera_x, camera_y)
-        
-        # 绘制日研中心顶部装饰和樱花树
-        self._draw_japan_center(camera_x, camera_y)
-        
-        # 绘制主楼中国传统屋顶
-        self._draw_main_building_roof(camera_x, camera_y)
-        
-        # 绘制校门（在最上层）
-        self._draw_gate(camera_x, camera_y)
                 
     def _draw_tile(self, tile_x, tile_y, camera_x, camera_y):
-        """绘制单个瓦片"""
+        """绘制单个瓦片（未启用瓦片图集时的逐瓦片绘制路径）"""
         if tile_y < 0 or tile_y >= MAP_TILES_HEIGHT or tile_x < 0 or tile_x >= MAP_TILES_WIDTH:
             return
             
         tile = CAMPUS_MAP[tile_y][tile_x]
         screen_x = int(tile_x * TILE_SIZE - camera_x)
         screen_y = int(tile_y * TILE_SIZE - camera_y)
+        self._paint_tile(pyxel, screen_x, screen_y, tile, tile_x, tile_y)
         
+    def _tile_variant(self, tile, tile_x, tile_y):
+        """返回瓦片的外观变体编号（外观相同的瓦片在图集中共用一个槽位）"""
+        if tile == TILE_GRASS:
+            return (tile_x * 7 + tile_y * 13) % 17
+        if tile == TILE_PATH:
+            return (tile_x + tile_y) % 5
+        if tile == TILE_PLAYGROUND_GREEN:
+            return (tile_x + tile_y) % 2
+        return 0
+        
+    def _paint_tile(self, canvas, screen_x, screen_y, tile, tile_x, tile_y):
+        """
+        在画布上绘制单个瓦片
+        
+        参数:
+            canvas: 绘制目标（pyxel 模块即屏幕，或 pyxel.Image 图像库）
+            screen_x, screen_y: 瓦片左上角在画布上的坐标
+            tile: 瓦片类型
+            tile_x, tile_y: 瓦片在地图中的坐标（用于纹理变化）
+        """
         if tile == TILE_GRASS:
             # 草地 - 深绿色基底带纹理
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             # 随机浅色点缀
             seed = (tile_x * 7 + tile_y * 13) % 17
             if seed < 5:
-                pyxel.pset(screen_x + seed, screen_y + (seed * 2) % TILE_SIZE, 11)
+                canvas.pset(screen_x + seed, screen_y + (seed * 2) % TILE_SIZE, 11)
             if seed > 10:
-                pyxel.pset(screen_x + 10, screen_y + seed % TILE_SIZE, 11)
+                canvas.pset(screen_x + 10, screen_y + seed % TILE_SIZE, 11)
                 
         elif tile == TILE_PATH:
             # 沙土道路 - 米黄色
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
             # 道路纹理 - 小石子
             seed = (tile_x + tile_y) % 5
-            pyxel.pset(screen_x + 3 + seed, screen_y + 5, 6)
-            pyxel.pset(screen_x + 10, screen_y + 3 + seed, 6)
-            pyxel.pset(screen_x + 7, screen_y + 11, 6)
+            canvas.pset(screen_x + 3 + seed, screen_y + 5, 6)
+            canvas.pset(screen_x + 10, screen_y + 3 + seed, 6)
+            canvas.pset(screen_x + 7, screen_y + 11, 6)
             
         elif tile == TILE_BUILDING:
             # 教学楼 - 灰色/米色墙体
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
             # 窗户
-            pyxel.rect(screen_x + 2, screen_y + 2, 5, 6, 12)
-            pyxel.rect(screen_x + 9, screen_y + 2, 5, 6, 12)
+            canvas.rect(screen_x + 2, screen_y + 2, 5, 6, 12)
+            canvas.rect(screen_x + 9, screen_y + 2, 5, 6, 12)
             # 窗框
-            pyxel.line(screen_x + 4, screen_y + 2, screen_x + 4, screen_y + 7, 5)
-            pyxel.line(screen_x + 11, screen_y + 2, screen_x + 11, screen_y + 7, 5)
+            canvas.line(screen_x + 4, screen_y + 2, screen_x + 4, screen_y + 7, 5)
+            canvas.line(screen_x + 11, screen_y + 2, screen_x + 11, screen_y + 7, 5)
             # 砖缝
-            pyxel.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 5)
-            pyxel.line(screen_x, screen_y + 14, screen_x + TILE_SIZE, screen_y + 14, 5)
+            canvas.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 5)
+            canvas.line(screen_x, screen_y + 14, screen_x + TILE_SIZE, screen_y + 14, 5)
             
         elif tile == TILE_BUILDING_DOOR:
             # 建筑门口
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
             # 大门（棕色木门）
-            pyxel.rect(screen_x + 3, screen_y, 10, 16, 4)
-            pyxel.rect(screen_x + 4, screen_y + 1, 8, 14, 9)
+            canvas.rect(screen_x + 3, screen_y, 10, 16, 4)
+            canvas.rect(screen_x + 4, screen_y + 1, 8, 14, 9)
             # 门把手
-            pyxel.pset(screen_x + 10, screen_y + 8, 10)
+            canvas.pset(screen_x + 10, screen_y + 8, 10)
             # 门顶装饰
-            pyxel.line(screen_x + 2, screen_y, screen_x + 14, screen_y, 5)
+            canvas.line(screen_x + 2, screen_y, screen_x + 14, screen_y, 5)
             
         elif tile == TILE_PLAYGROUND:
             # 操场跑道 - 红色橡胶
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 8)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 8)
             # 跑道线
-            pyxel.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 7)
-            pyxel.line(screen_x, screen_y + 12, screen_x + TILE_SIZE, screen_y + 12, 7)
+            canvas.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 7)
+            canvas.line(screen_x, screen_y + 12, screen_x + TILE_SIZE, screen_y + 12, 7)
                 
         elif tile == TILE_PLAYGROUND_GREEN:
             # 操场草坪 - 亮绿色
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 11)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 11)
             # 草坪纹理
             if (tile_x + tile_y) % 2 == 0:
-                pyxel.pset(screen_x + 5, screen_y + 5, 3)
-                pyxel.pset(screen_x + 11, screen_y + 10, 3)
+                canvas.pset(screen_x + 5, screen_y + 5, 3)
+                canvas.pset(screen_x + 11, screen_y + 10, 3)
                 
         elif tile == TILE_TREE:
             # 树木底部先画草地
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             
         elif tile == TILE_FLOWER:
             # 花坛
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             # 多彩花朵
-            pyxel.pset(screen_x + 3, screen_y + 3, 8)
-            pyxel.pset(screen_x + 7, screen_y + 5, 14)
-            pyxel.pset(screen_x + 11, screen_y + 4, 10)
-            pyxel.pset(screen_x + 5, screen_y + 10, 9)
-            pyxel.pset(screen_x + 9, screen_y + 12, 8)
+            canvas.pset(screen_x + 3, screen_y + 3, 8)
+            canvas.pset(screen_x + 7, screen_y + 5, 14)
+            canvas.pset(screen_x + 11, screen_y + 4, 10)
+            canvas.pset(screen_x + 5, screen_y + 10, 9)
+            canvas.pset(screen_x + 9, screen_y + 12, 8)
             
         elif tile == TILE_GATE_PILLAR:
             # 校门柱子 - 红砖色
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
             # 砖纹理
             for i in range(4):
                 y_pos = screen_y + i * 4
-                pyxel.line(screen_x, y_pos, screen_x + TILE_SIZE, y_pos, 4)
-            pyxel.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 4)
+                canvas.line(screen_x, y_pos, screen_x + TILE_SIZE, y_pos, 4)
+            canvas.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 4)
             
         elif tile == TILE_GATE_TOP:
             # 校门顶部横梁
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
-            pyxel.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 4)
-            pyxel.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 4)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
+            canvas.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 4)
+            canvas.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 4)
             
         elif tile == TILE_GATE_PASS:
             # 校门通道 - 地面
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
-            pyxel.pset(screen_x + 4, screen_y + 8, 6)
-            pyxel.pset(screen_x + 12, screen_y + 4, 6)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
+            canvas.pset(screen_x + 4, screen_y + 8, 6)
+            canvas.pset(screen_x + 12, screen_y + 4, 6)
             
         elif tile == TILE_FENCE:
             # 白色栅栏
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)  # 草地背景
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)  # 草地背景
             # 白色栅栏柱
             for i in range(4):
                 fx = screen_x + 2 + i * 4
-                pyxel.rect(fx, screen_y + 4, 2, 12, 7)
+                canvas.rect(fx, screen_y + 4, 2, 12, 7)
             # 横杆
-            pyxel.rect(screen_x, screen_y + 6, TILE_SIZE, 2, 7)
-            pyxel.rect(screen_x, screen_y + 12, TILE_SIZE, 2, 7)
+            canvas.rect(screen_x, screen_y + 6, TILE_SIZE, 2, 7)
+            canvas.rect(screen_x, screen_y + 12, TILE_SIZE, 2, 7)
             # 栅栏顶部尖端
             for i in range(4):
                 fx = screen_x + 2 + i * 4
-                pyxel.tri(fx, screen_y + 4, fx + 2, screen_y + 4, fx + 1, screen_y + 2, 7)
+                canvas.tri(fx, screen_y + 4, fx + 2, screen_y + 4, fx + 1, screen_y + 2, 7)
             
         elif tile == TILE_WATER:
             # 水池瓦片 - 只绘制草地背景，椭圆池塘由 _draw_ellipse_pond 统一绘制
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 11)  # 草地底色
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 11)  # 草地底色
             
         elif tile == TILE_BRIDGE:
             # 小桥
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 4)  # 木桥
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 4)  # 木桥
             # 桥面纹理
-            pyxel.line(screen_x, screen_y + 3, screen_x + TILE_SIZE, screen_y + 3, 9)
-            pyxel.line(screen_x, screen_y + 8, screen_x + TILE_SIZE, screen_y + 8, 9)
-            pyxel.line(screen_x, screen_y + 13, screen_x + TILE_SIZE, screen_y + 13, 9)
+            canvas.line(screen_x, screen_y + 3, screen_x + TILE_SIZE, screen_y + 3, 9)
+            canvas.line(screen_x, screen_y + 8, screen_x + TILE_SIZE, screen_y + 8, 9)
+            canvas.line(screen_x, screen_y + 13, screen_x + TILE_SIZE, screen_y + 13, 9)
             # 栏杆
-            pyxel.rect(screen_x, screen_y, 2, TILE_SIZE, 9)
-            pyxel.rect(screen_x + 14, screen_y, 2, TILE_SIZE, 9)
+            canvas.rect(screen_x, screen_y, 2, TILE_SIZE, 9)
+            canvas.rect(screen_x + 14, screen_y, 2, TILE_SIZE, 9)
             
         elif tile == TILE_LIBRARY:
             # 图书馆建筑 - 参考北外图书馆的现代风格
             # 米灰色主体墙
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)
             # 横向百叶窗/遮阳板效果（深棕色条纹）
             for i in range(4):
                 y_pos = screen_y + i * 4
-                pyxel.rect(screen_x, y_pos, TILE_SIZE, 2, 4)
+                canvas.rect(screen_x, y_pos, TILE_SIZE, 2, 4)
             # 窗户透光效果（浅色间隙）
             for i in range(4):
                 y_pos = screen_y + 2 + i * 4
-                pyxel.rect(screen_x + 1, y_pos, TILE_SIZE - 2, 2, 13)
+                canvas.rect(screen_x + 1, y_pos, TILE_SIZE - 2, 2, 13)
             # 竖向分隔线
-            pyxel.line(screen_x + 7, screen_y, screen_x + 7, screen_y + TILE_SIZE - 1, 5)
+            canvas.line(screen_x + 7, screen_y, screen_x + 7, screen_y + TILE_SIZE - 1, 5)
             
         elif tile == TILE_LIBRARY_WINDOW:
             # 图书馆大窗户区域 - 玻璃幕墙效果
             # 浅蓝色玻璃底
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 12)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 12)
             # 窗框（深色）
-            pyxel.rectb(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
+            canvas.rectb(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
             # 横向窗框分隔
-            pyxel.line(screen_x, screen_y + 5, screen_x + TILE_SIZE - 1, screen_y + 5, 5)
-            pyxel.line(screen_x, screen_y + 10, screen_x + TILE_SIZE - 1, screen_y + 10, 5)
+            canvas.line(screen_x, screen_y + 5, screen_x + TILE_SIZE - 1, screen_y + 5, 5)
+            canvas.line(screen_x, screen_y + 10, screen_x + TILE_SIZE - 1, screen_y + 10, 5)
             # 竖向窗框分隔
-            pyxel.line(screen_x + 5, screen_y, screen_x + 5, screen_y + TILE_SIZE - 1, 5)
-            pyxel.line(screen_x + 10, screen_y, screen_x + 10, screen_y + TILE_SIZE - 1, 5)
+            canvas.line(screen_x + 5, screen_y, screen_x + 5, screen_y + TILE_SIZE - 1, 5)
+            canvas.line(screen_x + 10, screen_y, screen_x + 10, screen_y + TILE_SIZE - 1, 5)
             # 玻璃反光效果
-            pyxel.pset(screen_x + 2, screen_y + 2, 7)
-            pyxel.pset(screen_x + 12, screen_y + 7, 7)
+            canvas.pset(screen_x + 2, screen_y + 2, 7)
+            canvas.pset(screen_x + 12, screen_y + 7, 7)
             
         elif tile == TILE_DOME:
             # 金色圆顶建筑主体（米色墙 + 精美装饰）
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
             # 墙面装饰线（金色）
-            pyxel.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 10)
-            pyxel.line(screen_x, screen_y + 11, screen_x + TILE_SIZE, screen_y + 11, 10)
+            canvas.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 10)
+            canvas.line(screen_x, screen_y + 11, screen_x + TILE_SIZE, screen_y + 11, 10)
             # 伊斯兰风格几何图案
-            pyxel.pset(screen_x + 4, screen_y + 7, 9)
-            pyxel.pset(screen_x + 8, screen_y + 7, 9)
-            pyxel.pset(screen_x + 12, screen_y + 7, 9)
+            canvas.pset(screen_x + 4, screen_y + 7, 9)
+            canvas.pset(screen_x + 8, screen_y + 7, 9)
+            canvas.pset(screen_x + 12, screen_y + 7, 9)
             # 墙面纹理
-            pyxel.pset(screen_x + 2, screen_y + 2, 7)
-            pyxel.pset(screen_x + 10, screen_y + 14, 7)
+            canvas.pset(screen_x + 2, screen_y + 2, 7)
+            canvas.pset(screen_x + 10, screen_y + 14, 7)
             
         elif tile == TILE_DOME_ARCH:
             # 圆顶建筑拱门（精美版）
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
             # 拱门外框（深棕色）
-            pyxel.rect(screen_x + 2, screen_y, 12, 16, 4)
+            canvas.rect(screen_x + 2, screen_y, 12, 16, 4)
             # 拱形顶（金色装饰）
-            pyxel.circ(screen_x + 8, screen_y + 2, 6, 9)
-            pyxel.circ(screen_x + 8, screen_y + 3, 5, 10)
+            canvas.circ(screen_x + 8, screen_y + 2, 6, 9)
+            canvas.circ(screen_x + 8, screen_y + 3, 5, 10)
             # 门洞内部（深色）
-            pyxel.rect(screen_x + 3, screen_y + 4, 10, 12, 1)
+            canvas.rect(screen_x + 3, screen_y + 4, 10, 12, 1)
             # 拱门顶部装饰尖
-            pyxel.tri(screen_x + 8, screen_y - 2, screen_x + 4, screen_y + 2, screen_x + 12, screen_y + 2, 10)
+            canvas.tri(screen_x + 8, screen_y - 2, screen_x + 4, screen_y + 2, screen_x + 12, screen_y + 2, 10)
             
         elif tile == TILE_CANTEEN:
             # 食堂 - 暖色调
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 9)  # 橙色背景
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 9)  # 橙色背景
             # 窗户
-            pyxel.rect(screen_x + 2, screen_y + 3, 5, 5, 12)
-            pyxel.rect(screen_x + 9, screen_y + 3, 5, 5, 12)
+            canvas.rect(screen_x + 2, screen_y + 3, 5, 5, 12)
+            canvas.rect(screen_x + 9, screen_y + 3, 5, 5, 12)
             # 横线装饰
-            pyxel.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 4)
-            pyxel.line(screen_x, screen_y + 14, screen_x + TILE_SIZE, screen_y + 14, 4)
+            canvas.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 4)
+            canvas.line(screen_x, screen_y + 14, screen_x + TILE_SIZE, screen_y + 14, 4)
             
         elif tile == TILE_ADMIN:
             # 行政楼 - 庄重灰色
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)  # 深灰
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)  # 深灰
             # 窗户（规整）
-            pyxel.rect(screen_x + 2, screen_y + 2, 4, 5, 6)
-            pyxel.rect(screen_x + 10, screen_y + 2, 4, 5, 6)
+            canvas.rect(screen_x + 2, screen_y + 2, 4, 5, 6)
+            canvas.rect(screen_x + 10, screen_y + 2, 4, 5, 6)
             # 砖纹
-            pyxel.line(screen_x, screen_y + 9, screen_x + TILE_SIZE, screen_y + 9, 13)
-            pyxel.line(screen_x, screen_y + 13, screen_x + TILE_SIZE, screen_y + 13, 13)
+            canvas.line(screen_x, screen_y + 9, screen_x + TILE_SIZE, screen_y + 9, 13)
+            canvas.line(screen_x, screen_y + 13, screen_x + TILE_SIZE, screen_y + 13, 13)
             
         elif tile == TILE_HALL:
             # 礼堂 - 红色典雅
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)  # 深红
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)  # 深红
             # 大窗户
-            pyxel.rect(screen_x + 3, screen_y + 2, 10, 8, 1)
+            canvas.rect(screen_x + 3, screen_y + 2, 10, 8, 1)
             # 窗格
-            pyxel.line(screen_x + 8, screen_y + 2, screen_x + 8, screen_y + 10, 2)
+            canvas.line(screen_x + 8, screen_y + 2, screen_x + 8, screen_y + 10, 2)
             # 墙面装饰
-            pyxel.line(screen_x, screen_y + 12, screen_x + TILE_SIZE, screen_y + 12, 4)
+            canvas.line(screen_x, screen_y + 12, screen_x + TILE_SIZE, screen_y + 12, 4)
             
         elif tile == TILE_GYM:
             # 体育馆 - 蓝白色
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)  # 浅蓝
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)  # 浅蓝
             # 弧形屋顶效果
-            pyxel.line(screen_x + 2, screen_y + 2, screen_x + 14, screen_y + 2, 7)
-            pyxel.line(screen_x + 1, screen_y + 4, screen_x + 15, screen_y + 4, 7)
+            canvas.line(screen_x + 2, screen_y + 2, screen_x + 14, screen_y + 2, 7)
+            canvas.line(screen_x + 1, screen_y + 4, screen_x + 15, screen_y + 4, 7)
             # 通风窗
-            pyxel.rect(screen_x + 4, screen_y + 8, 3, 3, 12)
-            pyxel.rect(screen_x + 9, screen_y + 8, 3, 3, 12)
+            canvas.rect(screen_x + 4, screen_y + 8, 3, 3, 12)
+            canvas.rect(screen_x + 9, screen_y + 8, 3, 3, 12)
             
         elif tile == TILE_JAPAN:
             # 日研中心 - 白色现代建筑风格（参考北外日本学研究中心）
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 7)  # 白色/浅灰
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 7)  # 白色/浅灰
             # 深灰色垂直支柱（建筑特征）
-            pyxel.rect(screen_x + 1, screen_y, 2, TILE_SIZE, 13)  # 左柱
-            pyxel.rect(screen_x + 13, screen_y, 2, TILE_SIZE, 13)  # 右柱
+            canvas.rect(screen_x + 1, screen_y, 2, TILE_SIZE, 13)  # 左柱
+            canvas.rect(screen_x + 13, screen_y, 2, TILE_SIZE, 13)  # 右柱
             # 水平遮阳板（日式现代特色）
-            pyxel.line(screen_x + 3, screen_y + 3, screen_x + 12, screen_y + 3, 5)
-            pyxel.line(screen_x + 3, screen_y + 6, screen_x + 12, screen_y + 6, 5)
-            pyxel.line(screen_x + 3, screen_y + 9, screen_x + 12, screen_y + 9, 5)
-            pyxel.line(screen_x + 3, screen_y + 12, screen_x + 12, screen_y + 12, 5)
+            canvas.line(screen_x + 3, screen_y + 3, screen_x + 12, screen_y + 3, 5)
+            canvas.line(screen_x + 3, screen_y + 6, screen_x + 12, screen_y + 6, 5)
+            canvas.line(screen_x + 3, screen_y + 9, screen_x + 12, screen_y + 9, 5)
+            canvas.line(screen_x + 3, screen_y + 12, screen_x + 12, screen_y + 12, 5)
             # 玻璃窗（深蓝色）
-            pyxel.rect(screen_x + 4, screen_y + 4, 3, 2, 1)
-            pyxel.rect(screen_x + 9, screen_y + 4, 3, 2, 1)
-            pyxel.rect(screen_x + 4, screen_y + 10, 3, 2, 1)
-            pyxel.rect(screen_x + 9, screen_y + 10, 3, 2, 1)
+            canvas.rect(screen_x + 4, screen_y + 4, 3, 2, 1)
+            canvas.rect(screen_x + 9, screen_y + 4, 3, 2, 1)
+            canvas.rect(screen_x + 4, screen_y + 10, 3, 2, 1)
+            canvas.rect(screen_x + 9, screen_y + 10, 3, 2, 1)
             
         elif tile == TILE_MAIN:
             # 主楼主体 - 米白色墙面，中国传统风格
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 7)  # 白色墙面
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 7)  # 白色墙面
             # 窗户（3列整齐排列）
             for wx in [2, 6, 10]:
-                pyxel.rect(screen_x + wx, screen_y + 4, 3, 4, 1)   # 深蓝窗
-                pyxel.rectb(screen_x + wx, screen_y + 4, 3, 4, 5)  # 灰色窗框
+                canvas.rect(screen_x + wx, screen_y + 4, 3, 4, 1)   # 深蓝窗
+                canvas.rectb(screen_x + wx, screen_y + 4, 3, 4, 5)  # 灰色窗框
             # 底部墙裙（略深色）
-            pyxel.rect(screen_x, screen_y + 11, TILE_SIZE, 5, 6)
+            canvas.rect(screen_x, screen_y + 11, TILE_SIZE, 5, 6)
             
         elif tile == TILE_MAIN_WING:
             # 主楼侧翼 - 白色墙面带窗
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 7)  # 白色墙面
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 7)  # 白色墙面
             # 侧翼窗户（2列）
             for wx in [3, 9]:
-                pyxel.rect(screen_x + wx, screen_y + 4, 3, 4, 1)   # 深蓝窗
-                pyxel.rectb(screen_x + wx, screen_y + 4, 3, 4, 5)  # 窗框
+                canvas.rect(screen_x + wx, screen_y + 4, 3, 4, 1)   # 深蓝窗
+                canvas.rectb(screen_x + wx, screen_y + 4, 3, 4, 5)  # 窗框
             # 底部墙裙
-            pyxel.rect(screen_x, screen_y + 11, TILE_SIZE, 5, 6)
+            canvas.rect(screen_x, screen_y + 11, TILE_SIZE, 5, 6)
             
         elif tile == TILE_MAIN_COURT:
             # 主楼庭院 - 浅灰色地砖（中式庭院地面）
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)  # 浅灰地面
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)  # 浅灰地面
             # 地砖纹理（细格子）
             for i in range(4):
-                pyxel.line(screen_x + i*4, screen_y, screen_x + i*4, screen_y + TILE_SIZE - 1, 5)
-                pyxel.line(screen_x, screen_y + i*4, screen_x + TILE_SIZE - 1, screen_y + i*4, 5)
+                canvas.line(screen_x + i*4, screen_y, screen_x + i*4, screen_y + TILE_SIZE - 1, 5)
+                canvas.line(screen_x, screen_y + i*4, screen_x + TILE_SIZE - 1, screen_y + i*4, 5)
             # 中心装饰
-            pyxel.pset(screen_x + 8, screen_y + 8, 13)
+            canvas.pset(screen_x + 8, screen_y + 8, 13)
             
         elif tile == TILE_PLAZA:
             # 小广场地砖
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)  # 浅灰蓝
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 6)  # 浅灰蓝
             # 地砖纹理（格子）
-            pyxel.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 5)
-            pyxel.line(screen_x, screen_y + 8, screen_x + TILE_SIZE, screen_y + 8, 5)
+            canvas.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 5)
+            canvas.line(screen_x, screen_y + 8, screen_x + TILE_SIZE, screen_y + 8, 5)
     
-    def _draw_ellipse_pond(self, camera_x, camera_y):
-        """绘制椭圆形池塘"""
-        # 池塘中心（像素坐标）
-        pond_center_x = 27.5 * TILE_SIZE  # 列24-31的中心
-        pond_center_y = 10.5 * TILE_SIZE  # 行9-12的中心
-        
-        # 椭圆半轴
-        radius_x = 3.5 * TILE_SIZE  # 水平半径
-        radius_y = 2.0 * TILE_SIZE  # 垂直半径
+    def _pond_geometry(self, camera_x, camera_y):
+        """返回椭圆形池塘的屏幕中心和半轴 (cx, cy, rx, ry)，不在可见范围内时返回 None"""
+        radius_x = POND_RADIUS_X  # 水平半径
+        radius_y = POND_RADIUS_Y  # 垂直半径
         
         # 转换为屏幕坐标
-        screen_cx = pond_center_x - camera_x
-        screen_cy = pond_center_y - camera_y
+        screen_cx = POND_CENTER_X - camera_x
+        screen_cy = POND_CENTER_Y - camera_y
         
         # 检查池塘是否在可见范围内
         if (screen_cx + radius_x < -20 or screen_cx - radius_x > WINDOW_WIDTH + 20 or
             screen_cy + radius_y < -20 or screen_cy - radius_y > WINDOW_HEIGHT + 20):
+            return None
+        return screen_cx, screen_cy, radius_x, radius_y
+    
+    def _paint_pond(self, canvas, camera_x, camera_y):
+        """绘制椭圆形池塘的水面（静态部分）"""
+        geometry = self._pond_geometry(camera_x, camera_y)
+        if geometry is None:
             return
+        screen_cx, screen_cy, radius_x, radius_y = geometry
         
         # 绘制椭圆形池塘（用多个同心椭圆填充）
         # 外边缘（深色边框）
-        pyxel.elli(int(screen_cx - radius_x), int(screen_cy - radius_y),
-                   int(radius_x * 2), int(radius_y * 2), 1)
+        canvas.elli(int(screen_cx - radius_x), int(screen_cy - radius_y),
+                    int(radius_x * 2), int(radius_y * 2), 1)
         
         # 主体（浅蓝色）
         inner_rx = radius_x - 2
         inner_ry = radius_y - 2
-        pyxel.elli(int(screen_cx - inner_rx), int(screen_cy - inner_ry),
-                   int(inner_rx * 2), int(inner_ry * 2), 12)
+        canvas.elli(int(screen_cx - inner_rx), int(screen_cy - inner_ry),
+                    int(inner_rx * 2), int(inner_ry * 2), 12)
+    
+    def _draw_pond_ripples(self, camera_x, camera_y):
+        """绘制池塘的波纹动画"""
+        geometry = self._pond_geometry(camera_x, camera_y)
+        if geometry is None:
+            return
+        screen_cx, screen_cy, radius_x, radius_y = geometry
         
-        # 绘制波纹动画
-        wave = math.sin(self.time * 0.08) * 2
+        wave = self.clock.wave(0.08) * 2
         for i in range(3):
-            wave_offset = math.sin(self.time * 0.06 + i * 1.5) * 3
+            wave_offset = self.clock.wave(0.06, i * 1.5) * 3
             wy = screen_cy - radius_y * 0.5 + i * 10 + int(wave)
             # 计算波纹在该y位置的宽度（椭圆形）
             if abs(wy - screen_cy) < radius_y - 4:
@@ -439,32 +559,49 @@ class CampusRenderer:
             wind_speed = 0
             sway_amount = 0
         
-        wind = math.sin(self.time * wind_speed) if wind_speed > 0 else 0
+        wind = self.clock.wave(wind_speed) if wind_speed > 0 else 0
         
-        for px, py, phase in self.grass_blades:
-            screen_x = px - camera_x
-            screen_y = py - camera_y
-            
-            if 0 <= screen_x < WINDOW_WIDTH and 0 <= screen_y < WINDOW_HEIGHT:
-                if self.current_weather == 'snow':
-                    # 雪天 - 草叶不摆动，并有积雪
-                    # 绿色草叶
-                    pyxel.line(
-                        int(screen_x), int(screen_y + 3),
-                        int(screen_x), int(screen_y),
-                        11
-                    )
-                    # 白色积雪（草叶顶部）
-                    pyxel.pset(int(screen_x), int(screen_y), 7)
-                    pyxel.pset(int(screen_x), int(screen_y + 1), 7)
-                else:
-                    # 晴天/雨天 - 草叶摆动
-                    sway = math.sin(self.time * (wind_speed * 1.5) + phase) * sway_amount * wind
-                    pyxel.line(
-                        int(screen_x), int(screen_y + 3),
-                        int(screen_x + sway), int(screen_y),
-                        11
-                    )
+        # 草叶相位为 0.0~9.9（以十分之一为桶），同一桶的草叶共用一个摆动偏移
+        sway_offsets = self.clock.phase_offsets(wind_speed * 1.5, 100, 0.1, sway_amount * wind)
+        
+        blades = self.grass_blades
+        xs, ys, phases = blades.xs, blades.ys, blades.params
+        for start, end in blades.visible_ranges(camera_x, camera_y):
+            for i in range(start, end):
+                screen_x = xs[i] - camera_x
+                screen_y = ys[i] - camera_y
+                
+                if 0 <= screen_x < WINDOW_WIDTH and 0 <= screen_y < WINDOW_HEIGHT:
+                    if self.current_weather == 'snow':
+                        # 雪天 - 草叶不摆动，并有积雪
+                        # 绿色草叶
+                        pyxel.line(
+                            int(screen_x), int(screen_y + 3),
+                            int(screen_x), int(screen_y),
+                            11
+                        )
+                        # 白色积雪（草叶顶部）
+                        pyxel.pset(int(screen_x), int(screen_y), 7)
+                        pyxel.pset(int(screen_x), int(screen_y + 1), 7)
+                    else:
+                        # 晴天/雨天 - 草叶摆动
+                        sway = sway_offsets[phases[i]]
+                        pyxel.line(
+                            int(screen_x), int(screen_y + 3),
+                            int(screen_x + sway), int(screen_y),
+                            11
+                        )
+    
+    def _draw_trees(self, camera_x, camera_y):
+        """绘制摄像机范围内的树木"""
+        trees = self.trees
+        # 树冠会越出所在瓦片，向左上多查询两格
+        for start, end in trees.visible_ranges(camera_x, camera_y, pad_before=2):
+            for i in range(start, end):
+                screen_x = trees.xs[i] - camera_x
+                screen_y = trees.ys[i] - camera_y
+                if -TILE_SIZE < screen_x < WINDOW_WIDTH and -TILE_SIZE * 2 < screen_y < WINDOW_HEIGHT:
+                    self._draw_tree(screen_x, screen_y, trees.params[i])
                 
     def _draw_tree(self, screen_x, screen_y, seed):
         """绘制大树（圆形树冠，无动画）"""
@@ -505,8 +642,18 @@ class CampusRenderer:
             color
         )
     
-    def _draw_library_tower(self, camera_x, camera_y):
-        """绘制图书馆左侧的多语言文字塔 - 北外图书馆标志性设计"""
+    def _draw_landmarks(self, camera_x, camera_y):
+        """绘制地标建筑（静态部分来自精灵缓存，动画部分实时叠加）"""
+        for name, paint, overlay in self.landmarks:
+            # 缓存会跳过包围盒不在屏幕内的地标，未缓存时实时绘制
+            if not (self.landmark_cache and self.landmark_cache.draw(name, camera_x, camera_y)):
+                if rect_on_screen(LANDMARK_RECTS[name], camera_x, camera_y):
+                    paint(pyxel, camera_x, camera_y)
+            if overlay:
+                overlay(camera_x, camera_y)
+    
+    def _paint_library_tower(self, canvas, camera_x, camera_y):
+        """绘制图书馆左侧的多语言文字塔 - 北外图书馆标志性设计（静态部分）"""
         # 图书馆位置（根据地图：第8-11行，x=12-19，已扩大）
         lib_x = 12 * TILE_SIZE
         lib_y = 8 * TILE_SIZE  # 从第8行开始
@@ -516,12 +663,6 @@ class CampusRenderer:
         screen_x = lib_x - camera_x
         screen_y = lib_y - camera_y
         
-        # 检查是否在可视范围内
-        if screen_x > WINDOW_WIDTH + 50 or screen_x < -180:
-            return
-        if screen_y > WINDOW_HEIGHT + 50 or screen_y < -100:
-            return
-        
         # === 文字塔（在图书馆左侧，紧贴图书馆建筑） ===
         tower_width = 20
         tower_height = lib_height + 24  # 比图书馆高一些
@@ -529,48 +670,42 @@ class CampusRenderer:
         tower_y = int(screen_y - 24)  # 向上延伸
         
         # 塔身底色（米灰色）
-        pyxel.rect(tower_x, tower_y, tower_width, tower_height, 6)
+        canvas.rect(tower_x, tower_y, tower_width, tower_height, 6)
         
         # 塔身内层边框（浅色装饰）
-        pyxel.rectb(tower_x + 2, tower_y + 2, tower_width - 4, tower_height - 4, 13)
+        canvas.rectb(tower_x + 2, tower_y + 2, tower_width - 4, tower_height - 4, 13)
         
         # 塔边框（深色）
-        pyxel.rectb(tower_x, tower_y, tower_width, tower_height, 5)
-        
-        # 竖排绘制 "图书馆" 三个中文字（居中）
-        text_x = tower_x + 4
-        draw_text(text_x, tower_y + 12, "图", 5)   # 深灰色文字
-        draw_text(text_x, tower_y + 32, "书", 5)
-        draw_text(text_x, tower_y + 52, "馆", 5)
+        canvas.rectb(tower_x, tower_y, tower_width, tower_height, 5)
         
         # 塔顶装饰（平顶设计，深棕色横条）
-        pyxel.rect(tower_x - 2, tower_y - 4, tower_width + 4, 5, 4)
-        pyxel.line(tower_x, tower_y - 2, tower_x + tower_width - 1, tower_y - 2, 9)
+        canvas.rect(tower_x - 2, tower_y - 4, tower_width + 4, 5, 4)
+        canvas.line(tower_x, tower_y - 2, tower_x + tower_width - 1, tower_y - 2, 9)
         # 平顶上的小装饰
-        pyxel.rect(tower_x + 4, tower_y - 7, tower_width - 8, 4, 5)
-        pyxel.rect(tower_x + 6, tower_y - 6, tower_width - 12, 2, 6)
+        canvas.rect(tower_x + 4, tower_y - 7, tower_width - 8, 4, 5)
+        canvas.rect(tower_x + 6, tower_y - 6, tower_width - 12, 2, 6)
         
         # === 图书馆主楼顶部装饰 ===
         roof_y = int(screen_y - 10)
         roof_width = lib_width
         
         # 屋顶主体（深棕色）
-        pyxel.rect(int(screen_x), roof_y, roof_width, 12, 4)
+        canvas.rect(int(screen_x), roof_y, roof_width, 12, 4)
         
         # 屋顶横线装饰
-        pyxel.line(int(screen_x) + 2, roof_y + 3, int(screen_x) + roof_width - 3, roof_y + 3, 9)
-        pyxel.line(int(screen_x) + 2, roof_y + 6, int(screen_x) + roof_width - 3, roof_y + 6, 9)
-        pyxel.line(int(screen_x) + 2, roof_y + 9, int(screen_x) + roof_width - 3, roof_y + 9, 9)
+        canvas.line(int(screen_x) + 2, roof_y + 3, int(screen_x) + roof_width - 3, roof_y + 3, 9)
+        canvas.line(int(screen_x) + 2, roof_y + 6, int(screen_x) + roof_width - 3, roof_y + 6, 9)
+        canvas.line(int(screen_x) + 2, roof_y + 9, int(screen_x) + roof_width - 3, roof_y + 9, 9)
         
         # 屋顶边缘装饰（深色边线）
-        pyxel.rect(int(screen_x), roof_y - 3, roof_width, 4, 5)
+        canvas.rect(int(screen_x), roof_y - 3, roof_width, 4, 5)
         
         # 屋顶上的小装饰（类似通风口）
         for i in range(3):
             dx = int(screen_x) + 20 + i * 35
             if dx < int(screen_x) + roof_width - 10:
-                pyxel.rect(dx, roof_y - 6, 8, 4, 5)
-                pyxel.rect(dx + 1, roof_y - 5, 6, 2, 6)
+                canvas.rect(dx, roof_y - 6, 8, 4, 5)
+                canvas.rect(dx + 1, roof_y - 5, 6, 2, 6)
         
         # === 图书馆底部装饰（台阶和入口装饰） ===
         base_y = int(screen_y) + lib_height
@@ -578,24 +713,42 @@ class CampusRenderer:
         door1_x = int(screen_x) + 2 * TILE_SIZE  # x=14的位置
         
         # 台阶装饰
-        pyxel.rect(door1_x - 4, base_y, TILE_SIZE + 8, 3, 6)
-        pyxel.rect(door1_x - 2, base_y + 3, TILE_SIZE + 4, 2, 13)
+        canvas.rect(door1_x - 4, base_y, TILE_SIZE + 8, 3, 6)
+        canvas.rect(door1_x - 2, base_y + 3, TILE_SIZE + 4, 2, 13)
         
         # === 右下角横向"图书馆"标识（小字） ===
         sign_x = int(screen_x) + lib_width - 52  # 右下角位置
         sign_y = int(screen_y) + lib_height - 18  # 靠近底部但在建筑内
         
         # 小型标识背景（完整覆盖文字，高度16像素）
-        pyxel.rect(sign_x - 2, sign_y - 2, 48, 16, 6)
-        pyxel.rectb(sign_x - 2, sign_y - 2, 48, 16, 5)
+        canvas.rect(sign_x - 2, sign_y - 2, 48, 16, 6)
+        canvas.rectb(sign_x - 2, sign_y - 2, 48, 16, 5)
+        
+    def _draw_library_tower_text(self, camera_x, camera_y):
+        """绘制文字塔和标识上的"图书馆"文字（实时叠加）"""
+        if not rect_on_screen(LANDMARK_RECTS['library_tower'], camera_x, camera_y):
+            return
+        
+        screen_x = 12 * TILE_SIZE - camera_x
+        screen_y = 8 * TILE_SIZE - camera_y
+        
+        # 竖排绘制 "图书馆" 三个中文字（居中）
+        tower_x = int(screen_x) - 20
+        tower_y = int(screen_y - 24)
+        text_x = tower_x + 4
+        draw_text(text_x, tower_y + 12, "图", 5)   # 深灰色文字
+        draw_text(text_x, tower_y + 32, "书", 5)
+        draw_text(text_x, tower_y + 52, "馆", 5)
         
         # 横向小字 "图书馆"
+        sign_x = int(screen_x) + 8 * TILE_SIZE - 52
+        sign_y = int(screen_y) + 4 * TILE_SIZE - 18
         draw_text(sign_x, sign_y, "图", 5)
         draw_text(sign_x + 14, sign_y, "书", 5)
         draw_text(sign_x + 28, sign_y, "馆", 5)
         
-    def _draw_dome_top(self, camera_x, camera_y):
-        """绘制清真寺穹顶 - 简洁风格，单一金色圆顶"""
+    def _paint_dome_top(self, canvas, camera_x, camera_y):
+        """绘制清真寺穹顶 - 简洁风格，单一金色圆顶（静态部分）"""
         # 清真寺位置（根据新地图：第1-4行，x=10-14）
         dome_x = 10 * TILE_SIZE
         dome_y = 1 * TILE_SIZE
@@ -603,12 +756,6 @@ class CampusRenderer:
         screen_x = dome_x - camera_x
         screen_y = dome_y - camera_y
         
-        # 检查是否在可视范围内
-        if screen_x > WINDOW_WIDTH + 50 or screen_x < -100:
-            return
-        if screen_y > WINDOW_HEIGHT + 50 or screen_y < -60:
-            return
-        
         # 建筑宽度 5 个瓦片（x=10-14）
         building_width = 5 * TILE_SIZE
         center_x = int(screen_x + building_width // 2)
@@ -617,24 +764,31 @@ class CampusRenderer:
         dome_top_y = int(screen_y - 20)
         
         # 圆顶主体（金色，从下往上画）
-        pyxel.circ(center_x, dome_top_y + 15, 22, 4)   # 深色底边
-        pyxel.circ(center_x, dome_top_y + 12, 20, 9)   # 橙色
-        pyxel.circ(center_x, dome_top_y + 8, 17, 10)   # 金黄色
-        pyxel.circ(center_x - 4, dome_top_y + 4, 10, 10)  # 高光
+        canvas.circ(center_x, dome_top_y + 15, 22, 4)   # 深色底边
+        canvas.circ(center_x, dome_top_y + 12, 20, 9)   # 橙色
+        canvas.circ(center_x, dome_top_y + 8, 17, 10)   # 金黄色
+        canvas.circ(center_x - 4, dome_top_y + 4, 10, 10)  # 高光
         
         # 顶端尖塔和新月
-        pyxel.rect(center_x - 1, dome_top_y - 12, 3, 14, 10)  # 尖塔
+        canvas.rect(center_x - 1, dome_top_y - 12, 3, 14, 10)  # 尖塔
         # 新月符号
-        pyxel.circ(center_x, dome_top_y - 16, 5, 10)
-        pyxel.circ(center_x + 2, dome_top_y - 16, 4, 1)  # 遮挡形成新月
+        canvas.circ(center_x, dome_top_y - 16, 5, 10)
+        canvas.circ(center_x + 2, dome_top_y - 16, 4, 1)  # 遮挡形成新月
         
-        # 闪光效果
-        if (self.time // 25) % 3 == 0:
-            pyxel.pset(center_x, dome_top_y - 14, 7)
-            pyxel.pset(center_x - 8, dome_top_y + 2, 7)
+    def _draw_dome_sparkle(self, camera_x, camera_y):
+        """绘制穹顶闪光效果（实时叠加）"""
+        if self.clock.step(25, 3) != 0:
+            return
+        if not rect_on_screen(LANDMARK_RECTS['dome'], camera_x, camera_y):
+            return
         
-    def _draw_japan_center(self, camera_x, camera_y):
-        """绘制日研中心顶部装饰和樱花树"""
+        center_x = int(10 * TILE_SIZE - camera_x + 5 * TILE_SIZE // 2)
+        dome_top_y = int(1 * TILE_SIZE - camera_y - 20)
+        pyxel.pset(center_x, dome_top_y - 14, 7)
+        pyxel.pset(center_x - 8, dome_top_y + 2, 7)
+        
+    def _paint_japan_center(self, canvas, camera_x, camera_y):
+        """绘制日研中心顶部装饰和樱花树（静态部分）"""
         # 日研中心位置（根据地图：第21-23行，x=29-33）
         jp_x = 29 * TILE_SIZE
         jp_y = 21 * TILE_SIZE
@@ -642,67 +796,77 @@ class CampusRenderer:
         screen_x = jp_x - camera_x
         screen_y = jp_y - camera_y
         
-        # 检查是否在可视范围内
-        if screen_x > WINDOW_WIDTH + 100 or screen_x < -150:
-            return
-        if screen_y > WINDOW_HEIGHT + 50 or screen_y < -80:
-            return
-        
         # 建筑宽度 5 个瓦片
         building_width = 5 * TILE_SIZE
-        center_x = int(screen_x + building_width // 2)
         
         # === 顶部檐篷装饰（深色遮阳结构）===
         canopy_y = int(screen_y - 8)
         # 深灰色大檐篷
-        pyxel.rect(int(screen_x - 4), canopy_y, building_width + 8, 6, 5)
+        canvas.rect(int(screen_x - 4), canopy_y, building_width + 8, 6, 5)
         # 底部阴影线
-        pyxel.line(int(screen_x - 4), canopy_y + 5, int(screen_x + building_width + 4), canopy_y + 5, 1)
+        canvas.line(int(screen_x - 4), canopy_y + 5, int(screen_x + building_width + 4), canopy_y + 5, 1)
         
         # === 招牌区域（金色字）===
         sign_y = canopy_y - 12
         # 米色招牌背景
-        pyxel.rect(int(screen_x + 10), sign_y, building_width - 20, 10, 15)
+        canvas.rect(int(screen_x + 10), sign_y, building_width - 20, 10, 15)
         # 金色文字框
-        pyxel.rectb(int(screen_x + 10), sign_y, building_width - 20, 10, 10)
+        canvas.rectb(int(screen_x + 10), sign_y, building_width - 20, 10, 10)
         
-        # === 樱花树（左侧）===
-        sakura_x1 = int(screen_x - 30)
-        sakura_y1 = int(screen_y - 10)
-        self._draw_sakura_tree(sakura_x1, sakura_y1, 0)
+        # === 樱花树（左侧、右侧）===
+        for x, y, _ in self._sakura_positions(screen_x, screen_y):
+            self._paint_sakura_tree(canvas, x, y)
         
-        # === 樱花树（右侧）===
-        sakura_x2 = int(screen_x + building_width + 10)
-        sakura_y2 = int(screen_y - 5)
-        self._draw_sakura_tree(sakura_x2, sakura_y2, 1)
+    def _draw_japan_center_petals(self, camera_x, camera_y):
+        """绘制樱花树上的花朵和飘落的花瓣（实时叠加）"""
+        jp_x = 29 * TILE_SIZE
+        jp_y = 21 * TILE_SIZE
+        screen_x = jp_x - camera_x
+        screen_y = jp_y - camera_y
         
-        # === 飘落的樱花花瓣 ===
-        self._draw_falling_petals(int(screen_x - 40), int(screen_y - 40), 120, 100)
+        # === 樱花树上的白色花朵 ===
+        if rect_on_screen(LANDMARK_RECTS['japan_center'], camera_x, camera_y):
+            for x, y, seed in self._sakura_positions(screen_x, screen_y):
+                self._draw_sakura_blossoms(x, y, seed)
+        
+        # === 飘落的樱花花瓣（不在屏幕上时发射器自己跳过）===
+        self.petals.draw(camera_x, camera_y)
+    
+    def _sakura_positions(self, screen_x, screen_y):
+        """日研中心两侧樱花树的位置 (x, y, seed)"""
+        building_width = 5 * TILE_SIZE
+        return [
+            (int(screen_x - 30), int(screen_y - 10), 0),                   # 左侧
+            (int(screen_x + building_width + 10), int(screen_y - 5), 1),   # 右侧
+        ]
     
-    def _draw_sakura_tree(self, x, y, seed):
+    def _paint_sakura_tree(self, canvas, x, y):
         """绘制樱花树"""
         # 树干（深棕色）
         trunk_x = x + 8
         trunk_y = y + 18
-        pyxel.rect(trunk_x, trunk_y, 5, 14, 4)
-        pyxel.line(trunk_x + 2, trunk_y, trunk_x + 2, trunk_y + 14, 9)
+        canvas.rect(trunk_x, trunk_y, 5, 14, 4)
+        canvas.line(trunk_x + 2, trunk_y, trunk_x + 2, trunk_y + 14, 9)
         
         # 樱花树冠（粉色）
         crown_x = x + 10
         crown_y = y + 8
         
         # 主树冠（多层粉色）
-        pyxel.circ(crown_x, crown_y, 12, 14)  # 深粉色底
-        pyxel.circ(crown_x - 6, crown_y + 3, 8, 14)  # 左侧
-        pyxel.circ(crown_x + 6, crown_y + 3, 8, 14)  # 右侧
-        pyxel.circ(crown_x, crown_y + 6, 9, 14)  # 底部
+        canvas.circ(crown_x, crown_y, 12, 14)  # 深粉色底
+        canvas.circ(crown_x - 6, crown_y + 3, 8, 14)  # 左侧
+        canvas.circ(crown_x + 6, crown_y + 3, 8, 14)  # 右侧
+        canvas.circ(crown_x, crown_y + 6, 9, 14)  # 底部
         
         # 浅粉色高光
-        pyxel.circ(crown_x - 3, crown_y - 4, 6, 8)   # 浅粉（用红色8模拟）
-        pyxel.circ(crown_x + 4, crown_y - 2, 5, 8)
-        
-        # 白色花朵点缀
-        petal_offset = (self.time // 10 + seed * 5) % 6
+        canvas.circ(crown_x - 3, crown_y - 4, 6, 8)   # 浅粉（用红色8模拟）
+        canvas.circ(crown_x + 4, crown_y - 2, 5, 8)
+    
+    def _draw_sakura_blossoms(self, x, y, seed):
+        """绘制樱花树冠上的白色花朵点缀"""
+        crown_x = x + 10
+        crown_y = y + 8
+        petal_offset = (self.clock.tick // 10 + seed * 5) % 6
         pyxel.pset(crown_x - 5 + petal_offset, crown_y - 3, 7)
         pyxel.pset(crown_x + 3, crown_y - 5 + (petal_offset % 3), 7)
         pyxel.pset(crown_x - 2 + (petal_offset % 4), crown_y + 2, 7)
@@ -710,24 +874,7 @@ class CampusRenderer:
         pyxel.pset(crown_x - 7, crown_y + 1, 7)
         pyxel.pset(crown_x + 8, crown_y + 2, 7)
     
-    def _draw_falling_petals(self, start_x, start_y, width, height):
-        """绘制飘落的樱花花瓣"""
-        # 多个花瓣，随时间飘动
-        for i in range(8):
-            # 基于时间和索引计算位置
-            t = self.time * 0.02 + i * 0.8
-            px = start_x + (i * 17 + int(math.sin(t * 2) * 15)) % width
-            py = start_y + (int(t * 20 + i * 12) % height)
-            
-            # 花瓣颜色（粉白交替）
-            color = 14 if i % 2 == 0 else 7
-            
-            # 绘制小花瓣（1-2像素）
-            pyxel.pset(int(px), int(py), color)
-            if i % 3 == 0:
-                pyxel.pset(int(px) + 1, int(py), color)
-
-    def _draw_main_building_roof(self, camera_x, camera_y):
+    def _paint_main_building_roof(self, canvas, camera_x, camera_y):
         """绘制主楼的中国传统风格屋顶"""
         # 主楼位置：行30-32，列4-14（U形布局）
         # 左翼：列4-5，中央主体：列6-12，右翼：列13-14
@@ -743,44 +890,38 @@ class CampusRenderer:
         screen_right_x = int(right_wing_x - camera_x)
         screen_center_x = int(center_x - camera_x)
         
-        # 检查是否在可视范围内
-        if screen_main_y > WINDOW_HEIGHT + 50 or screen_main_y < -100:
-            return
-        if screen_right_x + 64 < 0 or screen_left_x > WINDOW_WIDTH + 50:
-            return
-        
         # === 主楼中央大屋顶（跨越列6-12，7个瓦片宽度）===
         center_width = 7 * TILE_SIZE  # 112像素
         roof_height = 16
         roof_top = screen_main_y - roof_height
         
         # 深灰色主屋顶（中国传统瓦顶）
-        pyxel.rect(screen_center_x - 4, roof_top, center_width + 8, roof_height, 5)
+        canvas.rect(screen_center_x - 4, roof_top, center_width + 8, roof_height, 5)
         
         # 屋顶瓦片纹理（横向线条模拟瓦片）
         for i in range(1, roof_height, 3):
-            pyxel.line(screen_center_x - 4, roof_top + i, 
+            canvas.line(screen_center_x - 4, roof_top + i, 
                       screen_center_x + center_width + 4, roof_top + i, 13)
         
         # 屋脊（顶部亮线）
-        pyxel.rect(screen_center_x, roof_top - 3, center_width, 3, 13)
-        pyxel.line(screen_center_x, roof_top - 3, 
+        canvas.rect(screen_center_x, roof_top - 3, center_width, 3, 13)
+        canvas.line(screen_center_x, roof_top - 3, 
                   screen_center_x + center_width, roof_top - 3, 7)
         
         # 飞檐效果（两侧向上翘）
         # 左侧飞檐
-        pyxel.line(screen_center_x - 6, roof_top + roof_height - 2,
+        canvas.line(screen_center_x - 6, roof_top + roof_height - 2,
                    screen_center_x - 10, roof_top + roof_height - 6, 5)
-        pyxel.line(screen_center_x - 6, roof_top + roof_height - 3,
+        canvas.line(screen_center_x - 6, roof_top + roof_height - 3,
                    screen_center_x - 9, roof_top + roof_height - 6, 13)
         # 右侧飞檐
-        pyxel.line(screen_center_x + center_width + 6, roof_top + roof_height - 2,
+        canvas.line(screen_center_x + center_width + 6, roof_top + roof_height - 2,
                    screen_center_x + center_width + 10, roof_top + roof_height - 6, 5)
-        pyxel.line(screen_center_x + center_width + 6, roof_top + roof_height - 3,
+        canvas.line(screen_center_x + center_width + 6, roof_top + roof_height - 3,
                    screen_center_x + center_width + 9, roof_top + roof_height - 6, 13)
         
         # 檐下阴影
-        pyxel.rect(screen_center_x - 4, roof_top + roof_height, center_width + 8, 2, 1)
+        canvas.rect(screen_center_x - 4, roof_top + roof_height, center_width + 8, 2, 1)
         
         # === 左翼屋顶（列4-5，2个瓦片宽度）===
         wing_width = 2 * TILE_SIZE  # 32像素
@@ -788,28 +929,28 @@ class CampusRenderer:
         wing_roof_top = screen_main_y - wing_roof_height
         
         # 左翼屋顶
-        pyxel.rect(screen_left_x - 2, wing_roof_top, wing_width + 4, wing_roof_height, 5)
+        canvas.rect(screen_left_x - 2, wing_roof_top, wing_width + 4, wing_roof_height, 5)
         # 瓦片纹理
         for i in range(1, wing_roof_height, 3):
-            pyxel.line(screen_left_x - 2, wing_roof_top + i,
+            canvas.line(screen_left_x - 2, wing_roof_top + i,
                        screen_left_x + wing_width + 2, wing_roof_top + i, 13)
         # 屋脊
-        pyxel.rect(screen_left_x, wing_roof_top - 2, wing_width, 2, 13)
+        canvas.rect(screen_left_x, wing_roof_top - 2, wing_width, 2, 13)
         # 飞檐
-        pyxel.line(screen_left_x - 4, wing_roof_top + wing_roof_height - 2,
+        canvas.line(screen_left_x - 4, wing_roof_top + wing_roof_height - 2,
                    screen_left_x - 7, wing_roof_top + wing_roof_height - 5, 5)
         
         # === 右翼屋顶（列13-14，2个瓦片宽度）===
         # 右翼屋顶
-        pyxel.rect(screen_right_x - 2, wing_roof_top, wing_width + 4, wing_roof_height, 5)
+        canvas.rect(screen_right_x - 2, wing_roof_top, wing_width + 4, wing_roof_height, 5)
         # 瓦片纹理
         for i in range(1, wing_roof_height, 3):
-            pyxel.line(screen_right_x - 2, wing_roof_top + i,
+            canvas.line(screen_right_x - 2, wing_roof_top + i,
                        screen_right_x + wing_width + 2, wing_roof_top + i, 13)
         # 屋脊
-        pyxel.rect(screen_right_x, wing_roof_top - 2, wing_width, 2, 13)
+        canvas.rect(screen_right_x, wing_roof_top - 2, wing_width, 2, 13)
         # 飞檐
-        pyxel.line(screen_right_x + wing_width + 4, wing_roof_top + wing_roof_height - 2,
+        canvas.line(screen_right_x + wing_width + 4, wing_roof_top + wing_roof_height - 2,
                    screen_right_x + wing_width + 7, wing_roof_top + wing_roof_height - 5, 5)
         
         # === 主入口装饰（中央正门）===
@@ -817,15 +958,15 @@ class CampusRenderer:
         entrance_y = screen_main_y + 2 * TILE_SIZE  # 第32行
         
         # 入口顶部牌匾
-        pyxel.rect(entrance_x - 4, entrance_y - 14, 30, 10, 2)  # 红色牌匾
-        pyxel.rectb(entrance_x - 4, entrance_y - 14, 30, 10, 4)  # 深红边框
+        canvas.rect(entrance_x - 4, entrance_y - 14, 30, 10, 2)  # 红色牌匾
+        canvas.rectb(entrance_x - 4, entrance_y - 14, 30, 10, 4)  # 深红边框
         
         # 门口台阶（浅灰色）
-        pyxel.rect(entrance_x - 2, entrance_y + 8, 28, 4, 6)
-        pyxel.line(entrance_x - 2, entrance_y + 8, entrance_x + 26, entrance_y + 8, 13)
+        canvas.rect(entrance_x - 2, entrance_y + 8, 28, 4, 6)
+        canvas.line(entrance_x - 2, entrance_y + 8, entrance_x + 26, entrance_y + 8, 13)
 
-    def _draw_gate(self, camera_x, camera_y):
-        """绘制北外校门 - 精细版红砖拱门"""
+    def _paint_gate(self, canvas, camera_x, camera_y):
+        """绘制北外校门 - 精细版红砖拱门（静态部分）"""
         gate_left = GATE_POSITION['left_pillar_x'] * TILE_SIZE
         gate_right = (GATE_POSITION['right_pillar_x'] + 1) * TILE_SIZE
         gate_top = GATE_POSITION['top_y'] * TILE_SIZE
@@ -836,21 +977,16 @@ class CampusRenderer:
         
         gate_width = gate_right - gate_left
         gate_center = (screen_left + screen_right) // 2
-        
-        if screen_right < -50 or screen_left > WINDOW_WIDTH + 50:
-            return
-        if screen_top > WINDOW_HEIGHT + 50 or screen_top < -100:
-            return
             
         # === 拱门主体 ===
         arch_y = screen_top - 32
         
         # 门楣背景（深红色）
-        pyxel.rect(screen_left - 8, arch_y, gate_width + 16, 36, 2)
+        canvas.rect(screen_left - 8, arch_y, gate_width + 16, 36, 2)
         
         # 装饰边框
-        pyxel.rectb(screen_left - 8, arch_y, gate_width + 16, 36, 4)
-        pyxel.rectb(screen_left - 6, arch_y + 2, gate_width + 12, 32, 4)
+        canvas.rectb(screen_left - 8, arch_y, gate_width + 16, 36, 4)
+        canvas.rectb(screen_left - 6, arch_y + 2, gate_width + 12, 32, 4)
         
         # 拱形底部
         for i in range(int(gate_width + 16)):
@@ -858,54 +994,63 @@ class CampusRenderer:
             progress = (i - (gate_width + 16) / 2) / ((gate_width + 16) / 2)
             curve = int(12 * (1 - progress * progress))
             if curve > 0:
-                pyxel.rect(x, arch_y + 28 + curve, 1, 8, 2)
-        
-        # === 校名文字 ===
-        # "北京外国语大学" 
-        text_x = gate_center - 40
-        text_y = arch_y + 6
-        
-        # 模拟中文 "北京外国语大学" (使用矩形块模拟汉字)
-        # 现在使用自定义字体显示中文
+                canvas.rect(x, arch_y + 28 + curve, 1, 8, 2)
         
         # 校徽（盾形 - 蓝白色）
         badge_x = gate_center - 8
         badge_y = arch_y + 14
-        pyxel.rect(badge_x, badge_y, 16, 18, 1)  # 蓝色盾底
-        pyxel.tri(badge_x, badge_y + 18, badge_x + 16, badge_y + 18, 
-                  badge_x + 8, badge_y + 24, 1)  # 盾形底部
-        pyxel.rect(badge_x + 4, badge_y + 4, 8, 8, 7)  # 白色内部
-        
-        # 校名（中文）
-        school_name = "北外"
-        name_w = text_width(school_name)
-        draw_text(gate_center - name_w // 2, arch_y + 2, school_name, 7)
+        canvas.rect(badge_x, badge_y, 16, 18, 1)  # 蓝色盾底
+        canvas.tri(badge_x, badge_y + 18, badge_x + 16, badge_y + 18, 
+                   badge_x + 8, badge_y + 24, 1)  # 盾形底部
+        canvas.rect(badge_x + 4, badge_y + 4, 8, 8, 7)  # 白色内部
         
         # === 柱子 ===
         pillar_h = 48
         
         # 左柱子
-        pyxel.rect(screen_left - 8, screen_top - 16, 20, pillar_h + 16, 2)
+        canvas.rect(screen_left - 8, screen_top - 16, 20, pillar_h + 16, 2)
         # 砖纹
         for i in range(12):
             py = screen_top - 16 + i * 4
-            pyxel.line(screen_left - 8, py, screen_left + 12, py, 4)
-        # 攀爬植物
-        vine_sway = math.sin(self.time * 0.02) * 1
-        for i in range(6):
-            vy = screen_top - 10 + i * 7
-            pyxel.pset(int(screen_left - 4 + vine_sway), vy, 3)
-            pyxel.pset(int(screen_left - 2 + vine_sway * 0.5), vy + 3, 11)
+            canvas.line(screen_left - 8, py, screen_left + 12, py, 4)
         
         # 右柱子
         right_pillar_x = screen_right - 12
-        pyxel.rect(right_pillar_x, screen_top - 16, 20, pillar_h + 16, 2)
+        canvas.rect(right_pillar_x, screen_top - 16, 20, pillar_h + 16, 2)
         for i in range(12):
             py = screen_top - 16 + i * 4
-            pyxel.line(right_pillar_x, py, right_pillar_x + 20, py, 4)
+            canvas.line(right_pillar_x, py, right_pillar_x + 20, py, 4)
+        
+    def _draw_gate_overlay(self, camera_x, camera_y):
+        """绘制校门的校名、攀爬植物和灯光（实时叠加）"""
+        if not rect_on_screen(LANDMARK_RECTS['gate'], camera_x, camera_y):
+            return
+        
+        gate_left = GATE_POSITION['left_pillar_x'] * TILE_SIZE
+        gate_right = (GATE_POSITION['right_pillar_x'] + 1) * TILE_SIZE
+        gate_top = GATE_POSITION['top_y'] * TILE_SIZE
+        
+        screen_left = int(gate_left - camera_x)
+        screen_right = int(gate_right - camera_x)
+        screen_top = int(gate_top - camera_y)
+        gate_center = (screen_left + screen_right) // 2
+        arch_y = screen_top - 32
+        
+        # 校名（中文）
+        school_name = "北外"
+        name_w = text_width(school_name)
+        draw_text(gate_center - name_w // 2, arch_y + 2, school_name, 7)
+        
+        # 攀爬植物
+        vine_sway = self.clock.wave(0.02) * 1
+        for i in range(6):
+            vy = screen_top - 10 + i * 7
+            pyxel.pset(int(screen_left - 4 + vine_sway), vy, 3)
+            pyxel.pset(int(screen_left - 2 + vine_sway * 0.5), vy + 3, 11)
         
         # === 灯光 ===
-        light_phase = (self.time // 20) % 3
+        right_pillar_x = screen_right - 12
+        light_phase = self.clock.step(20, 3)
         if light_phase != 2:
             # 左灯
             pyxel.circ(screen_left + 2, screen_top - 20, 4, 10)
@@ -915,22 +1060,5 @@ class CampusRenderer:
             pyxel.pset(right_pillar_x + 10, screen_top - 20, 7)
         
     def is_collision(self, x, y, width, height):
-        """检查碰撞"""
-        corners = [
-            (x, y),
-            (x + width - 1, y),
-            (x, y + height - 1),
-            (x + width - 1, y + height - 1)
-        ]
-        
-        for cx, cy in corners:
-            tile_x = int(cx // TILE_SIZE)
-            tile_y = int(cy // TILE_SIZE)
-            
-            if tile_x < 0 or tile_x >= MAP_TILES_WIDTH or tile_y < 0 or tile_y >= MAP_TILES_HEIGHT:
-                return True
-                
-            if COLLISION_MAP[tile_y][tile_x] == 1:
-                return True
-                
-        return False
+        """检查碰撞（查询碰撞网格服务中本地图的网格）"""
+        return get_collision_service().get_grid('east').is_blocked(x, y, width, height)
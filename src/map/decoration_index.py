@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+装饰物索引
+按瓦片分桶保存草叶、树木等装饰物，绘制时只访问摄像机范围内的桶
+"""
+
+from array import array
+from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT
+
+
+class DecorationIndex:
+    """
+    按瓦片分桶的装饰物索引
+
+    装饰物按瓦片行优先顺序存放在紧凑数组中，
+    同一行瓦片的装饰物在数组中是连续的一段，查询时每行只需一次切片。
+    """
+
+    def __init__(self, map_width, map_height, entries):
+        """
+        构建索引
+
+        参数:
+            map_width, map_height: 地图尺寸（瓦片数）
+            entries: 可迭代的 (tile_x, tile_y, px, py, param)，
+                px/py 为世界像素坐标，param 为任意非负整数（相位、种子等）
+        """
+        self.map_width = map_width
+        self.map_height = map_height
+
+        buckets = [[] for _ in range(map_width * map_height)]
+        for tile_x, tile_y, px, py, param in entries:
+            buckets[tile_y * map_width + tile_x].append((px, py, param))
+
+        # 紧凑数组：坐标、参数，以及每个桶在数组中的起始下标
+        self.xs = array('h')
+        self.ys = array('h')
+        self.params = array('H')
+        self.starts = array('I', [0])
+        for bucket in buckets:
+            for px, py, param in bucket:
+                self.xs.append(px)
+                self.ys.append(py)
+                self.params.append(param)
+            self.starts.append(len(self.xs))
+
+    def __len__(self):
+        return len(self.xs)
+
+    def visible_ranges(self, camera_x, camera_y, pad_before=0, pad_after=0):
+        """
+        返回摄像机范围内每一行瓦片对应的数组下标区间 [(start, end), ...]
+
+        参数:
+            camera_x, camera_y: 摄像机位置
+            pad_before: 左侧/上方额外包含的瓦片数（装饰物向左上越出本格时使用）
+            pad_after: 右侧/下方额外包含的瓦片数
+        """
+        start_x = max(0, int(camera_x // TILE_SIZE) - pad_before)
+        start_y = max(0, int(camera_y // TILE_SIZE) - pad_before)
+        end_x = min(self.map_width, int((camera_x + WINDOW_WIDTH) // TILE_SIZE) + 1 + pad_after)
+        end_y = min(self.map_height, int((camera_y + WINDOW_HEIGHT) // TILE_SIZE) + 1 + pad_after)
+        if start_x >= end_x:
+            return []
+
+        ranges = []
+        for tile_y in range(start_y, end_y):
+            row = tile_y * self.map_width
+            start = self.starts[row + start_x]
+            end = self.starts[row + end_x]
+            if start < end:
+                ranges.append((start, end))
+        return ranges
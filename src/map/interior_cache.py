@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+室内画面缓存
+图书馆、清真寺等室内场景除了人物外完全静止：
+首次进入时把整个室内烘焙一次到图像库，之后每帧一次 blt；
+离开时释放，图像库重新交给室外地图的世界图层使用
+"""
+
+import math
+import pyxel
+from config import WORLD_LAYER_BANK
+from src.utils.image_bank_allocator import get_image_allocator
+
+
+class InteriorCache:
+    """
+    室内画面缓存
+
+    同一时间只缓存一个室内场景。默认使用相机世界图层所在的图像库
+    （身处室内时不会绘制室外地图），分配器会淘汰世界图层腾出空间，
+    回到室外后世界图层自动重新申请并整屏重绘。
+    """
+
+    def __init__(self, image_bank=WORLD_LAYER_BANK):
+        """
+        初始化缓存
+
+        参数:
+            image_bank: 烘焙使用的图像库编号
+        """
+        self.image_bank = image_bank
+        self.allocator = get_image_allocator()
+        self.name = None    # 当前已烘焙的室内名称
+        self.handle = None  # 图像库区域句柄
+        self.bake_count = 0  # 累计烘焙次数（调试用）
+
+    def is_baked(self, name):
+        """指定的室内是否已烘焙（且未被淘汰）"""
+        return self.name == name and self.allocator.touch(self.handle)
+
+    def bake(self, name, width, height, painter):
+        """
+        烘焙一个室内场景（会替换之前的缓存）
+
+        参数:
+            name: 室内名称
+            width, height: 室内的像素尺寸（不超过图像库大小）
+            painter: 静态部分绘制函数 painter(canvas)，按室内坐标绘制
+
+        返回:
+            bool: 是否烘焙成功（图像库空间不足时返回 False）
+        """
+        self.release()
+        width = min(width, pyxel.IMAGE_SIZE)
+        height = min(height, pyxel.IMAGE_SIZE)
+        handle = self.allocator.allocate(('interior', name), width, height, bank=self.image_bank)
+        if handle is None:
+            return False
+
+        # 室内坐标 (0, 0) 落在区域左上角
+        img = pyxel.images[handle.bank]
+        img.clip(handle.u, handle.v, width, height)
+        img.camera(-handle.u, -handle.v)
+        painter(img)
+        img.camera()
+        img.clip()
+
+        self.name = name
+        self.handle = handle
+        self.bake_count += 1
+        print(f"[室内缓存] {name} 烘焙完成 ({width}x{height})")
+        return True
+
+    def draw(self, camera_x=0, camera_y=0):
+        """把已烘焙的室内画到屏幕上"""
+        handle = self.handle
+        # 取整方式与实时绘制时的 int(world - camera) 保持一致
+        pyxel.blt(-math.ceil(camera_x), -math.ceil(camera_y), handle.bank,
+                  handle.u, handle.v, handle.w, handle.h)
+
+    def release(self):
+        """释放缓存，把图像库区域还给分配器"""
+        if self.name is None:
+            return
+        print(f"[室内缓存] 释放 {self.name}")
+        self.allocator.free(self.handle)
+        self.name = None
+        self.handle = None
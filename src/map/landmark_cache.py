@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+地标精灵缓存
+把地标建筑中不会变化的部分烘焙一次到图像库，之后每帧只需 blt；
+动画部分（灯光闪烁、樱花花瓣、文字等）由渲染器实时叠加绘制
+"""
+
+import math
+import pyxel
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, LANDMARK_BANK
+from src.utils.image_bank_allocator import get_image_allocator
+
+
+# 透明色：地标的静态部分都不使用黑色
+TRANSPARENT_COLOR = 0
+
+
+def rect_on_screen(rect, camera_x, camera_y):
+    """判断世界坐标矩形 (x, y, w, h) 是否与屏幕相交"""
+    x, y, w, h = rect
+    return (x + w > camera_x and x < camera_x + WINDOW_WIDTH and
+            y + h > camera_y and y < camera_y + WINDOW_HEIGHT)
+
+
+def union_rect(rects):
+    """返回多个矩形 (x, y, w, h) 的包围盒"""
+    left = min(r[0] for r in rects)
+    top = min(r[1] for r in rects)
+    right = max(r[0] + r[2] for r in rects)
+    bottom = max(r[1] + r[3] for r in rects)
+    return (left, top, right - left, bottom - top)
+
+
+class LandmarkCache:
+    """
+    地标精灵缓存
+
+    一个地标可以由多块矩形组成（空白区域不占用图像库），
+    每块都是整个地标在该矩形内的画面。
+    图像库空间由分配器管理，被淘汰的地标在下次绘制时重新烘焙。
+    """
+
+    def __init__(self, image_bank=LANDMARK_BANK):
+        """
+        初始化缓存
+
+        参数:
+            image_bank: 优先使用的图像库编号（None 表示任意图像库）
+        """
+        self.image_bank = image_bank
+        self.allocator = get_image_allocator()
+        self.sprites = {}   # 名称 -> [(世界x,世界y, 句柄), ...]
+        self.bounds = {}    # 名称 -> 整个地标的世界坐标包围盒
+        self.painters = {}  # 名称 -> (组成矩形, 绘制函数)，用于被淘汰后重新烘焙
+
+    def bake(self, name, pieces, painter):
+        """
+        烘焙一个地标
+
+        参数:
+            name: 地标名称
+            pieces: 组成地标的世界坐标矩形列表 [(x, y, w, h), ...]
+            painter: 静态部分绘制函数 painter(canvas, camera_x, camera_y)
+
+        返回:
+            bool: 是否烘焙成功（图像库空间不足时返回 False，由调用方实时绘制）
+        """
+        self.painters[name] = (pieces, painter)
+        self.bounds[name] = union_rect(pieces)
+
+        placed = []
+        for i, (x, y, w, h) in enumerate(pieces):
+            handle = self.allocator.allocate(('landmark', name, i), w, h, bank=self.image_bank)
+            if handle is None:
+                print(f"[地标缓存] 图像库空间不足，{name} 将实时绘制")
+                for _, _, placed_handle in placed:
+                    self.allocator.free(placed_handle)
+                self.sprites.pop(name, None)
+                return False
+
+            # 让世界坐标 (x, y) 恰好落在图像库的 (u, v)
+            img = pyxel.images[handle.bank]
+            u, v = handle.u, handle.v
+            img.clip(u, v, w, h)
+            img.rect(u, v, w, h, TRANSPARENT_COLOR)
+            painter(img, x - u, y - v)
+            img.clip()
+            placed.append((x, y, handle))
+
+        self.sprites[name] = placed
+        return True
+
+    def draw(self, name, camera_x, camera_y):
+        """
+        绘制已烘焙的地标（不在屏幕内时整个跳过）
+
+        返回:
+            bool: 是否已由缓存处理；未烘焙或重新烘焙失败时返回 False，由调用方实时绘制
+        """
+        if name not in self.sprites:
+            return False
+        if not rect_on_screen(self.bounds[name], camera_x, camera_y):
+            return True
+
+        pieces = self.sprites[name]
+        if not all([self.allocator.touch(handle) for _, _, handle in pieces]):
+            # 被淘汰过，重新烘焙
+            if not self.bake(name, *self.painters[name]):
+                return False
+            pieces = self.sprites[name]
+
+        # 取整方式与实时绘制时的 int(world - camera) 保持一致
+        cam_x = math.ceil(camera_x)
+        cam_y = math.ceil(camera_y)
+        for x, y, handle in pieces:
+            pyxel.blt(x - cam_x, y - cam_y, handle.bank, handle.u, handle.v,
+                      handle.w, handle.h, TRANSPARENT_COLOR)
+        return True
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+区域表
+HUD 左上角显示玩家所在的区域名称。东校区原本每帧扫描玩家周围 3x3 瓦片来找附近的建筑，
+这里在加载时把每个瓦片对应的区域预先算好，查询只需一次数组下标；
+区域跟踪器在玩家所在区域变化时（可选地带一点滞后，避免在边界来回闪烁）通知订阅者，
+音乐、任务、AI 对话上下文等系统可以订阅区域变化事件
+"""
+
+
+class RegionMap:
+    """每个瓦片对应的区域名称（加载时一次性计算）"""
+
+    def __init__(self, tile_map, width, height, region_names, default_name, search_radius=1):
+        """
+        初始化区域表
+
+        参数:
+            tile_map: 瓦片地图（二维列表）
+            width, height: 地图瓦片尺寸
+            region_names: {瓦片类型: 区域名称}
+            default_name: 附近没有建筑时的区域名称
+            search_radius: 搜索半径（瓦片），1 即玩家周围 3x3 范围
+        """
+        self.width = width
+        self.height = height
+        self.names = [default_name]  # 区域编号 -> 名称，0 为默认区域
+        name_ids = {default_name: 0}
+        tile_ids = {}
+        for tile, name in region_names.items():
+            if name not in name_ids:
+                name_ids[name] = len(self.names)
+                self.names.append(name)
+            tile_ids[tile] = name_ids[name]
+
+        # 每个瓦片取搜索范围内（从上到下、从左到右）第一个建筑瓦片所属的区域
+        self.region_ids = bytearray(width * height)
+        for tile_y in range(height):
+            for tile_x in range(width):
+                self.region_ids[tile_y * width + tile_x] = self._search(
+                    tile_map, tile_ids, tile_x, tile_y, search_radius)
+
+    def _search(self, tile_map, tile_ids, tile_x, tile_y, radius):
+        """在瓦片周围搜索建筑，返回区域编号"""
+        for check_y in range(tile_y - radius, tile_y + radius + 1):
+            if not 0 <= check_y < self.height:
+                continue
+            row = tile_map[check_y]
+            for check_x in range(tile_x - radius, tile_x + radius + 1):
+                if 0 <= check_x < self.width and row[check_x] in tile_ids:
+                    return tile_ids[row[check_x]]
+        return 0
+
+    def name_at(self, tile_x, tile_y):
+        """获取瓦片所在区域的名称（地图外为默认区域）"""
+        if 0 <= tile_x < self.width and 0 <= tile_y < self.height:
+            return self.names[self.region_ids[tile_y * self.width + tile_x]]
+        return self.names[0]
+
+
+class RegionTracker:
+    """
+    跟踪玩家当前所在区域
+
+    新区域需要持续 hysteresis 帧才会生效，生效时通知订阅者 callback(旧区域, 新区域)。
+    """
+
+    def __init__(self, hysteresis=0):
+        """
+        初始化区域跟踪器
+
+        参数:
+            hysteresis: 滞后帧数（0 表示区域一变化立刻生效）
+        """
+        self.hysteresis = hysteresis
+        self.current = None   # 当前生效的区域名称
+        self.pending = None   # 等待生效的新区域
+        self.pending_frames = 0
+        self.subscribers = []
+        self.change_count = 0  # 区域变化次数（调试用）
+
+    def subscribe(self, callback):
+        """订阅区域变化事件 callback(旧区域, 新区域)"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """取消订阅"""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def update(self, name, immediate=False):
+        """
+        每帧调用：传入玩家此刻所在的区域
+
+        参数:
+            name: 区域名称
+            immediate: 跳过滞后立刻生效（如切换地图、进出室内）
+        """
+        if name == self.current:
+            self.pending = None
+            return
+        if self.current is not None and not immediate and self.hysteresis > 0:
+            if name != self.pending:
+                self.pending = name
+                self.pending_frames = 0
+            self.pending_frames += 1
+            if self.pending_frames < self.hysteresis:
+                return
+
+        old_name = self.current
+        self.current = name
+        self.pending = None
+        self.change_count += 1
+        for callback in list(self.subscribers):
+            callback(old_name, name)
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        return [
+            f"region: {self.current} changes: {self.change_count}",
+            f"pending: {self.pending or '-'} ({self.pending_frames}/{self.hysteresis})"
+            if self.pending else "pending: -",
+        ]
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+瓦片图集
+启动时把每种地面瓦片（含纹理变体）烘焙一次到图像库，
+再把整张地图写入 pyxel.tilemaps，绘制时只需一次 pyxel.bltm。
+动画瓦片的每一帧也预先烘焙，绘制时按全局帧计数选帧再 blt
+"""
+
+import math
+import pyxel
+from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT, TILE_ATLAS_BANK
+from src.utils.animation_clock import get_clock
+from src.utils.image_bank_allocator import get_image_allocator
+
+
+# 一个 16x16 的游戏瓦片在 Pyxel 瓦片地图中占 2x2 个 8x8 格子
+CELLS_PER_TILE = TILE_SIZE // pyxel.TILE_SIZE
+
+
+class TileAtlas:
+    """
+    地面瓦片图集
+
+    渲染器提供绘制函数 painter(canvas, x, y, tile, tile_x, tile_y)，
+    以及可选的变体函数 variant_fn(tile, tile_x, tile_y)。
+    外观相同（类型与变体都相同）的瓦片共用同一个槽位。
+
+    动画瓦片的绘制函数会额外收到关键字参数 frame（帧编号）。
+    瓦片地图中写入的是第 0 帧，其余帧在 draw_animated 中覆盖绘制。
+
+    槽位向图像库分配器申请并固定（瓦片地图直接引用槽位坐标，不能被淘汰）。
+    """
+
+    def __init__(self, tilemap_index, painter, variant_fn=None, overhang_tiles=(),
+                 animated_tiles=None):
+        """
+        初始化图集
+
+        参数:
+            tilemap_index: 使用的 pyxel.tilemaps 编号
+            painter: 瓦片绘制函数
+            variant_fn: 瓦片变体函数，默认所有同类瓦片外观一致
+            overhang_tiles: 会向上越出自身格子绘制的瓦片类型
+                （逐瓦片绘制时会覆盖上一行，烘焙时合成进上方瓦片的槽位）
+            animated_tiles: 动画瓦片 {瓦片类型: (帧数, 每帧持续的帧数)}
+        """
+        self.tilemap_index = tilemap_index
+        self.painter = painter
+        self.variant_fn = variant_fn
+        self.overhang_tiles = set(overhang_tiles)
+        self.animated_tiles = dict(animated_tiles or {})
+        self.clock = get_clock()
+
+        # 动画格子 [(世界x, 世界y, 帧数, 周期, [各帧槽位])]
+        self.animated_cells = []
+
+        self.pixel_width = 0
+        self.pixel_height = 0
+        self.slot_count = 0  # 本图集占用的槽位数
+
+    def _claim_slot(self, key, frame=0):
+        """为一种格子外观（的某一帧）分配槽位，返回其在图像库中的像素坐标"""
+        handle = get_image_allocator().allocate(
+            ('tile_atlas', self.tilemap_index, key, frame), TILE_SIZE, TILE_SIZE,
+            bank=TILE_ATLAS_BANK, pinned=True, align=pyxel.TILE_SIZE)
+        if handle is None:
+            raise RuntimeError("瓦片图集槽位已用完")
+        return handle.u, handle.v
+
+    def _tile_key(self, tile, tile_x, tile_y):
+        """单个瓦片的外观键"""
+        if self.variant_fn is None:
+            return tile
+        return (tile, self.variant_fn(tile, tile_x, tile_y))
+
+    def _cell_key(self, map_data, tile_x, tile_y):
+        """地图格子的外观键（包含下方瓦片越界绘制的部分）"""
+        key = self._tile_key(map_data[tile_y][tile_x], tile_x, tile_y)
+        below = None
+        if tile_y + 1 < len(map_data):
+            below_tile = map_data[tile_y + 1][tile_x]
+            if below_tile in self.overhang_tiles:
+                below = self._tile_key(below_tile, tile_x, tile_y + 1)
+        return (key, below)
+
+    def _cell_animation(self, map_data, tile_x, tile_y):
+        """格子的动画参数 (帧数, 周期)；自身或越界绘制进来的下方瓦片是动画瓦片时才有"""
+        tile = map_data[tile_y][tile_x]
+        if tile in self.animated_tiles:
+            return self.animated_tiles[tile]
+        if tile_y + 1 < len(map_data):
+            below_tile = map_data[tile_y + 1][tile_x]
+            if below_tile in self.overhang_tiles and below_tile in self.animated_tiles:
+                return self.animated_tiles[below_tile]
+        return None
+
+    def _paint_tile(self, img, u, v, tile, tile_x, tile_y, frame):
+        """调用绘制函数，动画瓦片附带帧编号"""
+        if tile in self.animated_tiles:
+            frame_count = self.animated_tiles[tile][0]
+            self.painter(img, u, v, tile, tile_x, tile_y, frame=frame % frame_count)
+        else:
+            self.painter(img, u, v, tile, tile_x, tile_y)
+
+    def _paint_cell(self, img, u, v, map_data, tile_x, tile_y, frame=0):
+        """把一个地图格子（动画格子的指定帧）绘制到图像库的槽位中"""
+        img.clip(u, v, TILE_SIZE, TILE_SIZE)
+        img.rect(u, v, TILE_SIZE, TILE_SIZE, 0)
+        self._paint_tile(img, u, v, map_data[tile_y][tile_x], tile_x, tile_y, frame)
+        if tile_y + 1 < len(map_data):
+            below_tile = map_data[tile_y + 1][tile_x]
+            if below_tile in self.overhang_tiles:
+                self._paint_tile(img, u, v + TILE_SIZE, below_tile, tile_x, tile_y + 1, frame)
+        img.clip()
+
+    def bake(self, map_data):
+        """烘焙地图用到的全部瓦片，并写入瓦片地图"""
+        img = pyxel.images[TILE_ATLAS_BANK]
+        tilemap = pyxel.tilemaps[self.tilemap_index]
+        tilemap.imgsrc = TILE_ATLAS_BANK
+
+        slots = {}
+        frame_slots = {}  # 动画格子的外观键 -> 各帧槽位
+        self.animated_cells = []
+        for tile_y, row in enumerate(map_data):
+            for tile_x in range(len(row)):
+                key = self._cell_key(map_data, tile_x, tile_y)
+                slot = slots.get(key)
+                if slot is None:
+                    slot = self._claim_slot(key)
+                    self._paint_cell(img, slot[0], slot[1], map_data, tile_x, tile_y)
+                    slots[key] = slot
+
+                animation = self._cell_animation(map_data, tile_x, tile_y)
+                if animation:
+                    frame_count, period = animation
+                    frames = frame_slots.get(key)
+                    if frames is None:
+                        frames = [slot]
+                        for frame in range(1, frame_count):
+                            frame_slot = self._claim_slot(key, frame)
+                            self._paint_cell(img, frame_slot[0], frame_slot[1],
+                                             map_data, tile_x, tile_y, frame)
+                            frames.append(frame_slot)
+                        frame_slots[key] = frames
+                    self.animated_cells.append((tile_x * TILE_SIZE, tile_y * TILE_SIZE,
+                                                frame_count, period, frames))
+
+                cell_u = slot[0] // pyxel.TILE_SIZE
+                cell_v = slot[1] // pyxel.TILE_SIZE
+                for dy in range(CELLS_PER_TILE):
+                    for dx in range(CELLS_PER_TILE):
+                        tilemap.pset(tile_x * CELLS_PER_TILE + dx,
+                                     tile_y * CELLS_PER_TILE + dy,
+                                     (cell_u + dx, cell_v + dy))
+
+        self.pixel_width = len(map_data[0]) * TILE_SIZE
+        self.pixel_height = len(map_data) * TILE_SIZE
+        self.slot_count = len(slots) + sum(len(frames) - 1 for frames in frame_slots.values())
+        print(f"[瓦片图集] 瓦片地图 {self.tilemap_index} 烘焙完成，占用 {self.slot_count} 个槽位")
+        return self
+
+    def paint(self, canvas, x, y, w, h, world_x, world_y):
+        """把世界区域 (world_x, world_y, w, h) 的地面画到画布的 (x, y)，地图外的部分不画"""
+        left = max(world_x, 0)
+        top = max(world_y, 0)
+        right = min(world_x + w, self.pixel_width)
+        bottom = min(world_y + h, self.pixel_height)
+        if left < right and top < bottom:
+            canvas.bltm(x + left - world_x, y + top - world_y, self.tilemap_index,
+                        left, top, right - left, bottom - top)
+
+    def draw(self, camera_x, camera_y):
+        """用一次 bltm 绘制可见范围内的地面"""
+        # 取整方式与逐瓦片绘制时的 int(tile * TILE_SIZE - camera) 保持一致
+        cam_x = math.ceil(camera_x)
+        cam_y = math.ceil(camera_y)
+        self.paint(pyxel, 0, 0, WINDOW_WIDTH, WINDOW_HEIGHT, cam_x, cam_y)
+
+    def draw_animated(self, camera_x, camera_y):
+        """
+        在地面之上覆盖绘制可见动画格子的当前帧
+
+        瓦片地图（以及相机世界图层）里是第 0 帧，当前帧不是第 0 帧的格子才需要 blt
+        """
+        cam_x = math.ceil(camera_x)
+        cam_y = math.ceil(camera_y)
+        for x, y, frame_count, period, frames in self.animated_cells:
+            frame = self.clock.step(period, frame_count)
+            if frame == 0:
+                continue
+            screen_x = x - cam_x
+            screen_y = y - cam_y
+            if -TILE_SIZE < screen_x < WINDOW_WIDTH and -TILE_SIZE < screen_y < WINDOW_HEIGHT:
+                u, v = frames[frame]
+                pyxel.blt(screen_x, screen_y, TILE_ATLAS_BANK, u, v, TILE_SIZE, TILE_SIZE)
@@ -5,39 +5,82 @@
 """
 
 import pyxel
-import math
-from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT
+from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT, TILEMAP_TUNNEL
+from src.map.tile_atlas import TileAtlas
+from src.utils.animation_clock import get_clock
 from src.map.campus_map import (
-    TUNNEL_MAP, TUNNEL_COLLISION_MAP, TUNNEL_WIDTH, TUNNEL_HEIGHT,
+    TUNNEL_MAP, TUNNEL_WIDTH, TUNNEL_HEIGHT,
     TILE_TUNNEL_WALL, TILE_TUNNEL_FLOOR, TILE_TUNNEL_LIGHT,
     TILE_TUNNEL_ENTRY, TILE_TUNNEL_EXIT
 )
 from src.utils.font_manager import draw_text, text_width
+from src.systems.collision import get_collision_service
+
+
+# 顶灯闪烁动画：亮、暗两帧，每帧持续的帧数
+LIGHT_FRAMES = 2
+LIGHT_FRAME_PERIOD = 31
 
 
 class TunnelRenderer:
     """地下通道渲染器"""
     
-    def __init__(self):
-        """初始化"""
-        self.time = 0
-        self.light_flicker = 0
+    def __init__(self, use_tile_atlas=True):
+        """
+        初始化
+        
+        参数:
+            use_tile_atlas: 是否把地面瓦片烘焙进图集（否则每帧逐瓦片绘制）
+        """
+        self.clock = get_clock()  # 全局动画时钟
+        
+        # 地面瓦片图集（顶灯会向上越出自身格子，闪烁的每一帧都预先烘焙）
+        self.tile_atlas = None
+        if use_tile_atlas:
+            self.tile_atlas = TileAtlas(
+                TILEMAP_TUNNEL, self._paint_tile, self._tile_variant,
+                overhang_tiles=(TILE_TUNNEL_LIGHT,),
+                animated_tiles={TILE_TUNNEL_LIGHT: (LIGHT_FRAMES, LIGHT_FRAME_PERIOD)}
+            ).bake(TUNNEL_MAP)
         
     def update(self, weather='sunny'):
-        """更新动画"""
-        self.time += 1
-        # 灯光闪烁效果
-        self.light_flicker = math.sin(self.time * 0.1) * 0.3 + 0.7
+        """更新动画（顶灯闪烁的帧由全局动画时钟决定）"""
+        pass
         
-    def draw(self, camera_x, camera_y):
-        """绘制地下通道"""
-        # 深色背景
-        pyxel.cls(0)
+    def draw(self, camera_x, camera_y, camera=None):
+        """
+        绘制地下通道
         
+        参数:
+            camera_x, camera_y: 相机位置
+            camera: 可选的 Camera，提供持久化世界图层时只重绘新露出的部分
+        """
         # 确保相机坐标不为负数
         camera_x = max(0, camera_x)
         camera_y = max(0, camera_y)
         
+        # 深色背景和瓦片
+        if not (camera and self.tile_atlas and camera.draw_world(self.paint_world)):
+            pyxel.cls(0)
+            if self.tile_atlas:
+                self.tile_atlas.draw(camera_x, camera_y)
+            else:
+                self._draw_tiles(camera_x, camera_y)
+        
+        # 动画瓦片的当前帧
+        if self.tile_atlas:
+            self.tile_atlas.draw_animated(camera_x, camera_y)
+        
+        # 绘制方向指示
+        self._draw_direction_signs(camera_x, camera_y)
+        
+    def paint_world(self, canvas, x, y, w, h, world_x, world_y):
+        """把世界区域内的静态地面画到画布上（供相机的世界图层使用）"""
+        canvas.rect(x, y, w, h, 0)
+        self.tile_atlas.paint(canvas, x, y, w, h, world_x, world_y)
+        
+    def _draw_tiles(self, camera_x, camera_y):
+        """逐瓦片绘制可见范围内的地面"""
         # 计算可见范围（确保不越界）
         start_tile_x = max(0, int(camera_x // TILE_SIZE) - 1)
         start_tile_y = max(0, int(camera_y // TILE_SIZE) - 1)
@@ -48,9 +91,6 @@ class TunnelRenderer:
         for y in range(start_tile_y, end_tile_y):
             for x in range(start_tile_x, end_tile_x):
                 self._draw_tile(x, y, camera_x, camera_y)
-        
-        # 绘制方向指示
-        self._draw_direction_signs(camera_x, camera_y)
                 
     def _draw_tile(self, tile_x, tile_y, camera_x, camera_y):
         """绘制单个瓦片"""
@@ -63,55 +103,78 @@ class TunnelRenderer:
         tile = TUNNEL_MAP[tile_y][tile_x]
         screen_x = int(tile_x * TILE_SIZE - camera_x)
         screen_y = int(tile_y * TILE_SIZE - camera_y)
+        frame = self.clock.step(LIGHT_FRAME_PERIOD, LIGHT_FRAMES)
+        self._paint_tile(pyxel, screen_x, screen_y, tile, tile_x, tile_y, frame)
+        
+    def _tile_variant(self, tile, tile_x, tile_y):
+        """返回瓦片的外观变体编号（外观相同的瓦片在图集中共用一个槽位）"""
+        if tile == TILE_TUNNEL_FLOOR:
+            seed = (tile_x * 7 + tile_y * 11) % 13
+            return seed if seed < 3 else 3
+        return 0
         
+    def _paint_tile(self, canvas, screen_x, screen_y, tile, tile_x, tile_y, frame=0):
+        """
+        在画布上绘制单个瓦片
+        
+        参数:
+            canvas: 绘制目标（pyxel 模块即屏幕，或 pyxel.Image 图像库）
+            screen_x, screen_y: 瓦片左上角在画布上的坐标
+            tile: 瓦片类型
+            tile_x, tile_y: 瓦片在地图中的坐标（用于纹理变化）
+            frame: 动画帧编号（顶灯：0 为亮，1 为暗）
+        """
         if tile == TILE_TUNNEL_WALL:
             # 墙壁 - 深灰色砖墙
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
             # 砖纹
-            pyxel.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 1)
-            pyxel.line(screen_x, screen_y + 8, screen_x + TILE_SIZE, screen_y + 8, 1)
-            pyxel.line(screen_x, screen_y + 12, screen_x + TILE_SIZE, screen_y + 12, 1)
-            pyxel.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 1)
+            canvas.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 1)
+            canvas.line(screen_x, screen_y + 8, screen_x + TILE_SIZE, screen_y + 8, 1)
+            canvas.line(screen_x, screen_y + 12, screen_x + TILE_SIZE, screen_y + 12, 1)
+            canvas.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 1)
             
         elif tile == TILE_TUNNEL_FLOOR:
             # 地面 - 灰色地砖
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
             # 地砖纹理
-            pyxel.rectb(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
+            canvas.rectb(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
             # 地面污渍
             seed = (tile_x * 7 + tile_y * 11) % 13
             if seed < 3:
-                pyxel.pset(screen_x + seed + 4, screen_y + 8, 5)
+                canvas.pset(screen_x + seed + 4, screen_y + 8, 5)
                 
         elif tile == TILE_TUNNEL_LIGHT:
             # 灯光位置 - 地面+顶灯效果
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
-            pyxel.rectb(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 13)
+            canvas.rectb(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 5)
             
             # 灯光照射效果（黄色渐变）
-            light_intensity = int(self.light_flicker * 3)
-            if light_intensity > 0:
-                pyxel.rect(screen_x + 4, screen_y + 4, 8, 8, 10)  # 金黄色光斑
-                pyxel.rect(screen_x + 6, screen_y + 6, 4, 4, 7)   # 白色中心
+            if frame == 0:
+                canvas.rect(screen_x + 4, screen_y + 4, 8, 8, 10)  # 金黄色光斑
+                canvas.rect(screen_x + 6, screen_y + 6, 4, 4, 7)   # 白色中心
+            else:
+                # 闪烁变暗
+                canvas.rect(screen_x + 4, screen_y + 4, 8, 8, 9)   # 橙色光斑
+                canvas.rect(screen_x + 6, screen_y + 6, 4, 4, 10)  # 金黄色中心
                 
             # 顶部灯具
-            pyxel.rect(screen_x + 5, screen_y - 2, 6, 3, 6)
+            canvas.rect(screen_x + 5, screen_y - 2, 6, 3, 6)
             
         elif tile == TILE_TUNNEL_ENTRY:
             # 入口（从东校区来）- 绿色地面+向上箭头标识
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             # 标识线
-            pyxel.rect(screen_x + 6, screen_y + 2, 4, 12, 11)
+            canvas.rect(screen_x + 6, screen_y + 2, 4, 12, 11)
             # 向上箭头（表示通往东校区）
-            pyxel.tri(screen_x + 8, screen_y, screen_x + 4, screen_y + 6, screen_x + 12, screen_y + 6, 7)
+            canvas.tri(screen_x + 8, screen_y, screen_x + 4, screen_y + 6, screen_x + 12, screen_y + 6, 7)
             
         elif tile == TILE_TUNNEL_EXIT:
             # 出口（通往西校区）- 蓝色地面+向下箭头标识
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 1)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 1)
             # 标识线
-            pyxel.rect(screen_x + 6, screen_y + 2, 4, 12, 12)
+            canvas.rect(screen_x + 6, screen_y + 2, 4, 12, 12)
             # 向下箭头（表示通往西校区）
-            pyxel.tri(screen_x + 8, screen_y + 16, screen_x + 4, screen_y + 10, screen_x + 12, screen_y + 10, 7)
+            canvas.tri(screen_x + 8, screen_y + 16, screen_x + 4, screen_y + 10, screen_x + 12, screen_y + 10, 7)
     
     def _draw_direction_signs(self, camera_x, camera_y):
         """绘制方向指示牌"""
@@ -146,22 +209,5 @@ class TunnelRenderer:
                 pyxel.line(int(sign_x - 20 + i), int(sign_y), int(sign_x - 20 + i + 4), int(sign_y + 6), 10)
             
     def is_collision(self, x, y, width, height):
-        """检查碰撞"""
-        corners = [
-            (x, y),
-            (x + width - 1, y),
-            (x, y + height - 1),
-            (x + width - 1, y + height - 1)
-        ]
-        
-        for cx, cy in corners:
-            tile_x = int(cx // TILE_SIZE)
-            tile_y = int(cy // TILE_SIZE)
-            
-            if tile_x < 0 or tile_x >= TUNNEL_WIDTH or tile_y < 0 or tile_y >= TUNNEL_HEIGHT:
-                return True
-                
-            if TUNNEL_COLLISION_MAP[tile_y][tile_x] == 1:
-                return True
-                
-        return False
+        """检查碰撞（查询碰撞网格服务中本地图的网格）"""
+        return get_collision_service().get_grid('tunnel').is_blocked(x, y, width, height)
@@ -5,31 +5,46 @@
 """
 
 import pyxel
-import math
-from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT
+from config import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT, TILEMAP_WEST_CAMPUS
+from src.map.tile_atlas import TileAtlas
+from src.map.decoration_index import DecorationIndex
+from src.utils.animation_clock import get_clock
 from src.map.campus_map import (
-    WEST_CAMPUS_MAP, WEST_COLLISION_MAP, WEST_TREE_POSITIONS, WEST_GATE_POSITION,
+    WEST_CAMPUS_MAP, WEST_TREE_POSITIONS, WEST_GATE_POSITION,
     WEST_MAP_WIDTH, WEST_MAP_HEIGHT,
     TILE_GRASS, TILE_PATH, TILE_TREE, TILE_FENCE,
     TILE_GATE_PILLAR, TILE_GATE_TOP, TILE_GATE_PASS
 )
 from src.utils.font_manager import draw_text, text_width
+from src.systems.collision import get_collision_service
 
 
 class WestCampusRenderer:
     """西校区渲染器"""
     
-    def __init__(self):
-        """初始化"""
-        self.time = 0
+    def __init__(self, use_tile_atlas=True):
+        """
+        初始化
+        
+        参数:
+            use_tile_atlas: 是否把地面瓦片烘焙进图集（否则每帧逐瓦片绘制）
+        """
+        self.clock = get_clock()  # 全局动画时钟
         self.current_weather = 'sunny'
         
-        # 草地动画点
-        self.grass_blades = []
+        # 草地动画点和树木
         self._generate_grass_blades()
         
+        # 地面瓦片图集
+        self.tile_atlas = None
+        if use_tile_atlas:
+            self.tile_atlas = TileAtlas(
+                TILEMAP_WEST_CAMPUS, self._paint_tile, self._tile_variant
+            ).bake(WEST_CAMPUS_MAP)
+        
     def _generate_grass_blades(self):
-        """生成草叶位置"""
+        """生成草叶和树木的装饰物索引（按瓦片分桶）"""
+        blades = []
         for y in range(WEST_MAP_HEIGHT):
             for x in range(WEST_MAP_WIDTH):
                 tile = WEST_CAMPUS_MAP[y][x]
@@ -37,36 +52,31 @@ class WestCampusRenderer:
                     for i in range(4):
                         px = x * TILE_SIZE + (i * 4) % TILE_SIZE
                         py = y * TILE_SIZE + ((i * 5 + 2) % TILE_SIZE)
-                        phase = (x * 3 + y * 7 + i) % 100 / 10.0
-                        self.grass_blades.append((px, py, phase))
+                        phase = (x * 3 + y * 7 + i) % 100
+                        blades.append((x, y, px, py, phase))
+        self.grass_blades = DecorationIndex(WEST_MAP_WIDTH, WEST_MAP_HEIGHT, blades)
+        
+        self.trees = DecorationIndex(WEST_MAP_WIDTH, WEST_MAP_HEIGHT, [
+            (tx, ty, tx * TILE_SIZE, ty * TILE_SIZE, tx + ty) for tx, ty in WEST_TREE_POSITIONS
+        ])
                         
     def update(self, weather='sunny'):
-        """更新动画"""
-        self.time += 1
+        """更新天气（动画计时由全局动画时钟负责）"""
         self.current_weather = weather
         
     def draw(self, camera_x, camera_y):
         """绘制西校区"""
-        # 计算可见范围
-        start_tile_x = max(0, int(camera_x // TILE_SIZE) - 1)
-        start_tile_y = max(0, int(camera_y // TILE_SIZE) - 1)
-        end_tile_x = min(WEST_MAP_WIDTH, int((camera_x + WINDOW_WIDTH) // TILE_SIZE) + 2)
-        end_tile_y = min(WEST_MAP_HEIGHT, int((camera_y + WINDOW_HEIGHT) // TILE_SIZE) + 2)
-        
         # 绘制基础瓦片
-        for y in range(start_tile_y, end_tile_y):
-            for x in range(start_tile_x, end_tile_x):
-                self._draw_tile(x, y, camera_x, camera_y)
+        if self.tile_atlas:
+            self.tile_atlas.draw(camera_x, camera_y)
+        else:
+            self._draw_tiles(camera_x, camera_y)
         
         # 绘制动态草叶
         self._draw_grass_animation(camera_x, camera_y)
         
         # 绘制树木
-        for tx, ty in WEST_TREE_POSITIONS:
-            screen_x = tx * TILE_SIZE - camera_x
-            screen_y = ty * TILE_SIZE - camera_y
-            if -TILE_SIZE < screen_x < WINDOW_WIDTH and -TILE_SIZE * 2 < screen_y < WINDOW_HEIGHT:
-                self._draw_tree(screen_x, screen_y, tx + ty)
+        self._draw_trees(camera_x, camera_y)
         
         # 绘制西校区校门
         self._draw_gate(camera_x, camera_y)
@@ -74,6 +84,17 @@ class WestCampusRenderer:
         # 绘制"西校区"标识
         self._draw_campus_sign(camera_x, camera_y)
                 
+    def _draw_tiles(self, camera_x, camera_y):
+        """逐瓦片绘制可见范围内的地面"""
+        start_tile_x = max(0, int(camera_x // TILE_SIZE) - 1)
+        start_tile_y = max(0, int(camera_y // TILE_SIZE) - 1)
+        end_tile_x = min(WEST_MAP_WIDTH, int((camera_x + WINDOW_WIDTH) // TILE_SIZE) + 2)
+        end_tile_y = min(WEST_MAP_HEIGHT, int((camera_y + WINDOW_HEIGHT) // TILE_SIZE) + 2)
+        
+        for y in range(start_tile_y, end_tile_y):
+            for x in range(start_tile_x, end_tile_x):
+                self._draw_tile(x, y, camera_x, camera_y)
+                
     def _draw_tile(self, tile_x, tile_y, camera_x, camera_y):
         """绘制单个瓦片"""
         if tile_y < 0 or tile_y >= WEST_MAP_HEIGHT or tile_x < 0 or tile_x >= WEST_MAP_WIDTH:
@@ -82,72 +103,108 @@ class WestCampusRenderer:
         tile = WEST_CAMPUS_MAP[tile_y][tile_x]
         screen_x = int(tile_x * TILE_SIZE - camera_x)
         screen_y = int(tile_y * TILE_SIZE - camera_y)
+        self._paint_tile(pyxel, screen_x, screen_y, tile, tile_x, tile_y)
+        
+    def _tile_variant(self, tile, tile_x, tile_y):
+        """返回瓦片的外观变体编号（外观相同的瓦片在图集中共用一个槽位）"""
+        if tile == TILE_GRASS:
+            seed = (tile_x * 7 + tile_y * 13) % 17
+            return seed if seed < 5 else 5
+        if tile == TILE_PATH:
+            return (tile_x + tile_y) % 5
+        return 0
+        
+    def _paint_tile(self, canvas, screen_x, screen_y, tile, tile_x, tile_y):
+        """
+        在画布上绘制单个瓦片
         
+        参数:
+            canvas: 绘制目标（pyxel 模块即屏幕，或 pyxel.Image 图像库）
+            screen_x, screen_y: 瓦片左上角在画布上的坐标
+            tile: 瓦片类型
+            tile_x, tile_y: 瓦片在地图中的坐标（用于纹理变化）
+        """
         if tile == TILE_GRASS:
             # 草地
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             seed = (tile_x * 7 + tile_y * 13) % 17
             if seed < 5:
-                pyxel.pset(screen_x + seed, screen_y + (seed * 2) % TILE_SIZE, 11)
+                canvas.pset(screen_x + seed, screen_y + (seed * 2) % TILE_SIZE, 11)
                 
         elif tile == TILE_PATH:
             # 道路
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
             seed = (tile_x + tile_y) % 5
-            pyxel.pset(screen_x + 3 + seed, screen_y + 5, 6)
+            canvas.pset(screen_x + 3 + seed, screen_y + 5, 6)
             
         elif tile == TILE_TREE:
             # 树底座
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             
         elif tile == TILE_FENCE:
             # 围栏
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 3)
             for i in range(4):
                 fx = screen_x + 2 + i * 4
-                pyxel.rect(fx, screen_y + 4, 2, 12, 7)
-            pyxel.rect(screen_x, screen_y + 6, TILE_SIZE, 2, 7)
-            pyxel.rect(screen_x, screen_y + 12, TILE_SIZE, 2, 7)
+                canvas.rect(fx, screen_y + 4, 2, 12, 7)
+            canvas.rect(screen_x, screen_y + 6, TILE_SIZE, 2, 7)
+            canvas.rect(screen_x, screen_y + 12, TILE_SIZE, 2, 7)
             for i in range(4):
                 fx = screen_x + 2 + i * 4
-                pyxel.tri(fx, screen_y + 4, fx + 2, screen_y + 4, fx + 1, screen_y + 2, 7)
+                canvas.tri(fx, screen_y + 4, fx + 2, screen_y + 4, fx + 1, screen_y + 2, 7)
                 
         elif tile == TILE_GATE_PILLAR:
             # 校门柱子
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
             for i in range(4):
                 y_pos = screen_y + i * 4
-                pyxel.line(screen_x, y_pos, screen_x + TILE_SIZE, y_pos, 4)
-            pyxel.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 4)
+                canvas.line(screen_x, y_pos, screen_x + TILE_SIZE, y_pos, 4)
+            canvas.line(screen_x + 8, screen_y, screen_x + 8, screen_y + TILE_SIZE, 4)
             
         elif tile == TILE_GATE_TOP:
             # 校门顶部
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
-            pyxel.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 4)
-            pyxel.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 4)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 2)
+            canvas.line(screen_x, screen_y + 4, screen_x + TILE_SIZE, screen_y + 4, 4)
+            canvas.line(screen_x, screen_y + 10, screen_x + TILE_SIZE, screen_y + 10, 4)
             
         elif tile == TILE_GATE_PASS:
             # 校门通道
-            pyxel.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
-            pyxel.pset(screen_x + 4, screen_y + 8, 6)
+            canvas.rect(screen_x, screen_y, TILE_SIZE, TILE_SIZE, 15)
+            canvas.pset(screen_x + 4, screen_y + 8, 6)
             
     def _draw_grass_animation(self, camera_x, camera_y):
         """绘制动态草叶"""
         wind_speed = 0.015
         sway_amount = 1.2
-        wind = math.sin(self.time * wind_speed)
+        wind = self.clock.wave(wind_speed)
+        # 同一相位桶的草叶共用一个摆动偏移
+        sway_offsets = self.clock.phase_offsets(wind_speed * 1.5, 100, 0.1, sway_amount * wind)
         
-        for px, py, phase in self.grass_blades:
-            screen_x = px - camera_x
-            screen_y = py - camera_y
-            
-            if 0 <= screen_x < WINDOW_WIDTH and 0 <= screen_y < WINDOW_HEIGHT:
-                sway = math.sin(self.time * (wind_speed * 1.5) + phase) * sway_amount * wind
-                pyxel.line(
-                    int(screen_x), int(screen_y + 3),
-                    int(screen_x + sway), int(screen_y),
-                    11
-                )
+        blades = self.grass_blades
+        xs, ys, phases = blades.xs, blades.ys, blades.params
+        for start, end in blades.visible_ranges(camera_x, camera_y):
+            for i in range(start, end):
+                screen_x = xs[i] - camera_x
+                screen_y = ys[i] - camera_y
+                
+                if 0 <= screen_x < WINDOW_WIDTH and 0 <= screen_y < WINDOW_HEIGHT:
+                    sway = sway_offsets[phases[i]]
+                    pyxel.line(
+                        int(screen_x), int(screen_y + 3),
+                        int(screen_x + sway), int(screen_y),
+                        11
+                    )
+    
+    def _draw_trees(self, camera_x, camera_y):
+        """绘制摄像机范围内的树木"""
+        trees = self.trees
+        # 树冠会越出所在瓦片，向左上多查询两格
+        for start, end in trees.visible_ranges(camera_x, camera_y, pad_before=2):
+            for i in range(start, end):
+                screen_x = trees.xs[i] - camera_x
+                screen_y = trees.ys[i] - camera_y
+                if -TILE_SIZE < screen_x < WINDOW_WIDTH and -TILE_SIZE * 2 < screen_y < WINDOW_HEIGHT:
+                    self._draw_tree(screen_x, screen_y, trees.params[i])
     
     def _draw_tree(self, screen_x, screen_y, seed):
         """绘制树木"""
@@ -214,7 +271,7 @@ class WestCampusRenderer:
             pyxel.line(right_pillar_x, py, right_pillar_x + 20, py, 4)
         
         # 灯光
-        light_phase = (self.time // 20) % 3
+        light_phase = self.clock.step(20, 3)
         if light_phase != 2:
             pyxel.circ(screen_left + 2, screen_top - 20, 4, 10)
             pyxel.pset(screen_left + 2, screen_top - 20, 7)
@@ -240,22 +297,5 @@ class WestCampusRenderer:
             draw_text(int(sign_x - hw // 2), int(sign_y + 24), hint, 6)
     
     def is_collision(self, x, y, width, height):
-        """检查碰撞"""
-        corners = [
-            (x, y),
-            (x + width - 1, y),
-            (x, y + height - 1),
-            (x + width - 1, y + height - 1)
-        ]
-        
-        for cx, cy in corners:
-            tile_x = int(cx // TILE_SIZE)
-            tile_y = int(cy // TILE_SIZE)
-            
-            if tile_x < 0 or tile_x >= WEST_MAP_WIDTH or tile_y < 0 or tile_y >= WEST_MAP_HEIGHT:
-                return True
-                
-            if WEST_COLLISION_MAP[tile_y][tile_x] == 1:
-                return True
-                
-        return False
+        """检查碰撞（查询碰撞网格服务中本地图的网格）"""
+        return get_collision_service().get_grid('west').is_blocked(x, y, width, height)
@@ -7,6 +7,7 @@
 import pyxel
 from config import WINDOW_WIDTH, WINDOW_HEIGHT
 from src.systems.input_handler import InputHandler
+from src.entities.player import Player
 from src.utils.font_manager import draw_text, text_width
 
 
@@ -27,11 +28,6 @@ class CharacterCreationScene:
         # 选项配置
         self.gender_options = ['男', '女']
         self.skin_options = ['黄', '白', '黑']
-        self.skin_colors = {
-            '黄': 15,   # 浅黄肤色
-            '白': 7,    # 白色
-            '黑': 4     # 棕色（显示为"黑"但用棕色）
-        }
         self.skin_color_names = {
             '黄': 'yellow',
             '白': 'white', 
@@ -58,6 +54,9 @@ class CharacterCreationScene:
         self.preview_direction = 'down'
         self.direction_timer = 0
         
+        # 预览用的玩家（只用来绘制，不参与游戏逻辑）
+        self.preview_player = Player()
+        
     def on_enter(self):
         """进入场景"""
         pass
@@ -251,182 +250,13 @@ class CharacterCreationScene:
         draw_text(hint_x, WINDOW_HEIGHT - 20, hint, 13)
         
     def _draw_character_preview(self, x, y, scale=2):
-        """绘制角色预览（带缩放）"""
-        # 获取肤色
+        """绘制角色预览（放大显示，与游戏内共用精灵图集中的同一份精灵）"""
         skin_name = self.skin_options[self.skin_index]
-        skin_color = self.skin_colors[skin_name]
-        
-        # 性别决定衣服颜色和发型
-        is_male = self.gender_index == 0
-        cloth_color = 12 if is_male else 14  # 男蓝色，女粉色
-        
-        # 行走动画的身体弹跳
-        bounce = 0
-        if self.anim_frame in [1, 3]:
-            bounce = -scale
-            
-        draw_y = y + bounce
-        
-        # 根据方向绘制
-        if self.preview_direction == 'down':
-            self._draw_preview_down(x, draw_y, scale, skin_color, cloth_color, is_male)
-        elif self.preview_direction == 'up':
-            self._draw_preview_up(x, draw_y, scale, skin_color, cloth_color, is_male)
-        elif self.preview_direction == 'left':
-            self._draw_preview_left(x, draw_y, scale, skin_color, cloth_color, is_male)
-        else:
-            self._draw_preview_right(x, draw_y, scale, skin_color, cloth_color, is_male)
-            
-    def _draw_preview_down(self, x, y, s, skin, cloth, is_male):
-        """绘制正面预览"""
-        frame = self.anim_frame
-        
-        # 头发
-        hair_color = 0 if is_male else 4  # 男黑发，女棕发
-        pyxel.rect(x + 3*s, y, 6*s, 3*s, hair_color)
-        if not is_male:  # 女性长发
-            pyxel.rect(x + 2*s, y + 2*s, 2*s, 4*s, hair_color)
-            pyxel.rect(x + 8*s, y + 2*s, 2*s, 4*s, hair_color)
-        
-        # 头部
-        pyxel.rect(x + 3*s, y + 2*s, 6*s, 5*s, skin)
-        # 眼睛
-        pyxel.rect(x + 4*s, y + 4*s, s, s, 0)
-        pyxel.rect(x + 7*s, y + 4*s, s, s, 0)
-        
-        # 身体
-        pyxel.rect(x + 2*s, y + 7*s, 8*s, 6*s, cloth)
-        
-        # 手臂
-        if frame in [0, 2]:
-            pyxel.rect(x + s, y + 7*s, 2*s, 4*s, skin)
-            pyxel.rect(x + 9*s, y + 7*s, 2*s, 4*s, skin)
-        elif frame == 1:
-            pyxel.rect(x + s, y + 8*s, 2*s, 3*s, skin)
-            pyxel.rect(x + 9*s, y + 6*s, 2*s, 3*s, skin)
-        else:
-            pyxel.rect(x + s, y + 6*s, 2*s, 3*s, skin)
-            pyxel.rect(x + 9*s, y + 8*s, 2*s, 3*s, skin)
-        
-        # 腿
-        leg_color = 1
-        if frame == 0:
-            pyxel.rect(x + 3*s, y + 13*s, 3*s, 3*s, leg_color)
-            pyxel.rect(x + 6*s, y + 13*s, 3*s, 2*s, leg_color)
-        elif frame == 1:
-            pyxel.rect(x + 4*s, y + 13*s, 4*s, 3*s, leg_color)
-        elif frame == 2:
-            pyxel.rect(x + 3*s, y + 13*s, 3*s, 2*s, leg_color)
-            pyxel.rect(x + 6*s, y + 13*s, 3*s, 3*s, leg_color)
-        else:
-            pyxel.rect(x + 4*s, y + 13*s, 4*s, 3*s, leg_color)
-            
-    def _draw_preview_up(self, x, y, s, skin, cloth, is_male):
-        """绘制背面预览"""
-        frame = self.anim_frame
-        hair_color = 0 if is_male else 4
-        
-        # 头发（背面更多）
-        pyxel.rect(x + 3*s, y, 6*s, 5*s, hair_color)
-        if not is_male:
-            pyxel.rect(x + 2*s, y + 2*s, 2*s, 6*s, hair_color)
-            pyxel.rect(x + 8*s, y + 2*s, 2*s, 6*s, hair_color)
-        
-        # 身体
-        pyxel.rect(x + 2*s, y + 7*s, 8*s, 6*s, cloth)
-        
-        # 手臂
-        if frame in [0, 2]:
-            pyxel.rect(x + s, y + 7*s, 2*s, 4*s, skin)
-            pyxel.rect(x + 9*s, y + 7*s, 2*s, 4*s, skin)
-        elif frame == 1:
-            pyxel.rect(x + s, y + 6*s, 2*s, 3*s, skin)
-            pyxel.rect(x + 9*s, y + 8*s, 2*s, 3*s, skin)
-        else:
-            pyxel.rect(x + s, y + 8*s, 2*s, 3*s, skin)
-            pyxel.rect(x + 9*s, y + 6*s, 2*s, 3*s, skin)
-        
-        # 腿
-        leg_color = 1
-        if frame == 0:
-            pyxel.rect(x + 3*s, y + 13*s, 3*s, 2*s, leg_color)
-            pyxel.rect(x + 6*s, y + 13*s, 3*s, 3*s, leg_color)
-        elif frame == 1:
-            pyxel.rect(x + 4*s, y + 13*s, 4*s, 3*s, leg_color)
-        elif frame == 2:
-            pyxel.rect(x + 3*s, y + 13*s, 3*s, 3*s, leg_color)
-            pyxel.rect(x + 6*s, y + 13*s, 3*s, 2*s, leg_color)
-        else:
-            pyxel.rect(x + 4*s, y + 13*s, 4*s, 3*s, leg_color)
-            
-    def _draw_preview_left(self, x, y, s, skin, cloth, is_male):
-        """绘制左侧预览"""
-        frame = self.anim_frame
-        hair_color = 0 if is_male else 4
-        
-        # 头发
-        pyxel.rect(x + 4*s, y, 5*s, 3*s, hair_color)
-        if not is_male:
-            pyxel.rect(x + 6*s, y + 2*s, 3*s, 5*s, hair_color)
-        
-        # 头部
-        pyxel.rect(x + 3*s, y + 2*s, 5*s, 5*s, skin)
-        # 眼睛
-        pyxel.rect(x + 4*s, y + 4*s, s, s, 0)
-        
-        # 身体
-        pyxel.rect(x + 3*s, y + 7*s, 6*s, 6*s, cloth)
-        
-        # 手臂
-        if frame in [0, 2]:
-            pyxel.rect(x + 2*s, y + 7*s, 2*s, 4*s, skin)
-        elif frame == 1:
-            pyxel.rect(x + s, y + 8*s, 2*s, 4*s, skin)
-        else:
-            pyxel.rect(x + 3*s, y + 6*s, 2*s, 4*s, skin)
-        
-        # 腿
-        leg_color = 1
-        if frame in [0, 2]:
-            pyxel.line(x + 4*s, y + 13*s, x + 3*s, y + 15*s, leg_color)
-            pyxel.line(x + 5*s, y + 13*s, x + 4*s, y + 15*s, leg_color)
-            pyxel.line(x + 6*s, y + 13*s, x + 8*s, y + 15*s, leg_color)
-            pyxel.line(x + 7*s, y + 13*s, x + 9*s, y + 15*s, leg_color)
-        else:
-            pyxel.rect(x + 4*s, y + 13*s, 4*s, 3*s, leg_color)
-            
-    def _draw_preview_right(self, x, y, s, skin, cloth, is_male):
-        """绘制右侧预览"""
-        frame = self.anim_frame
-        hair_color = 0 if is_male else 4
-        
-        # 头发
-        pyxel.rect(x + 3*s, y, 5*s, 3*s, hair_color)
-        if not is_male:
-            pyxel.rect(x + 3*s, y + 2*s, 3*s, 5*s, hair_color)
-        
-        # 头部
-        pyxel.rect(x + 4*s, y + 2*s, 5*s, 5*s, skin)
-        # 眼睛
-        pyxel.rect(x + 7*s, y + 4*s, s, s, 0)
-        
-        # 身体
-        pyxel.rect(x + 3*s, y + 7*s, 6*s, 6*s, cloth)
-        
-        # 手臂
-        if frame in [0, 2]:
-            pyxel.rect(x + 8*s, y + 7*s, 2*s, 4*s, skin)
-        elif frame == 1:
-            pyxel.rect(x + 7*s, y + 6*s, 2*s, 4*s, skin)
-        else:
-            pyxel.rect(x + 9*s, y + 8*s, 2*s, 4*s, skin)
-        
-        # 腿
-        leg_color = 1
-        if frame in [0, 2]:
-            pyxel.line(x + 5*s, y + 13*s, x + 3*s, y + 15*s, leg_color)
-            pyxel.line(x + 6*s, y + 13*s, x + 4*s, y + 15*s, leg_color)
-            pyxel.line(x + 7*s, y + 13*s, x + 9*s, y + 15*s, leg_color)
-            pyxel.line(x + 8*s, y + 13*s, x + 10*s, y + 15*s, leg_color)
-        else:
-            pyxel.rect(x + 5*s, y + 13*s, 4*s, 3*s, leg_color)
+        gender = 'male' if self.gender_index == 0 else 'female'
+        
+        player = self.preview_player
+        player.set_appearance(gender, self.skin_color_names[skin_name])
+        player.direction = self.preview_direction
+        player.frame = self.anim_frame
+        player.is_moving = True
+        player.draw_at(x, y, scale)
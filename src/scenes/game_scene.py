@@ -12,19 +12,32 @@ from src.entities.player import Player
 from src.entities.npc import NPCManager
 from src.entities.football import Football
 from src.entities.goal import Goal
+from src.entities.koi_pond import KoiPond
 from src.map.campus_renderer import CampusRenderer
 from src.map.tunnel_renderer import TunnelRenderer
 from src.map.library_renderer import LibraryRenderer
+from src.map.camera import Camera
+from src.map.interior_cache import InteriorCache
+from src.map.region_map import RegionMap, RegionTracker
 from src.map.campus_map import (MAP_TILES_WIDTH, MAP_TILES_HEIGHT, NPC_DATA, CAT_DATA,
-    CAMPUS_MAP, TILE_DOME, TILE_DOME_ARCH, TILE_LIBRARY, TILE_LIBRARY_WINDOW,
-    TILE_CANTEEN, TILE_ADMIN, TILE_HALL, TILE_GYM, TILE_JAPAN, TILE_MAIN, TILE_WATER,
+    CAMPUS_MAP, BUILDING_REGION_NAMES, CAMPUS_DEFAULT_REGION,
     TUNNEL_WIDTH, TUNNEL_HEIGHT, WEST_MAP_WIDTH, WEST_MAP_HEIGHT,
     LIBRARY_WIDTH, LIBRARY_HEIGHT, LIBRARY_NPC_DATA, LIBRARY_BOOKSHELF_CONTENT,
-    TILE_LIB_BOOKSHELF, TILE_LIB_CHAIR)
+    TILE_LIB_BOOKSHELF, TILE_LIB_CHAIR, SKATEBOARD_TILE_X, SKATEBOARD_TILE_Y,
+    TRIGGER_ZONE_DATA, POND_CENTER_X, POND_CENTER_Y, POND_RADIUS_X, POND_RADIUS_Y)
 from src.systems.ai_dialogue import AIDialogueSystem
+from src.systems.collision import get_collision_service, sweep_aabb, bounds_checker
+from src.systems.spatial_hash import SpatialHash
+from src.systems.trigger_system import TriggerSystem
+from src.systems.pathfinding import get_pathfinding_service
+from src.systems.particles import ParticleEmitter, get_particle_system
 from src.systems.input_handler import InputHandler
 from src.ui.game_menu import GameMenu
+from src.ui.debug_overlay import DebugOverlay
 from src.utils.font_manager import draw_text, text_width
+from src.utils.animation_clock import get_clock, fast_sin, fast_cos
+from src.utils.image_bank_allocator import get_image_allocator
+from src.utils.entity_store import ColumnStore, memory_report
 
 
 # 地图类型常量
@@ -40,6 +53,38 @@ FIELD_MIN_X = 7 * TILE_SIZE + 4   # 左边界+一点内边距
 FIELD_MIN_Y = 22 * TILE_SIZE + 4  # 上边界+一点内边距
 FIELD_MAX_X = 23 * TILE_SIZE - 4  # 右边界-一点内边距
 FIELD_MAX_Y = 26 * TILE_SIZE - 4  # 下边界-一点内边距
+FIELD_TILE_RECT = (7, 22, 16, 4)  # 操场草坪的瓦片矩形（NPC 寻路的常用目的地）
+
+# 可收集花朵的尺寸（像素）
+FLOWER_SIZE = 8
+
+# 花朵种类表（花朵列存储中的 kind 是这里的下标）：(名称, 描述, 花瓣颜色, 花蕊颜色)
+FLOWER_RED = 0
+FLOWER_YELLOW = 1
+FLOWER_TYPES = [
+    ("红花", "红颜色的花。", 8, 10),   # 红花瓣，黄色花蕊
+    ("黄花", "黄颜色的花。", 10, 9),   # 黄花瓣，橙色花蕊
+]
+
+# 锦鲤游动的椭圆范围（比池塘椭圆小一圈，留边距）
+KOI_SWIM_RADIUS_X = POND_RADIUS_X - TILE_SIZE // 2
+KOI_SWIM_RADIUS_Y = POND_RADIUS_Y - TILE_SIZE // 2
+# 锦鲤数量和颜色（红锦鲤、白锦鲤、橙锦鲤按这个顺序循环）
+KOI_COUNT = 24
+KOI_COLORS = [8, 7, 8, 9, 7, 8]
+
+# 天气粒子数量（密度为 1 时）
+WEATHER_PARTICLE_COUNT = 100
+
+# 进球时喷出的彩带粒子数
+GOAL_CONFETTI_COUNT = 48
+
+# 踢球检测的查询半径：NPC 中心到球心小于（半个身位 + 球半径 + 2）才会踢到，
+# NPC 包围盒一定落在球心周围这个范围内
+KICK_QUERY_RADIUS = 32
+
+# HUD 区域名称的滞后帧数（在建筑边界来回走动时不闪烁）
+REGION_HYSTERESIS_FRAMES = 12
 
 
 class GameScene:
@@ -51,6 +96,8 @@ class GameScene:
         
         # 当前地图
         self.current_map = MAP_EAST_CAMPUS
+        # 模拟帧数（菜单、对话暂停时不增加）
+        self.sim_frame = 0
         
         # 创建各地图渲染器
         self.campus = CampusRenderer()           # 东校区
@@ -60,21 +107,39 @@ class GameScene:
         # 获取角色创建数据
         player_data = getattr(scene_manager, 'player_data', None)
         
+        # 碰撞网格服务（检测函数在切换地图时按地图绑定一次）
+        self.collision = get_collision_service()
+        
         # 创建玩家，传入碰撞检测函数和角色数据
-        self.player = Player(collision_checker=self._get_collision_checker(), player_data=player_data)
+        self.player = Player(collision_checker=self.collision.checker(self.current_map),
+                             player_data=player_data)
+        
+        # 东校区动态实体的空间哈希（NPC、足球、花朵）
+        self.entity_hash = SpatialHash()
         
         # 创建NPC管理器
-        self.npc_manager = NPCManager()
+        self.npc_manager = NPCManager(self.entity_hash)
         self.npc_manager.load_npcs(NPC_DATA, CAT_DATA)
         
-        # 为所有NPC设置碰撞检测器
+        # 寻路服务：操场和每个NPC的原位预先算好流场
+        self.pathfinding = get_pathfinding_service()
+        east_paths = self.pathfinding.get_pathfinder(MAP_EAST_CAMPUS)
+        east_paths.add_destination('football_field', FIELD_TILE_RECT)
+        
+        # 为所有NPC设置碰撞检测器和寻路器（东校区NPC只在东校区活动）
         for npc in self.npc_manager.npcs:
-            npc.collision_checker = self._get_collision_checker()
+            npc.collision_checker = self.collision.checker(MAP_EAST_CAMPUS)
+            npc.set_pathfinder(east_paths)
+        east_paths.warm()
         
-        # 相机位置
+        # 相机（整数对齐视口 + 持久化世界图层）
+        self.camera = Camera(*self._get_map_pixel_size())
         self.camera_x = 0
         self.camera_y = 0
         
+        # 室内画面缓存（图书馆/清真寺，借用世界图层的图像库，离开室内时释放）
+        self.interior_cache = InteriorCache()
+        
         # 对话状态
         self.show_interaction_hint = False
         self.nearby_npc = None
@@ -91,6 +156,7 @@ class GameScene:
             field_center_x, field_center_y,
             (FIELD_MIN_X, FIELD_MIN_Y, FIELD_MAX_X, FIELD_MAX_Y)
         )
+        self._register_football()
         
         # 创建两个球门（左右两边）
         # 左球门紧贴操场左边缘（球门开口朝右，球门背面在场外）
@@ -108,6 +174,17 @@ class GameScene:
         # 添加一些初始物品（示例）
         self.game_menu.add_item("学生证", "北外学生证明")
         
+        # 调试浮层（F3）
+        self.debug_overlay = DebugOverlay()
+        self.debug_overlay.add_provider("camera", self._get_camera_debug_lines)
+        self.debug_overlay.add_provider("image banks", get_image_allocator().get_debug_lines)
+        self.debug_overlay.add_provider("spatial hash", self.entity_hash.get_debug_lines)
+        self.debug_overlay.add_provider("pathfinding", east_paths.get_debug_lines)
+        self.debug_overlay.add_provider("npc lod", self.npc_manager.get_debug_lines)
+        self.debug_overlay.add_provider("llm", self.ai_dialogue.llm.get_debug_lines)
+        self.debug_overlay.add_provider("dialogue cache", self.ai_dialogue.llm.cache.get_debug_lines)
+        self.debug_overlay.add_provider("prompt", self.ai_dialogue.prompt_builder.get_debug_lines)
+        
         # 清真寺室内状态
         self.in_mosque = False
         self.mosque_player_x = 0
@@ -115,49 +192,16 @@ class GameScene:
         # 保存室外玩家位置（用于返回时）
         self.outdoor_player_x = 0
         self.outdoor_player_y = 0
-        # 清真寺入口冷却（防止退出后立刻重新进入）
-        self.mosque_entrance_cooldown = 0
-        
-        # 清真寺入口位置（拱门区域）- 新位置：第4行，列11-13
-        self.mosque_entrance = {
-            'min_x': 11 * TILE_SIZE,
-            'max_x': 14 * TILE_SIZE,
-            'y': 5 * TILE_SIZE  # 拱门下方（第4行拱门，检测第5行）
-        }
+        # 清真寺室内边界（留出墙壁空间，玩家左上角的活动范围）
+        self.mosque_bounds = {'min_x': 40, 'max_x': 216, 'min_y': 40, 'max_y': 210}
+        bounds = self.mosque_bounds
+        self.mosque_bounds_checker = bounds_checker(
+            bounds['min_x'], bounds['min_y'],
+            bounds['max_x'] + self.player.width, bounds['max_y'] + self.player.height)
         
-        # 地图切换入口位置
-        # 东校区校门（进入地下通道）- 在地图底部边界（第39行之后）
-        self.east_gate_entrance = {
-            'min_x': 13 * TILE_SIZE,
-            'max_x': 19 * TILE_SIZE,
-            'y': 39 * TILE_SIZE  # 地图底部边界
-        }
-        # 地下通道入口（返回东校区）
-        self.tunnel_entry_to_east = {
-            'min_x': 7 * TILE_SIZE,
-            'max_x': 13 * TILE_SIZE,
-            'y': 0  # 顶部
-        }
-        # 地下通道底部施工牌子
-        self.construction_sign = {
-            'min_x': 7 * TILE_SIZE,
-            'max_x': 13 * TILE_SIZE,
-            'y': 27 * TILE_SIZE,  # 底部牌子位置
-            'text': '未完待续，正在建设中'
-        }
-        # 图书馆入口位置（图书馆门：列14，行11）
-        self.library_entrance = {
-            'x': 14 * TILE_SIZE,
-            'y': 12 * TILE_SIZE  # 门下方（行11的门，检测行12）
-        }
-        # 图书馆出口（内部）
-        self.library_exit = {
-            'x': 7 * TILE_SIZE,
-            'y': 11 * TILE_SIZE  # 底部门
-        }
         # 图书馆相关状态
-        self.library_entrance_cooldown = 0
         self.outdoor_pos_before_library = {'x': 0, 'y': 0}  # 进入图书馆前的位置
+        self.nearby_bookshelf = None  # 玩家所在书架阅读区域对应的书架坐标
         
         # 图书馆内交互状态
         self.library_interaction = {
@@ -171,20 +215,39 @@ class GameScene:
         # 图书馆NPC管理
         self.library_npc_manager = None  # 延迟初始化
         
-        # 地图切换冷却
-        self.map_switch_cooldown = 120  # 启动时2秒冷却，防止误触发
-        
         # 施工牌子提示
         self.show_sign_hint = False
         self.sign_message = ""
         
-        # 可收集的花朵（红花和黄花）
+        # 触发区域（入口、出口、施工牌子、书架、滑板），区域数据见 TRIGGER_ZONE_DATA
+        self.triggers = TriggerSystem()
+        self.triggers.load(TRIGGER_ZONE_DATA)
+        self.triggers.on('enter_mosque', self._on_enter_mosque)
+        self.triggers.on('enter_library', self._on_enter_library)
+        self.triggers.on('enter_tunnel', lambda zone: self._switch_to_map(MAP_TUNNEL, 'from_east'))
+        self.triggers.on('return_to_east', lambda zone: self._switch_to_map(MAP_EAST_CAMPUS, 'from_tunnel'))
+        self.triggers.on('leave_library', lambda zone: self._switch_to_map(MAP_EAST_CAMPUS, 'from_library'))
+        self.triggers.on('collect_skateboard', self._on_collect_skateboard)
+        self.triggers.on('show_sign', self._on_show_sign)
+        self.triggers.on('hide_sign', self._on_hide_sign)
+        self.triggers.on('read_sign', self._on_read_sign)
+        self.triggers.on('near_bookshelf', self._on_near_bookshelf)
+        self.triggers.on('leave_bookshelf', self._on_leave_bookshelf)
+        self.triggers.on('read_bookshelf', self._on_read_bookshelf)
+        self.triggers.suspend(120)  # 启动时2秒冷却，防止误触发
+        self.debug_overlay.add_provider("triggers", self.triggers.get_debug_lines)
+        
+        # 可收集的花朵（红花和黄花），未收集的登记到空间哈希
+        # 花朵按列存放，空间哈希里登记的是花朵下标
         self.flowers = self._generate_flowers()
+        for i in range(len(self.flowers)):
+            self.entity_hash.insert(('flower', i), i, self.flowers.x[i], self.flowers.y[i],
+                                    FLOWER_SIZE, FLOWER_SIZE, kind='flower')
         
-        # 滑板道具（操场旁边）
+        # 滑板道具（操场旁边，拾取由触发区域处理）
         self.skateboard = {
-            'x': 24 * TILE_SIZE + 4,  # 操场右侧草地
-            'y': 20 * TILE_SIZE + 4,
+            'x': SKATEBOARD_TILE_X * TILE_SIZE + 4,  # 操场右侧草地
+            'y': SKATEBOARD_TILE_Y * TILE_SIZE + 4,
             'collected': False
         }
         
@@ -192,97 +255,76 @@ class GameScene:
         self.collect_message = ""
         self.collect_message_timer = 0
         
-        # 锦鲤系统（小碧池）
-        self.koi_fish = self._init_koi_fish()
+        # 锦鲤系统（小碧池），鱼群整池一起模拟，绘制时按池塘包围盒整体裁剪
+        self.koi_pond = KoiPond(POND_CENTER_X, POND_CENTER_Y, KOI_SWIM_RADIUS_X, KOI_SWIM_RADIUS_Y,
+                                [KOI_COLORS[i % len(KOI_COLORS)] for i in range(KOI_COUNT)])
+        self.debug_overlay.add_provider("koi", self.koi_pond.get_debug_lines)
         
         # 天气系统
         self.weather_types = ['sunny', 'rain', 'snow']
         self.current_weather = 'sunny'
         self.weather_timer = 0
         self.weather_duration = 60 * 30  # 每种天气持续30秒（60帧/秒）
-        self.weather_particles = []  # 天气粒子（雨滴/雪花）
         self.weather_mode = 0  # 0=随机, 1=晴天, 2=下雨, 3=下雪
-        self._init_weather_particles()
         
-        # 设置菜单的天气回调
+        # 粒子效果：天气（屏幕坐标，落出屏幕底部后回到顶部）和进球彩带
+        self.particles = get_particle_system()
+        weather_bounds = (0, -WINDOW_HEIGHT, WINDOW_WIDTH, WINDOW_HEIGHT * 2)
+        weather_area = (0, -20, WINDOW_WIDTH, 20)
+        self.weather_emitters = {
+            # 雨滴快速下落，略微倾斜
+            'rain': self.particles.add(ParticleEmitter(
+                'rain', WEATHER_PARTICLE_COUNT, 'streak', (12,), ((1, 1), (6, 15)),
+                rate=None, area=weather_area, prefill_area=weather_bounds,
+                bounds=weather_bounds, wrap_x=True, screen_space=True)),
+            # 雪花缓慢飘落，左右飘动
+            'snow': self.particles.add(ParticleEmitter(
+                'snow', WEATHER_PARTICLE_COUNT, 'flake', (7,), ((0, 0), (1, 2.5)),
+                rate=None, sway=1, size=(1, 3), area=weather_area, prefill_area=weather_bounds,
+                bounds=weather_bounds, wrap_x=True, screen_space=True)),
+        }
+        self.goal_confetti = self.particles.add(ParticleEmitter(
+            'goal_confetti', GOAL_CONFETTI_COUNT * 2, 'confetti', (7, 8, 9, 10, 11, 12, 14),
+            ((-1.8, 1.8), (-3.2, -1.0)), lifetime=(40, 70), gravity=0.12, size=(1, 2)))
+        self.debug_overlay.add_provider("particles", self.particles.get_debug_lines)
+        
+        # 设置菜单的天气和粒子密度回调
         self.game_menu.weather_callback = self._on_weather_setting_changed
-    
-    def _get_collision_checker(self):
-        """获取当前地图的碰撞检测函数"""
-        def checker(x, y, width, height):
-            if self.current_map == MAP_EAST_CAMPUS:
-                return self.campus.is_collision(x, y, width, height)
-            elif self.current_map == MAP_TUNNEL:
-                return self.tunnel.is_collision(x, y, width, height)
-            elif self.current_map == MAP_LIBRARY:
-                return self.library.is_collision(x, y, width, height)
-            return False
-        return checker
+        self.game_menu.particle_callback = self._on_particle_setting_changed
+        
+        # 区域表（东校区每个瓦片附近的建筑，加载时算好）和当前区域跟踪
+        # 其他系统可以用 self.region_tracker.subscribe(callback) 订阅区域变化
+        self.campus_regions = RegionMap(CAMPUS_MAP, MAP_TILES_WIDTH, MAP_TILES_HEIGHT,
+                                        BUILDING_REGION_NAMES, CAMPUS_DEFAULT_REGION)
+        self.region_tracker = RegionTracker(REGION_HYSTERESIS_FRAMES)
+        self._region_scope = None  # (地图, 是否在清真寺内)，变化时区域立刻生效
+        self._update_region()
+        self.debug_overlay.add_provider("region", self.region_tracker.get_debug_lines)
+        self.debug_overlay.add_provider("memory", self.get_memory_report)
     
     def _init_library_npcs(self):
         """初始化图书馆内的NPC"""
         if self.library_npc_manager is None:
             self.library_npc_manager = NPCManager()
             self.library_npc_manager.load_npcs(LIBRARY_NPC_DATA, [])
-            # 设置碰撞检测
+            # 设置碰撞检测和寻路
+            library_paths = self.pathfinding.get_pathfinder(MAP_LIBRARY)
             for npc in self.library_npc_manager.npcs:
-                npc.collision_checker = self._get_collision_checker()
-        
-    def _init_weather_particles(self):
-        """初始化天气粒子"""
-        self.weather_particles = []
-        for _ in range(100):
-            self.weather_particles.append({
-                'x': random.randint(0, WINDOW_WIDTH),
-                'y': random.randint(-WINDOW_HEIGHT, WINDOW_HEIGHT),
-                'speed': random.uniform(2, 5),
-                'size': random.randint(1, 3)
-            })
+                npc.collision_checker = self.collision.checker(MAP_LIBRARY)
+                npc.set_pathfinder(library_paths)
+        
+    def _register_football(self):
+        """把足球登记到空间哈希"""
+        ball = self.football
+        self.entity_hash.insert(ball, ball, ball.x - ball.radius, ball.y - ball.radius,
+                                ball.radius * 2, ball.radius * 2, kind='football')
     
-    def _init_koi_fish(self):
-        """初始化池塘中的锦鲤"""
-        import math
-        koi_fish = []
-        # 椭圆形池塘参数（与渲染器保持一致）
-        pond_center_x = 27.5 * TILE_SIZE  # 池塘中心x
-        pond_center_y = 10.5 * TILE_SIZE  # 池塘中心y
-        pond_radius_x = 3.0 * TILE_SIZE   # 水平半径（留边距）
-        pond_radius_y = 1.5 * TILE_SIZE   # 垂直半径（留边距）
-        
-        # 创建5条锦鲤
-        fish_configs = [
-            {'color': 8, 'name': '红锦鲤'},   # 红色
-            {'color': 8, 'name': '红锦鲤'},   # 红色
-            {'color': 7, 'name': '白锦鲤'},   # 白色
-            {'color': 7, 'name': '白锦鲤'},   # 白色
-            {'color': 8, 'name': '红锦鲤'},   # 红色
-        ]
+    def _sync_football(self):
+        """足球移动后同步空间哈希"""
+        ball = self.football
+        self.entity_hash.move(ball, ball.x - ball.radius, ball.y - ball.radius,
+                              ball.radius * 2, ball.radius * 2)
         
-        for i, config in enumerate(fish_configs):
-            # 在椭圆内随机生成位置
-            angle = random.uniform(0, 2 * math.pi)
-            r = random.uniform(0.3, 0.8)  # 距离中心的比例
-            x = pond_center_x + math.cos(angle) * pond_radius_x * r
-            y = pond_center_y + math.sin(angle) * pond_radius_y * r
-            
-            koi_fish.append({
-                'x': x,
-                'y': y,
-                'color': config['color'],
-                'name': config['name'],
-                'direction': random.uniform(0, 2 * math.pi),
-                'speed': random.uniform(0.3, 0.5),
-                'turn_timer': random.randint(30, 90),
-                'tail_phase': random.uniform(0, 6.28),
-                # 椭圆参数
-                'pond_center_x': pond_center_x,
-                'pond_center_y': pond_center_y,
-                'pond_radius_x': pond_radius_x,
-                'pond_radius_y': pond_radius_y
-            })
-        
-        return koi_fish
-    
     def _on_weather_setting_changed(self, mode_index):
         """天气设置改变时的回调"""
         self.weather_mode = mode_index
@@ -294,11 +336,16 @@ class GameScene:
             self.current_weather = 'rain'
         elif mode_index == 3:  # 下雪
             self.current_weather = 'snow'
-        self._init_weather_particles()
+        for emitter in self.weather_emitters.values():
+            emitter.reset()
+    
+    def _on_particle_setting_changed(self, level_index):
+        """粒子密度设置改变时的回调"""
+        self.particles.set_density(self.particles.DENSITY_LEVELS[level_index][1])
         
     def _generate_flowers(self):
         """在草地上生成红花和黄花（只放在确定的草地位置）"""
-        flowers = []
+        flowers = ColumnStore({'x': 'h', 'y': 'h', 'collected': 'b', 'kind': 'b'})
         # 红花位置（都在草地G=0的位置）
         red_flower_positions = [
             (1, 1), (3, 1), (5, 1),      # 第1行左侧草地
@@ -323,22 +370,10 @@ class GameScene:
         ]
         
         for tx, ty in red_flower_positions:
-            flowers.append({
-                'x': tx * TILE_SIZE + 4,
-                'y': ty * TILE_SIZE + 4,
-                'collected': False,
-                'name': '红花',
-                'type': 'red'
-            })
+            flowers.add(x=tx * TILE_SIZE + 4, y=ty * TILE_SIZE + 4, kind=FLOWER_RED)
         
         for tx, ty in yellow_flower_positions:
-            flowers.append({
-                'x': tx * TILE_SIZE + 4,
-                'y': ty * TILE_SIZE + 4,
-                'collected': False,
-                'name': '黄花',
-                'type': 'yellow'
-            })
+            flowers.add(x=tx * TILE_SIZE + 4, y=ty * TILE_SIZE + 4, kind=FLOWER_YELLOW)
         
         return flowers
         
@@ -351,12 +386,8 @@ class GameScene:
         if player_data:
             # 更新玩家外观
             self.player.name = player_data.get('name', '艾北外')
-            self.player.gender = player_data.get('gender', 'male')
-            self.player.skin_color_name = player_data.get('skin_color', 'yellow')
-            self.player.skin_color = self.player.SKIN_COLORS.get(self.player.skin_color_name, 15)
-            self.player.cloth_color = 12 if self.player.gender == 'male' else 14
-            self.player.hair_color = 0 if self.player.gender == 'male' else 4
-            self.player.is_male = self.player.gender == 'male'
+            self.player.set_appearance(player_data.get('gender', 'male'),
+                                       player_data.get('skin_color', 'yellow'))
             print(f"[游戏] 已加载角色: {self.player.name}, 性别: {self.player.gender}, 肤色: {self.player.skin_color_name}")
             
             # 更新学生证描述，显示玩家姓名
@@ -388,8 +419,13 @@ class GameScene:
         
     def update(self):
         """更新逻辑"""
+        self.debug_overlay.update()
+        self.pathfinding.begin_frame()
+        self._update_region()
+        
         # 如果在清真寺内部
         if self.in_mosque:
+            self._advance_frame()
             self._update_mosque_interior()
             return
             
@@ -449,30 +485,31 @@ class GameScene:
                 self.library_interaction['bookshelf_content'] = None
             return
             
+        self._advance_frame()
+        
         # 更新天气系统
         self._update_weather()
         
         # 更新锦鲤
         self._update_koi_fish()
         
+        # 更新进球彩带
+        self.goal_confetti.update()
+        
         # 更新当前地图渲染器
         if self.current_map == MAP_EAST_CAMPUS:
             self.campus.update(self.current_weather)
         elif self.current_map == MAP_TUNNEL:
             self.tunnel.update(self.current_weather)
-            # 检查是否靠近施工牌子
-            self._check_construction_sign()
         elif self.current_map == MAP_LIBRARY:
             self.library.update()
             # 更新图书馆NPC
             if self.library_npc_manager:
                 self.library_npc_manager.update()
-            # 检查图书馆交互
-            self._check_library_interaction()
         
-        # 更新NPC（只在东校区）
+        # 更新NPC（只在东校区，屏幕外的NPC粗略更新）
         if self.current_map == MAP_EAST_CAMPUS:
-            self.npc_manager.update()
+            self.npc_manager.update(self.camera_x, self.camera_y)
         
         # 更新玩家
         self.player.update()
@@ -480,9 +517,6 @@ class GameScene:
         # 检查花朵收集
         self._check_flower_collection()
         
-        # 检查滑板收集
-        self._check_skateboard_collection()
-        
         # 更新收集提示计时器
         if self.collect_message_timer > 0:
             self.collect_message_timer -= 1
@@ -494,8 +528,12 @@ class GameScene:
                 self.player.width, self.player.height
             )
             
-            # 检查NPC是否踢到足球（NPC踢球时朝向目标球门）
-            for npc in self.npc_manager.npcs:
+            # 检查足球附近的NPC是否踢到足球（NPC踢球时朝向目标球门）
+            ball = self.football
+            for npc in self.npc_manager.get_npcs_near(ball.x - KICK_QUERY_RADIUS,
+                                                      ball.y - KICK_QUERY_RADIUS,
+                                                      KICK_QUERY_RADIUS * 2,
+                                                      KICK_QUERY_RADIUS * 2):
                 # 如果NPC有目标球门，就朝球门踢
                 if hasattr(npc, 'target_goal') and npc.target_goal:
                     goal_x, goal_y = npc.target_goal.get_target_position()
@@ -505,6 +543,7 @@ class GameScene:
             
             # 更新足球
             self.football.update()
+            self._sync_football()
             
             # 更新球门并检测进球
             for goal in self.goals:
@@ -514,6 +553,7 @@ class GameScene:
                     side_name = "左" if goal.side == 'left' else "右"
                     self.goal_message = f"进球！{side_name}侧球门！"
                     self.goal_message_timer = 120  # 显示2秒
+                    self.goal_confetti.emit(GOAL_CONFETTI_COUNT, goal.x, goal.y)
                     print(f"[游戏] 进球！{side_name}侧球门，总计: {goal.score}")
                     # 将球重置到中场
                     field_center_x = (FIELD_MIN_X + FIELD_MAX_X) // 2
@@ -522,6 +562,7 @@ class GameScene:
                     self.football.y = field_center_y
                     self.football.vx = 0
                     self.football.vy = 0
+                    self._sync_football()
         
         # 更新进球消息计时器
         if self.goal_message_timer > 0:
@@ -553,16 +594,13 @@ class GameScene:
                     self.npc_manager.start_dialogue(self.nearby_npc)
         else:
             self.nearby_npc = None
-            self.show_interaction_hint = False
-        
-        # 检查是否进入清真寺
-        self._check_mosque_entrance()
-        
-        # 检查是否进入图书馆
-        self._check_library_entrance()
+            # 图书馆里站在书架旁时提示查看书架
+            self.show_interaction_hint = self.nearby_bookshelf is not None
         
-        # 检查是否切换地图
-        self._check_map_switch()
+        # 触发区域（入口、出口、施工牌子、书架、滑板）：玩家所在瓦片变化时才检测
+        self.triggers.update(self.current_map, self.player.x, self.player.y,
+                             self.player.width, self.player.height, self.player.direction,
+                             InputHandler.is_just_pressed(InputHandler.INTERACT))
         
         # 更新相机跟随玩家
         self._update_camera()
@@ -583,67 +621,17 @@ class GameScene:
                 self.current_weather = random.choices(self.weather_types, weights=weather_weights)[0]
         
         # 更新天气粒子
-        if self.current_weather in ['rain', 'snow']:
-            for particle in self.weather_particles:
-                if self.current_weather == 'rain':
-                    # 雨滴快速下落
-                    particle['y'] += particle['speed'] * 3
-                    particle['x'] += 1  # 略微倾斜
-                else:
-                    # 雪花缓慢飘落
-                    particle['y'] += particle['speed'] * 0.5
-                    particle['x'] += random.uniform(-1, 1)  # 左右飘动
-                
-                # 超出屏幕则重置
-                if particle['y'] > WINDOW_HEIGHT:
-                    particle['y'] = random.randint(-20, 0)
-                    particle['x'] = random.randint(0, WINDOW_WIDTH)
-                if particle['x'] < 0:
-                    particle['x'] = WINDOW_WIDTH
-                elif particle['x'] > WINDOW_WIDTH:
-                    particle['x'] = 0
+        emitter = self.weather_emitters.get(self.current_weather)
+        if emitter is not None:
+            emitter.update()
     
     def _update_koi_fish(self):
-        """更新锦鲤游动"""
-        import math
-        for fish in self.koi_fish:
-            cx = fish['pond_center_x']
-            cy = fish['pond_center_y']
-            rx = fish['pond_radius_x']
-            ry = fish['pond_radius_y']
-            
-            # 更新转向计时器
-            fish['turn_timer'] -= 1
-            if fish['turn_timer'] <= 0:
-                # 随机改变方向
-                fish['direction'] += random.uniform(-0.8, 0.8)
-                fish['turn_timer'] = random.randint(40, 100)
-            
-            # 根据方向移动
-            dx = math.cos(fish['direction']) * fish['speed']
-            dy = math.sin(fish['direction']) * fish['speed']
-            
-            new_x = fish['x'] + dx
-            new_y = fish['y'] + dy
-            
-            # 椭圆边界检测: (x-cx)²/rx² + (y-cy)²/ry² <= 1
-            norm_x = (new_x - cx) / rx
-            norm_y = (new_y - cy) / ry
-            distance = norm_x * norm_x + norm_y * norm_y
-            
-            if distance > 0.85:  # 接近边界时掉头
-                # 计算指向中心的方向
-                to_center = math.atan2(cy - fish['y'], cx - fish['x'])
-                # 朝向中心偏转
-                fish['direction'] = to_center + random.uniform(-0.5, 0.5)
-                fish['turn_timer'] = random.randint(20, 50)
-                # 不更新位置，等待下一帧
-            else:
-                fish['x'] = new_x
-                fish['y'] = new_y
-            
-            # 更新尾巴摆动相位
-            fish['tail_phase'] += 0.3
+        """更新锦鲤游动（玩家在东校区时鱼群会对玩家做出反应）"""
+        player = self.player
+        if self.current_map == MAP_EAST_CAMPUS and not self.in_mosque:
+            self.koi_pond.update(player.x + player.width / 2, player.y + player.height / 2)
+        else:
+            self.koi_pond.update()
 
     def _check_flower_collection(self):
         """检查并收集花朵"""
@@ -654,100 +642,75 @@ class GameScene:
         px, py = self.player.x, self.player.y
         pw, ph = self.player.width, self.player.height
         
-        for flower in self.flowers:
-            if flower['collected']:
-                continue
-            
+        # 只检查玩家所在格子里还没被收集的花
+        flowers = self.flowers
+        for i in self.entity_hash.query(px, py, pw, ph, kind='flower'):
             # 简单的碰撞检测
-            fx, fy = flower['x'], flower['y']
-            flower_size = 8
+            fx, fy = flowers.x[i], flowers.y[i]
             
-            if (px < fx + flower_size and px + pw > fx and
-                py < fy + flower_size and py + ph > fy):
+            if (px < fx + FLOWER_SIZE and px + pw > fx and
+                py < fy + FLOWER_SIZE and py + ph > fy):
                 # 收集花朵
-                flower['collected'] = True
+                flowers.collected[i] = 1
+                self.entity_hash.remove(('flower', i))
                 
-                # 根据花朵类型设置描述
-                if flower.get('type') == 'red':
-                    desc = "红颜色的花。"
-                else:
-                    desc = "黄颜色的花。"
+                # 根据花朵类型取名称和描述
+                name, desc = FLOWER_TYPES[flowers.kind[i]][:2]
                 
                 # 添加到背包
-                self.game_menu.add_item(flower['name'], desc)
+                self.game_menu.add_item(name, desc)
                 
                 # 显示收集提示
-                self.collect_message = f"获得了 {flower['name']}！"
+                self.collect_message = f"获得了 {name}！"
                 self.collect_message_timer = 90  # 显示1.5秒
                 
                 # 统计收集数量
-                collected_count = sum(1 for f in self.flowers if f['collected'])
-                total_count = len(self.flowers)
-                print(f"[游戏] 收集了{flower['name']}! ({collected_count}/{total_count})")
+                collected_count = sum(flowers.collected)
+                total_count = len(flowers)
+                print(f"[游戏] 收集了{name}! ({collected_count}/{total_count})")
     
-    def _check_skateboard_collection(self):
-        """检查并收集滑板"""
-        if self.skateboard['collected']:
-            return
+    def _on_collect_skateboard(self, zone):
+        """走到滑板所在瓦片时收集滑板"""
+        self.skateboard['collected'] = True
+        self.player.has_skateboard = True
         
-        if self.current_map != MAP_EAST_CAMPUS:
-            return
-            
-        px, py = self.player.x, self.player.y
-        pw, ph = self.player.width, self.player.height
+        # 添加到背包
+        self.game_menu.add_item("滑板", "按B键或手柄X切换滑板模式，移动更快！")
         
-        sx, sy = self.skateboard['x'], self.skateboard['y']
-        skateboard_size = 12
+        # 显示收集提示
+        self.collect_message = "获得了 滑板！按B键或手柄X使用"
+        self.collect_message_timer = 120  # 显示2秒
         
-        if (px < sx + skateboard_size and px + pw > sx and
-            py < sy + skateboard_size and py + ph > sy):
-            # 收集滑板
-            self.skateboard['collected'] = True
-            self.player.has_skateboard = True
-            
-            # 添加到背包
-            self.game_menu.add_item("滑板", "按B键或手柄X切换滑板模式，移动更快！")
-            
-            # 显示收集提示
-            self.collect_message = "获得了 滑板！按B键或手柄X使用"
-            self.collect_message_timer = 120  # 显示2秒
-            
-            print("[游戏] 收集了滑板！")
+        print("[游戏] 收集了滑板！")
     
-    def _check_mosque_entrance(self):
-        """检查玩家是否进入清真寺入口"""
-        # 只在东校区检测
-        if self.current_map != MAP_EAST_CAMPUS:
-            return
-            
-        # 冷却中则不检测
-        if self.mosque_entrance_cooldown > 0:
-            self.mosque_entrance_cooldown -= 1
-            return
-            
-        px, py = self.player.x, self.player.y
-        entrance = self.mosque_entrance
-        
-        # 检查玩家是否走到拱门区域并且朝上走
-        if (entrance['min_x'] <= px <= entrance['max_x'] and
-            py <= entrance['y'] and 
-            self.player.direction == 'up'):
-            # 保存室外位置
-            self.outdoor_player_x = px
-            self.outdoor_player_y = py
-            # 进入清真寺
-            self.in_mosque = True
-            # 设置室内初始位置（入口处）
-            self.mosque_player_x = 128  # 室内中央
-            self.mosque_player_y = 200  # 靠近下方出口
-            self.player.x = self.mosque_player_x
-            self.player.y = self.mosque_player_y
-            self.player.direction = 'up'
-            print("[游戏] 进入清真寺内部")
+    def _on_enter_mosque(self, zone):
+        """朝上走进清真寺拱门时进入室内"""
+        # 保存室外位置
+        self.outdoor_player_x = self.player.x
+        self.outdoor_player_y = self.player.y
+        # 进入清真寺
+        self.in_mosque = True
+        # 设置室内初始位置（入口处）
+        self.mosque_player_x = 128  # 室内中央
+        self.mosque_player_y = 200  # 靠近下方出口
+        self.player.x = self.mosque_player_x
+        self.player.y = self.mosque_player_y
+        self.player.direction = 'up'
+        # 室内期间东校区NPC不再逐帧更新，出来时一次补上
+        self.npc_manager.suspend(self.sim_frame)
+        print("[游戏] 进入清真寺内部")
     
+    def _advance_frame(self):
+        """
+        推进一帧：动画时钟和模拟帧数只在场景没有暂停（菜单、对话）时前进，
+        和各渲染器、NPC 的更新保持同步（离开东校区期间的 NPC 按模拟帧数补帧）
+        """
+        self.sim_frame += 1
+        get_clock().advance()
+        
     def _update_mosque_interior(self):
         """更新清真寺内部逻辑"""
-        # 处理玩家移动（简化版，无碰撞）
+        # 处理玩家移动（只受室内墙壁限制）
         speed = 2
         
         move_x, move_y = InputHandler.get_movement()
@@ -762,20 +725,11 @@ class GameScene:
         
         self.player.is_moving = abs(dx) > 0.001 or abs(dy) > 0.001
         
-        # 更新玩家位置（室内边界）
-        new_x = self.player.x + dx
-        new_y = self.player.y + dy
-        
-        # 室内边界 (留出墙壁空间)
-        INTERIOR_MIN_X = 40
-        INTERIOR_MAX_X = 216
-        INTERIOR_MIN_Y = 40
-        INTERIOR_MAX_Y = 210
-        
-        if INTERIOR_MIN_X <= new_x <= INTERIOR_MAX_X:
-            self.player.x = new_x
-        if INTERIOR_MIN_Y <= new_y <= INTERIOR_MAX_Y:
-            self.player.y = new_y
+        # 更新玩家位置（扫掠玩家矩形，贴着室内墙壁停下）
+        result = sweep_aabb(self.mosque_bounds_checker, self.player.x, self.player.y,
+                            self.player.width, self.player.height, dx, dy)
+        self.player.x = result.x
+        self.player.y = result.y
         
         # 更新动画
         if self.player.is_moving:
@@ -785,79 +739,45 @@ class GameScene:
                 self.player.frame = (self.player.frame + 1) % 4
         
         # 检查是否离开清真寺（走到下方出口）
-        if self.player.y >= INTERIOR_MAX_Y - 5 and self.player.direction == 'down':
+        if self.player.y >= self.mosque_bounds['max_y'] - 5 and self.player.direction == 'down':
             # 离开清真寺
             self.in_mosque = False
             # 恢复室外位置（向下偏移更多，避免立刻重新触发入口）
             self.player.x = self.outdoor_player_x
             self.player.y = self.outdoor_player_y + 32  # 向下偏移2个瓦片
             self.player.direction = 'down'
-            # 设置入口冷却时间（约1秒）
-            self.mosque_entrance_cooldown = 60
+            # 触发区域冷却（约1秒）
+            self.triggers.suspend(60)
+            self.npc_manager.resume(self.sim_frame)
+            self._release_interior_cache()
             print("[游戏] 离开清真寺")
     
-    def _check_map_switch(self):
-        """检查是否需要切换地图"""
-        # 冷却中则不检测
-        if self.map_switch_cooldown > 0:
-            self.map_switch_cooldown -= 1
-            return
-        
-        px, py = self.player.x, self.player.y
-        direction = self.player.direction
-        
-        if self.current_map == MAP_EAST_CAMPUS:
-            # 在东校区：检查是否走到地图底部（进入地下通道）
-            gate = self.east_gate_entrance
-            # 必须在校门X范围、向下走、且走到地图底部
-            if (gate['min_x'] <= px <= gate['max_x'] and 
-                py >= gate['y'] and
-                direction == 'down'):
-                print(f"[调试] 触发东→地下: px={px}, py={py}, gate_y={gate['y']}, dir={direction}")
-                self._switch_to_map(MAP_TUNNEL, 'from_east')
-                
-        elif self.current_map == MAP_TUNNEL:
-            # 在地下通道：检查是否走到顶部（返回东校区）
-            entry = self.tunnel_entry_to_east
-            if (entry['min_x'] <= px <= entry['max_x'] and 
-                py <= 1 * TILE_SIZE and
-                self.player.direction == 'up'):
-                self._switch_to_map(MAP_EAST_CAMPUS, 'from_tunnel')
-        
-        elif self.current_map == MAP_LIBRARY:
-            # 在图书馆内：检查是否走到出口（底部门）
-            exit_pos = self.library_exit
-            if (abs(px - exit_pos['x']) < TILE_SIZE and
-                py >= exit_pos['y'] and
-                direction == 'down'):
-                self._switch_to_map(MAP_EAST_CAMPUS, 'from_library')
-    
-    def _check_library_entrance(self):
-        """检查是否进入图书馆（自动进入）"""
-        if self.current_map != MAP_EAST_CAMPUS:
-            return
-        if self.library_entrance_cooldown > 0:
-            self.library_entrance_cooldown -= 1
-            return
-        
-        px, py = self.player.x, self.player.y
-        entrance = self.library_entrance
-        
-        # 检查玩家是否在图书馆门前（自动进入，不需要按交互键）
-        if (abs(px - entrance['x']) < TILE_SIZE * 1.2 and
-            abs(py - entrance['y']) < TILE_SIZE * 1.2):
-            # 保存当前位置
-            self.outdoor_pos_before_library['x'] = px
-            self.outdoor_pos_before_library['y'] = py
-            # 切换到图书馆
-            self._switch_to_map(MAP_LIBRARY, 'from_campus')
+    def _on_enter_library(self, zone):
+        """走到图书馆门口时自动进入（不需要按交互键）"""
+        # 保存当前位置
+        self.outdoor_pos_before_library['x'] = self.player.x
+        self.outdoor_pos_before_library['y'] = self.player.y
+        # 切换到图书馆
+        self._switch_to_map(MAP_LIBRARY, 'from_campus')
     
     def _switch_to_map(self, target_map, from_direction):
         """切换到目标地图"""
         print(f"[地图切换] {self.current_map} -> {target_map}, 来源={from_direction}")
         old_map = self.current_map
         self.current_map = target_map
-        self.map_switch_cooldown = 60  # 1秒冷却
+        self.triggers.suspend(60)  # 触发区域1秒冷却
+        
+        if old_map == MAP_LIBRARY:
+            self._release_interior_cache()
+        
+        # 东校区NPC在玩家离开期间不逐帧更新，回来时按离开的时长一次补上
+        if target_map == MAP_EAST_CAMPUS:
+            self.npc_manager.resume(self.sim_frame)
+        elif old_map == MAP_EAST_CAMPUS:
+            self.npc_manager.suspend(self.sim_frame)
+        
+        # 玩家的碰撞检测绑定到新地图的网格
+        self.player.collision_checker = self.collision.checker(target_map)
         
         # 根据目标地图和来源方向设置玩家位置
         if target_map == MAP_TUNNEL:
@@ -872,7 +792,6 @@ class GameScene:
                 self.player.x = self.outdoor_pos_before_library['x']
                 self.player.y = self.outdoor_pos_before_library['y'] + 16
                 self.player.direction = 'down'
-                self.library_entrance_cooldown = 60
             else:
                 # 从地下通道返回东校区
                 self.player.x = 16 * TILE_SIZE
@@ -888,55 +807,43 @@ class GameScene:
             self._init_library_npcs()
         
         # 强制更新相机到正确位置
-        self.camera_x = self.player.x - WINDOW_WIDTH // 2
-        self.camera_y = self.player.y - WINDOW_HEIGHT // 2
+        self.camera.set_bounds(*self._get_map_pixel_size())
+        self.camera.set_position(self.player.x - WINDOW_WIDTH // 2,
+                                 self.player.y - WINDOW_HEIGHT // 2)
         self._update_camera()
         
         print(f"[游戏] 切换地图: {old_map} -> {target_map}, 玩家位置: ({self.player.x}, {self.player.y})")
     
-    def _check_library_interaction(self):
-        """检查图书馆内的交互（书架）"""
-        if self.current_map != MAP_LIBRARY:
-            return
-        
-        px, py = self.player.x, self.player.y
-        tile_x, tile_y = self.library.get_tile_pos(px + 8, py + 8)
-        
-        # 检查附近的书架
-        nearby_bookshelf = None
-        for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:  # 上下左右
-            check_x, check_y = tile_x + dx, tile_y + dy
-            if (check_x, check_y) in LIBRARY_BOOKSHELF_CONTENT:
-                nearby_bookshelf = (check_x, check_y)
-                break
-        
-        # 显示交互提示
-        if nearby_bookshelf:
-            self.show_interaction_hint = True
-            self.nearby_npc = None
-            if InputHandler.is_just_pressed(InputHandler.INTERACT):
-                content = LIBRARY_BOOKSHELF_CONTENT[nearby_bookshelf]
-                self.library_interaction['show_bookshelf'] = True
-                self.library_interaction['bookshelf_content'] = content
-        else:
-            self.show_interaction_hint = False
-            self.nearby_npc = None
-
-    def _check_construction_sign(self):
-        """检查是否靠近施工牌子"""
-        sign = self.construction_sign
-        px, py = self.player.x, self.player.y
-        
-        # 检查玩家是否在牌子附近
-        if (sign['min_x'] - 32 <= px <= sign['max_x'] + 32 and 
-            sign['y'] - 32 <= py <= sign['y'] + 48):
-            self.show_sign_hint = True
-            self.sign_message = sign['text']
-            # 按交互键阅读牌子
-            if InputHandler.is_just_pressed(InputHandler.INTERACT):
-                print(f"[游戏] 阅读牌子: {sign['text']}")
-        else:
-            self.show_sign_hint = False
+    def _release_interior_cache(self):
+        """离开室内时释放室内缓存（世界图层会在回到室外时重新申请图像库并整屏重绘）"""
+        self.interior_cache.release()
+    
+    def _on_near_bookshelf(self, zone):
+        """走到书架旁"""
+        self.nearby_bookshelf = zone.data['bookshelf']
+    
+    def _on_leave_bookshelf(self, zone):
+        """离开书架旁"""
+        if self.nearby_bookshelf == zone.data['bookshelf']:
+            self.nearby_bookshelf = None
+    
+    def _on_read_bookshelf(self, zone):
+        """在书架旁按交互键查看书架"""
+        self.library_interaction['show_bookshelf'] = True
+        self.library_interaction['bookshelf_content'] = LIBRARY_BOOKSHELF_CONTENT[zone.data['bookshelf']]
+    
+    def _on_show_sign(self, zone):
+        """走到施工牌子附近时显示提示"""
+        self.show_sign_hint = True
+        self.sign_message = zone.data['text']
+    
+    def _on_hide_sign(self, zone):
+        """离开施工牌子附近"""
+        self.show_sign_hint = False
+    
+    def _on_read_sign(self, zone):
+        """按交互键阅读牌子"""
+        print(f"[游戏] 阅读牌子: {zone.data['text']}")
             
     def _trigger_npc_action(self, npc, action):
         """触发NPC执行动作"""
@@ -946,45 +853,54 @@ class GameScene:
             target_x = self.football.x
             target_y = self.football.y
             # 5秒 = 300帧，给NPC更多时间踢球
-            npc.start_action('play_football', target_x, target_y, duration=300)
+            npc.start_action('play_football', target_x, target_y, duration=300,
+                             destination='football_field')
             # 传递足球引用和目标球门，让NPC能够追踪足球并往球门踢
             # 随机选择一个球门作为目标
             target_goal = random.choice(self.goals)
             npc.set_football_ref(self.football, target_goal)
             print(f"[游戏] {npc.name} 开始去踢足球，目标球门: {target_goal.side}")
             
-    def _update_camera(self):
-        """更新相机位置，跟随玩家"""
-        # 目标相机位置：将玩家置于屏幕中央
-        target_x = self.player.x - WINDOW_WIDTH // 2 + self.player.width // 2
-        target_y = self.player.y - WINDOW_HEIGHT // 2 + self.player.height // 2
-        
-        # 平滑跟随
-        self.camera_x += (target_x - self.camera_x) * 0.1
-        self.camera_y += (target_y - self.camera_y) * 0.1
-        
-        # 根据当前地图限制相机边界
-        if self.current_map == MAP_EAST_CAMPUS:
-            map_pixel_width = MAP_TILES_WIDTH * TILE_SIZE
-            map_pixel_height = MAP_TILES_HEIGHT * TILE_SIZE
-        elif self.current_map == MAP_TUNNEL:
-            map_pixel_width = TUNNEL_WIDTH * TILE_SIZE
-            map_pixel_height = TUNNEL_HEIGHT * TILE_SIZE
+    def _get_map_pixel_size(self):
+        """当前地图的像素尺寸（相机边界）"""
+        if self.current_map == MAP_TUNNEL:
+            return TUNNEL_WIDTH * TILE_SIZE, TUNNEL_HEIGHT * TILE_SIZE
         elif self.current_map == MAP_LIBRARY:
-            map_pixel_width = LIBRARY_WIDTH * TILE_SIZE
-            map_pixel_height = LIBRARY_HEIGHT * TILE_SIZE
-        else:
-            map_pixel_width = MAP_TILES_WIDTH * TILE_SIZE
-            map_pixel_height = MAP_TILES_HEIGHT * TILE_SIZE
+            return LIBRARY_WIDTH * TILE_SIZE, LIBRARY_HEIGHT * TILE_SIZE
+        return MAP_TILES_WIDTH * TILE_SIZE, MAP_TILES_HEIGHT * TILE_SIZE
         
-        self.camera_x = max(0, min(self.camera_x, map_pixel_width - WINDOW_WIDTH))
-        self.camera_y = max(0, min(self.camera_y, map_pixel_height - WINDOW_HEIGHT))
-            
+    def _update_camera(self):
+        """更新相机位置，跟随玩家（绘制使用整数对齐后的视口）"""
+        # 将玩家中心置于屏幕中央，平滑跟随并限制在地图边界内
+        self.camera.follow(self.player.x + self.player.width // 2,
+                           self.player.y + self.player.height // 2, 0.1)
+        self.camera_x = self.camera.view_x
+        self.camera_y = self.camera.view_y
+        
+    def _get_camera_debug_lines(self):
+        """相机世界图层的重绘统计"""
+        return [
+            f"view: {self.camera_x},{self.camera_y}",
+            f"tiles repainted: {self.camera.tiles_repainted}",
+            f"total repainted: {self.camera.total_tiles_repainted}",
+        ]
+
+    def get_memory_report(self):
+        """各类实体的内存占用（每个实体的字节数，调试浮层和性能测试共用）"""
+        return memory_report([
+            ("npc", self.npc_manager.npcs),
+            ("goal", self.goals),
+            ("football", [self.football]),
+            ("koi", self.koi_pond),
+            ("flower", self.flowers),
+        ] + list(self.particles.emitters.items()))
+
     def draw(self):
         """绘制画面"""
         # 如果在清真寺内部
         if self.in_mosque:
             self._draw_mosque_interior()
+            self.debug_overlay.draw()
             return
         
         # 根据当前地图绘制
@@ -1031,11 +947,13 @@ class GameScene:
         # 绘制游戏菜单（最后绘制，覆盖其他UI）
         if self.game_menu.active:
             self.game_menu.draw()
+        
+        self.debug_overlay.draw()
     
     def _draw_east_campus(self):
         """绘制东校区"""
         # 绘制校园场景
-        self.campus.draw(self.camera_x, self.camera_y)
+        self.campus.draw(self.camera_x, self.camera_y, self.camera)
         
         # 绘制锦鲤（在水面上）
         self._draw_koi_fish()
@@ -1058,11 +976,14 @@ class GameScene:
         
         # 绘制玩家
         self.player.draw(self.camera_x, self.camera_y)
+        
+        # 绘制进球彩带
+        self.goal_confetti.draw(self.camera_x, self.camera_y)
     
     def _draw_tunnel(self):
         """绘制地下通道"""
         # 绘制通道场景
-        self.tunnel.draw(self.camera_x, self.camera_y)
+        self.tunnel.draw(self.camera_x, self.camera_y, self.camera)
         
         # 绘制玩家
         self.player.draw(self.camera_x, self.camera_y)
@@ -1087,7 +1008,7 @@ class GameScene:
     def _draw_library(self):
         """绘制图书馆内部"""
         # 绘制图书馆场景
-        self.library.render(self.camera_x, self.camera_y)
+        self.library.render(self.camera_x, self.camera_y, self.interior_cache)
         
         # 绘制图书馆NPC
         if self.library_npc_manager:
@@ -1182,20 +1103,6 @@ class GameScene:
             bubble_y = npc_screen_y - 12
             pyxel.rect(bubble_x, bubble_y, 10, 10, 7)
             draw_text(bubble_x + 2, bubble_y, "!", 0)
-        elif self.current_map == MAP_EAST_CAMPUS:
-            # 检查是否在图书馆门前
-            px, py = self.player.x, self.player.y
-            entrance = self.library_entrance
-            if (abs(px - entrance['x']) < TILE_SIZE * 1.5 and
-                abs(py - entrance['y']) < TILE_SIZE * 1.5 and
-                self.player.direction == 'up'):
-                # 显示进入图书馆提示
-                hint = "按A/Enter进入图书馆"
-                box_x = WINDOW_WIDTH // 2 - 55
-                box_y = 20
-                pyxel.rect(box_x, box_y, 110, 18, 0)
-                pyxel.rectb(box_x, box_y, 110, 18, 7)
-                draw_text(box_x + 5, box_y + 4, hint, 7)
         elif self.current_map == MAP_LIBRARY:
             # 图书馆内交互提示
             if self.nearby_npc:
@@ -1272,21 +1179,25 @@ class GameScene:
     
     def _draw_koi_fish(self):
         """绘制池塘中游动的锦鲤"""
-        import math
-        for fish in self.koi_fish:
+        # 池塘不在屏幕附近时整池跳过
+        left, top, width, height = self.koi_pond.bounds()
+        if (left + width < self.camera_x - 20 or left > self.camera_x + WINDOW_WIDTH + 20 or
+                top + height < self.camera_y - 20 or top > self.camera_y + WINDOW_HEIGHT + 20):
+            return
+        
+        for x, y, direction, tail_phase, color in zip(*self.koi_pond.get_draw_data()):
             # 计算屏幕位置
-            screen_x = int(fish['x'] - self.camera_x)
-            screen_y = int(fish['y'] - self.camera_y)
+            screen_x = int(x - self.camera_x)
+            screen_y = int(y - self.camera_y)
             
             # 检查是否在屏幕内
             if -20 < screen_x < WINDOW_WIDTH + 20 and -20 < screen_y < WINDOW_HEIGHT + 20:
-                color = fish['color']
-                direction = fish['direction']
-                tail_offset = math.sin(fish['tail_phase']) * 1.5
+                # 尾巴摆动（相位由鱼群模拟推进，游得快摆得快）
+                tail_offset = fast_sin(tail_phase) * 1.5
                 
                 # 计算朝向
-                dx = math.cos(direction)
-                dy = math.sin(direction)
+                dx = fast_cos(direction)
+                dy = fast_sin(direction)
                 
                 # 鱼身体（椭圆形）- 根据朝向绘制
                 # 身体中心
@@ -1320,24 +1231,18 @@ class GameScene:
 
     def _draw_flowers(self):
         """绘制可收集的花朵"""
-        for flower in self.flowers:
-            if flower['collected']:
-                continue
-            
+        flowers = self.flowers
+        # 只取屏幕附近格子里还没被收集的花
+        for i in self.entity_hash.query(self.camera_x - 16, self.camera_y - 16,
+                                        WINDOW_WIDTH + 32, WINDOW_HEIGHT + 32, kind='flower'):
             # 计算屏幕位置
-            screen_x = int(flower['x'] - self.camera_x)
-            screen_y = int(flower['y'] - self.camera_y)
+            screen_x = int(flowers.x[i] - self.camera_x)
+            screen_y = int(flowers.y[i] - self.camera_y)
             
             # 检查是否在屏幕内
             if -16 < screen_x < WINDOW_WIDTH + 16 and -16 < screen_y < WINDOW_HEIGHT + 16:
                 # 根据花朵类型选择颜色
-                flower_type = flower.get('type', 'red')
-                if flower_type == 'red':
-                    petal_color = 8   # 红色
-                    center_color = 10  # 黄色花蕊
-                else:  # yellow
-                    petal_color = 10  # 黄色
-                    center_color = 9   # 橙色花蕊
+                petal_color, center_color = FLOWER_TYPES[flowers.kind[i]][2:]
                 
                 # 花茎
                 pyxel.line(screen_x + 4, screen_y + 8, screen_x + 4, screen_y + 4, 11)
@@ -1377,135 +1282,116 @@ class GameScene:
                 pyxel.circb(screen_x + 6, screen_y + 4, 8, 10)
     
     def _draw_weather(self):
-        """绘制天气效果"""
-        if self.current_weather == 'sunny':
-            # 晴天 - 无特效
-            pass
-                
-        elif self.current_weather == 'rain':
-            # 下雨 - 只绘制雨滴
-            for particle in self.weather_particles:
-                x, y = int(particle['x']), int(particle['y'])
-                if 0 <= y < WINDOW_HEIGHT:
-                    pyxel.line(x, y, x + 1, y + 4, 12)  # 蓝色雨滴
-                    
-        elif self.current_weather == 'snow':
-            # 下雪 - 只绘制雪花
-            for particle in self.weather_particles:
-                x, y = int(particle['x']), int(particle['y'])
-                size = particle['size']
-                if 0 <= y < WINDOW_HEIGHT:
-                    pyxel.pset(x, y, 7)  # 白色雪花
-                    if size > 1:
-                        pyxel.pset(x + 1, y, 7)
-                        pyxel.pset(x, y + 1, 7)
-                    if size > 2:
-                        pyxel.pset(x - 1, y, 7)
-                        pyxel.pset(x, y - 1, 7)
+        """绘制天气效果（晴天无特效，下雨画雨滴，下雪画雪花）"""
+        emitter = self.weather_emitters.get(self.current_weather)
+        if emitter is not None:
+            emitter.draw(clip_height=WINDOW_HEIGHT)
     
     def _draw_mosque_interior(self):
         """绘制清真寺内部"""
+        # 室内除玩家外完全静止：首次进入时烘焙，之后直接 blt
+        if (self.interior_cache.is_baked('mosque') or
+                self.interior_cache.bake('mosque', WINDOW_WIDTH, WINDOW_HEIGHT,
+                                         self._paint_mosque_interior)):
+            self.interior_cache.draw()
+        else:
+            self._paint_mosque_interior(pyxel)
+        
+        # 绘制玩家（室内无相机偏移）
+        self.player.draw(0, 0)
+        
+        # 提示文字
+        hint = "阿拉伯语学院内部 - 向下走离开"
+        draw_text(WINDOW_WIDTH // 2 - text_width(hint) // 2, WINDOW_HEIGHT - 20, hint, 0)
+        
+    def _paint_mosque_interior(self, canvas):
+        """在画布上绘制清真寺内部的静态部分"""
         # 背景 - 米色地板
-        pyxel.cls(15)
+        canvas.rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT, 15)
         
         # 地板瓷砖图案
         for y in range(0, WINDOW_HEIGHT, 32):
             for x in range(0, WINDOW_WIDTH, 32):
-                pyxel.rectb(x, y, 32, 32, 6)
+                canvas.rectb(x, y, 32, 32, 6)
                 # 伊斯兰几何图案
-                pyxel.pset(x + 16, y + 16, 10)
-                pyxel.rect(x + 14, y + 14, 4, 4, 10)
+                canvas.pset(x + 16, y + 16, 10)
+                canvas.rect(x + 14, y + 14, 4, 4, 10)
         
         # 墙壁 - 四周
         wall_color = 7  # 白色墙
         wall_decor = 10  # 金色装饰
         
         # 上墙（有精美图案）
-        pyxel.rect(0, 0, WINDOW_WIDTH, 35, wall_color)
-        pyxel.rect(0, 30, WINDOW_WIDTH, 5, wall_decor)
+        canvas.rect(0, 0, WINDOW_WIDTH, 35, wall_color)
+        canvas.rect(0, 30, WINDOW_WIDTH, 5, wall_decor)
         # 伊斯兰拱形装饰
         for i in range(5):
             arch_x = 30 + i * 50
-            pyxel.circ(arch_x, 20, 15, 12)
-            pyxel.circ(arch_x, 22, 12, wall_color)
-            pyxel.tri(arch_x, 5, arch_x - 8, 20, arch_x + 8, 20, 12)
+            canvas.circ(arch_x, 20, 15, 12)
+            canvas.circ(arch_x, 22, 12, wall_color)
+            canvas.tri(arch_x, 5, arch_x - 8, 20, arch_x + 8, 20, 12)
         
         # 左墙
-        pyxel.rect(0, 0, 35, WINDOW_HEIGHT, wall_color)
-        pyxel.rect(30, 0, 5, WINDOW_HEIGHT, wall_decor)
+        canvas.rect(0, 0, 35, WINDOW_HEIGHT, wall_color)
+        canvas.rect(30, 0, 5, WINDOW_HEIGHT, wall_decor)
         # 窗户
         for y in [60, 120, 180]:
-            pyxel.rect(8, y, 16, 24, 12)
-            pyxel.rectb(8, y, 16, 24, wall_decor)
-            pyxel.line(16, y, 16, y + 24, wall_decor)
+            canvas.rect(8, y, 16, 24, 12)
+            canvas.rectb(8, y, 16, 24, wall_decor)
+            canvas.line(16, y, 16, y + 24, wall_decor)
         
         # 右墙
-        pyxel.rect(WINDOW_WIDTH - 35, 0, 35, WINDOW_HEIGHT, wall_color)
-        pyxel.rect(WINDOW_WIDTH - 35, 0, 5, WINDOW_HEIGHT, wall_decor)
+        canvas.rect(WINDOW_WIDTH - 35, 0, 35, WINDOW_HEIGHT, wall_color)
+        canvas.rect(WINDOW_WIDTH - 35, 0, 5, WINDOW_HEIGHT, wall_decor)
         # 窗户
         for y in [60, 120, 180]:
-            pyxel.rect(WINDOW_WIDTH - 24, y, 16, 24, 12)
-            pyxel.rectb(WINDOW_WIDTH - 24, y, 16, 24, wall_decor)
-            pyxel.line(WINDOW_WIDTH - 16, y, WINDOW_WIDTH - 16, y + 24, wall_decor)
+            canvas.rect(WINDOW_WIDTH - 24, y, 16, 24, 12)
+            canvas.rectb(WINDOW_WIDTH - 24, y, 16, 24, wall_decor)
+            canvas.line(WINDOW_WIDTH - 16, y, WINDOW_WIDTH - 16, y + 24, wall_decor)
         
         # 下墙（有出口门）
-        pyxel.rect(0, WINDOW_HEIGHT - 35, WINDOW_WIDTH, 35, wall_color)
-        pyxel.rect(0, WINDOW_HEIGHT - 35, WINDOW_WIDTH, 5, wall_decor)
+        canvas.rect(0, WINDOW_HEIGHT - 35, WINDOW_WIDTH, 35, wall_color)
+        canvas.rect(0, WINDOW_HEIGHT - 35, WINDOW_WIDTH, 5, wall_decor)
         # 出口门
         door_x = WINDOW_WIDTH // 2 - 20
-        pyxel.rect(door_x, WINDOW_HEIGHT - 35, 40, 30, 4)  # 棕色门
-        pyxel.circ(door_x + 20, WINDOW_HEIGHT - 35, 20, 4)  # 拱形顶
-        pyxel.rectb(door_x, WINDOW_HEIGHT - 35, 40, 30, 9)
+        canvas.rect(door_x, WINDOW_HEIGHT - 35, 40, 30, 4)  # 棕色门
+        canvas.circ(door_x + 20, WINDOW_HEIGHT - 35, 20, 4)  # 拱形顶
+        canvas.rectb(door_x, WINDOW_HEIGHT - 35, 40, 30, 9)
         
         # 中央祈祷大厅装饰
         # 吊灯
         chandelier_x = WINDOW_WIDTH // 2
         chandelier_y = 60
-        pyxel.circ(chandelier_x, chandelier_y, 20, 10)
-        pyxel.circ(chandelier_x, chandelier_y, 15, 9)
-        pyxel.line(chandelier_x, 35, chandelier_x, chandelier_y - 15, 10)
+        canvas.circ(chandelier_x, chandelier_y, 20, 10)
+        canvas.circ(chandelier_x, chandelier_y, 15, 9)
+        canvas.line(chandelier_x, 35, chandelier_x, chandelier_y - 15, 10)
         # 吊灯光芒
         for i in range(8):
             import math
             angle = i * math.pi / 4
             px = chandelier_x + int(12 * math.cos(angle))
             py = chandelier_y + int(12 * math.sin(angle))
-            pyxel.pset(px, py, 7)
+            canvas.pset(px, py, 7)
         
         # 地毯
         carpet_x = 60
         carpet_y = 100
         carpet_w = WINDOW_WIDTH - 120
         carpet_h = 80
-        pyxel.rect(carpet_x, carpet_y, carpet_w, carpet_h, 8)  # 红色地毯
-        pyxel.rectb(carpet_x, carpet_y, carpet_w, carpet_h, 9)
-        pyxel.rectb(carpet_x + 4, carpet_y + 4, carpet_w - 8, carpet_h - 8, 10)
+        canvas.rect(carpet_x, carpet_y, carpet_w, carpet_h, 8)  # 红色地毯
+        canvas.rectb(carpet_x, carpet_y, carpet_w, carpet_h, 9)
+        canvas.rectb(carpet_x + 4, carpet_y + 4, carpet_w - 8, carpet_h - 8, 10)
         # 地毯图案
         for i in range(3):
             pattern_x = carpet_x + 30 + i * 50
             pattern_y = carpet_y + carpet_h // 2
-            pyxel.circ(pattern_x, pattern_y, 12, 9)
-            pyxel.circ(pattern_x, pattern_y, 8, 10)
-        
-        # 绘制玩家（室内无相机偏移）
-        self.player.draw(0, 0)
-        
-        # 提示文字
-        hint = "阿拉伯语学院内部 - 向下走离开"
-        draw_text(WINDOW_WIDTH // 2 - text_width(hint) // 2, WINDOW_HEIGHT - 20, hint, 0)
+            canvas.circ(pattern_x, pattern_y, 12, 9)
+            canvas.circ(pattern_x, pattern_y, 8, 10)
         
     def _draw_hud(self):
         """绘制界面信息"""
         # 显示当前区域名称
-        if self.current_map == MAP_LIBRARY:
-            location_name = "北外图书馆"
-        elif self.in_mosque:
-            location_name = "阿拉伯语学院"
-        elif self.current_map == MAP_TUNNEL:
-            location_name = "地下通道"
-        else:
-            # 东校区：检测玩家附近的建筑
-            location_name = self._get_nearby_building_name()
+        location_name = self.region_tracker.current
         
         # 区域名称背景
         name_width = text_width(location_name) + 12
@@ -1547,41 +1433,19 @@ class GameScene:
                     hint = "方向/WASD:移动 B键/手柄X:滑板 A:对话 Start/M:菜单"
             draw_text(WINDOW_WIDTH - text_width(hint) - 4, WINDOW_HEIGHT - 14, hint, 7)
         
-    def _get_nearby_building_name(self):
-        """检测玩家附近的建筑物并返回名称"""
-        # 获取玩家当前瓦片位置
-        player_tile_x = int(self.player.x // TILE_SIZE)
-        player_tile_y = int(self.player.y // TILE_SIZE)
-        
-        # 检查周围3x3范围内的瓦片
-        for dy in range(-1, 2):
-            for dx in range(-1, 2):
-                check_x = player_tile_x + dx
-                check_y = player_tile_y + dy
-                
-                # 边界检查
-                if 0 <= check_x < MAP_TILES_WIDTH and 0 <= check_y < MAP_TILES_HEIGHT:
-                    tile = CAMPUS_MAP[check_y][check_x]
-                    
-                    # 根据瓦片类型返回建筑名称
-                    if tile in [TILE_DOME, TILE_DOME_ARCH]:
-                        return "阿拉伯语学院"
-                    elif tile in [TILE_LIBRARY, TILE_LIBRARY_WINDOW]:
-                        return "图书馆"
-                    elif tile == TILE_CANTEEN:
-                        return "食堂"
-                    elif tile == TILE_ADMIN:
-                        return "行政楼"
-                    elif tile == TILE_HALL:
-                        return "礼堂"
-                    elif tile == TILE_GYM:
-                        return "体育馆"
-                    elif tile == TILE_JAPAN:
-                        return "日研中心"
-                    elif tile == TILE_MAIN:
-                        return "主楼"
-                    elif tile == TILE_WATER:
-                        return "小碧池"
-        
-        # 默认显示东校区
-        return "东校区"
+    def _update_region(self):
+        """更新玩家所在区域（HUD 显示并通知区域变化的订阅者）"""
+        if self.current_map == MAP_LIBRARY:
+            name = "北外图书馆"
+        elif self.in_mosque:
+            name = "阿拉伯语学院"
+        elif self.current_map == MAP_TUNNEL:
+            name = "地下通道"
+        else:
+            # 东校区：查区域表得到玩家附近的建筑
+            name = self.campus_regions.name_at(int(self.player.x // TILE_SIZE),
+                                               int(self.player.y // TILE_SIZE))
+        
+        scope = (self.current_map, self.in_mosque)
+        self.region_tracker.update(name, immediate=scope != self._region_scope)
+        self._region_scope = scope
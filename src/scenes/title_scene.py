@@ -5,10 +5,10 @@
 """
 
 import pyxel
-import math
 from config import WINDOW_WIDTH, WINDOW_HEIGHT, COLOR_WHITE, COLOR_YELLOW
 from src.systems.input_handler import InputHandler
 from src.utils.font_manager import draw_text, text_width
+from src.utils.animation_clock import get_clock
 
 
 class TitleScene:
@@ -19,12 +19,10 @@ class TitleScene:
         self.scene_manager = scene_manager
         self.blink_timer = 0
         self.show_text = True
-        self.time = 0
         
     def on_enter(self):
         """进入场景时调用"""
         self.blink_timer = 0
-        self.time = 0
         
     def on_exit(self):
         """退出场景时调用"""
@@ -32,7 +30,7 @@ class TitleScene:
         
     def update(self):
         """更新逻辑"""
-        self.time += 1
+        get_clock().advance()
         
         # 闪烁效果
         self.blink_timer += 1
@@ -101,7 +99,7 @@ class TitleScene:
             pyxel.rect(55 + i * 18, 125, 8, 10, 12)
             
         # 树木
-        wind = math.sin(self.time * 0.03) * 2
+        wind = get_clock().wave(0.03) * 2
         self._draw_simple_tree(20, 130, wind)
         self._draw_simple_tree(220, 125, wind * 0.8)
         
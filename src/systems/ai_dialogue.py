@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 """
 AI 对话系统模块
-支持玩家与 NPC 进行实时文字对话
+支持玩家与 NPC 进行实时文字对话。
+回复以流式接收：每收到一段文字就接到 NPC 回复后面，由打字机效果逐字显示。
+只处理当前请求编号的回复事件；对话结束或发出新消息时取消旧请求，
+上一段对话迟到的回复不会串到下一段对话里。
+提示词按 token 预算组装（见 prompt_builder），更早的对话折叠进滚动摘要
 """
 
 import pyxel
@@ -9,6 +13,10 @@ import random
 from config import WINDOW_WIDTH, WINDOW_HEIGHT, COLOR_WHITE, COLOR_BLACK
 from src.systems.input_handler import InputHandler
 from src.systems.llm_client import get_llm_client
+from src.systems.prompt_builder import (
+    PromptBuilder, SUMMARY_KEEP_RECENT, SUMMARY_MAX_TOKENS,
+    build_summary_request, estimate_message_tokens, summarize_locally,
+)
 from src.utils.font_manager import draw_text, text_width
 
 # 各NPC的专属问候语（根据人设定制）
@@ -84,6 +92,35 @@ DEFAULT_GREETINGS = [
     "你好！",
 ]
 
+# 回复中的动作标签 -> 动作类型（标签不显示，只触发动作）
+ACTION_TAGS = {
+    '[动作:踢足球]': 'play_football',
+}
+
+
+def split_action_tags(text, final=True):
+    """
+    去掉回复中的动作标签
+
+    流式接收时回复末尾可能是被切断的半个标签（如 "[动作:踢"），final=False 时先不显示这一段，
+    等后续文字到达后再判断
+
+    返回:
+        (显示文字, 动作类型列表)
+    """
+    actions = []
+    for tag, action in ACTION_TAGS.items():
+        if tag in text:
+            text = text.replace(tag, '')
+            actions.append(action)
+    if not final:
+        start = text.rfind('[')
+        if start >= 0:
+            tail = text[start:]
+            if any(tag.startswith(tail) for tag in ACTION_TAGS):
+                text = text[:start]
+    return text, actions
+
 
 class AIDialogueSystem:
     """AI 驱动的对话系统"""
@@ -98,6 +135,13 @@ class AIDialogueSystem:
         # 对话历史
         self.conversation_history = []
         
+        # 提示词预算与滚动摘要：conversation_history[:summary_covered] 已经折叠进 summary
+        self.prompt_builder = PromptBuilder()
+        self.summary = ""
+        self.summary_covered = 0
+        self.summary_request_id = None  # 后台摘要请求的编号
+        self.summary_fold_end = 0  # 后台摘要完成后覆盖到的位置
+        
         # 输入相关
         self.input_text = ""
         self.input_active = True
@@ -112,6 +156,9 @@ class AIDialogueSystem:
         
         # 状态
         self.waiting_for_response = False
+        self.request_id = None  # 当前等待的 LLM 请求编号
+        self.stream_text = ""  # 流式接收中的原始回复（含动作标签）
+        self.stream_started = False  # 是否已收到第一段文字
         self.show_exit_hint = True
         self.failure_message = None  # 一次性失败提示
         
@@ -138,6 +185,8 @@ class AIDialogueSystem:
         self.npc_name = npc_name
         self.npc_personality = npc_personality
         self.npc_can_play_football = can_play_football
+        self._cancel_request()
+        self._reset_summary()
         self.conversation_history = []
         self.input_text = ""
         # 根据NPC名字选择专属问候语
@@ -155,6 +204,8 @@ class AIDialogueSystem:
     def end_dialogue(self):
         """结束对话"""
         # 注意：不清空 pending_action，让 game_scene 在下一帧处理
+        self._cancel_request()
+        self._reset_summary()
         self.active = False
         self.conversation_history = []
         self.input_text = ""
@@ -162,6 +213,20 @@ class AIDialogueSystem:
         self.waiting_for_response = False
         self.input_active = True
         
+    def _cancel_request(self):
+        """取消还没收到完整回复的请求（之后收到的该编号事件都会被丢弃；已完成的请求不受影响）"""
+        if self.request_id is not None:
+            self.llm.cancel(self.request_id)
+            self.request_id = None
+        
+    def _reset_summary(self):
+        """清空摘要（取消进行中的后台摘要）"""
+        if self.summary_request_id is not None:
+            self.llm.cancel(self.summary_request_id)
+            self.summary_request_id = None
+        self.summary = ""
+        self.summary_covered = 0
+        
     def set_action_callback(self, callback):
         """设置动作回调函数"""
         self.action_callback = callback
@@ -171,12 +236,24 @@ class AIDialogueSystem:
         if not self.active:
             return
             
-        # 如果正在等待响应，检查队列
-        if self.waiting_for_response:
-            response = self.llm.check_response()
-            if response is not None:
-                print(f"[AI对话] 收到回复: {response}")
-                self._process_response(response)
+        # 如果正在等待响应（或后台摘要），取出这一帧收到的所有回复事件
+        while self.waiting_for_response or self.summary_request_id is not None:
+            event = self.llm.check_response()
+            if event is None:
+                break
+            request_id, kind, text = event
+            if request_id == self.summary_request_id:
+                if kind != 'delta':
+                    self._apply_summary(text if kind == 'done' else None)
+                continue
+            if request_id != self.request_id:
+                print(f"[AI对话] 丢弃过期回复 #{request_id}")
+                continue
+            if kind == 'delta':
+                self._append_stream(text)
+            else:
+                print(f"[AI对话] 收到回复: {text}")
+                self._process_response(text if kind == 'done' else None, text)
                 if not self.active:
                     return
             
@@ -243,6 +320,11 @@ class AIDialogueSystem:
             "content": user_message
         })
         
+        # 后台摘要还没回来时不再等它，需要折叠的旧对话改用本地摘要（玩家的请求优先）
+        if self.summary_request_id is not None:
+            self.llm.cancel(self.summary_request_id)
+            self.summary_request_id = None
+        
         # 清空输入
         self.input_text = ""
         
@@ -251,6 +333,8 @@ class AIDialogueSystem:
         self.response_display_index = 0
         self.waiting_for_response = True
         self.input_active = False
+        self.stream_text = ""
+        self.stream_started = False
         
         # 构建消息
         messages = self._build_messages()
@@ -258,11 +342,13 @@ class AIDialogueSystem:
         # 打印调试信息
         print(f"[AI对话] 发送消息: {user_message}")
         
-        # 异步请求 AI（使用队列方式）
-        self.llm.chat_async(messages, None)
+        # 异步请求 AI（流式，增量文字经队列送回；相同 NPC 的相似对话可能直接命中回复缓存）
+        # 新请求取代还没完成的旧请求
+        self._cancel_request()
+        self.request_id = self.llm.chat_async(messages, None, stream=True, cache_tag=self.npc_name)
         
-    def _build_messages(self):
-        """构建发送给 AI 的消息列表"""
+    def _build_system_prompt(self):
+        """构建 NPC 的人设提示词"""
         # 构建可用动作列表
         available_actions = ""
         if self.npc_can_play_football:
@@ -283,43 +369,104 @@ class AIDialogueSystem:
 3. 可以表达情绪和性格
 4. 不要跳出角色或提及自己是AI
 5. 用中文回复{available_actions}"""
-
-        messages = [{"role": "system", "content": system_prompt}]
+        return system_prompt
         
-        # 添加对话历史（最近10轮）
-        history = self.conversation_history[-20:]  # 最多10轮对话
-        messages.extend(history)
-        
-        return messages
+    def _build_messages(self):
+        """构建发送给 AI 的消息列表"""
+        system_prompt = self._build_system_prompt()
+        
+        # 预算放不下的旧对话先用本地规则折叠进摘要，保证请求长度不随对话变长
+        history = self.conversation_history[self.summary_covered:]
+        start = self.prompt_builder.split(system_prompt, history)
+        if start > 0:
+            self.summary = summarize_locally(self.summary, history[:start], self.npc_name,
+                                             self.prompt_builder.summary_budget)
+            self.summary_covered += start
+            history = history[start:]
             
-    def _process_response(self, response):
-        """在主线程中处理响应"""
-        if response == "(AI not enabled)" or response.startswith("(Error:"):
-            self.failure_message = "LLM失败，已切换预设回复"
-            print(f"[AI对话] 检测到失败响应，准备降级: {response}")
-            self.end_dialogue()
+        return self.prompt_builder.build(system_prompt, history, self.summary)
+        
+    def _request_summary(self):
+        """
+        回复完成后、玩家打字时，如果没折叠的对话已经用掉一半预算，
+        请 LLM 在后台把较早的部分压缩进摘要（只保留最近几条原文）
+        """
+        if self.summary_request_id is not None or not self.llm.is_available():
+            return
+        fold_end = len(self.conversation_history) - SUMMARY_KEEP_RECENT
+        if fold_end <= self.summary_covered:
+            return
+        pending = self.conversation_history[self.summary_covered:]
+        budget = self.prompt_builder.history_budget(self._build_system_prompt())
+        if estimate_message_tokens(pending) < budget // 2:
             return
+        messages = build_summary_request(self.summary, self.conversation_history[self.summary_covered:fold_end],
+                                         self.npc_name)
+        self.summary_fold_end = fold_end
+        self.summary_request_id = self.llm.chat_async(messages, None, max_tokens=SUMMARY_MAX_TOKENS)
+        print(f"[AI对话] 后台压缩前 {fold_end} 条对话")
+        
+    def _apply_summary(self, summary):
+        """
+        后台摘要完成
+        
+        参数:
+            summary: 新摘要，失败时为 None（等需要时再用本地摘要）
+        """
+        self.summary_request_id = None
+        if summary is None or self.summary_fold_end <= self.summary_covered:
+            return
+        self.summary = summary
+        self.summary_covered = self.summary_fold_end
+        print(f"[AI对话] 对话摘要: {summary}")
+            
+    def _append_stream(self, text):
+        """收到一段流式文字：接到 NPC 回复后面，打字机效果从已显示的位置继续"""
+        if not self.stream_started:
+            # 第一段文字到达，替换“正在思考...”
+            self.stream_started = True
+            self.response_display_index = 0
+        self.stream_text += text
+        display_text, _ = split_action_tags(self.stream_text, final=False)
+        self.npc_response = display_text.lstrip()
+            
+    def _process_response(self, response, error=None):
+        """
+        在主线程中处理完整回复
+        
+        参数:
+            response: 完整回复，失败时为 None
+            error: 失败时的错误提示
+        """
+        if response is None:
+            if not self.stream_started:
+                self.failure_message = "LLM失败，已切换预设回复"
+                print(f"[AI对话] 检测到失败响应，准备降级: {error}")
+                self.end_dialogue()
+                return
+            # 已经显示了一部分回复，保留已收到的内容
+            print(f"[AI对话] 回复中断，保留已收到的部分: {error}")
+            response = self.stream_text
 
         # 检查是否包含动作指令
-        action = None
-        display_response = response
-        
-        if '[动作:踢足球]' in response:
-            action = 'play_football'
-            display_response = response.replace('[动作:踢足球]', '').strip()
-            self.pending_action = action
-            print(f"[AI对话] 检测到动作指令: {action}")
+        display_response, actions = split_action_tags(response)
+        display_response = display_response.strip()
+        if actions:
+            self.pending_action = actions[0]
+            print(f"[AI对话] 检测到动作指令: {self.pending_action}")
         
         self.npc_response = display_response
-        self.response_display_index = 0
+        if not self.stream_started:
+            self.response_display_index = 0
         self.waiting_for_response = False
         self.input_active = True
         
-        # 添加到对话历史（保存原始响应）
+        # 添加到对话历史（保存去掉动作标签的回复）
         self.conversation_history.append({
             "role": "assistant",
             "content": display_response
         })
+        self._request_summary()
 
     def consume_failure_message(self):
         """获取失败提示（一次性）"""
@@ -1,8 +1,20 @@
 # -*- coding: utf-8 -*-
 """
 碰撞检测模块
+包含通用的矩形碰撞工具，以及各地图共用的位集碰撞网格服务：
+每张地图在启动时转换成位集网格，玩家/NPC 的 AABB 查询只需几次整数位运算；
+池塘、圆顶拱门等不规则形状可以附加逐像素掩码。
+移动解算器 sweep_aabb 把实体的 AABB 沿位移扫掠一次，得到最远的无碰撞位置和接触法线
 """
 
+import math
+from config import TILE_SIZE
+from src.map.campus_map import (
+    COLLISION_MAP, TUNNEL_COLLISION_MAP, WEST_COLLISION_MAP, LIBRARY_COLLISION_MAP,
+    CAMPUS_MAP, TILE_WATER, TILE_DOME_ARCH,
+    POND_CENTER_X, POND_CENTER_Y, POND_RADIUS_X, POND_RADIUS_Y
+)
+
 
 class CollisionSystem:
     """碰撞检测系统"""
@@ -42,3 +54,323 @@ class CollisionSystem:
         rect1 = (entity1.x, entity1.y, entity1.width, entity1.height)
         rect2 = (entity2.x, entity2.y, entity2.width, entity2.height)
         return CollisionSystem.rect_collision(rect1, rect2)
+
+
+# 网格中每个瓦片的状态
+TILE_OPEN = 0     # 可通行
+TILE_SOLID = 1    # 整格阻挡
+TILE_MASKED = 2   # 按逐像素掩码判断
+
+
+def _span_bits(start, end):
+    """第 start 到第 end 位（含）为 1 的位掩码"""
+    return ((2 << (end - start)) - 1) << start
+
+
+class CollisionGrid:
+    """
+    位集碰撞网格
+
+    tiles 是按行展开的 bytearray，记录每个瓦片的状态；
+    另外每行瓦片各存两个整数位掩码（第 i 位对应第 i 列）：
+    整格阻挡的瓦片和带像素掩码的瓦片。AABB 查询时每行只需一次与运算，
+    只有碰到带掩码的瓦片时才逐像素检查。地图外视为阻挡。
+    """
+
+    def __init__(self, collision_map, tile_size=TILE_SIZE):
+        """
+        初始化网格
+
+        参数:
+            collision_map: 二维碰撞地图（1 表示阻挡）
+            tile_size: 瓦片边长（像素）
+        """
+        self.tile_size = tile_size
+        self.width = len(collision_map[0])
+        self.height = len(collision_map)
+        self.tiles = bytearray(self.width * self.height)
+        self.solid_rows = [0] * self.height
+        self.masked_rows = [0] * self.height
+        self.pixel_masks = {}  # (tile_x, tile_y) -> 每行一个整数的像素掩码
+
+        for tile_y, row in enumerate(collision_map):
+            for tile_x, value in enumerate(row):
+                if value == 1:
+                    self._set_state(tile_x, tile_y, TILE_SOLID)
+
+    def _set_state(self, tile_x, tile_y, state):
+        """设置瓦片状态并同步行位掩码"""
+        bit = 1 << tile_x
+        self.tiles[tile_y * self.width + tile_x] = state
+        self.solid_rows[tile_y] &= ~bit
+        self.masked_rows[tile_y] &= ~bit
+        if state == TILE_SOLID:
+            self.solid_rows[tile_y] |= bit
+        elif state == TILE_MASKED:
+            self.masked_rows[tile_y] |= bit
+
+    def set_pixel_mask(self, tile_x, tile_y, mask_rows):
+        """
+        给瓦片设置逐像素掩码
+
+        参数:
+            tile_x, tile_y: 瓦片坐标
+            mask_rows: tile_size 个整数，第 i 位为 1 表示该行第 i 个像素阻挡
+        """
+        full = _span_bits(0, self.tile_size - 1)
+        self.pixel_masks.pop((tile_x, tile_y), None)
+        if not any(mask_rows):
+            self._set_state(tile_x, tile_y, TILE_OPEN)
+        elif all(row == full for row in mask_rows):
+            self._set_state(tile_x, tile_y, TILE_SOLID)
+        else:
+            self.pixel_masks[(tile_x, tile_y)] = list(mask_rows)
+            self._set_state(tile_x, tile_y, TILE_MASKED)
+
+    def set_shape_mask(self, tiles, inside):
+        """
+        用形状函数生成瓦片的像素掩码
+
+        参数:
+            tiles: 要设置的瓦片坐标列表 [(tile_x, tile_y), ...]
+            inside: 形状函数 inside(像素中心x, 像素中心y)，返回该像素是否阻挡（世界坐标）
+        """
+        size = self.tile_size
+        for tile_x, tile_y in tiles:
+            base_x = tile_x * size + 0.5
+            base_y = tile_y * size + 0.5
+            mask_rows = []
+            for py in range(size):
+                bits = 0
+                for px in range(size):
+                    if inside(base_x + px, base_y + py):
+                        bits |= 1 << px
+                mask_rows.append(bits)
+            self.set_pixel_mask(tile_x, tile_y, mask_rows)
+
+    def is_blocked(self, x, y, width, height):
+        """矩形 (x, y, width, height) 是否与阻挡区域重叠"""
+        size = self.tile_size
+        left = int(x // size)
+        right = int((x + width - 1) // size)
+        top = int(y // size)
+        bottom = int((y + height - 1) // size)
+        if left < 0 or top < 0 or right >= self.width or bottom >= self.height:
+            return True
+
+        span = _span_bits(left, right)
+        for tile_y in range(top, bottom + 1):
+            if self.solid_rows[tile_y] & span:
+                return True
+            masked = self.masked_rows[tile_y] & span
+            if masked and self._hits_pixel_masks(masked, tile_y, x, y, width, height):
+                return True
+        return False
+
+    def _hits_pixel_masks(self, masked, tile_y, x, y, width, height):
+        """检查矩形是否碰到一行中带掩码瓦片的阻挡像素"""
+        size = self.tile_size
+        pixel_left = math.floor(x)
+        pixel_right = math.floor(x + width - 1)
+        row_top = max(math.floor(y) - tile_y * size, 0)
+        row_bottom = min(math.floor(y + height - 1) - tile_y * size, size - 1)
+
+        while masked:
+            bit = masked & -masked
+            masked ^= bit
+            tile_x = bit.bit_length() - 1
+            column_left = max(pixel_left - tile_x * size, 0)
+            column_right = min(pixel_right - tile_x * size, size - 1)
+            columns = _span_bits(column_left, column_right)
+            mask_rows = self.pixel_masks[(tile_x, tile_y)]
+            for row in range(row_top, row_bottom + 1):
+                if mask_rows[row] & columns:
+                    return True
+        return False
+
+
+def _never_blocked(x, y, width, height):
+    """没有碰撞网格的地图：处处可通行"""
+    return False
+
+
+class CollisionService:
+    """
+    碰撞网格服务
+
+    按地图名称（east、tunnel、west、library）保存碰撞网格，
+    切换地图时通过 checker() 取出绑定好的检测函数，查询时不再按地图分派。
+    """
+
+    def __init__(self):
+        """初始化服务并构建所有地图的碰撞网格"""
+        self.grids = {}
+        self.register('east', self._build_east_grid())
+        self.register('tunnel', CollisionGrid(TUNNEL_COLLISION_MAP))
+        self.register('west', CollisionGrid(WEST_COLLISION_MAP))
+        self.register('library', CollisionGrid(LIBRARY_COLLISION_MAP))
+
+    def register(self, map_name, grid):
+        """注册（或替换）一张地图的碰撞网格"""
+        self.grids[map_name] = grid
+
+    def get_grid(self, map_name):
+        """获取地图的碰撞网格，没有时返回 None"""
+        return self.grids.get(map_name)
+
+    def checker(self, map_name):
+        """
+        获取绑定到指定地图的碰撞检测函数
+
+        返回:
+            function: checker(x, y, width, height)，返回是否碰撞
+        """
+        grid = self.grids.get(map_name)
+        return grid.is_blocked if grid else _never_blocked
+
+    def _build_east_grid(self):
+        """东校区网格：椭圆形池塘和圆顶拱门使用逐像素掩码"""
+        grid = CollisionGrid(COLLISION_MAP)
+
+        # 池塘只有椭圆内部阻挡，水池瓦片四角露出的草地可以走
+        water_tiles = [(x, y) for y, row in enumerate(CAMPUS_MAP)
+                       for x, tile in enumerate(row) if tile == TILE_WATER]
+
+        def in_pond(px, py):
+            dx = (px - POND_CENTER_X) / POND_RADIUS_X
+            dy = (py - POND_CENTER_Y) / POND_RADIUS_Y
+            return dx * dx + dy * dy <= 1
+
+        grid.set_shape_mask(water_tiles, in_pond)
+
+        # 圆顶拱门只有门洞可以进入：连续几格拱门组成一个门洞，只有最外两侧的门框阻挡
+        # （与拱门瓦片的绘制一致），门洞内部整段都可以通过
+        arch_tiles = [(x, y) for y, row in enumerate(CAMPUS_MAP)
+                      for x, tile in enumerate(row) if tile == TILE_DOME_ARCH]
+        arch_set = set(arch_tiles)
+        size = grid.tile_size
+
+        def in_arch_frame(px, py):
+            tx, ty = px // size, py // size
+            local_x = px % size
+            if local_x < 3:
+                return (tx - 1, ty) not in arch_set
+            if local_x >= 13:
+                return (tx + 1, ty) not in arch_set
+            return False
+
+        grid.set_shape_mask(arch_tiles, in_arch_frame)
+        return grid
+
+
+def bounds_checker(min_x, min_y, max_x, max_y):
+    """
+    生成矩形区域的碰撞检测函数：矩形完全位于区域内才不算碰撞
+
+    参数:
+        min_x, min_y, max_x, max_y: 区域边界（像素，max 为开区间）
+
+    返回:
+        function: checker(x, y, width, height)
+    """
+    def checker(x, y, width, height):
+        return (x < min_x or y < min_y or
+                x + width - 1 >= max_x or y + height - 1 >= max_y)
+    return checker
+
+
+class MoveResult:
+    """移动解算结果"""
+
+    def __init__(self, x, y, normal_x=0, normal_y=0):
+        """
+        初始化结果
+
+        参数:
+            x, y: 解算后的位置
+            normal_x, normal_y: 接触法线（-1/0/1，0 表示该方向没有碰到障碍）
+        """
+        self.x = x
+        self.y = y
+        self.normal_x = normal_x
+        self.normal_y = normal_y
+
+    @property
+    def blocked(self):
+        """是否碰到了障碍"""
+        return self.normal_x != 0 or self.normal_y != 0
+
+
+def _sweep_axis(checker, x, y, width, height, delta, horizontal):
+    """
+    沿单个轴扫掠，返回 (该轴到达的坐标, 法线)
+
+    先检查起点到终点的整个扫掠区域，无碰撞时直接到达终点；
+    否则从前沿开始逐列（逐行）找到第一条阻挡的像素线，停在它前面
+    """
+    if horizontal:
+        pos, size = x, width
+        blocked = checker(min(x, x + delta), y, width + abs(delta), height)
+    else:
+        pos, size = y, height
+        blocked = checker(x, min(y, y + delta), width, height + abs(delta))
+    if not blocked:
+        return pos + delta, 0
+
+    if delta > 0:
+        lines = range(math.floor(pos + size - 1) + 1, math.floor(pos + delta + size - 1) + 1)
+    else:
+        lines = range(math.floor(pos) - 1, math.floor(pos + delta) - 1, -1)
+
+    for line in lines:
+        if horizontal:
+            hit = checker(line, y, 1, height)
+        else:
+            hit = checker(x, line, width, 1)
+        if hit:
+            if delta > 0:
+                return max(pos, line - size), -1
+            return min(pos, line + 1), 1
+    # 阻挡只来自实体当前占据的区域（例如出生在障碍里），允许移出
+    return pos + delta, 0
+
+
+def sweep_aabb(checker, x, y, width, height, dx, dy):
+    """
+    移动解算：把矩形沿位移 (dx, dy) 扫掠，返回最远的无碰撞位置和接触法线
+
+    整段位移（含对角线）的扫掠区域无碰撞时只需一次查询；
+    有碰撞时先解 X 轴再解 Y 轴，贴着障碍停下，另一个轴继续滑动。
+    每条像素线都会检查，高速移动时也不会穿过拐角。
+
+    参数:
+        checker: 碰撞检测函数 checker(x, y, width, height)
+        x, y, width, height: 实体的碰撞矩形
+        dx, dy: 本帧位移
+
+    返回:
+        MoveResult: 解算后的位置和接触法线
+    """
+    if dx == 0 and dy == 0:
+        return MoveResult(x, y)
+    if not checker(min(x, x + dx), min(y, y + dy), width + abs(dx), height + abs(dy)):
+        return MoveResult(x + dx, y + dy)
+
+    normal_x = normal_y = 0
+    if dx != 0:
+        x, normal_x = _sweep_axis(checker, x, y, width, height, dx, True)
+    if dy != 0:
+        y, normal_y = _sweep_axis(checker, x, y, width, height, dy, False)
+    return MoveResult(x, y, normal_x, normal_y)
+
+
+# 全局单例
+_collision_service = None
+
+
+def get_collision_service():
+    """获取全局碰撞网格服务"""
+    global _collision_service
+    if _collision_service is None:
+        _collision_service = CollisionService()
+    return _collision_service
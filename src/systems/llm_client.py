@@ -1,13 +1,26 @@
 # -*- coding: utf-8 -*-
 """
 LLM 客户端模块
-用于与大语言模型 API 通信
+用于与大语言模型 API 通信。
+请求由常驻的工作线程从有界队列中取出执行（不再每条消息新建线程），
+同一个 API 地址复用 HTTP keep-alive 连接，SSL 上下文只创建一次，
+除第一轮外每轮对话都省掉 TCP/TLS 握手。
+流式请求（stream: true）在工作线程里解析 SSE 数据块，每段增量文字一到就放入回复队列，
+主线程可以边收边显示；统计的主要指标是首字延迟。
+每个异步请求有一个编号，回复事件都带着编号，对话系统只认自己最新发出的那一个；
+对话结束时按编号取消请求：还在排队的直接跳过，正在进行的关闭其 socket 立即中止
 """
 
 import os
+import socket
 import threading
 import queue
 import json
+import time
+import http.client
+import urllib.parse
+import urllib.request
+from src.systems.response_cache import ResponseCache
 
 try:
     from dotenv import load_dotenv
@@ -19,6 +32,175 @@ except ModuleNotFoundError:
 # 加载环境变量
 load_dotenv()
 
+# 工作线程数（对话是一问一答，一个线程就够；同时有多路请求时可以调大）
+LLM_WORKER_COUNT = 1
+# 待处理请求队列的容量，满了时新请求直接返回失败（对话降级为预设回复）
+LLM_QUEUE_SIZE = 4
+# 请求超时（秒）
+LLM_TIMEOUT = 30
+# NPC 对话回复缓存的持久化文件（None 表示只缓存在内存中）
+RESPONSE_CACHE_PATH = os.path.join("saves", "dialogue_cache.json")
+
+
+class LLMHTTPError(Exception):
+    """API 返回了错误状态码"""
+
+    def __init__(self, status, reason, body=""):
+        super().__init__(f"HTTP Error {status}: {reason}")
+        self.status = status
+        self.body = body
+
+
+class LLMCancelled(Exception):
+    """请求已被取消"""
+
+
+class _LLMRequest:
+    """一个异步请求的取消令牌：记录编号和正在使用的连接，取消时关闭其 socket"""
+
+    def __init__(self, request_id):
+        """
+        初始化请求令牌
+
+        参数:
+            request_id: 请求编号
+        """
+        self.id = request_id
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn):
+        """请求开始使用连接（已取消时抛出 LLMCancelled）"""
+        with self._lock:
+            if self.cancelled:
+                raise LLMCancelled()
+            self._conn = conn
+
+    def detach(self):
+        """请求不再使用连接"""
+        with self._lock:
+            self._conn = None
+
+    def cancel(self):
+        """取消请求：正在收发的连接直接断开，阻塞在读写上的工作线程随即返回"""
+        with self._lock:
+            self.cancelled = True
+            conn, self._conn = self._conn, None
+        sock = conn.sock if conn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _iter_sse_data(response):
+    """逐个产出 SSE（server-sent events）事件的 data 字段（多行 data 以换行连接）"""
+    data_lines = []
+    while True:
+        line = response.readline()
+        if not line:
+            break
+        line = line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            # 空行表示一个事件结束
+            if data_lines:
+                yield '\n'.join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(':'):
+            continue  # 注释（心跳）
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data_lines.append(value[1:] if value.startswith(' ') else value)
+    if data_lines:
+        yield '\n'.join(data_lines)
+
+
+class _ConnectionPool:
+    """
+    按主机复用的 HTTP(S) 连接池
+
+    每个 (协议, 主机, 端口) 保留空闲的 keep-alive 连接，SSL 上下文全局只创建一次。
+    和 urllib 一样遵守 HTTP(S)_PROXY / NO_PROXY 环境变量（HTTPS 经代理时用 CONNECT 隧道）
+    """
+
+    def __init__(self, timeout=LLM_TIMEOUT):
+        """
+        初始化连接池
+
+        参数:
+            timeout: 连接和读取超时（秒）
+        """
+        self.timeout = timeout
+        self._idle = {}  # (协议, 主机, 端口) -> [空闲连接, ...]
+        self._lock = threading.Lock()
+        self._ssl_context = None
+
+        # 统计（调试用）
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    def _get_ssl_context(self):
+        """SSL 上下文（首次使用时创建，之后复用）"""
+        if self._ssl_context is None:
+            import ssl
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def acquire(self, scheme, host, port):
+        """
+        取一个连接（优先复用空闲连接）
+
+        返回:
+            (连接, 是否复用)
+        """
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.connections_reused += 1
+                return idle.pop(), True
+            self.connections_opened += 1
+        return self._connect(scheme, host, port), False
+
+    def release(self, scheme, host, port, conn):
+        """请求完成后归还连接，留给下一轮复用"""
+        with self._lock:
+            self._idle.setdefault((scheme, host, port), []).append(conn)
+
+    def _connect(self, scheme, host, port):
+        """新建连接（还没有握手，第一次请求时才真正连接）；absolute_url 表示请求行要用完整 URL"""
+        proxy = None
+        if not urllib.request.proxy_bypass(host):
+            proxy = urllib.request.getproxies().get(scheme)
+        if proxy:
+            proxy_url = urllib.parse.urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+            proxy_host, proxy_port = proxy_url.hostname, proxy_url.port or 80
+        if scheme == 'https':
+            if proxy:
+                conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=self.timeout,
+                                                   context=self._get_ssl_context())
+                conn.set_tunnel(host, port)
+            else:
+                conn = http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                                   context=self._get_ssl_context())
+        elif proxy:
+            conn = http.client.HTTPConnection(proxy_host, proxy_port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        conn.absolute_url = scheme == 'http' and bool(proxy)  # 经 HTTP 代理的明文请求
+        return conn
+
+    def close_all(self):
+        """关闭所有空闲连接（切换 API 地址或退出时）"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
 
 class LLMClient:
     """大语言模型客户端"""
@@ -30,10 +212,30 @@ class LLMClient:
         self.base_url = env_config['base_url']
         self.model = env_config['model']
         self.available = False
+        self._pool = _ConnectionPool()
         self._init_client()
         
-        # 用于异步通信的队列
+        # 用于异步通信的队列：待处理请求（有界）和回复
+        self.job_queue = queue.Queue(maxsize=LLM_QUEUE_SIZE)
         self.response_queue = queue.Queue()
+        self._workers = []
+        
+        # 未完成的异步请求：编号 -> 取消令牌
+        self._requests = {}
+        self._next_request_id = 1
+        self._requests_lock = threading.Lock()
+        
+        # NPC 对话回复缓存（命中时不发请求）
+        self.cache = ResponseCache(path=RESPONSE_CACHE_PATH)
+        
+        # 统计（调试用）：首字延迟从请求入队算到第一段文字到达
+        self.request_count = 0
+        self.rejected_count = 0
+        self.cancelled_count = 0
+        self.last_latency = 0.0
+        self.last_first_char = 0.0
+        self.first_char_total = 0.0
+        self.first_char_count = 0
 
     def read_env_config(self):
         """读取 .env 中的 LLM 配置"""
@@ -48,6 +250,7 @@ class LLMClient:
         self.api_key = (api_key or '').strip()
         self.base_url = (base_url or '').strip()
         self.model = (model or '').strip()
+        self._pool.close_all()  # API 地址可能变了，旧连接不再复用
         self._init_client()
 
     def disable(self):
@@ -77,76 +280,323 @@ class LLMClient:
         
     def chat(self, messages, max_tokens=150):
         """
-        发送对话请求 - 使用 urllib 直接发送 HTTP 请求
+        发送对话请求（阻塞），失败时返回 "(Error: ...)" 形式的文字
         """
         if not self.available:
             return "(AI not enabled)"
             
         try:
-            import urllib.request
-            import ssl
-            
-            print(f"[LLM] 正在发送请求到 {self.model}...")
+            return self._complete(messages, max_tokens)
+        except Exception as e:
+            error_msg = str(e)
+            print(f"[LLM] 请求失败: {error_msg}")
+            return f"(Error: {error_msg[:40]})"
+    
+    def _complete(self, messages, max_tokens, on_delta=None, request=None):
+        """
+        发送对话请求并返回完整回复（失败时抛出异常，被取消时抛出 LLMCancelled）
+        
+        参数:
+            messages: 消息列表
+            max_tokens: 最大回复长度
+            on_delta: 流式回调 on_delta(增量文字)，None 表示不用流式
+            request: 取消令牌，None 表示不可取消
+        """
+        print(f"[LLM] 正在发送请求到 {self.model}...")
+        
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.7
+        }
+        if on_delta is not None:
+            data["stream"] = True
+        
+        start = time.perf_counter()
+        if on_delta is not None:
+            content = self._post('/chat/completions', data,
+                                 lambda response: self._read_stream(response, on_delta), request)
+        else:
+            result = json.loads(self._post('/chat/completions', data, None, request).decode('utf-8'))
+            content = result['choices'][0]['message']['content']
+        content = content.strip()
+        self.last_latency = time.perf_counter() - start
+        self.request_count += 1
+        print(f"[LLM] 请求成功（{self.last_latency * 1000:.0f}ms），回复: {content}")
+        return content
+    
+    def _read_stream(self, response, on_delta):
+        """读取流式响应，每段增量文字调用 on_delta，返回完整文字"""
+        if 'text/event-stream' not in response.getheader('Content-Type', ''):
+            # 服务器不支持流式时会直接返回完整结果
+            result = json.loads(response.read().decode('utf-8'))
+            content = result['choices'][0]['message']['content']
+            on_delta(content)
+            return content
             
-            url = f"{self.base_url}/chat/completions"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+        parts = []
+        for data in _iter_sse_data(response):
+            if data == '[DONE]':
+                break
+            chunk = json.loads(data)
+            choices = chunk.get('choices') or []
+            if not choices:
+                continue
+            text = (choices[0].get('delta') or {}).get('content')
+            if text:
+                parts.append(text)
+                on_delta(text)
+        return ''.join(parts)
+    
+    def _post(self, endpoint, data, read_body=None, request=None):
+        """
+        用连接池中的 keep-alive 连接发送 POST 请求
+        
+        复用的连接可能已被服务器关闭，这时换一个新连接重试一次。
+        请求被取消时连接已被断开，不再归还连接池
+        
+        参数:
+            endpoint: API 路径（接在 base_url 之后）
+            data: 请求体（JSON）
+            read_body: 读取响应的函数 read_body(response)，None 表示读出全部字节
+            request: 取消令牌，None 表示不可取消
+        
+        返回:
+            read_body 的返回值
+        """
+        url = urllib.parse.urlsplit(self.base_url)
+        scheme = url.scheme or 'https'
+        host = url.hostname
+        port = url.port or (443 if scheme == 'https' else 80)
+        path = url.path.rstrip('/') + endpoint
+        body = json.dumps(data).encode('utf-8')
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+            "Connection": "keep-alive",
+        }
+        if data.get("stream"):
+            headers["Accept"] = "text/event-stream"
+        
+        for attempt in range(2):
+            conn, reused = self._pool.acquire(scheme, host, port)
+            target = f"{scheme}://{url.netloc}{path}" if conn.absolute_url else path
+            try:
+                if request is not None:
+                    request.attach(conn)
+                conn.request('POST', target, body, headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                    ConnectionResetError, BrokenPipeError):
+                conn.close()
+                self._check_cancelled(request)
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                self._check_cancelled(request)
+                raise
             
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            }
+            try:
+                if response.status >= 400 or read_body is None:
+                    result = response.read()
+                else:
+                    result = read_body(response)
+                    response.read()  # 读完剩余内容（如 [DONE] 之后），连接才能复用
+            except Exception:
+                conn.close()
+                self._check_cancelled(request)
+                raise
+            if request is not None:
+                request.detach()
+                if request.cancelled:
+                    # socket 被断开后读到的只是部分内容
+                    conn.close()
+                    raise LLMCancelled()
+            if response.will_close:
+                conn.close()
+            else:
+                self._pool.release(scheme, host, port, conn)
+            if response.status >= 400:
+                raise LLMHTTPError(response.status, response.reason,
+                                   result.decode('utf-8', 'replace'))
+            return result
             
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(data).encode('utf-8'),
-                headers=headers,
-                method='POST'
-            )
+    @staticmethod
+    def _check_cancelled(request):
+        """请求已被取消时抛出 LLMCancelled（取消导致的连接错误不再按普通失败处理）"""
+        if request is not None and request.cancelled:
+            raise LLMCancelled()
             
-            # 创建 SSL 上下文
-            ctx = ssl.create_default_context()
+    def chat_async(self, messages, callback=None, max_tokens=150, stream=False, cache_tag=None):
+        """
+        异步发送对话请求：放入请求队列，由常驻工作线程执行
+        
+        结果以事件的形式放入回复队列，主线程用 check_response 取回：
+            (编号, 'delta', 增量文字)  流式请求每收到一段文字
+            (编号, 'done', 完整回复)   请求完成
+            (编号, 'error', 错误提示)  请求失败（"(AI not enabled)" 或 "(Error: ...)"）
+        被取消的请求不再产生事件（取消前已放入队列的除外，调用方按编号丢弃）
+        
+        参数:
+            messages: 消息列表
+            callback: 保留参数（结果统一通过 check_response 在主线程取回）
+            max_tokens: 最大回复长度
+            stream: 是否流式接收
+            cache_tag: 回复缓存的标签（NPC 名称），None 表示不使用缓存
+        
+        返回:
+            int: 请求编号（用于 cancel 和识别回复事件）
+        """
+        queued_at = time.perf_counter()
+        with self._requests_lock:
+            request = _LLMRequest(self._next_request_id)
+            self._next_request_id += 1
             
-            with urllib.request.urlopen(req, timeout=30, context=ctx) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                content = result['choices'][0]['message']['content'].strip()
-                print(f"[LLM] 请求成功，回复: {content}")
-                return content
+        cache_key = None
+        if cache_tag is not None and self.available:
+            cache_key = self.cache.make_key(cache_tag, messages)
+            reply = self.cache.get(cache_key)
+            if reply is not None:
+                print(f"[LLM] 命中回复缓存: {reply}")
+                if stream:
+                    self.response_queue.put((request.id, 'delta', reply))
+                self._record_first_char(queued_at)
+                self.response_queue.put((request.id, 'done', reply))
+                return request.id
                 
-        except Exception as e:
-            error_msg = str(e)
-            print(f"[LLM] 请求失败: {error_msg}")
-            return f"(Error: {error_msg[:40]})"
-            
-    def chat_async(self, messages, callback, max_tokens=150):
+        self._ensure_workers()
+        with self._requests_lock:
+            self._requests[request.id] = request
+        try:
+            self.job_queue.put_nowait((request, messages, max_tokens, stream, queued_at, cache_key))
+        except queue.Full:
+            self._finish_request(request)
+            self.rejected_count += 1
+            print("[LLM] 请求队列已满，丢弃本次请求")
+            self.response_queue.put((request.id, 'error', "(Error: 请求队列已满)"))
+        return request.id
+        
+    def cancel(self, request_id):
         """
-        异步发送对话请求
+        取消请求：还在排队的不再发送，正在进行的立即断开连接
+        
+        参数:
+            request_id: chat_async 返回的请求编号
+        
+        返回:
+            bool: 请求是否还未完成（已完成或不存在时返回 False）
         """
-        def _request():
-            print("[LLM] 异步线程开始执行...")
+        with self._requests_lock:
+            request = self._requests.pop(request_id, None)
+        if request is None:
+            return False
+        request.cancel()
+        self.cancelled_count += 1
+        print(f"[LLM] 已取消请求 #{request_id}")
+        return True
+        
+    def _finish_request(self, request):
+        """请求结束，不再可以取消"""
+        with self._requests_lock:
+            self._requests.pop(request.id, None)
+            
+    def _emit(self, request, kind, text):
+        """放入一个回复事件（请求已被取消时丢弃）"""
+        if not request.cancelled:
+            self.response_queue.put((request.id, kind, text))
+            
+    def _ensure_workers(self):
+        """启动工作线程（首次请求时）"""
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < LLM_WORKER_COUNT:
+            worker = threading.Thread(target=self._worker_loop, name="llm-worker", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+            print("[LLM] 工作线程已启动")
+            
+    def _worker_loop(self):
+        """工作线程：依次处理请求队列中的请求"""
+        while True:
+            job = self.job_queue.get()
+            if job is None:
+                break
+            request, messages, max_tokens, stream, queued_at, cache_key = job
+            if request.cancelled:
+                continue  # 排队期间已被取消
+            if not self.available:
+                self._finish_request(request)
+                self._emit(request, 'error', "(AI not enabled)")
+                continue
+            on_delta = self._make_delta_handler(request, queued_at) if stream else None
+            start = time.perf_counter()
             try:
-                result = self.chat(messages, max_tokens)
-                print(f"[LLM] 异步线程完成")
-                self.response_queue.put(result)
+                result = self._complete(messages, max_tokens, on_delta, request)
+            except LLMCancelled:
+                print(f"[LLM] 请求 #{request.id} 已中止")
+                continue
             except Exception as e:
-                print(f"[LLM] 异步线程异常: {e}")
-                self.response_queue.put(f"(Error: {str(e)[:40]})")
+                self._finish_request(request)
+                print(f"[LLM] 请求失败: {e}")
+                self._emit(request, 'error', f"(Error: {str(e)[:40]})")
+                continue
+            self._finish_request(request)
+            if not stream:
+                self._record_first_char(queued_at)
+            self._emit(request, 'done', result)
+            if cache_key is not None and result:
+                self.cache.put(cache_key, result, time.perf_counter() - start)
             
-        thread = threading.Thread(target=_request)
-        thread.daemon = True
-        thread.start()
-        print("[LLM] 异步线程已启动")
+    def _make_delta_handler(self, request, queued_at):
+        """流式请求的增量回调：把增量文字放入回复队列，记录首字延迟"""
+        first = [True]
+        
+        def on_delta(text):
+            if request.cancelled:
+                raise LLMCancelled()
+            if first[0]:
+                first[0] = False
+                self._record_first_char(queued_at)
+            self._emit(request, 'delta', text)
+        return on_delta
+        
+    def _record_first_char(self, queued_at):
+        """记录首字延迟（从请求入队到第一段文字可以显示）"""
+        self.last_first_char = time.perf_counter() - queued_at
+        self.first_char_total += self.last_first_char
+        self.first_char_count += 1
+            
+    def shutdown(self):
+        """取消未完成的请求，停止工作线程并关闭空闲连接"""
+        with self._requests_lock:
+            pending = list(self._requests)
+        for request_id in pending:
+            self.cancel(request_id)
+        for _ in self._workers:
+            self.job_queue.put(None)
+        self._workers = []
+        self._pool.close_all()
         
     def check_response(self):
-        """检查是否有响应可用（非阻塞）"""
+        """取出一个回复事件 (编号, 类型, 文字)（非阻塞，没有时返回 None）"""
         try:
             return self.response_queue.get_nowait()
         except queue.Empty:
             return None
+            
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        pool = self._pool
+        average = self.first_char_total / self.first_char_count if self.first_char_count else 0
+        return [
+            f"first char: {self.last_first_char * 1000:.0f}ms avg {average * 1000:.0f}ms",
+            f"requests: {self.request_count} total: {self.last_latency * 1000:.0f}ms",
+            f"conns: {pool.connections_opened} new {pool.connections_reused} reused",
+            f"workers: {len(self._workers)} queued: {self.job_queue.qsize()} rejected: {self.rejected_count}",
+            f"in flight: {len(self._requests)} cancelled: {self.cancelled_count}",
+        ]
 
 
 # 全局 LLM 客户端实例
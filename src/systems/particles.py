@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+粒子系统
+雨、雪、樱花花瓣、进球彩带等效果共用的粒子发射器。
+每个发射器有一个固定容量的粒子池，状态按字段存放在 array.array 连续数组里，
+存活的粒子始终排在数组前部（粒子死亡时与最后一个存活粒子交换），运行中不分配新对象。
+发射器参数（生成速率、速度、寿命、颜色、形状）在创建时给出，
+绘制时同一发射器的粒子按形状一次性画完。
+容量可以在运行时按密度整体调整（设置菜单的“粒子”选项）
+"""
+
+from array import array
+import random
+import pyxel
+
+
+def _zeros(typecode, count):
+    """长度为 count 的全零数组"""
+    return array(typecode, bytes(array(typecode).itemsize * count))
+
+
+class ParticleEmitter:
+    """
+    粒子发射器（带固定容量的粒子池）
+
+    三种生成方式：
+        rate=None    持续填满：粒子死亡后立即在生成区域重生（天气）
+        rate>0       每帧按速率生成（小数部分累积到下一帧）
+        rate=0       只在 emit() 时成批生成（进球彩带）
+    """
+
+    SHAPES = ('pixel', 'streak', 'flake', 'confetti')
+
+    def __init__(self, name, capacity, shape, colors, velocity, lifetime=None, rate=0,
+                 gravity=0.0, sway=0.0, size=(1, 1), area=None, prefill_area=None,
+                 bounds=None, wrap_x=False, screen_space=False):
+        """
+        初始化粒子发射器
+
+        参数:
+            name: 发射器名称
+            capacity: 粒子池容量（密度为 1 时）
+            shape: 粒子形状 'pixel'（1-2 像素点）/'streak'（斜线，雨）/'flake'（十字，雪）/'confetti'（2x2 方块）
+            colors: 颜色列表，生成时随机选取
+            velocity: ((vx最小, vx最大), (vy最小, vy最大))，像素/帧
+            lifetime: (最短, 最长) 寿命帧数，None 表示不会老死
+            rate: 每帧生成数（见类说明）
+            gravity: 每帧加到 vy 上的加速度
+            sway: 每帧 x 方向的随机飘动幅度
+            size: (最小, 最大) 粒子尺寸
+            area: 生成区域 (x, y, w, h)
+            prefill_area: 预热时的生成区域（默认同 area）
+            bounds: 存活范围 (x, y, w, h)，越界的粒子死亡；None 表示不限
+            wrap_x: 横向越界时从另一侧绕回，而不是死亡
+            screen_space: 坐标是屏幕坐标（不随相机移动），否则是世界坐标
+        """
+        if shape not in self.SHAPES:
+            raise ValueError(f"未知的粒子形状: {shape}")
+        self.name = name
+        self.base_capacity = capacity
+        self.shape = shape
+        self.colors = tuple(colors)
+        self.velocity = velocity
+        self.lifetime = lifetime
+        self.rate = rate
+        self.gravity = gravity
+        self.sway = sway
+        self.size = size
+        self.area = area if area is not None else (0, 0, 0, 0)
+        self.prefill_area = prefill_area if prefill_area is not None else self.area
+        self.bounds = bounds
+        self.wrap_x = wrap_x
+        self.screen_space = screen_space
+
+        self.capacity = 0
+        self.count = 0  # 存活粒子数（占用数组的前 count 个位置）
+        self._spawn_credit = 0.0
+
+        # 统计（调试用）
+        self.spawned = 0
+        self.dropped = 0  # 池满时丢弃的生成请求
+
+        self.set_capacity(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def set_capacity(self, capacity):
+        """调整粒子池容量（保留能放下的存活粒子，持续填满的发射器随即补满）"""
+        capacity = max(0, int(capacity))
+        keep = min(self.count, capacity)
+        columns = {}
+        for name, typecode in (('x', 'f'), ('y', 'f'), ('vx', 'f'), ('vy', 'f'),
+                               ('life', 'h'), ('color', 'b'), ('psize', 'b')):
+            column = _zeros(typecode, capacity)
+            if keep:
+                column[:keep] = getattr(self, name)[:keep]
+            columns[name] = column
+        self.x, self.y = columns['x'], columns['y']
+        self.vx, self.vy = columns['vx'], columns['vy']
+        self.life, self.color, self.psize = columns['life'], columns['color'], columns['psize']
+        self.capacity = capacity
+        self.count = keep
+        if self.rate is None:
+            self._fill(self.area)
+
+    def reset(self):
+        """清空并预热：持续填满的发射器铺满预热区域，按速率生成的发射器直接进入稳定状态"""
+        self.count = 0
+        self._spawn_credit = 0.0
+        if self.rate is None:
+            self._fill(self.prefill_area)
+        elif self.rate > 0 and self.lifetime is not None:
+            # 稳定时的粒子数约为 速率 x 平均寿命，寿命随机取，模拟已经飘了一段时间
+            steady = int(self.rate * (self.lifetime[0] + self.lifetime[1]) / 2)
+            for _ in range(min(steady, self.capacity)):
+                index = self._spawn(self.prefill_area)
+                self.life[index] = random.randint(1, self.lifetime[1])
+
+    def _fill(self, area):
+        """生成粒子直到池满"""
+        while self.count < self.capacity:
+            self._spawn(area)
+
+    def _spawn(self, area, x=None, y=None):
+        """在区域内（或给定位置）生成一个粒子，返回下标；池满时返回 -1"""
+        if self.count >= self.capacity:
+            self.dropped += 1
+            return -1
+        i = self.count
+        self.count += 1
+        self.spawned += 1
+        self._init_particle(i, area, x, y)
+        return i
+
+    def _init_particle(self, i, area, x=None, y=None):
+        """初始化下标 i 处的粒子"""
+        uniform = random.uniform
+        left, top, width, height = area
+        self.x[i] = x if x is not None else random.randint(int(left), int(left + width))
+        self.y[i] = y if y is not None else random.randint(int(top), int(top + height))
+        (vx_min, vx_max), (vy_min, vy_max) = self.velocity
+        self.vx[i] = uniform(vx_min, vx_max)
+        self.vy[i] = uniform(vy_min, vy_max)
+        self.life[i] = random.randint(*self.lifetime) if self.lifetime else -1
+        self.color[i] = random.choice(self.colors)
+        self.psize[i] = random.randint(*self.size)
+
+    def emit(self, count, x=None, y=None):
+        """
+        立即生成 count 个粒子（池满时多出的丢弃）
+
+        参数:
+            count: 粒子数
+            x, y: 生成位置，None 表示在生成区域内随机
+        """
+        accepted = min(count, self.capacity - self.count)
+        self.dropped += count - accepted
+        for _ in range(accepted):
+            self._spawn(self.area, x, y)
+
+    def update(self):
+        """推进一帧：按速率生成、移动、回收死亡粒子"""
+        if self.rate:
+            self._spawn_credit += self.rate
+            while self._spawn_credit >= 1:
+                self._spawn_credit -= 1
+                self._spawn(self.area)
+
+        xs, ys, vxs, vys, lives = self.x, self.y, self.vx, self.vy, self.life
+        gravity, sway, wrap_x, refill = self.gravity, self.sway, self.wrap_x, self.rate is None
+        uniform = random.uniform
+        if self.bounds is not None:
+            left, top, width, height = self.bounds
+            right, bottom = left + width, top + height
+        else:
+            left = top = float('-inf')
+            right = bottom = float('inf')
+
+        i = 0
+        while i < self.count:
+            if gravity:
+                vys[i] += gravity
+            x = xs[i] + vxs[i]
+            y = ys[i] + vys[i]
+            if sway:
+                x += uniform(-sway, sway)
+            if wrap_x:
+                if x < left:
+                    x = right
+                elif x > right:
+                    x = left
+            xs[i] = x
+            ys[i] = y
+
+            dead = y > bottom or y < top or (not wrap_x and (x < left or x > right))
+            if lives[i] > 0:
+                lives[i] -= 1
+                dead = dead or lives[i] == 0
+            if not dead:
+                i += 1
+            elif refill:
+                self._init_particle(i, self.area)
+                self.spawned += 1
+                i += 1
+            else:
+                self._kill(i)
+
+    def _kill(self, i):
+        """回收下标 i 处的粒子（与最后一个存活粒子交换）"""
+        last = self.count - 1
+        if i != last:
+            for column in (self.x, self.y, self.vx, self.vy, self.life, self.color, self.psize):
+                column[i] = column[last]
+        self.count = last
+
+    def draw(self, camera_x=0, camera_y=0, clip_height=None):
+        """
+        绘制所有存活粒子
+
+        参数:
+            camera_x, camera_y: 相机偏移（屏幕坐标的发射器忽略）
+            clip_height: 只绘制屏幕 y 在 [0, clip_height) 内的粒子（None 表示不裁剪）
+        """
+        if not self.count:
+            return
+        if self.screen_space:
+            camera_x = camera_y = 0
+        elif self.bounds is not None:
+            # 存活范围不在屏幕上时整体跳过
+            left, top, width, height = self.bounds
+            if (left + width < camera_x or left > camera_x + pyxel.width or
+                    top + height < camera_y or top > camera_y + pyxel.height):
+                return
+
+        count = self.count
+        xs, ys = self.x[:count], self.y[:count]
+        colors, sizes = self.color[:count], self.psize[:count]
+        limit = clip_height if clip_height is not None else 1 << 30
+        pset = pyxel.pset
+        shape = self.shape
+
+        if shape == 'streak':
+            line = pyxel.line
+            for x, y, color in zip(xs, ys, colors):
+                x, y = int(x - camera_x), int(y - camera_y)
+                if 0 <= y < limit:
+                    line(x, y, x + 1, y + 4, color)
+        elif shape == 'flake':
+            for x, y, color, size in zip(xs, ys, colors, sizes):
+                x, y = int(x - camera_x), int(y - camera_y)
+                if 0 <= y < limit:
+                    pset(x, y, color)
+                    if size > 1:
+                        pset(x + 1, y, color)
+                        pset(x, y + 1, color)
+                    if size > 2:
+                        pset(x - 1, y, color)
+                        pset(x, y - 1, color)
+        elif shape == 'confetti':
+            rect = pyxel.rect
+            for x, y, color, size in zip(xs, ys, colors, sizes):
+                rect(int(x - camera_x), int(y - camera_y), size, size, color)
+        else:
+            for x, y, color, size in zip(xs, ys, colors, sizes):
+                x, y = int(x - camera_x), int(y - camera_y)
+                pset(x, y, color)
+                if size > 1:
+                    pset(x + 1, y, color)
+
+    def bytes_per_entity(self):
+        """每个粒子占用的字节数"""
+        return sum(column.itemsize for column in
+                   (self.x, self.y, self.vx, self.vy, self.life, self.color, self.psize))
+
+    def get_debug_line(self):
+        """调试浮层显示的统计行"""
+        return f"{self.name}: {self.count}/{self.capacity} dropped: {self.dropped}"
+
+
+class ParticleSystem:
+    """所有粒子发射器的登记表，统一调整密度、汇总统计"""
+
+    # 设置菜单的粒子密度档位
+    DENSITY_LEVELS = [('低', 0.5), ('中', 1.0), ('高', 2.0)]
+
+    def __init__(self):
+        """初始化粒子系统"""
+        self.emitters = {}
+        self.density = 1.0
+
+    def add(self, emitter):
+        """登记发射器（按当前密度设置容量并预热），返回发射器本身"""
+        self.emitters[emitter.name] = emitter
+        emitter.set_capacity(emitter.base_capacity * self.density)
+        emitter.reset()
+        return emitter
+
+    def get(self, name):
+        """按名称取发射器（未登记时返回 None）"""
+        return self.emitters.get(name)
+
+    def set_density(self, density):
+        """按密度调整所有发射器的容量（1.0 为默认容量）"""
+        self.density = density
+        for emitter in self.emitters.values():
+            emitter.set_capacity(emitter.base_capacity * density)
+        print(f"[粒子] 密度 x{density}")
+
+    def set_capacity(self, name, capacity):
+        """单独调整某个发射器的容量"""
+        emitter = self.emitters.get(name)
+        if emitter is not None:
+            emitter.set_capacity(capacity)
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        total = sum(emitter.count for emitter in self.emitters.values())
+        lines = [f"particles: {total} density: x{self.density}"]
+        lines.extend(emitter.get_debug_line() for emitter in self.emitters.values())
+        return lines
+
+
+# 全局粒子系统
+_particle_system = None
+
+
+def get_particle_system():
+    """获取全局粒子系统"""
+    global _particle_system
+    if _particle_system is None:
+        _particle_system = ParticleSystem()
+    return _particle_system
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+寻路系统
+在碰撞网格上为 NPC 寻路，避免直线走向目标时卡在建筑上。
+常用目的地（操场、每个 NPC 的原位）预先算好流场，任意位置查一次就知道下一步往哪走；
+临时目标用 A* 寻路，结果按目标缓存，沿途每个瓦片都能直接查到下一步。
+缓存只在地图的碰撞网格改变时失效；每帧的搜索量有预算，
+同一帧很多 NPC 同时寻路时超出预算的请求顺延到下一帧（这一帧先直线移动）
+"""
+
+import heapq
+from collections import OrderedDict
+from config import TILE_SIZE
+from src.systems.collision import get_collision_service
+
+
+# 每帧允许展开的寻路节点数（所有地图共用）
+PATH_BUDGET_PER_FRAME = 1500
+
+# 每张地图缓存 A* 路径的目标数（超出时淘汰最久未用的）
+PATH_CACHE_SIZE = 64
+
+# 八个方向及代价（直走 10，斜走 14）
+_NEIGHBORS = [
+    (1, 0, 10), (-1, 0, 10), (0, 1, 10), (0, -1, 10),
+    (1, 1, 14), (1, -1, 14), (-1, 1, 14), (-1, -1, 14),
+]
+
+_UNREACHABLE = -1
+
+
+class PathFinder:
+    """
+    单张地图的寻路器
+
+    瓦片可通行的条件是寻路对象的碰撞框放在瓦片正中时不碰撞；
+    斜着走时两侧相邻的瓦片都必须可通行（不切墙角）。
+    坐标参数都是寻路对象碰撞框中心的像素坐标。
+    """
+
+    def __init__(self, map_name, service, agent_width=10, agent_height=12):
+        """
+        初始化寻路器
+
+        参数:
+            map_name: 地图名称（从碰撞网格服务取网格）
+            service: 所属的寻路服务（共用每帧预算）
+            agent_width, agent_height: 寻路对象碰撞框的尺寸
+        """
+        self.map_name = map_name
+        self.service = service
+        self.agent_width = agent_width
+        self.agent_height = agent_height
+        self.destinations = {}   # 目的地名称 -> 瓦片矩形 (x, y, 宽, 高)
+        self.flow_fields = {}    # 目的地名称 -> 每个瓦片到目的地的距离
+        self.path_cache = OrderedDict()  # 目标瓦片 -> {瓦片: 下一步瓦片}
+        self.grid = None
+        self._bind(get_collision_service().get_grid(map_name))
+
+        # 统计（调试用）
+        self.flow_hits = 0
+        self.path_hits = 0
+        self.path_searches = 0
+        self.deferred = 0
+
+    def _bind(self, grid):
+        """绑定碰撞网格：重新计算可通行瓦片，丢弃所有流场和路径缓存"""
+        self.grid = grid
+        self.width = grid.width
+        self.height = grid.height
+        size = grid.tile_size
+        offset_x = (size - self.agent_width) / 2
+        offset_y = (size - self.agent_height) / 2
+        self.passable = bytearray(
+            0 if grid.is_blocked(tile_x * size + offset_x, tile_y * size + offset_y,
+                                 self.agent_width, self.agent_height) else 1
+            for tile_y in range(self.height) for tile_x in range(self.width))
+        self.flow_fields.clear()
+        self.path_cache.clear()
+
+    def _is_passable(self, tile_x, tile_y):
+        """瓦片是否可通行（地图外不可通行）"""
+        return (0 <= tile_x < self.width and 0 <= tile_y < self.height and
+                self.passable[tile_y * self.width + tile_x] == 1)
+
+    def _steps(self, tile_x, tile_y):
+        """从瓦片出发可以走到的相邻瓦片 (x, y, 代价)"""
+        for dx, dy, cost in _NEIGHBORS:
+            next_x, next_y = tile_x + dx, tile_y + dy
+            if not self._is_passable(next_x, next_y):
+                continue
+            if dx and dy and not (self._is_passable(tile_x + dx, tile_y) and
+                                  self._is_passable(tile_x, tile_y + dy)):
+                continue
+            yield next_x, next_y, cost
+
+    def add_destination(self, name, tile_rect):
+        """
+        登记常用目的地（使用流场寻路）
+
+        参数:
+            name: 目的地名称
+            tile_rect: 目的地瓦片矩形 (x, y, 宽, 高)，走进矩形即视为到达
+        """
+        self.destinations[name] = tile_rect
+        self.flow_fields.pop(name, None)
+
+    def warm(self):
+        """预先计算所有常用目的地的流场（不计入每帧预算，加载时调用）"""
+        for name in self.destinations:
+            if name not in self.flow_fields:
+                self.flow_fields[name] = self._build_flow_field(self.destinations[name])
+
+    def next_waypoint(self, x, y, target_x, target_y, destination=None):
+        """
+        获取下一步要走向的位置
+
+        参数:
+            x, y: 当前位置（碰撞框中心）
+            target_x, target_y: 目标位置（碰撞框中心）
+            destination: 常用目的地名称（可选），在目的地外时按流场走
+
+        返回:
+            tuple: 下一个瓦片中心的像素坐标；可以直线走向目标
+                （同一瓦片、直线畅通、无法到达或本帧预算用完）时返回 None
+        """
+        # 地图的碰撞网格被替换后缓存全部失效
+        grid = get_collision_service().get_grid(self.map_name)
+        if grid is not self.grid:
+            self._bind(grid)
+
+        size = TILE_SIZE
+        start = (int(x // size), int(y // size))
+
+        if destination is not None and destination in self.destinations:
+            left, top, width, height = self.destinations[destination]
+            if not (left <= start[0] < left + width and top <= start[1] < top + height):
+                step = self._flow_step(destination, start)
+                if step is not None:
+                    return self._tile_center(step)
+                return None
+
+        goal = (int(target_x // size), int(target_y // size))
+        if start == goal or self._clear_line(start, goal):
+            return None
+        step = self._path_step(start, goal)
+        if step is None:
+            return None
+        return self._tile_center(step)
+
+    def _tile_center(self, tile):
+        """瓦片中心的像素坐标"""
+        return (tile[0] * TILE_SIZE + TILE_SIZE / 2, tile[1] * TILE_SIZE + TILE_SIZE / 2)
+
+    # ---------- 流场 ----------
+
+    def _build_flow_field(self, tile_rect):
+        """从目的地矩形出发做 Dijkstra，返回每个瓦片到目的地的距离"""
+        distances = [_UNREACHABLE] * (self.width * self.height)
+        left, top, width, height = tile_rect
+        queue = []
+        for tile_y in range(top, top + height):
+            for tile_x in range(left, left + width):
+                if self._is_passable(tile_x, tile_y):
+                    distances[tile_y * self.width + tile_x] = 0
+                    queue.append((0, tile_x, tile_y))
+        heapq.heapify(queue)
+
+        expanded = 0
+        while queue:
+            distance, tile_x, tile_y = heapq.heappop(queue)
+            if distance > distances[tile_y * self.width + tile_x]:
+                continue
+            expanded += 1
+            # 八方向移动是对称的，从目的地往外扩展得到的就是走到目的地的距离
+            for next_x, next_y, cost in self._steps(tile_x, tile_y):
+                index = next_y * self.width + next_x
+                new_distance = distance + cost
+                if distances[index] == _UNREACHABLE or new_distance < distances[index]:
+                    distances[index] = new_distance
+                    heapq.heappush(queue, (new_distance, next_x, next_y))
+        self.service.spend(expanded)
+        return distances
+
+    def _flow_step(self, name, start):
+        """按流场从 start 走一步，返回下一个瓦片（流场未就绪或无法到达时返回 None）"""
+        field = self.flow_fields.get(name)
+        if field is None:
+            if not self.service.has_budget():
+                self.deferred += 1
+                return None
+            field = self.flow_fields[name] = self._build_flow_field(self.destinations[name])
+        self.flow_hits += 1
+
+        tile_x, tile_y = start
+        if self._is_passable(tile_x, tile_y):
+            best = field[tile_y * self.width + tile_x]
+            if best == _UNREACHABLE:
+                return None
+            neighbors = self._steps(tile_x, tile_y)
+        else:
+            # 站在不可通行的瓦片上（如被挤进池塘边缘），走向任意相邻的可通行瓦片
+            best = None
+            neighbors = ((tile_x + dx, tile_y + dy, cost) for dx, dy, cost in _NEIGHBORS
+                         if self._is_passable(tile_x + dx, tile_y + dy))
+
+        step = None
+        for next_x, next_y, _ in neighbors:
+            distance = field[next_y * self.width + next_x]
+            if distance != _UNREACHABLE and (best is None or distance < best):
+                best = distance
+                step = (next_x, next_y)
+        return step
+
+    # ---------- A* ----------
+
+    def _clear_line(self, start, goal):
+        """两个瓦片之间的直线经过的瓦片是否都可通行"""
+        (x0, y0), (x1, y1) = start, goal
+        steps = max(abs(x1 - x0), abs(y1 - y0))
+        for i in range(1, steps + 1):
+            t = i / steps
+            if not self._is_passable(round(x0 + (x1 - x0) * t), round(y0 + (y1 - y0) * t)):
+                return False
+        return True
+
+    def _path_step(self, start, goal):
+        """按缓存的 A* 路径走一步，缓存中没有时搜索（本帧预算用完时返回 None）"""
+        steps = self.path_cache.get(goal)
+        if steps is not None:
+            self.path_cache.move_to_end(goal)
+            if start in steps:
+                self.path_hits += 1
+                return steps[start]
+
+        if not self.service.has_budget():
+            self.deferred += 1
+            return None
+        path = self._search(start, goal)
+        if not path:
+            return None
+
+        if steps is None:
+            steps = self.path_cache[goal] = {}
+            if len(self.path_cache) > PATH_CACHE_SIZE:
+                self.path_cache.popitem(last=False)
+        # 路径上每个瓦片的下一步都记下来，沿路径走时不用再搜索
+        for tile, next_tile in zip(path, path[1:]):
+            steps[tile] = next_tile
+        return path[1]
+
+    def _search(self, start, goal):
+        """A* 搜索，返回从 start 到 goal 的瓦片列表（无法到达时返回 None）"""
+        if not self._is_passable(*goal):
+            return None
+        self.path_searches += 1
+        goal_x, goal_y = goal
+
+        def heuristic(tile_x, tile_y):
+            dx = abs(tile_x - goal_x)
+            dy = abs(tile_y - goal_y)
+            return 10 * max(dx, dy) + 4 * min(dx, dy)
+
+        costs = {start: 0}
+        came_from = {start: None}
+        queue = [(heuristic(*start), 0, start)]
+        expanded = 0
+        limit = self.width * self.height
+        while queue and expanded < limit:
+            _, cost, tile = heapq.heappop(queue)
+            if cost > costs[tile]:
+                continue
+            if tile == goal:
+                break
+            expanded += 1
+            if self._is_passable(*tile):
+                neighbors = self._steps(*tile)
+            else:
+                # 起点可能不可通行（被挤进障碍边缘），允许从这里走出去
+                neighbors = ((tile[0] + dx, tile[1] + dy, step_cost) for dx, dy, step_cost in _NEIGHBORS
+                             if self._is_passable(tile[0] + dx, tile[1] + dy))
+            for next_x, next_y, step_cost in neighbors:
+                next_tile = (next_x, next_y)
+                new_cost = cost + step_cost
+                if next_tile not in costs or new_cost < costs[next_tile]:
+                    costs[next_tile] = new_cost
+                    came_from[next_tile] = tile
+                    heapq.heappush(queue, (new_cost + heuristic(next_x, next_y), new_cost, next_tile))
+        self.service.spend(expanded)
+
+        if goal not in came_from:
+            return None
+        path = []
+        tile = goal
+        while tile is not None:
+            path.append(tile)
+            tile = came_from[tile]
+        path.reverse()
+        return path
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        return [
+            f"flow: {len(self.flow_fields)}/{len(self.destinations)} hits: {self.flow_hits}",
+            f"a*: {self.path_searches} cached: {len(self.path_cache)} hits: {self.path_hits}",
+            f"deferred: {self.deferred}",
+        ]
+
+
+class PathfindingService:
+    """
+    寻路服务
+
+    按地图名称保存寻路器，所有地图共用每帧的搜索预算。
+    地图的碰撞网格被替换（CollisionService.register）后，寻路器下次查询时自动丢弃缓存。
+    """
+
+    def __init__(self, budget_per_frame=PATH_BUDGET_PER_FRAME):
+        """
+        初始化服务
+
+        参数:
+            budget_per_frame: 每帧允许展开的寻路节点数
+        """
+        self.budget_per_frame = budget_per_frame
+        self.budget = budget_per_frame
+        self.finders = {}  # 地图名称 -> PathFinder
+
+    def get_pathfinder(self, map_name):
+        """获取地图的寻路器（地图没有碰撞网格时返回 None）"""
+        if get_collision_service().get_grid(map_name) is None:
+            return None
+        finder = self.finders.get(map_name)
+        if finder is None:
+            finder = self.finders[map_name] = PathFinder(map_name, self)
+        return finder
+
+    def invalidate(self, map_name=None):
+        """丢弃地图（默认全部）的流场和路径缓存，常用目的地保留"""
+        for name, finder in self.finders.items():
+            if map_name is None or name == map_name:
+                finder._bind(get_collision_service().get_grid(name))
+
+    def begin_frame(self):
+        """每帧开始时重置搜索预算"""
+        self.budget = self.budget_per_frame
+
+    def has_budget(self):
+        """本帧是否还能发起搜索"""
+        return self.budget > 0
+
+    def spend(self, expanded):
+        """记录一次搜索展开的节点数"""
+        self.budget -= expanded
+
+
+# 全局单例
+_pathfinding_service = None
+
+
+def get_pathfinding_service():
+    """获取全局寻路服务"""
+    global _pathfinding_service
+    if _pathfinding_service is None:
+        _pathfinding_service = PathfindingService()
+    return _pathfinding_service
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+提示词组装模块
+按 token 预算组装发送给 LLM 的消息：人设提示词 + 对话摘要 + 放得下的最近几轮对话。
+更早的对话折叠进一段滚动摘要里，平时由 LLM 在后台（回复完成、玩家还在打字时）压缩，
+来不及或 LLM 失败时用本地规则截取要点，保证每轮请求的长度（也就是延迟和费用）不随对话变长。
+token 数是估算值：中日韩文字每字约 1 个 token，拉丁字母单词每 4 个字母约 1 个 token
+"""
+
+import re
+
+# 每次请求的提示词预算（token，不含回复）
+PROMPT_TOKEN_BUDGET = 700
+# 摘要的预算（token）
+SUMMARY_TOKEN_BUDGET = 120
+# 每条消息的格式开销（角色标记等）
+MESSAGE_OVERHEAD = 4
+# 后台摘要时保留原文的最近消息条数
+SUMMARY_KEEP_RECENT = 4
+# 后台摘要请求的最大回复长度
+SUMMARY_MAX_TOKENS = 100
+# 本地摘要中每条消息保留的字数
+LOCAL_SUMMARY_CLIP = 16
+# 摘要接在人设提示词后面时的标题
+SUMMARY_HEADER = "\n\n之前聊过的内容（摘要）："
+
+_CJK = '\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef'
+_TOKEN_PATTERN = re.compile(f'([{_CJK}])|([^\\W{_CJK}]+)|(\\S)')
+
+
+def estimate_tokens(text):
+    """
+    估算一段文字的 token 数
+
+    中日韩文字和全角标点每个算 1 个，拉丁字母/数字组成的单词每 4 个字符算 1 个，
+    其他符号每个算 1 个，空白不计
+    """
+    tokens = 0
+    for cjk, word, symbol in _TOKEN_PATTERN.findall(text):
+        if word:
+            tokens += (len(word) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
+
+def estimate_message_tokens(messages):
+    """估算消息列表的 token 数（含每条消息的格式开销）"""
+    return sum(estimate_tokens(m['content']) + MESSAGE_OVERHEAD for m in messages)
+
+
+def clip_to_tokens(text, budget, keep_end=False):
+    """
+    把文字截到不超过 budget 个 token
+
+    参数:
+        text: 原文
+        budget: token 预算
+        keep_end: 保留末尾（丢掉开头），否则保留开头
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    budget -= 1  # 省略号
+    low, high = 0, len(text)
+    # 二分查找能保留的最多字数
+    while low < high:
+        middle = (low + high + 1) // 2
+        part = text[-middle:] if keep_end else text[:middle]
+        if estimate_tokens(part) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    if not low:
+        return ""
+    return "…" + text[-low:] if keep_end else text[:low] + "…"
+
+
+def _speaker(message, npc_name):
+    """对话记录中的说话人"""
+    return "玩家" if message['role'] == 'user' else npc_name
+
+
+def summarize_locally(summary, messages, npc_name, budget=SUMMARY_TOKEN_BUDGET):
+    """
+    本地摘要：每条消息只留开头几个字，接在原摘要后面，超出预算时丢掉最早的内容
+
+    参数:
+        summary: 原摘要
+        messages: 要折叠进摘要的消息
+        npc_name: NPC 名称
+        budget: 摘要的 token 预算
+    """
+    parts = [summary] if summary else []
+    for message in messages:
+        content = message['content'].strip().replace('\n', ' ')
+        if len(content) > LOCAL_SUMMARY_CLIP:
+            content = content[:LOCAL_SUMMARY_CLIP] + "…"
+        parts.append(f"{_speaker(message, npc_name)}：{content}")
+    return clip_to_tokens("；".join(parts), budget, keep_end=True)
+
+
+def build_summary_request(summary, messages, npc_name):
+    """
+    构建让 LLM 压缩对话的请求消息
+
+    参数:
+        summary: 原摘要
+        messages: 要折叠进摘要的消息
+        npc_name: NPC 名称
+    """
+    transcript = "\n".join(f"{_speaker(m, npc_name)}：{m['content']}" for m in messages)
+    return [
+        {"role": "system", "content": "你负责整理游戏对话记录。把已有摘要和新的对话合并成一段不超过60字的中文摘要，"
+                                      "保留玩家透露的信息、双方的约定和正在聊的话题。只输出摘要本身。"},
+        {"role": "user", "content": f"已有摘要：{summary or '（无）'}\n新的对话：\n{transcript}"},
+    ]
+
+
+class PromptBuilder:
+    """按 token 预算组装提示词"""
+
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+        """
+        初始化提示词组装器
+
+        参数:
+            budget: 每次请求的提示词预算（token）
+            summary_budget: 摘要的预算（token），组装时始终为摘要预留
+        """
+        self.budget = budget
+        self.summary_budget = summary_budget
+
+        # 统计（调试用）
+        self.last_tokens = 0
+        self.last_history = 0
+        self.last_summary_tokens = 0
+
+    def history_budget(self, system_prompt):
+        """扣除人设提示词和摘要预留之后，留给对话原文的预算"""
+        fixed = (estimate_tokens(system_prompt) + MESSAGE_OVERHEAD +
+                 estimate_tokens(SUMMARY_HEADER) + self.summary_budget)
+        return max(0, self.budget - fixed)
+
+    def split(self, system_prompt, history):
+        """
+        找出预算内能放下的最近对话
+
+        至少保留最后一条消息；保留部分不以 NPC 的回复开头（那一条折叠进摘要）
+
+        返回:
+            int: 保留部分在 history 中的起始下标（之前的需要折叠进摘要）
+        """
+        remaining = self.history_budget(system_prompt)
+        start = len(history)
+        while start > 0:
+            cost = estimate_tokens(history[start - 1]['content']) + MESSAGE_OVERHEAD
+            if cost > remaining and start < len(history):
+                break
+            remaining -= cost
+            start -= 1
+        while start < len(history) - 1 and history[start]['role'] != 'user':
+            start += 1
+        return start
+
+    def build(self, system_prompt, history, summary=""):
+        """
+        组装消息列表（history 应该已经能放进预算，见 split）
+
+        参数:
+            system_prompt: 人设提示词
+            history: 保留原文的对话
+            summary: 更早对话的摘要
+        """
+        if summary:
+            summary = clip_to_tokens(summary, self.summary_budget, keep_end=True)
+            system_prompt = system_prompt + SUMMARY_HEADER + summary
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(history)
+        self.last_tokens = estimate_message_tokens(messages)
+        self.last_history = len(history)
+        self.last_summary_tokens = estimate_tokens(summary)
+        return messages
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        return [
+            f"prompt: ~{self.last_tokens}/{self.budget} tokens",
+            f"history: {self.last_history} msgs summary: ~{self.last_summary_tokens} tokens",
+        ]
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+NPC 对话回复缓存
+玩家经常用几乎一样的开场白（“你好”、“hi”）跟 NPC 打招呼，每次都要走一遍又慢又花钱的 LLM 请求。
+这里按 NPC 名称 + 人设提示词哈希 + 最近几轮对话（归一化后）缓存回复：
+内存中按最近最少使用（LRU）淘汰，可选地持久化到 saves/ 目录。
+为了不让回复显得千篇一律，每个键先攒够几条不同的回复才开始命中，命中时随机挑一条，
+并且有一定概率跳过缓存重新请求来刷新；条目超过有效期（TTL）后作废
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import unicodedata
+
+
+def normalize_text(text):
+    """
+    归一化一句话：全角转半角、转小写，去掉标点、空白和符号
+
+    “你好！”、“ 你好~ ”、“你好”归一化后相同；只有标点的句子保留原文
+    """
+    text = unicodedata.normalize('NFKC', text).lower().strip()
+    normalized = ''.join(ch for ch in text if unicodedata.category(ch)[0] not in 'PZSC')
+    return normalized or text
+
+
+class ResponseCache:
+    """NPC 对话回复缓存（线程安全，查询在主线程，写入在 LLM 工作线程）"""
+
+    def __init__(self, capacity=256, ttl=3 * 24 * 3600, history_messages=2, samples=3,
+                 refresh_rate=0.25, path=None):
+        """
+        初始化回复缓存
+
+        参数:
+            capacity: 内存中最多保留的键数（超出时淘汰最久未用的）
+            ttl: 条目有效期（秒）
+            history_messages: 键中包含的最近消息条数（玩家和 NPC 的发言都算）
+            samples: 每个键攒够这么多条不同回复后才开始命中
+            refresh_rate: 命中时仍然跳过缓存、重新请求的概率
+            path: 持久化文件路径（None 表示只在内存中缓存）
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.history_messages = history_messages
+        self.samples = samples
+        self.refresh_rate = refresh_rate
+        self.path = path
+        self.entries = OrderedDict()  # 键 -> {'replies': [...], 'created': 时间, 'latency': 秒, 'last': 上次给出的回复}
+        self._lock = threading.Lock()
+
+        # 统计（调试用）
+        self.lookups = 0
+        self.hits = 0
+        self.saved_seconds = 0.0
+
+        if path:
+            self._load()
+
+    def make_key(self, npc_name, messages):
+        """
+        由 NPC 名称、人设提示词（system 消息）和最近几条对话生成缓存键
+
+        参数:
+            npc_name: NPC 名称
+            messages: 发送给 LLM 的消息列表（第一条为 system 提示词）
+        """
+        system = ''.join(m['content'] for m in messages if m['role'] == 'system')
+        persona = hashlib.sha1(system.encode('utf-8')).hexdigest()[:12]
+        turns = [m for m in messages if m['role'] != 'system'][-self.history_messages:]
+        history = '|'.join(f"{m['role'][0]}:{normalize_text(m['content'])}" for m in turns)
+        return f"{npc_name}|{persona}|{history}"
+
+    def get(self, key):
+        """
+        查询缓存
+
+        返回:
+            str: 缓存的回复；未命中（没有、已过期、样本不够或本次随机刷新）时返回 None
+        """
+        with self._lock:
+            self.lookups += 1
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['created'] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            if len(entry['replies']) < self.samples or random.random() < self.refresh_rate:
+                return None
+            # 随机挑一条，尽量不和上次一样
+            choices = [r for r in entry['replies'] if r != entry.get('last')] or entry['replies']
+            reply = random.choice(choices)
+            entry['last'] = reply
+            self.hits += 1
+            self.saved_seconds += entry['latency']
+            return reply
+
+    def put(self, key, reply, latency):
+        """
+        记录一条 LLM 回复
+
+        参数:
+            key: 缓存键
+            reply: 回复原文
+            latency: 这次请求的耗时（秒），命中时按平均耗时统计节省的时间
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry['created'] > self.ttl:
+                entry = {'replies': [], 'created': time.time(), 'latency': latency, 'last': None}
+                self.entries[key] = entry
+            if reply not in entry['replies']:
+                entry['replies'].append(reply)
+                if len(entry['replies']) > self.samples:
+                    entry['replies'].pop(0)  # 刷新时替换最旧的一条
+            count = len(entry['replies'])
+            entry['latency'] += (latency - entry['latency']) / count
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            snapshot = list(self.entries.items()) if self.path else None
+        if snapshot is not None:
+            self._save(snapshot)
+
+    def clear(self):
+        """清空缓存（包括持久化文件）"""
+        with self._lock:
+            self.entries.clear()
+        if self.path:
+            self._save([])
+
+    def _load(self):
+        """从持久化文件读取（丢弃已过期的条目）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[对话缓存] 读取失败: {e}")
+            return
+        now = time.time()
+        for key, entry in data.get('entries', []):
+            if now - entry['created'] <= self.ttl:
+                entry['last'] = None
+                self.entries[key] = entry
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        print(f"[对话缓存] 读取了 {len(self.entries)} 条缓存")
+
+    def _save(self, items):
+        """写入持久化文件（先写临时文件再替换，避免写到一半的文件）"""
+        data = {
+            'version': 1,
+            'entries': [[key, {'replies': entry['replies'], 'created': entry['created'],
+                               'latency': entry['latency']}] for key, entry in items],
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"[对话缓存] 保存失败: {e}")
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        rate = self.hits / self.lookups * 100 if self.lookups else 0
+        return [
+            f"cache: {len(self.entries)} keys hits: {self.hits}/{self.lookups} ({rate:.0f}%)",
+            f"saved: {self.saved_seconds:.1f}s",
+        ]
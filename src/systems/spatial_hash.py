@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+空间哈希
+把地图按固定大小的格子划分，动态实体（NPC、足球、花朵）按包围盒登记到格子里。
+实体移动时只有跨格才更新登记，交互、踢球、拾取和绘制只查询附近格子里的实体，
+实体数量增加到几百个时每帧开销也不会线性增长
+"""
+
+
+class _Entry:
+    """空间哈希中的一个实体"""
+
+    def __init__(self, key, item, kind, order, cells):
+        self.key = key
+        self.item = item
+        self.kind = kind
+        self.order = order  # 登记顺序，查询结果按它排序，保证与原列表顺序一致
+        self.cells = cells  # 覆盖的格子范围 (左, 上, 右, 下)
+
+
+class SpatialHash:
+    """
+    均匀格子空间哈希
+
+    每个实体用一个可哈希的键登记（实体对象本身，或 ('flower', 下标) 这样的元组），
+    可以附带类别 kind，查询时按类别过滤。
+    """
+
+    def __init__(self, cell_size=32):
+        """
+        初始化空间哈希
+
+        参数:
+            cell_size: 格子边长（像素），一般取最常见查询范围的量级
+        """
+        self.cell_size = cell_size
+        self.cells = {}    # (格子x, 格子y) -> {键: 实体}
+        self.entries = {}  # 键 -> 实体
+        self._next_order = 0
+
+        # 统计（调试用）
+        self.query_count = 0
+        self.candidate_count = 0
+        self.cell_moves = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def _cell_range(self, x, y, width, height):
+        """包围盒覆盖的格子范围"""
+        size = self.cell_size
+        return (int(x // size), int(y // size),
+                int((x + max(width, 1) - 1) // size), int((y + max(height, 1) - 1) // size))
+
+    def _link(self, entry):
+        """把实体登记到它覆盖的格子"""
+        left, top, right, bottom = entry.cells
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket is None:
+                    bucket = self.cells[(cell_x, cell_y)] = {}
+                bucket[entry.key] = entry
+
+    def _unlink(self, entry):
+        """把实体从它覆盖的格子中移除"""
+        left, top, right, bottom = entry.cells
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                bucket = self.cells[(cell_x, cell_y)]
+                del bucket[entry.key]
+                if not bucket:
+                    del self.cells[(cell_x, cell_y)]
+
+    def insert(self, key, item, x, y, width=1, height=1, kind=None):
+        """
+        登记实体（同一个键已登记时先移除）
+
+        参数:
+            key: 实体的键
+            item: 查询时返回的对象
+            x, y, width, height: 包围盒（像素）
+            kind: 类别（可选）
+        """
+        if key in self.entries:
+            self.remove(key)
+        entry = _Entry(key, item, kind, self._next_order,
+                       self._cell_range(x, y, width, height))
+        self._next_order += 1
+        self.entries[key] = entry
+        self._link(entry)
+
+    def move(self, key, x, y, width=1, height=1):
+        """实体移动后更新登记（没有跨格时什么也不做）"""
+        entry = self.entries[key]
+        cells = self._cell_range(x, y, width, height)
+        if cells == entry.cells:
+            return
+        self._unlink(entry)
+        entry.cells = cells
+        self._link(entry)
+        self.cell_moves += 1
+
+    def remove(self, key):
+        """移除实体（未登记时忽略）"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self._unlink(entry)
+
+    def query(self, x, y, width, height, kind=None):
+        """
+        查询与矩形所在格子重叠的实体
+
+        返回的是候选实体（同格但不一定真正相交），调用方再做精确判断。
+
+        参数:
+            x, y, width, height: 查询矩形（像素）
+            kind: 只返回该类别的实体，None 表示全部
+
+        返回:
+            list: 实体对象列表，按登记顺序排列
+        """
+        left, top, right, bottom = self._cell_range(x, y, width, height)
+        found = {}
+        cells = self.cells
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                bucket = cells.get((cell_x, cell_y))
+                if bucket:
+                    for key, entry in bucket.items():
+                        if kind is None or entry.kind == kind:
+                            found[key] = entry
+        self.query_count += 1
+        self.candidate_count += len(found)
+        if len(found) > 1:
+            return [entry.item for entry in sorted(found.values(), key=lambda e: e.order)]
+        return [entry.item for entry in found.values()]
+
+    def query_around(self, center_x, center_y, radius, kind=None):
+        """查询以 (center_x, center_y) 为中心、半边长为 radius 的正方形附近的实体"""
+        return self.query(center_x - radius, center_y - radius, radius * 2, radius * 2, kind)
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        average = self.candidate_count / self.query_count if self.query_count else 0
+        return [
+            f"entries: {len(self.entries)} cells: {len(self.cells)}",
+            f"queries: {self.query_count} avg cand: {average:.1f}",
+            f"cell moves: {self.cell_moves}",
+        ]
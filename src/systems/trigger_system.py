@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+触发区域系统
+入口、出口、施工牌子、书架、道具等区域以数据形式按地图登记（见 campus_map.TRIGGER_ZONE_DATA），
+按瓦片建立索引。只有玩家所在瓦片（或朝向、地图）变化时才重新检测，
+进入/离开区域时触发 enter/exit 事件，按交互键时对所在区域触发 interact 事件。
+冷却也由这里统一处理：暂停期间进入的区域不会触发，玩家换格或转向后再检测
+"""
+
+from config import TILE_SIZE
+
+
+class TriggerZone:
+    """一个触发区域"""
+
+    def __init__(self, name, tiles, on_enter=None, on_exit=None, on_interact=None,
+                 facing=None, once=False, data=None):
+        """
+        初始化触发区域
+
+        参数:
+            name: 区域名称
+            tiles: 区域覆盖的瓦片坐标列表 [(x, y), ...]
+            on_enter, on_exit, on_interact: 进入、离开、交互时触发的事件名
+            facing: 要求玩家朝向（'up'/'down'/'left'/'right'，None 表示不限）
+            once: 是否只触发一次（触发后移除，如可收集道具）
+            data: 原始区域数据，事件处理函数从这里读取附加信息
+        """
+        self.name = name
+        self.tiles = tiles
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.on_interact = on_interact
+        self.facing = facing
+        self.once = once
+        self.data = data if data is not None else {}
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        从区域数据创建触发区域
+
+        区域用 'rect': (瓦片x, 瓦片y, 宽, 高) 或 'tiles': [(x, y), ...] 描述范围
+        """
+        if 'tiles' in data:
+            tiles = list(data['tiles'])
+        else:
+            left, top, width, height = data['rect']
+            tiles = [(x, y) for y in range(top, top + height) for x in range(left, left + width)]
+        return cls(data['name'], tiles, data.get('on_enter'), data.get('on_exit'),
+                   data.get('on_interact'), data.get('facing'), data.get('once', False), data)
+
+
+class TriggerSystem:
+    """
+    按地图、按瓦片索引的触发区域系统
+
+    事件名在区域数据中配置，由游戏场景用 on() 绑定处理函数 handler(zone)。
+    """
+
+    def __init__(self):
+        """初始化触发区域系统"""
+        self.zone_index = {}  # 地图名 -> {(瓦片x, 瓦片y): [区域, ...]}
+        self.zones = {}       # 区域名 -> (地图名, 区域)
+        self.handlers = {}    # 事件名 -> 处理函数
+        self.active = []      # 玩家当前所在、且已触发进入事件的区域
+        self.suspend_frames = 0
+        self._last_key = None
+
+        # 统计（调试用）
+        self.evaluation_count = 0
+        self.event_count = 0
+
+    def load(self, zone_data):
+        """
+        登记区域数据
+
+        参数:
+            zone_data: {地图名: [区域数据, ...]}
+        """
+        for map_name, zones in zone_data.items():
+            for data in zones:
+                self.add_zone(map_name, TriggerZone.from_data(data))
+
+    def add_zone(self, map_name, zone):
+        """登记一个区域"""
+        index = self.zone_index.setdefault(map_name, {})
+        for tile in zone.tiles:
+            index.setdefault(tile, []).append(zone)
+        self.zones[zone.name] = (map_name, zone)
+        self._last_key = None  # 下一帧重新检测
+
+    def remove_zone(self, name):
+        """移除一个区域（未登记时忽略）"""
+        entry = self.zones.pop(name, None)
+        if entry is None:
+            return
+        map_name, zone = entry
+        index = self.zone_index[map_name]
+        for tile in zone.tiles:
+            index[tile].remove(zone)
+            if not index[tile]:
+                del index[tile]
+        self._last_key = None
+
+    def on(self, event, handler):
+        """绑定事件处理函数 handler(zone)"""
+        self.handlers[event] = handler
+
+    def suspend(self, frames):
+        """暂停所有区域的进入事件若干帧（切换地图、离开室内后防止立刻再次触发）"""
+        self.suspend_frames = max(self.suspend_frames, frames)
+
+    def update(self, map_name, x, y, width, height, facing, interact=False):
+        """
+        每帧调用：玩家所在瓦片、朝向或地图变化时才重新检测区域
+
+        参数:
+            map_name: 当前地图
+            x, y, width, height: 玩家包围盒（以中心点所在瓦片为准）
+            facing: 玩家朝向
+            interact: 本帧是否按下交互键
+        """
+        if self.suspend_frames > 0:
+            self.suspend_frames -= 1
+
+        tile_x = int((x + width // 2) // TILE_SIZE)
+        tile_y = int((y + height // 2) // TILE_SIZE)
+        key = (map_name, tile_x, tile_y, facing)
+        if key != self._last_key:
+            self._last_key = key
+            self._evaluate(map_name, tile_x, tile_y, facing)
+
+        if interact:
+            for zone in list(self.active):
+                if zone.on_interact:
+                    self._fire(zone.on_interact, zone)
+
+    def _evaluate(self, map_name, tile_x, tile_y, facing):
+        """检测玩家所在瓦片上的区域，先触发离开事件，再触发进入事件"""
+        self.evaluation_count += 1
+        zones = self.zone_index.get(map_name, {}).get((tile_x, tile_y), ())
+        current = [zone for zone in zones if zone.facing is None or zone.facing == facing]
+
+        for zone in [zone for zone in self.active if zone not in current]:
+            self.active.remove(zone)
+            if zone.on_exit:
+                self._fire(zone.on_exit, zone)
+
+        for zone in current:
+            if zone in self.active:
+                continue
+            # 暂停中（事件处理函数也可能刚切换了地图并暂停）
+            if self.suspend_frames > 0:
+                break
+            self.active.append(zone)
+            if zone.once:
+                self.remove_zone(zone.name)
+            if zone.on_enter:
+                self._fire(zone.on_enter, zone)
+
+    def _fire(self, event, zone):
+        """调用事件处理函数"""
+        handler = self.handlers.get(event)
+        if handler is None:
+            print(f"[触发器] 事件 {event} 未绑定处理函数（区域 {zone.name}）")
+            return
+        self.event_count += 1
+        handler(zone)
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        active = ", ".join(zone.name for zone in self.active) or "-"
+        return [
+            f"zones: {len(self.zones)} evals: {self.evaluation_count} events: {self.event_count}",
+            f"suspend: {self.suspend_frames} active: {active}",
+        ]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+调试信息浮层
+按 F3 切换显示，各系统通过注册的回调提供要显示的统计行
+"""
+
+import pyxel
+from config import COLOR_WHITE
+
+
+class DebugOverlay:
+    """调试信息浮层"""
+
+    LINE_HEIGHT = 8
+
+    def __init__(self, toggle_key=pyxel.KEY_F3):
+        """
+        初始化调试浮层
+
+        参数:
+            toggle_key: 切换显示的按键
+        """
+        self.visible = False
+        self.toggle_key = toggle_key
+        self.providers = []  # [(标题, 回调)]，回调返回字符串列表
+
+    def add_provider(self, title, provider):
+        """
+        注册一组统计信息
+
+        参数:
+            title: 分组标题
+            provider: 无参回调，返回要显示的字符串列表
+        """
+        self.providers.append((title, provider))
+
+    def update(self):
+        """检测切换按键"""
+        if pyxel.btnp(self.toggle_key):
+            self.toggle()
+
+    def toggle(self):
+        """切换显示"""
+        self.visible = not self.visible
+
+    def draw(self, x=4, y=22):
+        """绘制浮层（使用 Pyxel 内置字体，统计行只含 ASCII）"""
+        if not self.visible:
+            return
+
+        lines = []
+        for title, provider in self.providers:
+            lines.append(f"[{title}]")
+            lines.extend(f" {line}" for line in provider())
+        if not lines:
+            return
+
+        width = max(len(line) for line in lines) * 4 + 4
+        height = len(lines) * self.LINE_HEIGHT + 2
+        pyxel.rect(x, y, width, height, 0)
+        pyxel.rectb(x, y, width, height, 5)
+        for i, line in enumerate(lines):
+            pyxel.text(x + 2, y + 2 + i * self.LINE_HEIGHT, line, COLOR_WHITE)
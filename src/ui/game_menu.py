@@ -31,7 +31,7 @@ class GameMenu:
         ]
         
         # 设置选项
-        self.settings_options = ['音量: 开', '天气: 随机', '返回']
+        self.settings_options = ['音量: 开', '天气: 随机', '粒子: 中', '返回']
         self.sound_on = True
         
         # 天气设置
@@ -39,6 +39,11 @@ class GameMenu:
         self.weather_mode_index = 0  # 0=随机
         self.weather_callback = None  # 用于通知游戏场景天气变化
         
+        # 粒子密度设置（档位与 ParticleSystem.DENSITY_LEVELS 对应）
+        self.particle_levels = ['低', '中', '高']
+        self.particle_level_index = 1
+        self.particle_callback = None  # 用于通知游戏场景调整粒子数量
+        
         # 滚动位置（用于长列表）
         self.scroll_offset = 0
         
@@ -171,7 +176,12 @@ class GameMenu:
                 # 通知游戏场景更新天气
                 if self.weather_callback:
                     self.weather_callback(self.weather_mode_index)
-            elif self.selected == 2:  # 返回
+            elif self.selected == 2:  # 粒子密度
+                self.particle_level_index = (self.particle_level_index + 1) % len(self.particle_levels)
+                self.settings_options[2] = '粒子: ' + self.particle_levels[self.particle_level_index]
+                if self.particle_callback:
+                    self.particle_callback(self.particle_level_index)
+            elif self.selected == 3:  # 返回
                 self.current_menu = 'main'
                 self.selected = 0
                 
@@ -310,7 +320,7 @@ class GameMenu:
         
     def _draw_settings(self):
         """绘制设置"""
-        x, y = self._draw_menu_frame("设置", 150, 130)
+        x, y = self._draw_menu_frame("设置", 150, 150)
         
         for i, option in enumerate(self.settings_options):
             opt_y = y + 30 + i * 22
@@ -322,4 +332,4 @@ class GameMenu:
                 
         # 操作提示
         hint = "A/Z:切换  B/X/Esc:返回"
-        draw_text(x + (150 - text_width(hint)) // 2, y + 130 - 16, hint, 13)
+        draw_text(x + (150 - text_width(hint)) // 2, y + 150 - 16, hint, 13)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+全局动画时钟
+所有渲染器共享同一个帧计数，并通过预计算的正弦查找表取代逐元素的 math.sin
+"""
+
+import math
+
+# 正弦查找表：一个周期量化为 SINE_TABLE_SIZE 份
+SINE_TABLE_SIZE = 1024
+_SINE_TABLE = [math.sin(2 * math.pi * i / SINE_TABLE_SIZE) for i in range(SINE_TABLE_SIZE)]
+_TABLE_SCALE = SINE_TABLE_SIZE / (2 * math.pi)
+_QUARTER = SINE_TABLE_SIZE // 4
+
+
+def fast_sin(angle):
+    """查表求正弦"""
+    return _SINE_TABLE[int(angle * _TABLE_SCALE) % SINE_TABLE_SIZE]
+
+
+def fast_cos(angle):
+    """查表求余弦"""
+    return _SINE_TABLE[(int(angle * _TABLE_SCALE) + _QUARTER) % SINE_TABLE_SIZE]
+
+
+class AnimationClock:
+    """全局动画时钟（由当前场景在没有暂停的帧推进，菜单或对话打开时动画停住）"""
+
+    def __init__(self):
+        """初始化时钟"""
+        self.tick = 0
+        # 本帧已计算的分桶偏移（同一帧内多次请求时复用）
+        self._offset_cache = {}
+
+    def advance(self):
+        """推进一帧"""
+        self.tick += 1
+        self._offset_cache.clear()
+
+    def wave(self, speed, phase=0.0):
+        """
+        当前帧的正弦波取值，等价于 sin(tick * speed + phase)
+
+        参数:
+            speed: 每帧的角速度（弧度）
+            phase: 初始相位（弧度）
+        """
+        return _SINE_TABLE[int((self.tick * speed + phase) * _TABLE_SCALE) % SINE_TABLE_SIZE]
+
+    def step(self, period, count):
+        """按固定帧数切换的动画帧编号：每 period 帧前进一格，共 count 格循环"""
+        return (self.tick // period) % count
+
+    def phase_offsets(self, speed, bucket_count, phase_step, amplitude):
+        """
+        一组相位分桶在当前帧的偏移量
+
+        第 k 个桶的取值为 sin(tick * speed + k * phase_step) * amplitude，
+        相位落在同一个桶里的元素（如草叶）共用同一个偏移，每帧每桶只算一次。
+
+        返回:
+            list: 长度为 bucket_count 的偏移列表
+        """
+        key = (speed, bucket_count, phase_step, amplitude)
+        offsets = self._offset_cache.get(key)
+        if offsets is None:
+            base = self.tick * speed
+            offsets = [fast_sin(base + k * phase_step) * amplitude for k in range(bucket_count)]
+            self._offset_cache[key] = offsets
+        return offsets
+
+
+# 全局单例
+_clock = None
+
+
+def get_clock():
+    """获取全局动画时钟"""
+    global _clock
+    if _clock is None:
+        _clock = AnimationClock()
+    return _clock
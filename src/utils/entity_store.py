@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑实体存储
+锦鲤、花朵、天气粒子这类成群的小实体原本每个都是一个字典（锦鲤还各自带着一份池塘参数），
+这里改为按字段分列存放：每个字段是一个 array.array 连续数组，实体就是数组下标。
+更新循环直接遍历连续的数值列，内存也只有字典的几分之一。
+NPC、足球、球门这类字段多、数量少的实体则用 __slots__ 类，见 memory_report()
+"""
+
+from array import array
+import sys
+
+
+class ColumnStore:
+    """
+    按列存放的实体集合
+
+    每个字段对应一个 array.array（类型码同标准库 array：'f' 单精度浮点、'd' 双精度、
+    'h' 16位整数、'b' 8位整数……），以同名属性暴露，如 store.x[i]。
+    """
+
+    def __init__(self, columns):
+        """
+        初始化列存储
+
+        参数:
+            columns: {字段名: 类型码}
+        """
+        self.columns = {}
+        for name, typecode in columns.items():
+            column = array(typecode)
+            self.columns[name] = column
+            setattr(self, name, column)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, **values):
+        """
+        追加一个实体（未给出的字段取 0）
+
+        返回:
+            int: 实体下标
+        """
+        for name, column in self.columns.items():
+            column.append(values.get(name, 0))
+        self.count += 1
+        return self.count - 1
+
+    def clear(self):
+        """清空所有实体（保留各列对象，外部持有的列引用仍然有效）"""
+        for column in self.columns.values():
+            del column[:]
+        self.count = 0
+
+    def bytes_per_entity(self):
+        """每个实体占用的字节数"""
+        return sum(column.itemsize for column in self.columns.values())
+
+
+def object_size(obj):
+    """
+    估算单个对象占用的字节数（浅层）
+
+    普通对象计入实例字典；__slots__ 对象没有实例字典，只计对象本身。
+    字典计入键值对容器本身，不计其中的值对象
+    """
+    size = sys.getsizeof(obj)
+    instance_dict = getattr(obj, '__dict__', None)
+    if instance_dict is not None:
+        size += sys.getsizeof(instance_dict)
+    return size
+
+
+def memory_report(groups):
+    """
+    生成实体内存报告
+
+    参数:
+        groups: [(名称, 实体列表或列存储), ...]，列存储是提供 bytes_per_entity() 的对象
+
+    返回:
+        list: 每组一行 "名称: 数量 x 每个字节数 B = 合计"
+    """
+    lines = []
+    for name, entities in groups:
+        if hasattr(entities, 'bytes_per_entity'):
+            count = len(entities)
+            per_entity = entities.bytes_per_entity()
+            layout = "cols"
+        else:
+            count = len(entities)
+            per_entity = object_size(entities[0]) if count else 0
+            slotted = count and not hasattr(entities[0], '__dict__')
+            layout = "slots" if slotted else "dict"
+        lines.append(f"{name}: {count} x {per_entity}B = {count * per_entity}B ({layout})")
+    return lines
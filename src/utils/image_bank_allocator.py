@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+图像库分配器
+Pyxel 只有 3 个 256x256 的图像库，瓦片图集、地标精灵、世界图层、室内缓存等
+都要从这里申请矩形区域，避免互相覆盖对方的像素。
+空间不足时按最近最少使用（LRU）的顺序淘汰未固定的条目，并统计命中率和占用率
+"""
+
+from collections import OrderedDict
+import pyxel
+
+
+IMAGE_BANK_COUNT = 3
+
+
+def _align_up(value, align):
+    """向上对齐到 align 的整数倍"""
+    return (value + align - 1) // align * align
+
+
+class BankHandle:
+    """
+    图像库区域句柄
+
+    被淘汰或释放后 valid 变为 False，持有者需要重新申请并重新烘焙
+    """
+
+    def __init__(self, key, bank, u, v, w, h, pinned=False, on_evict=None):
+        """
+        初始化句柄
+
+        参数:
+            key: 缓存键
+            bank: 图像库编号
+            u, v, w, h: 区域在图像库中的位置和尺寸
+            pinned: 是否固定（固定的条目不会被淘汰）
+            on_evict: 被淘汰时的回调 on_evict(handle)
+        """
+        self.key = key
+        self.bank = bank
+        self.u = u
+        self.v = v
+        self.w = w
+        self.h = h
+        self.pinned = pinned
+        self.on_evict = on_evict
+        self.valid = True
+        self.shelf = None  # 所在的货架（由分配器维护）
+
+
+class _Shelf:
+    """货架：图像库中等高的一行，行内用空闲区间列表管理"""
+
+    def __init__(self, y, h, width):
+        self.y = y
+        self.h = h
+        self.free_spans = [[0, width]]  # [[x, w], ...]，按 x 排序
+        self.used = 0  # 行内条目数
+
+    def find(self, w, align):
+        """找出第一个放得下宽度 w 的空闲区间，返回 (区间下标, 对齐后的 x)"""
+        for i, (x, span_w) in enumerate(self.free_spans):
+            start = _align_up(x, align)
+            if start + w <= x + span_w:
+                return i, start
+        return None
+
+    def take(self, index, start, w):
+        """从空闲区间中切出 [start, start + w)"""
+        x, span_w = self.free_spans[index]
+        pieces = []
+        if start > x:
+            pieces.append([x, start - x])
+        if start + w < x + span_w:
+            pieces.append([start + w, x + span_w - start - w])
+        self.free_spans[index:index + 1] = pieces
+        self.used += 1
+
+    def give_back(self, x, w):
+        """归还区间并与相邻空闲区间合并"""
+        self.free_spans.append([x, w])
+        self.free_spans.sort()
+        merged = []
+        for span in self.free_spans:
+            if merged and merged[-1][0] + merged[-1][1] == span[0]:
+                merged[-1][1] += span[1]
+            else:
+                merged.append(span)
+        self.free_spans = merged
+        self.used -= 1
+
+
+class ImageBankAllocator:
+    """
+    图像库分配器（货架式装箱 + LRU 淘汰）
+
+    每个图像库按行划分为若干货架，新条目优先放进高度足够的已有货架，
+    否则在库底部开新货架；最后一个货架可以长高以容纳更高的条目。
+    """
+
+    def __init__(self, bank_count=IMAGE_BANK_COUNT, bank_size=pyxel.IMAGE_SIZE):
+        """
+        初始化分配器
+
+        参数:
+            bank_count: 管理的图像库数量
+            bank_size: 图像库边长（像素）
+        """
+        self.bank_count = bank_count
+        self.bank_size = bank_size
+        self.shelves = [[] for _ in range(bank_count)]
+        self.entries = OrderedDict()  # 键 -> 句柄，按最近使用时间排序（末尾最新）
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.allocations = 0
+
+    # ---------- 查询 ----------
+
+    def lookup(self, key):
+        """
+        查找缓存条目（计入命中/未命中统计，命中时标记为最近使用）
+
+        返回:
+            BankHandle: 有效句柄，未找到时返回 None
+        """
+        handle = self.entries.get(key)
+        if handle is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return handle
+
+    def touch(self, handle):
+        """
+        使用已持有的句柄（计入命中/未命中统计，有效时标记为最近使用）
+
+        返回:
+            bool: 句柄是否仍然有效（无效说明已被淘汰，持有者需要重新烘焙）
+        """
+        if not handle.valid:
+            self.misses += 1
+            return False
+        self.hits += 1
+        self.entries.move_to_end(handle.key)
+        return True
+
+    # ---------- 分配与释放 ----------
+
+    def allocate(self, key, w, h, bank=None, pinned=False, align=1, on_evict=None):
+        """
+        申请一块区域（同一个键已有条目时先释放旧条目）
+
+        参数:
+            key: 缓存键（任意可哈希对象，建议以使用者名称开头）
+            w, h: 区域尺寸
+            bank: 指定图像库编号，None 表示任意图像库
+            pinned: 是否固定，固定的条目不会被淘汰
+            align: 区域左上角坐标的对齐单位（瓦片地图引用的区域需要按 8 对齐）
+            on_evict: 被淘汰时的回调 on_evict(handle)
+
+        返回:
+            BankHandle: 分配到的句柄；淘汰所有可淘汰条目后仍放不下时返回 None
+        """
+        if key in self.entries:
+            self.free(self.entries[key])
+        if w > self.bank_size or h > self.bank_size:
+            return None
+
+        banks = [bank] if bank is not None else list(range(self.bank_count))
+        while True:
+            for bank_index in banks:
+                handle = self._place(bank_index, key, w, h, pinned, align, on_evict)
+                if handle:
+                    self.entries[key] = handle
+                    self.allocations += 1
+                    return handle
+            if not self._evict_one(banks):
+                print(f"[图像库] 空间不足，无法分配 {key} ({w}x{h})")
+                return None
+
+    def free(self, handle):
+        """释放条目（不触发淘汰回调）"""
+        if not handle.valid:
+            return
+        handle.valid = False
+        self.entries.pop(handle.key, None)
+
+        shelf = handle.shelf
+        shelf.give_back(handle.u, handle.w)
+        handle.shelf = None
+
+        # 清理库底部的空货架，空间可以被更高的条目重新使用
+        shelves = self.shelves[handle.bank]
+        while shelves and shelves[-1].used == 0:
+            shelves.pop()
+
+    def _place(self, bank, key, w, h, pinned, align, on_evict):
+        """尝试在指定图像库中放下条目"""
+        shelves = self.shelves[bank]
+
+        # 已有货架
+        for shelf in shelves:
+            if h <= shelf.h and shelf.y % align == 0:
+                found = shelf.find(w, align)
+                if found:
+                    return self._take(bank, shelf, found, key, w, h, pinned, on_evict)
+
+        # 最后一个货架长高
+        if shelves:
+            last = shelves[-1]
+            if last.y % align == 0 and last.y + h <= self.bank_size:
+                found = last.find(w, align)
+                if found:
+                    last.h = max(last.h, h)
+                    return self._take(bank, last, found, key, w, h, pinned, on_evict)
+
+        # 新货架
+        top = shelves[-1].y + shelves[-1].h if shelves else 0
+        y = _align_up(top, align)
+        if y + h > self.bank_size:
+            return None
+        shelf = _Shelf(y, h, self.bank_size)
+        shelves.append(shelf)
+        return self._take(bank, shelf, shelf.find(w, align), key, w, h, pinned, on_evict)
+
+    def _take(self, bank, shelf, found, key, w, h, pinned, on_evict):
+        """在货架中切出区域并生成句柄"""
+        index, x = found
+        shelf.take(index, x, w)
+        handle = BankHandle(key, bank, x, shelf.y, w, h, pinned, on_evict)
+        handle.shelf = shelf
+        return handle
+
+    def _evict_one(self, banks):
+        """淘汰指定图像库中最久未使用的一个未固定条目，没有可淘汰条目时返回 False"""
+        for handle in self.entries.values():
+            if not handle.pinned and handle.bank in banks:
+                self.free(handle)
+                self.evictions += 1
+                if handle.on_evict:
+                    handle.on_evict(handle)
+                return True
+        return False
+
+    # ---------- 统计 ----------
+
+    def occupancy(self, bank):
+        """图像库的占用率（0~1，按已分配条目的面积计算）"""
+        used = sum(handle.w * handle.h for handle in self.entries.values()
+                   if handle.bank == bank)
+        return used / (self.bank_size * self.bank_size)
+
+    def hit_rate(self):
+        """查找命中率（0~1）"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_debug_lines(self):
+        """调试浮层显示的统计行"""
+        lines = [f"bank{bank}: {self.occupancy(bank) * 100:.0f}%"
+                 for bank in range(self.bank_count)]
+        lines.append(f"entries: {len(self.entries)} alloc: {self.allocations} evict: {self.evictions}")
+        lines.append(f"hit: {self.hits} miss: {self.misses} "
+                     f"({self.hit_rate() * 100:.0f}%)")
+        return lines
+
+
+# 全局单例
+_allocator = None
+
+
+def get_image_allocator():
+    """获取全局图像库分配器"""
+    global _allocator
+    if _allocator is None:
+        _allocator = ImageBankAllocator()
+    return _allocator
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+精灵图集
+角色（玩家、NPC、角色创建预览）原本每帧用几十个 rect/pset 拼出来，
+这里在第一次用到某个外观组合时把它烘焙进图像库，之后每次绘制只需一次带透明色的 blt。
+肤色、衣服、头发等可换色的部分用占位色烘焙，绘制时通过 pyxel.pal 换成实际颜色，
+角色外观组合再多，图集占用的空间也不会增加
+"""
+
+import pyxel
+from src.utils.image_bank_allocator import get_image_allocator
+
+
+# 透明色：角色精灵都不使用深绿色
+SPRITE_COLKEY = 3
+
+# 换色占位色：烘焙时用这些颜色绘制可换色的部分，绘制时映射为实际颜色
+# （使用换色的精灵中，其余固定颜色不能与占位色重复）
+PLACEHOLDER_SKIN = 8
+PLACEHOLDER_CLOTH = 9
+PLACEHOLDER_HAIR = 10
+
+
+class SpriteAtlas:
+    """
+    按需烘焙的精灵图集
+
+    每个精灵由键唯一确定，键必须包含所有影响外观的参数（类型、方向、动画帧、颜色等）。
+    绘制函数 painter(canvas, x, y) 以 (x, y) 为原点绘制精灵，
+    bounds = (ox, oy, w, h) 是精灵相对原点的包围盒。
+    图像库空间由分配器管理，被淘汰的精灵在下次使用时重新烘焙。
+
+    换色精灵在绘制时传入 palette = ((占位色, 实际颜色), ...)，
+    键中只需包含形状相关的参数，不同配色共用同一份烘焙结果。
+    """
+
+    def __init__(self, colkey=SPRITE_COLKEY):
+        """
+        初始化图集
+
+        参数:
+            colkey: 透明色
+        """
+        self.colkey = colkey
+        self.allocator = get_image_allocator()
+        self.bake_count = 0  # 累计烘焙次数（调试用）
+
+    def _bake(self, key, bounds, painter):
+        """烘焙一个精灵，图像库空间不足时返回 None"""
+        ox, oy, w, h = bounds
+        handle = self.allocator.allocate(('sprite', key), w, h)
+        if handle is None:
+            return None
+
+        img = pyxel.images[handle.bank]
+        img.clip(handle.u, handle.v, w, h)
+        img.rect(handle.u, handle.v, w, h, self.colkey)
+        painter(img, handle.u - ox, handle.v - oy)
+        img.clip()
+        self.bake_count += 1
+        return handle
+
+    def draw(self, key, x, y, bounds, painter, scale=1, palette=()):
+        """
+        绘制精灵（第一次使用时烘焙）
+
+        参数:
+            key: 精灵键
+            x, y: 精灵原点在屏幕上的位置
+            bounds: 精灵相对原点的包围盒 (ox, oy, w, h)
+            painter: 烘焙用的绘制函数 painter(canvas, x, y)
+            scale: 放大倍数（以原点为基准放大，如角色创建界面的 2 倍预览）
+            palette: 换色表 ((占位色, 实际颜色), ...)
+        """
+        handle = self.allocator.lookup(('sprite', key))
+        if handle is None:
+            handle = self._bake(key, bounds, painter)
+
+        for placeholder, color in palette:
+            pyxel.pal(placeholder, color)
+        if handle is None:
+            # 图像库已满，直接绘制（无法缩放）
+            painter(pyxel, x, y)
+        else:
+            self._blt(handle, x, y, bounds, scale)
+        for placeholder, _ in palette:
+            pyxel.pal(placeholder, placeholder)
+
+    def _blt(self, handle, x, y, bounds, scale):
+        """把烘焙好的精灵画到屏幕上"""
+        ox, oy, w, h = bounds
+        if scale == 1:
+            pyxel.blt(x + ox, y + oy, handle.bank, handle.u, handle.v, w, h, self.colkey)
+        else:
+            # Pyxel 以目标区域中心为基准缩放，换算成以原点为基准
+            pyxel.blt(x + ox * scale + (scale - 1) * w / 2,
+                      y + oy * scale + (scale - 1) * h / 2,
+                      handle.bank, handle.u, handle.v, w, h, self.colkey, scale=scale)
+
+
+# 全局单例
+_sprite_atlas = None
+
+
+def get_sprite_atlas():
+    """获取全局精灵图集"""
+    global _sprite_atlas
+    if _sprite_atlas is None:
+        _sprite_atlas = SpriteAtlas()
+    return _sprite_atlas
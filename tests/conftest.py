@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+Pyxel 在无显示器的环境下用 offscreen 视频驱动运行，整个测试会话只初始化一次
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+@pytest.fixture(scope='session')
+def game():
+    """初始化 Pyxel 并创建游戏实例（资源路径相对于项目根目录）"""
+    import pyxel
+    from config import WINDOW_WIDTH, WINDOW_HEIGHT, RESOURCE_FILE
+    os.chdir(ROOT)
+    pyxel.init(WINDOW_WIDTH, WINDOW_HEIGHT)
+    if os.path.exists(RESOURCE_FILE):
+        pyxel.load(RESOURCE_FILE)
+    from src.utils.font_manager import init_font
+    init_font(os.path.join(ROOT, 'assets', 'font', 'ark-pixel-12px-proportional-zh_cn.bdf'))
+    from src.game import Game
+    return Game()
+
+
+@pytest.fixture
+def game_scene(game):
+    """切换到校园场景，返回 GameScene"""
+    from src.scenes.scene_manager import SceneType
+    game.scene_manager.change_scene(SceneType.GAME)
+    return game.scene_manager.scenes[SceneType.GAME]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""移动解算（sweep_aabb）测试"""
+
+from config import TILE_SIZE
+from src.systems.collision import CollisionGrid, sweep_aabb
+
+# 8x4 瓦片，第 3 列是一整列墙
+WALL_COLUMN = 3
+WALL_LEFT = WALL_COLUMN * TILE_SIZE
+WALL_MAP = [[1 if x == WALL_COLUMN else 0 for x in range(8)] for _ in range(4)]
+SIZE = 8
+
+
+def make_grid():
+    """带一整列墙的网格"""
+    return CollisionGrid(WALL_MAP)
+
+
+def test_stops_flush_against_wall_from_fractional_start():
+    """小数起点、小数速度撞墙时停在紧贴墙面的位置"""
+    grid = make_grid()
+    result = sweep_aabb(grid.is_blocked, WALL_LEFT - SIZE - 3.5, 20, SIZE, SIZE, 7.3, 0)
+    assert result.x == WALL_LEFT - SIZE
+    assert result.normal_x == -1
+    assert not grid.is_blocked(result.x, 20, SIZE, SIZE)
+    assert grid.is_blocked(result.x + 1, 20, SIZE, SIZE)
+
+
+def test_does_not_tunnel_through_one_tile_wall():
+    """一帧的位移超过瓦片边长时也不会穿过一格厚的墙"""
+    grid = make_grid()
+    speed = TILE_SIZE * 3 + 5
+    result = sweep_aabb(grid.is_blocked, 4, 20, SIZE, SIZE, speed, 0)
+    assert result.x == WALL_LEFT - SIZE
+    assert result.normal_x == -1
+
+
+def test_slides_along_free_axis():
+    """斜着撞墙时被挡住的轴停下，另一个轴照常移动"""
+    grid = make_grid()
+    result = sweep_aabb(grid.is_blocked, WALL_LEFT - SIZE - 2, 20, SIZE, SIZE, 6, 5)
+    assert result.x == WALL_LEFT - SIZE
+    assert result.y == 25
+    assert result.normal_x == -1
+    assert result.normal_y == 0
+
+
+def test_box_starting_inside_obstacle_can_leave():
+    """出生在障碍里的矩形可以移出来"""
+    grid = make_grid()
+    start_x = WALL_LEFT - 4
+    assert grid.is_blocked(start_x, 20, SIZE, SIZE)
+    result = sweep_aabb(grid.is_blocked, start_x, 20, SIZE, SIZE, -6, 0)
+    assert result.x == start_x - 6
+    assert not result.blocked
+    assert not grid.is_blocked(result.x, 20, SIZE, SIZE)
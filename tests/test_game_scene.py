@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""校园场景测试"""
+
+from src.entities.player import PLACEHOLDER_SKIN, PLACEHOLDER_CLOTH, PLACEHOLDER_HAIR
+
+
+def test_on_enter_applies_character_palette(game, game_scene):
+    """创建角色后进入场景，精灵调色板换成所选的性别和肤色"""
+    game.scene_manager.player_data = {'name': '测试', 'gender': 'female', 'skin_color': 'white'}
+    game_scene.on_enter()
+    player = game_scene.player
+    assert not player.is_male
+    assert player.sprite_palette == ((PLACEHOLDER_SKIN, player.SKIN_COLORS['white']),
+                                     (PLACEHOLDER_CLOTH, 14),
+                                     (PLACEHOLDER_HAIR, 4))
+
+
+def test_walking_up_through_archway_enters_mosque(game_scene, monkeypatch):
+    """从拱门正中朝上走，进入清真寺"""
+    from config import TILE_SIZE
+    from src.systems.input_handler import InputHandler
+    monkeypatch.setattr(InputHandler, 'get_movement', staticmethod(lambda: (0, -1)))
+    monkeypatch.setattr(InputHandler, 'is_just_pressed', staticmethod(lambda *args, **kwargs: False))
+
+    if game_scene.current_map != 'east':
+        game_scene._switch_to_map('east', 'from_library')
+    game_scene.in_mosque = False
+    game_scene.triggers.suspend_frames = 0  # 跳过启动时的触发冷却
+    player = game_scene.player
+    player.skateboard_mode = False
+    player.x, player.y = 12 * TILE_SIZE, 7 * TILE_SIZE  # 拱门（列11-13）正中下方
+
+    for _ in range(120):
+        game_scene.update()
+        if game_scene.in_mosque:
+            break
+    assert game_scene.in_mosque
+
+
+def test_paused_frames_away_from_campus_are_not_caught_up(game_scene, monkeypatch):
+    """离开东校区期间，菜单打开的帧不计入 NPC 补帧"""
+    from src.entities.npc import NPC, NPCManager
+    from src.systems.input_handler import InputHandler
+    monkeypatch.setattr(InputHandler, 'get_movement', staticmethod(lambda: (0, 0)))
+    monkeypatch.setattr(InputHandler, 'is_just_pressed', staticmethod(lambda *args, **kwargs: False))
+    caught_up = []
+    monkeypatch.setattr(NPC, 'catch_up', lambda npc, frames: caught_up.append(frames))
+
+    game_scene.in_mosque = False
+    if game_scene.current_map != 'east':
+        game_scene._switch_to_map('east', 'from_library')
+    game_scene.npc_manager.update(game_scene.camera_x, game_scene.camera_y)
+    game_scene._switch_to_map('library', 'from_east')
+    for _ in range(10):
+        game_scene.update()
+    game_scene.game_menu.active = True
+    for _ in range(50):
+        game_scene.update()
+    game_scene.game_menu.active = False
+    game_scene._switch_to_map('east', 'from_library')
+
+    # 图书馆里实际模拟了 10 帧，再加上离开前屏幕外 NPC 攒下的不到一个间隔的帧
+    assert caught_up
+    assert all(10 <= frames < 10 + NPCManager.COARSE_INTERVAL for frames in caught_up)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""寻路（PathFinder / PathfindingService）测试"""
+
+import pytest
+
+from config import TILE_SIZE
+from src.systems.collision import CollisionGrid, get_collision_service
+from src.systems.pathfinding import PathfindingService
+
+MAP_NAME = 'test_pathfinding'
+
+# 第 3 列是墙，只有最下面一行留着缺口
+WALL_MAP = [
+    [0, 0, 0, 1, 0, 0, 0],
+    [0, 0, 0, 1, 0, 0, 0],
+    [0, 0, 0, 1, 0, 0, 0],
+    [0, 0, 0, 1, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0],
+]
+
+# (2,1) 是墙：从 (1,1) 斜着走到 (2,2) 会切墙角
+CORNER_MAP = [
+    [1, 1, 1, 1, 1],
+    [1, 0, 1, 1, 1],
+    [1, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1],
+]
+
+
+def center(tile_x, tile_y):
+    """瓦片中心的像素坐标"""
+    return tile_x * TILE_SIZE + TILE_SIZE / 2, tile_y * TILE_SIZE + TILE_SIZE / 2
+
+
+def tile_of(point):
+    """像素坐标所在的瓦片"""
+    return int(point[0] // TILE_SIZE), int(point[1] // TILE_SIZE)
+
+
+@pytest.fixture
+def register_map():
+    """把测试网格登记到碰撞网格服务，测试结束后移除"""
+    service = get_collision_service()
+
+    def register(collision_map):
+        service.register(MAP_NAME, CollisionGrid(collision_map))
+
+    yield register
+    service.grids.pop(MAP_NAME, None)
+
+
+def test_routes_around_wall(register_map):
+    """直线被墙挡住时绕过墙的缺口"""
+    register_map(WALL_MAP)
+    service = PathfindingService()
+    finder = service.get_pathfinder(MAP_NAME)
+    goal = center(5, 1)
+    position = center(1, 1)
+    visited = [tile_of(position)]
+    for _ in range(20):
+        service.begin_frame()
+        waypoint = finder.next_waypoint(*position, *goal)
+        if waypoint is None:
+            break
+        position = waypoint
+        visited.append(tile_of(position))
+    else:
+        pytest.fail("没有走到可以直线到达目标的位置")
+
+    assert all(WALL_MAP[y][x] == 0 for x, y in visited)
+    assert (3, 4) in visited  # 从墙下的缺口绕过去
+
+
+def test_diagonal_steps_do_not_cut_corners(register_map):
+    """斜走时两侧相邻的瓦片都必须可通行"""
+    register_map(CORNER_MAP)
+    service = PathfindingService()
+    finder = service.get_pathfinder(MAP_NAME)
+    finder.add_destination('corner', (3, 2, 1, 1))
+    service.begin_frame()
+    waypoint = finder.next_waypoint(*center(1, 1), *center(3, 2), destination='corner')
+    assert tile_of(waypoint) == (1, 2)
+
+
+def test_search_deferred_when_frame_budget_is_spent(register_map):
+    """本帧预算用完时返回 None，下一帧有预算时照常寻路"""
+    register_map(WALL_MAP)
+    service = PathfindingService(budget_per_frame=0)
+    finder = service.get_pathfinder(MAP_NAME)
+    service.begin_frame()
+    assert finder.next_waypoint(*center(1, 1), *center(5, 1)) is None
+    assert finder.deferred == 1
+
+    service.budget_per_frame = 1500
+    service.begin_frame()
+    assert finder.next_waypoint(*center(1, 1), *center(5, 1)) is not None
+
+
+def test_caches_dropped_when_grid_is_replaced(register_map):
+    """CollisionService.register 替换网格后，流场和路径缓存全部失效"""
+    register_map(WALL_MAP)
+    service = PathfindingService()
+    finder = service.get_pathfinder(MAP_NAME)
+    finder.add_destination('right', (5, 0, 2, 5))
+    service.begin_frame()
+    assert finder.next_waypoint(*center(1, 1), *center(5, 1)) is not None
+    assert finder.next_waypoint(*center(1, 1), *center(5, 1), destination='right') is not None
+    assert finder.path_cache and finder.flow_fields
+
+    # 拆掉墙：旧缓存作废，目标可以直线到达
+    open_map = [[0] * len(WALL_MAP[0]) for _ in WALL_MAP]
+    register_map(open_map)
+    service.begin_frame()
+    assert finder.next_waypoint(*center(1, 1), *center(5, 1)) is None
+    assert finder.grid is get_collision_service().get_grid(MAP_NAME)
+    assert not finder.path_cache and not finder.flow_fields
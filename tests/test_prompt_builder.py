@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""提示词组装（token 预算）测试"""
+
+from src.systems.prompt_builder import (
+    PROMPT_TOKEN_BUDGET, PromptBuilder, clip_to_tokens, estimate_message_tokens,
+    estimate_tokens, summarize_locally,
+)
+
+SYSTEM_PROMPT = "你是一个名叫\"小明\"的游戏NPC角色。英语系学生，开朗，喜欢 English corner。" * 3
+
+
+def test_estimate_tokens_counts_cjk_and_latin():
+    """中日韩文字每字 1 个 token，拉丁字母单词每 4 个字母 1 个 token"""
+    assert estimate_tokens("你好") == 2
+    assert estimate_tokens("hello world") == 4
+    assert estimate_tokens("hi你好！") == 4
+    assert estimate_tokens("   ") == 0
+
+
+def test_clip_to_tokens_stays_within_budget():
+    """截断后（含省略号）不超过预算"""
+    text = "图书馆 library 今天人很多，people everywhere。" * 10
+    for budget in (1, 5, 17, 40):
+        assert estimate_tokens(clip_to_tokens(text, budget)) <= budget
+        assert estimate_tokens(clip_to_tokens(text, budget, keep_end=True)) <= budget
+
+
+def test_long_mixed_history_stays_within_budget():
+    """
+    长对话中每轮的提示词都不超过预算，总是保留玩家的最后一句，
+    保留的原文不以 NPC 的回复开头
+    """
+    builder = PromptBuilder()
+    history = []
+    summary = ""
+    covered = 0
+    for turn in range(60):
+        user_text = f"第{turn}句：Can you tell me about the 图书馆 and 食堂 opening hours? 谢谢！" * (1 + turn % 3)
+        history.append({"role": "user", "content": user_text})
+
+        # 与 AIDialogueSystem._build_messages 相同：放不下的旧对话折叠进本地摘要
+        pending = history[covered:]
+        start = builder.split(SYSTEM_PROMPT, pending)
+        if start > 0:
+            summary = summarize_locally(summary, pending[:start], "小明", builder.summary_budget)
+            covered += start
+        messages = builder.build(SYSTEM_PROMPT, history[covered:], summary)
+
+        assert estimate_message_tokens(messages) <= PROMPT_TOKEN_BUDGET
+        assert messages[-1] == {"role": "user", "content": user_text}
+        assert messages[1]["role"] == "user"
+
+        history.append({"role": "assistant",
+                        "content": f"好的 sure！第{turn}次回答：图书馆 opens at 8am，食堂 serves lunch 到一点。"})
+
+    assert covered > 0 and summary